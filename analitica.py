@@ -0,0 +1,555 @@
+"""
+Analítica vectorizada de visitas y asignaciones con NumPy.
+
+Carga ``visitas`` y ``asignaciones_semanales`` (incluidos los archivos
+históricos de ``archivo.py``) en arreglos por columna y calcula sobre todo el
+historial, sin recorrer filas en Python:
+
+- ``abandono``: clientes cuyas visitas se cortaron, comparando los días desde
+  la última visita con el intervalo habitual de cada cliente;
+- ``precios``: precio medio por mes y clientes cuyo precio cambió;
+- ``cumplimiento``: porcentaje de asignaciones realizadas por semana, con
+  media móvil y pendiente de la tendencia;
+- ``rendimiento``: visitas, ingresos y regularidad semanal de cada técnico.
+
+Los arreglos quedan en memoria y, opcionalmente, en un archivo ``.npz``.
+``refrescar`` trae solo las filas con id mayor al último cargado, después de
+comprobar con una huella (conteo y sumas de cada columna) que las filas ya
+cargadas no cambiaron; si cambiaron (se marcó una asignación como realizada,
+se archivó un año) recarga todo.
+
+Las fechas se guardan como días desde 1970-01-01 y las semanas como número
+de semana desde el lunes 1969-12-29 (``(dia + 3) // 7``).
+
+Uso:
+    python analitica.py abandono [--db piscinas.db] [--dias 45] [--factor 3] [--limite 30]
+    python analitica.py precios [--meses 12] [--limite 20]
+    python analitica.py cumplimiento [--semanas 26] [--ventana 4] [--responsable ID]
+    python analitica.py rendimiento [--semanas 12]
+    python analitica.py refrescar
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import Database
+
+VERSION_CACHE = 1
+
+# Columnas que se cargan de cada tabla. La fecha se lee con julianday(), que
+# cuesta mucho menos por fila que las columnas generadas dia_clave y
+# semana_clave (strftime y date() con modificadores); 0 si no es válida.
+_TIPO = np.dtype([
+    ('id', 'i8'), ('cliente_id', 'i4'), ('responsable_id', 'i4'),
+    ('juliano', 'f8'), ('realizada', 'i1'), ('precio', 'f8'),
+])
+_FECHA = {'visitas': 'fecha_visita', 'asignaciones_semanales': 'semana_inicio'}
+_SQL = """
+    SELECT id, COALESCE(cliente_id, 0), COALESCE(responsable_id, 0), IFNULL(julianday({fecha}), 0),
+           COALESCE(realizada, 0) = 1, COALESCE(precio, -1)
+    FROM {origen}
+    WHERE id > ?
+"""
+# Sumas enteras (fecha en días julianos y precio en centavos) para comparar exacto
+_SQL_HUELLA = """
+    SELECT COUNT(*), TOTAL(id), TOTAL(cliente_id), TOTAL(responsable_id),
+           TOTAL(CAST(julianday({fecha}) AS INTEGER)), TOTAL(COALESCE(realizada, 0) = 1),
+           TOTAL(ROUND(precio * 100))
+    FROM main.{tabla}
+    WHERE id <= ?
+"""
+# Día juliano del 1970-01-01 a las 00:00
+_EPOCA_JULIANA = 2440587.5
+
+
+def _dias(juliano: np.ndarray) -> np.ndarray:
+    """Días julianos (con o sin hora) a días desde 1970-01-01."""
+    return np.floor(juliano - _EPOCA_JULIANA).astype(np.int32)
+
+
+def _fecha(dia) -> str:
+    return str(np.datetime64(int(dia), 'D'))
+
+
+def _lunes(semana) -> str:
+    return _fecha(int(semana) * 7 - 3)
+
+
+def _huella(filas: np.ndarray) -> List[int]:
+    """Mismos valores que ``_SQL_HUELLA`` calculados sobre las filas cargadas."""
+    precios = filas['precio'][filas['precio'] >= 0]
+    return [len(filas), int(filas['id'].sum()), int(filas['cliente_id'].sum(dtype=np.int64)),
+            int(filas['responsable_id'].sum(dtype=np.int64)),
+            int(np.trunc(filas['juliano']).sum()), int(filas['realizada'].sum(dtype=np.int64)),
+            int(np.floor(precios * 100 + 0.5).sum())]  # como ROUND() de SQLite
+
+
+def _grupos(ordenados: np.ndarray):
+    """Inicio y fin (inclusive) de cada tramo de valores iguales de un arreglo ordenado."""
+    inicio = np.flatnonzero(np.r_[True, ordenados[1:] != ordenados[:-1]])
+    fin = np.r_[inicio[1:], len(ordenados)] - 1
+    return inicio, fin
+
+
+class Analitica:
+    """Métricas sobre todo el historial, calculadas con arreglos de NumPy.
+    
+    ``cache`` es la ruta de un ``.npz`` donde guardar los arreglos entre
+    ejecuciones (None para solo memoria). Los métodos de métricas refrescan
+    los datos si pasaron más de ``ttl`` segundos desde el último refresco.
+    """
+    
+    def __init__(self, db: Database, cache: Optional[str] = None, ttl: float = 60.0,
+                 historico: bool = True):
+        self.db = db
+        self.cache = cache
+        self.ttl = ttl
+        self.historico = historico
+        self.visitas: Dict[str, np.ndarray] = {}
+        self.asignaciones: Dict[str, np.ndarray] = {}
+        self._estado: Dict = {}
+        self._refrescado = None
+    
+    # Carga
+    def _leer(self, tabla: str, origen: str, desde_id: int = 0) -> np.ndarray:
+        cursor = self.db.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(_SQL.format(fecha=_FECHA[tabla], origen=origen), (desde_id,))
+        return np.fromiter(cursor, dtype=_TIPO)
+    
+    def _columnas(self, tabla: str, filas: np.ndarray) -> Dict[str, np.ndarray]:
+        """Separa las filas en arreglos por columna, con fechas en días o semanas.
+        
+        Descarta las filas sin fecha válida.
+        """
+        filas = filas[filas['juliano'] > 0]
+        precio = filas['precio'].copy()
+        precio[precio < 0] = np.nan
+        columnas = {
+            'id': filas['id'].copy(),
+            'cliente_id': filas['cliente_id'].copy(),
+            'responsable_id': filas['responsable_id'].copy(),
+            'realizada': filas['realizada'].astype(bool),
+            'precio': precio,
+        }
+        dias = _dias(filas['juliano'])
+        if tabla == 'visitas':
+            columnas['dia'] = dias
+        else:
+            columnas['semana'] = (dias + 3) // 7
+        return columnas
+    
+    def _archivos(self) -> List:
+        if not self.historico:
+            return []
+        return [[a['anio'], a['archivo'], a['visitas'], a['asignaciones'], a['actualizado_at']]
+                for a in self.db.archivos_historicos()]
+    
+    def _cargar_todo(self):
+        conn = self.db.get_connection()
+        archivos = self._archivos()
+        esquemas = self.db._adjuntar_archivos(conn, self.db.archivos_historicos()) if archivos else []
+        estado = {'version': VERSION_CACHE, 'db': os.path.abspath(self.db.db_path),
+                  'archivos': archivos}
+        for tabla, destino in (('visitas', 'visitas'), ('asignaciones_semanales', 'asignaciones')):
+            partes = [self._leer(tabla, f"{esquema}.{tabla}") for esquema in esquemas]
+            base = self._leer(tabla, f"main.{tabla}")
+            partes.append(base)
+            filas = np.concatenate(partes)
+            setattr(self, destino, self._columnas(tabla, filas))
+            estado[tabla] = {'max_id': int(base['id'].max()) if len(base) else 0,
+                             'huella': _huella(base)}
+        self._estado = estado
+    
+    def _sin_cambios(self, tabla: str) -> bool:
+        """Compara la huella de las filas ya cargadas con la de la base."""
+        estado = self._estado[tabla]
+        actual = self.db.get_connection().execute(
+            _SQL_HUELLA.format(fecha=_FECHA[tabla], tabla=tabla), (estado['max_id'],)).fetchone()
+        return [int(valor) for valor in actual] == estado['huella']
+    
+    def refrescar(self, completo: bool = False) -> Dict:
+        """Trae las filas nuevas (o todo, si cambiaron las ya cargadas).
+        
+        Retorna si fue una recarga completa, las filas nuevas de cada tabla,
+        el total cargado y los segundos que tomó.
+        """
+        inicio = time.perf_counter()
+        if not self._estado and self.cache and not completo:
+            self._leer_cache()
+        recarga = (completo or not self._estado or self._estado['archivos'] != self._archivos()
+                   or not all(self._sin_cambios(t) for t in _FECHA))
+        nuevas = {}
+        if recarga:
+            self._cargar_todo()
+            nuevas = {'visitas': len(self.visitas['id']),
+                      'asignaciones': len(self.asignaciones['id'])}
+        else:
+            for tabla, destino in (('visitas', 'visitas'), ('asignaciones_semanales', 'asignaciones')):
+                estado = self._estado[tabla]
+                filas = self._leer(tabla, f"main.{tabla}", estado['max_id'])
+                nuevas[destino] = len(filas)
+                if len(filas):
+                    actuales = getattr(self, destino)
+                    agregadas = self._columnas(tabla, filas)
+                    setattr(self, destino, {c: np.concatenate([actuales[c], agregadas[c]])
+                                            for c in actuales})
+                    estado['max_id'] = max(estado['max_id'], int(filas['id'].max()))
+                    estado['huella'] = [a + b for a, b in zip(estado['huella'], _huella(filas))]
+        if self.cache and (recarga or any(nuevas.values())):
+            self._guardar_cache()
+        self._refrescado = time.monotonic()
+        return {
+            'recarga_completa': recarga,
+            'visitas_nuevas': nuevas['visitas'],
+            'asignaciones_nuevas': nuevas['asignaciones'],
+            'visitas': len(self.visitas['id']),
+            'asignaciones': len(self.asignaciones['id']),
+            'segundos': time.perf_counter() - inicio,
+        }
+    
+    def _asegurar(self):
+        if self._refrescado is None or time.monotonic() - self._refrescado > self.ttl:
+            self.refrescar()
+    
+    def _guardar_cache(self):
+        arreglos = {f"v_{c}": a for c, a in self.visitas.items()}
+        arreglos.update({f"a_{c}": a for c, a in self.asignaciones.items()})
+        temporal = self.cache + '.tmp.npz'
+        np.savez(temporal, estado=np.array(json.dumps(self._estado)), **arreglos)
+        os.replace(temporal, self.cache)
+    
+    def _leer_cache(self):
+        """Carga los arreglos del ``.npz`` si corresponde a esta base y versión."""
+        if not os.path.exists(self.cache):
+            return
+        with np.load(self.cache, allow_pickle=False) as datos:
+            estado = json.loads(str(datos['estado']))
+            if (estado.get('version') != VERSION_CACHE
+                    or estado.get('db') != os.path.abspath(self.db.db_path)):
+                return
+            self.visitas = {c[2:]: datos[c] for c in datos.files if c.startswith('v_')}
+            self.asignaciones = {c[2:]: datos[c] for c in datos.files if c.startswith('a_')}
+        self._estado = estado
+    
+    # Métricas
+    def _nombres(self, tabla: str, columnas: str = "id, nombre") -> Dict[int, tuple]:
+        cursor = self.db.get_connection().execute(f"SELECT {columnas} FROM {tabla}")
+        return {row[0]: tuple(row) for row in cursor}
+    
+    def abandono(self, dias: int = 45, factor: float = 3.0, minimo_visitas: int = 3,
+                 referencia: str = None, solo_activos: bool = True) -> List[Dict]:
+        """Clientes que dejaron de recibir visitas realizadas.
+        
+        Un cliente está en abandono si tiene al menos ``minimo_visitas`` y
+        pasaron más de ``dias`` días, y más de ``factor`` veces su intervalo
+        medio entre visitas, desde la última. ``referencia`` es la fecha de
+        comparación; por defecto, la de la última visita registrada (así una
+        base restaurada o importada no marca a todos). Ordenados por días
+        sin visita, de mayor a menor.
+        """
+        self._asegurar()
+        v = self.visitas
+        realizadas = v['realizada']
+        cliente, dia, precio = v['cliente_id'][realizadas], v['dia'][realizadas], v['precio'][realizadas]
+        if not len(cliente):
+            return []
+        orden = np.lexsort((dia, cliente))
+        cliente, dia, precio = cliente[orden], dia[orden], precio[orden]
+        inicio, fin = _grupos(cliente)
+        
+        cantidad = fin - inicio + 1
+        primera, ultima = dia[inicio], dia[fin]
+        intervalo = np.where(cantidad > 1, (ultima - primera) / np.maximum(cantidad - 1, 1), np.nan)
+        hoy = int(dia.max()) if referencia is None else int(np.datetime64(referencia[:10], 'D').astype(int))
+        sin_visita = hoy - ultima
+        # fmax ignora el NaN de los clientes con una sola visita
+        umbral = np.fmax(float(dias), factor * intervalo)
+        marcados = np.flatnonzero((cantidad >= minimo_visitas) & (sin_visita > umbral))
+        marcados = marcados[np.argsort(-sin_visita[marcados], kind='stable')]
+        
+        clientes = self._nombres('clientes', "id, nombre, comuna, responsable_id, activo")
+        resultado = []
+        for i in marcados:
+            cliente_id = int(cliente[inicio[i]])
+            _, nombre, comuna, responsable_id, activo = clientes.get(
+                cliente_id, (cliente_id, None, None, None, 0))
+            if solo_activos and activo != 1:
+                continue
+            resultado.append({
+                'cliente_id': cliente_id,
+                'nombre': nombre,
+                'comuna': comuna,
+                'responsable_id': responsable_id,
+                'visitas': int(cantidad[i]),
+                'primera_visita': _fecha(primera[i]),
+                'ultima_visita': _fecha(ultima[i]),
+                'dias_sin_visita': int(sin_visita[i]),
+                'intervalo_medio': round(float(intervalo[i]), 1) if cantidad[i] > 1 else None,
+                'ultimo_precio': None if np.isnan(precio[fin[i]]) else float(precio[fin[i]]),
+            })
+        return resultado
+    
+    def precios(self, meses: int = 12, referencia: str = None, limite: int = 20) -> Dict:
+        """Evolución del precio de las visitas realizadas en los últimos ``meses`` meses.
+        
+        Retorna ``por_mes`` (visitas, precio medio, mínimo y máximo y la
+        variación del medio respecto del mes anterior), ``clientes`` (los
+        ``limite`` con mayor cambio porcentual entre su primer y su último
+        precio del periodo) y un ``resumen`` de cuántos subieron o bajaron.
+        """
+        self._asegurar()
+        v = self.visitas
+        validas = v['realizada'] & ~np.isnan(v['precio'])
+        dia, cliente, precio = v['dia'][validas], v['cliente_id'][validas], v['precio'][validas]
+        mes = dia.astype('M8[D]').astype('M8[M]').astype(np.int32)
+        if referencia is not None:
+            ultimo = int(np.datetime64(referencia[:7], 'M').astype(int))
+        else:
+            ultimo = int(mes.max()) if len(mes) else 0
+        periodo = (mes > ultimo - meses) & (mes <= ultimo)
+        dia, cliente, precio, mes = dia[periodo], cliente[periodo], precio[periodo], mes[periodo]
+        
+        por_mes = []
+        if len(mes):
+            indice = mes - (ultimo - meses + 1)
+            cantidad = np.bincount(indice, minlength=meses)
+            suma = np.bincount(indice, weights=precio, minlength=meses)
+            minimo = np.full(meses, np.inf)
+            maximo = np.full(meses, -np.inf)
+            np.minimum.at(minimo, indice, precio)
+            np.maximum.at(maximo, indice, precio)
+            medio = np.divide(suma, cantidad, out=np.full(meses, np.nan), where=cantidad > 0)
+            anterior = np.r_[np.nan, medio[:-1]]
+            variacion = (medio / anterior - 1) * 100
+            for i in np.flatnonzero(cantidad):
+                por_mes.append({
+                    'mes': str(np.datetime64(int(ultimo - meses + 1 + i), 'M')),
+                    'visitas': int(cantidad[i]),
+                    'precio_medio': round(float(medio[i]), 1),
+                    'precio_minimo': float(minimo[i]),
+                    'precio_maximo': float(maximo[i]),
+                    'variacion_pct': None if np.isnan(variacion[i]) else round(float(variacion[i]), 2),
+                })
+        
+        clientes_cambio, resumen = [], {'clientes': 0, 'subieron': 0, 'bajaron': 0,
+                                        'variacion_media_pct': 0.0}
+        if len(cliente):
+            orden = np.lexsort((dia, cliente))
+            cliente, precio = cliente[orden], precio[orden]
+            inicio, fin = _grupos(cliente)
+            primero, ultimo_precio = precio[inicio], precio[fin]
+            variacion = np.divide(ultimo_precio - primero, primero,
+                                  out=np.zeros(len(inicio)), where=primero > 0) * 100
+            resumen = {
+                'clientes': len(inicio),
+                'subieron': int((ultimo_precio > primero).sum()),
+                'bajaron': int((ultimo_precio < primero).sum()),
+                'variacion_media_pct': round(float(variacion.mean()), 2),
+            }
+            cambios = np.flatnonzero(ultimo_precio != primero)
+            cambios = cambios[np.argsort(-np.abs(variacion[cambios]), kind='stable')][:limite]
+            nombres = self._nombres('clientes') if len(cambios) else {}
+            for i in cambios:
+                cliente_id = int(cliente[inicio[i]])
+                clientes_cambio.append({
+                    'cliente_id': cliente_id,
+                    'nombre': nombres.get(cliente_id, (None, None))[1],
+                    'precio_inicial': float(primero[i]),
+                    'precio_final': float(ultimo_precio[i]),
+                    'variacion_pct': round(float(variacion[i]), 2),
+                })
+        return {'por_mes': por_mes, 'clientes': clientes_cambio, 'resumen': resumen}
+    
+    def _semana_referencia(self, referencia: Optional[str]) -> int:
+        if referencia is not None:
+            return (int(np.datetime64(referencia[:10], 'D').astype(int)) + 3) // 7
+        if len(self.asignaciones['semana']):
+            return int(self.asignaciones['semana'].max())
+        return (int(self.visitas['dia'].max()) + 3) // 7 if len(self.visitas['dia']) else 0
+    
+    def cumplimiento(self, semanas: int = 26, ventana: int = 4, referencia: str = None,
+                     responsable_id: int = None) -> Dict:
+        """Porcentaje de asignaciones realizadas por semana y su tendencia.
+        
+        ``media_movil`` es el cumplimiento de las ``ventana`` semanas que
+        terminan en cada una (realizadas / asignadas del tramo, no el promedio
+        de los porcentajes). ``pendiente`` es la tendencia del periodo en
+        puntos porcentuales por semana (recta de mínimos cuadrados).
+        """
+        self._asegurar()
+        a = self.asignaciones
+        ultima = self._semana_referencia(referencia)
+        primera = ultima - semanas + 1
+        filtro = (a['semana'] >= primera) & (a['semana'] <= ultima)
+        if responsable_id is not None:
+            filtro &= a['responsable_id'] == responsable_id
+        indice = a['semana'][filtro] - primera
+        asignadas = np.bincount(indice, minlength=semanas)
+        realizadas = np.bincount(indice, weights=a['realizada'][filtro], minlength=semanas)
+        tasa = np.divide(realizadas, asignadas, out=np.full(semanas, np.nan), where=asignadas > 0) * 100
+        
+        acumuladas = np.r_[0, np.cumsum(asignadas)]
+        acumuladas_r = np.r_[0, np.cumsum(realizadas)]
+        desde = np.maximum(np.arange(semanas) + 1 - ventana, 0)
+        en_ventana = acumuladas[1:] - acumuladas[desde]
+        media = np.divide(acumuladas_r[1:] - acumuladas_r[desde], en_ventana,
+                          out=np.full(semanas, np.nan), where=en_ventana > 0) * 100
+        
+        con_datos = ~np.isnan(tasa)
+        pendiente = (float(np.polyfit(np.flatnonzero(con_datos), tasa[con_datos], 1)[0])
+                     if con_datos.sum() >= 2 else None)
+        filas = [{
+            'semana_inicio': _lunes(primera + i),
+            'asignadas': int(asignadas[i]),
+            'realizadas': int(realizadas[i]),
+            'cumplimiento_pct': round(float(tasa[i]), 2),
+            'media_movil_pct': round(float(media[i]), 2),
+        } for i in np.flatnonzero(con_datos)]
+        return {'semanas': filas,
+                'pendiente_pp_semana': None if pendiente is None else round(pendiente, 3)}
+    
+    def rendimiento(self, semanas: int = 12, referencia: str = None) -> List[Dict]:
+        """Productividad de cada responsable en las últimas ``semanas`` semanas.
+        
+        Incluye visitas realizadas e ingresos, semanas con visitas, visitas
+        por semana activa, la mejor semana, la regularidad (coeficiente de
+        variación de las visitas semanales, menor es más parejo) y el
+        cumplimiento de sus asignaciones. Ordenado por visitas.
+        """
+        self._asegurar()
+        v, a = self.visitas, self.asignaciones
+        ultima = self._semana_referencia(referencia)
+        primera = ultima - semanas + 1
+        
+        semana_v = (v['dia'] + 3) // 7
+        filtro_v = v['realizada'] & (semana_v >= primera) & (semana_v <= ultima)
+        filtro_a = (a['semana'] >= primera) & (a['semana'] <= ultima)
+        ids, inverso = np.unique(np.r_[v['responsable_id'][filtro_v], a['responsable_id'][filtro_a]],
+                                 return_inverse=True)
+        if not len(ids):
+            return []
+        total_v = int(filtro_v.sum())
+        resp_v, resp_a = inverso[:total_v], inverso[total_v:]
+        
+        matriz = np.bincount(resp_v * semanas + (semana_v[filtro_v] - primera),
+                             minlength=len(ids) * semanas).reshape(len(ids), semanas)
+        visitas = matriz.sum(axis=1)
+        activas = (matriz > 0).sum(axis=1)
+        media = matriz.mean(axis=1)
+        regularidad = np.divide(matriz.std(axis=1), media, out=np.zeros(len(ids)), where=media > 0)
+        ingresos = np.bincount(resp_v, weights=np.nan_to_num(v['precio'][filtro_v]), minlength=len(ids))
+        asignadas = np.bincount(resp_a, minlength=len(ids))
+        realizadas = np.bincount(resp_a, weights=a['realizada'][filtro_a], minlength=len(ids))
+        
+        nombres = self._nombres('responsables')
+        resultado = []
+        for i in np.argsort(-visitas, kind='stable'):
+            responsable_id = int(ids[i])
+            resultado.append({
+                'responsable_id': responsable_id,
+                'nombre': nombres.get(responsable_id, (None, 'Sin responsable'))[1],
+                'visitas': int(visitas[i]),
+                'ingresos': float(ingresos[i]),
+                'semanas_activas': int(activas[i]),
+                'visitas_por_semana': round(float(visitas[i] / activas[i]), 1) if activas[i] else 0.0,
+                'mejor_semana': int(matriz[i].max()),
+                'regularidad_cv': round(float(regularidad[i]), 3),
+                'asignadas': int(asignadas[i]),
+                'cumplimiento_pct': round(float(realizadas[i] / asignadas[i] * 100), 2) if asignadas[i] else None,
+            })
+        return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analítica de visitas y asignaciones con NumPy")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_aba = sub.add_parser('abandono', help="Clientes cuyas visitas se cortaron")
+    p_aba.add_argument('--dias', type=int, default=45, help="Mínimo de días sin visita")
+    p_aba.add_argument('--factor', type=float, default=3.0,
+                       help="Veces el intervalo habitual del cliente")
+    p_aba.add_argument('--minimo-visitas', type=int, default=3)
+    p_aba.add_argument('--limite', type=int, default=30)
+    
+    p_pre = sub.add_parser('precios', help="Precio medio por mes y clientes con cambio de precio")
+    p_pre.add_argument('--meses', type=int, default=12)
+    p_pre.add_argument('--limite', type=int, default=20)
+    
+    p_cum = sub.add_parser('cumplimiento', help="Cumplimiento semanal y su tendencia")
+    p_cum.add_argument('--semanas', type=int, default=26)
+    p_cum.add_argument('--ventana', type=int, default=4)
+    p_cum.add_argument('--responsable', type=int)
+    
+    p_ren = sub.add_parser('rendimiento', help="Productividad por responsable")
+    p_ren.add_argument('--semanas', type=int, default=12)
+    
+    sub.add_parser('refrescar', help="Actualiza la caché de arreglos")
+    
+    for p in sub.choices.values():
+        p.add_argument('--db', default='piscinas.db')
+        p.add_argument('--cache', help="Archivo .npz de caché (por defecto junto a la base)")
+        p.add_argument('--sin-cache', action='store_true')
+    for p in (p_aba, p_cum, p_ren):
+        p.add_argument('--referencia', help="Fecha de referencia (por defecto, la última con datos)")
+    p_pre.add_argument('--referencia', help="Mes de referencia YYYY-MM (por defecto, el último con datos)")
+    
+    args = parser.parse_args()
+    db = Database(args.db)
+    cache = None if args.sin_cache else (args.cache or os.path.splitext(args.db)[0] + '.analitica.npz')
+    analitica = Analitica(db, cache)
+    r = analitica.refrescar()
+    tipo = "recarga completa" if r['recarga_completa'] else "incremental"
+    print(f"✓ Datos ({tipo}): {r['visitas']:,} visitas y {r['asignaciones']:,} asignaciones, "
+          f"{r['visitas_nuevas']:,} y {r['asignaciones_nuevas']:,} nuevas en {r['segundos']:.2f}s")
+    
+    if args.comando == 'abandono':
+        clientes = analitica.abandono(args.dias, args.factor, args.minimo_visitas, args.referencia)
+        print(f"\n{len(clientes)} clientes sin visitas recientes")
+        print(f"\n{'ID':>6} {'Cliente':<32} {'Comuna':<14} {'Visitas':>7} {'Última':<11} "
+              f"{'Días':>5} {'Interv.':>7}")
+        print("-" * 88)
+        for c in clientes[:args.limite]:
+            intervalo = f"{c['intervalo_medio']:.1f}" if c['intervalo_medio'] is not None else "-"
+            print(f"{c['cliente_id']:>6} {(c['nombre'] or '')[:32]:<32} {(c['comuna'] or '')[:14]:<14} "
+                  f"{c['visitas']:>7} {c['ultima_visita']:<11} {c['dias_sin_visita']:>5} {intervalo:>7}")
+    elif args.comando == 'precios':
+        informe = analitica.precios(args.meses, args.referencia, args.limite)
+        print(f"\n{'Mes':<8} {'Visitas':>8} {'Medio':>10} {'Mínimo':>10} {'Máximo':>10} {'Var. %':>7}")
+        print("-" * 58)
+        for m in informe['por_mes']:
+            variacion = f"{m['variacion_pct']:+.2f}" if m['variacion_pct'] is not None else "-"
+            print(f"{m['mes']:<8} {m['visitas']:>8,} {m['precio_medio']:>10,.0f} "
+                  f"{m['precio_minimo']:>10,.0f} {m['precio_maximo']:>10,.0f} {variacion:>7}")
+        resumen = informe['resumen']
+        print(f"\n{resumen['clientes']} clientes: {resumen['subieron']} subieron, "
+              f"{resumen['bajaron']} bajaron (variación media {resumen['variacion_media_pct']:+.2f}%)")
+        for c in informe['clientes']:
+            print(f"  {c['cliente_id']:>6} {(c['nombre'] or '')[:32]:<32} "
+                  f"${c['precio_inicial']:,.0f} → ${c['precio_final']:,.0f} ({c['variacion_pct']:+.1f}%)")
+    elif args.comando == 'cumplimiento':
+        informe = analitica.cumplimiento(args.semanas, args.ventana, args.referencia, args.responsable)
+        print(f"\n{'Semana':<11} {'Asignadas':>10} {'Realizadas':>11} {'%':>7} {'Media móvil':>12}")
+        print("-" * 55)
+        for s in informe['semanas']:
+            print(f"{s['semana_inicio']:<11} {s['asignadas']:>10,} {s['realizadas']:>11,} "
+                  f"{s['cumplimiento_pct']:>7.1f} {s['media_movil_pct']:>12.1f}")
+        if informe['pendiente_pp_semana'] is not None:
+            print(f"\nTendencia: {informe['pendiente_pp_semana']:+.3f} puntos por semana")
+    elif args.comando == 'rendimiento':
+        print(f"\n{'Responsable':<24} {'Visitas':>8} {'Ingresos':>14} {'Sem.':>5} {'Por sem.':>9} "
+              f"{'Mejor':>6} {'CV':>6} {'Cumpl. %':>9}")
+        print("-" * 88)
+        for r in analitica.rendimiento(args.semanas, args.referencia):
+            cumplimiento = f"{r['cumplimiento_pct']:.1f}" if r['cumplimiento_pct'] is not None else "-"
+            print(f"{r['nombre'][:24]:<24} {r['visitas']:>8,} {r['ingresos']:>14,.0f} "
+                  f"{r['semanas_activas']:>5} {r['visitas_por_semana']:>9.1f} {r['mejor_semana']:>6} "
+                  f"{r['regularidad_cv']:>6.2f} {cumplimiento:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,11 @@
 """
 Aplicación CLI para gestionar el sistema de mantenimiento de piscinas.
 """
+import os
 import sys
 from datetime import datetime, timedelta
-from database import Database
+from database import Database, DIAS_SEMANA, normalizar_texto
+from reportes import Reportes
 from typing import Optional
 
 
@@ -13,6 +15,14 @@ class App:
     
     def __init__(self, db_path: str = "piscinas.db"):
         self.db = Database(db_path)
+        # PISCINAS_SLOW_MS=<umbral> activa la instrumentación de consultas
+        umbral = os.environ.get('PISCINAS_SLOW_MS')
+        if umbral:
+            self.db.activar_instrumentacion(
+                umbral_ms=float(umbral),
+                archivo_log=os.environ.get('PISCINAS_SLOW_LOG', 'consultas_lentas.log'),
+                volcar_al_salir=True
+            )
     
     def mostrar_menu_principal(self):
         """Muestra el menú principal."""
@@ -29,23 +39,82 @@ class App:
         print("8. Ver asignaciones por semana específica")
         print("9. Registrar visita realizada")
         print("10. Ver historial de visitas de un cliente")
+        print("11. Asignar clientes a un rango de semanas")
+        print("12. Cerrar ruta del día (registrar visitas en lote)")
+        print("13. Reportes de facturación y cumplimiento")
+        print("14. Estadísticas de consultas")
+        print("15. Balancear carga de responsables y días")
         print("0. Salir")
         print("="*60)
     
-    def ver_clientes(self):
-        """Muestra todos los clientes."""
-        clientes = self.db.obtener_clientes()
-        if not clientes:
-            print("\nNo hay clientes registrados.")
-            return
+    def ver_clientes(self, tamano_pagina: int = 50, **filtros):
+        """Muestra los clientes página por página.
         
-        print(f"\n{'ID':<5} {'Nombre':<30} {'Responsable':<20} {'Día':<12} {'Precio':<10}")
-        print("-" * 80)
-        for cliente in clientes:
+        Acepta los filtros de ``Database.pagina_clientes`` (``comuna``,
+        ``responsable_id``, ``dia_atencion``).
+        """
+        mostrados = 0
+        for cliente in self.db.iter_clientes(batch_size=tamano_pagina, **filtros):
+            if mostrados == 0:
+                print(f"\n{'ID':<5} {'Nombre':<30} {'Responsable':<20} {'Día':<12} {'Precio':<10}")
+                print("-" * 80)
+            elif mostrados % tamano_pagina == 0:
+                continuar = input(f"-- {mostrados} mostrados. Enter para ver más, 'q' para terminar: ")
+                if continuar.strip().lower() == 'q':
+                    return
             print(f"{cliente['id']:<5} {cliente['nombre']:<30} "
                   f"{(cliente['responsable_nombre'] or 'Sin asignar'):<20} "
                   f"{(cliente['dia_atencion'] or 'Sin asignar'):<12} "
                   f"${cliente['precio_por_visita']:<9.0f}")
+            mostrados += 1
+        
+        if mostrados == 0:
+            print("\nNo hay clientes registrados.")
+    
+    def ver_clientes_filtrados(self):
+        """Pide filtros opcionales y muestra los clientes que los cumplen."""
+        print("\n--- Ver Clientes (Enter para omitir un filtro) ---")
+        comuna = input("Comuna: ").strip() or None
+        
+        responsable_id = None
+        responsables = self.db.obtener_responsables()
+        if responsables:
+            for resp in responsables:
+                print(f"  {resp['id']}. {resp['nombre']}")
+            resp_input = input("ID del responsable: ").strip()
+            responsable_id = int(resp_input) if resp_input.isdigit() else None
+        
+        dia_atencion = input("Día de atención: ").strip() or None
+        self.ver_clientes(comuna=comuna, responsable_id=responsable_id,
+                          dia_atencion=dia_atencion)
+    
+    def seleccionar_cliente(self, mensaje: str = "\nCliente (ID o texto a buscar): ") -> Optional[dict]:
+        """Pide un cliente por ID o por búsqueda de texto y lo retorna."""
+        while True:
+            texto = input(mensaje).strip()
+            if not texto:
+                return None
+            if texto.isdigit():
+                cliente = self.db.obtener_cliente_por_id(int(texto))
+                if not cliente:
+                    print("Cliente no encontrado.")
+                return cliente
+            
+            resultados = self.db.buscar_clientes(texto, limit=10)
+            if not resultados:
+                print("Sin resultados, intenta con otro texto.")
+                continue
+            if len(resultados) == 1:
+                cliente = resultados[0]
+                print(f"  → {cliente['id']}. {cliente['nombre']} ({cliente['comuna'] or 'Sin comuna'})")
+                return cliente
+            
+            for i, cliente in enumerate(resultados, 1):
+                print(f"  {i}. [{cliente['id']}] {cliente['nombre']} - "
+                      f"{cliente['direccion'] or ''} ({cliente['comuna'] or 'Sin comuna'})")
+            eleccion = input("Número de la lista (Enter para buscar de nuevo): ").strip()
+            if eleccion.isdigit() and 1 <= int(eleccion) <= len(resultados):
+                return resultados[int(eleccion) - 1]
     
     def ver_responsables(self):
         """Muestra todos los responsables."""
@@ -105,17 +174,10 @@ class App:
     
     def editar_cliente(self):
         """Edita un cliente existente."""
-        self.ver_clientes()
-        cliente_id_input = input("\nID del cliente a editar: ").strip()
-        if not cliente_id_input.isdigit():
-            print("ID inválido.")
-            return
-        
-        cliente_id = int(cliente_id_input)
-        cliente = self.db.obtener_cliente_por_id(cliente_id)
+        cliente = self.seleccionar_cliente("\nCliente a editar (ID o texto a buscar): ")
         if not cliente:
-            print("Cliente no encontrado.")
             return
+        cliente_id = cliente['id']
         
         print(f"\nEditando cliente: {cliente['nombre']}")
         print("(Presiona Enter para mantener el valor actual)\n")
@@ -192,39 +254,50 @@ class App:
             return
         
         semana_inicio = self.db.obtener_semana_actual()
-        asignados = self.db.asignar_clientes_semana(semana_inicio)
-        print(f"\n✓ {asignados} clientes asignados a la semana del {semana_inicio}")
+        resultado = self.db.asignar_clientes_semanas(semana_inicio, semana_inicio)
+        print(f"\n✓ {resultado['insertadas']} clientes asignados a la semana del {semana_inicio}"
+              f" ({resultado['existentes']} ya estaban asignados)")
+    
+    def asignar_rango_semanas(self):
+        """Asigna todos los clientes activos a un rango de semanas."""
+        print("\n--- Asignar Clientes a Rango de Semanas ---")
+        desde = input("Semana inicial (YYYY-MM-DD): ").strip()
+        hasta = input("Semana final (YYYY-MM-DD): ").strip()
+        try:
+            resultado = self.db.asignar_clientes_semanas(desde, hasta)
+        except ValueError as e:
+            print(f"Fechas inválidas: {e}")
+            return
+        
+        print(f"\n✓ {resultado['semanas']} semanas procesadas: "
+              f"{resultado['insertadas']} asignaciones nuevas, "
+              f"{resultado['existentes']} ya existentes")
     
     def ver_asignaciones_semana(self, semana_inicio: str = None):
         """Muestra las asignaciones de una semana."""
         if semana_inicio is None:
             semana_inicio = self.db.obtener_semana_actual()
         
-        asignaciones = self.db.obtener_asignaciones_semana(semana_inicio)
-        if not asignaciones:
+        agenda = self.db.agenda_semana(semana_inicio)
+        if not agenda:
             print(f"\nNo hay asignaciones para la semana del {semana_inicio}")
             return
         
         print(f"\nAsignaciones para la semana del {semana_inicio}")
         print("="*100)
         
-        # Agrupar por día
-        por_dia = {}
-        for asignacion in asignaciones:
-            dia = asignacion['dia_atencion'] or 'Sin día asignado'
-            if dia not in por_dia:
-                por_dia[dia] = []
-            por_dia[dia].append(asignacion)
-        
-        for dia in sorted(por_dia.keys()):
-            print(f"\n{dia}:")
-            print(f"{'ID':<5} {'Cliente':<30} {'Responsable':<20} {'Precio':<10} {'Realizada':<10}")
-            print("-" * 80)
-            for asignacion in por_dia[dia]:
-                realizada = "Sí" if asignacion['realizada'] else "No"
-                print(f"{asignacion['id']:<5} {asignacion['cliente_nombre']:<30} "
-                      f"{(asignacion['responsable_nombre'] or 'Sin asignar'):<20} "
-                      f"${asignacion['precio']:<9.0f} {realizada:<10}")
+        for responsable in agenda:
+            print(f"\n{responsable['responsable_nombre']} "
+                  f"({responsable['realizadas']}/{responsable['total']} realizadas)")
+            for dia in responsable['dias']:
+                print(f"\n  {dia['dia']}" + (f" {dia['fecha']}" if dia['fecha'] else "") + ":")
+                print(f"  {'ID':<5} {'Cliente':<30} {'Comuna':<20} {'Precio':<10} {'Realizada':<10}")
+                print("  " + "-" * 78)
+                for asignacion in dia['clientes']:
+                    realizada = "Sí" if asignacion['realizada'] else "No"
+                    print(f"  {asignacion['id']:<5} {(asignacion['cliente_nombre'] or ''):<30} "
+                          f"{(asignacion['comuna'] or ''):<20} "
+                          f"${(asignacion['precio'] or 0):<9.0f} {realizada:<10}")
     
     def ver_asignaciones_semana_especifica(self):
         """Muestra asignaciones de una semana específica."""
@@ -238,17 +311,10 @@ class App:
     def registrar_visita(self):
         """Registra una visita realizada."""
         print("\n--- Registrar Visita ---")
-        self.ver_clientes()
-        cliente_id_input = input("\nID del cliente: ").strip()
-        if not cliente_id_input.isdigit():
-            print("ID inválido.")
-            return
-        
-        cliente_id = int(cliente_id_input)
-        cliente = self.db.obtener_cliente_por_id(cliente_id)
+        cliente = self.seleccionar_cliente()
         if not cliente:
-            print("Cliente no encontrado.")
             return
+        cliente_id = cliente['id']
         
         fecha_input = input(f"Fecha de visita (YYYY-MM-DD) [hoy: {datetime.now().strftime('%Y-%m-%d')}]: ").strip()
         if not fecha_input:
@@ -273,22 +339,136 @@ class App:
         )
         print(f"\n✓ Visita registrada con ID: {visita_id}")
     
+    def cerrar_ruta_dia(self):
+        """Registra de una vez las visitas de la ruta de un responsable en un día."""
+        print("\n--- Cerrar Ruta del Día ---")
+        self.ver_responsables()
+        resp_input = input("\nID del responsable: ").strip()
+        if not resp_input.isdigit():
+            print("ID inválido.")
+            return
+        responsable_id = int(resp_input)
+        
+        hoy = datetime.now().strftime('%Y-%m-%d')
+        fecha_input = input(f"Fecha (YYYY-MM-DD) [hoy: {hoy}]: ").strip() or hoy
+        try:
+            fecha = datetime.strptime(fecha_input, "%Y-%m-%d")
+        except ValueError:
+            print("Formato de fecha inválido.")
+            return
+        
+        semana_inicio = (fecha - timedelta(days=fecha.weekday())).strftime("%Y-%m-%d")
+        dia = DIAS_SEMANA[fecha.weekday()]
+        # El Excel trae los días con o sin tilde y en cualquier caja
+        pendientes = [a for a in self.db.obtener_asignaciones_semana(semana_inicio)
+                      if a['responsable_id'] == responsable_id
+                      and normalizar_texto(a['dia_atencion']) == normalizar_texto(dia)
+                      and not a['realizada']]
+        if not pendientes:
+            print(f"\nNo hay asignaciones pendientes para el {dia} {fecha_input}.")
+            return
+        
+        print(f"\nRuta del {dia} {fecha_input}:")
+        for a in pendientes:
+            print(f"  {a['cliente_id']:<5} {a['cliente_nombre']:<30} ${a['precio'] or 0:.0f}")
+        omitir_input = input("\nIDs de clientes NO visitados (separados por coma, Enter si todos): ")
+        omitir = {int(x) for x in omitir_input.replace(' ', '').split(',') if x.isdigit()}
+        
+        visitas = [{
+            'cliente_id': a['cliente_id'],
+            'fecha_visita': fecha_input,
+            'responsable_id': responsable_id,
+            'precio': a['precio'],
+        } for a in pendientes if a['cliente_id'] not in omitir]
+        resultado = self.db.registrar_visitas_lote(visitas)
+        print(f"\n✓ {len(resultado['visita_ids'])} visitas registradas, "
+              f"{resultado['asignaciones_marcadas']} asignaciones marcadas como realizadas")
+    
+    def ver_reportes(self):
+        """Muestra los reportes semanales de facturación y cumplimiento."""
+        reportes = Reportes(self.db)
+        print("\n--- Reportes ---")
+        print("1. Por responsable")
+        print("2. Por comuna")
+        print("3. Tendencia de las últimas 12 semanas")
+        opcion = input("\nSelecciona un reporte: ").strip()
+        
+        if opcion in ("1", "2"):
+            semana_actual = self.db.obtener_semana_actual()
+            desde = input(f"Semana inicial (YYYY-MM-DD) [{semana_actual}]: ").strip() or semana_actual
+            hasta = input(f"Semana final (YYYY-MM-DD) [{desde}]: ").strip() or desde
+            if opcion == "1":
+                filas = reportes.por_responsable(desde, hasta)
+                titulo, clave = 'Responsable', 'responsable_nombre'
+            else:
+                filas = reportes.por_comuna(desde, hasta)
+                titulo, clave = 'Comuna', 'comuna'
+        elif opcion == "3":
+            filas = reportes.tendencia_semanal(12)
+            titulo, clave = 'Semana', 'semana_inicio'
+        else:
+            print("\nOpción inválida.")
+            return
+        
+        if not filas:
+            print("\nNo hay datos para el período.")
+            return
+        
+        print(f"\n{titulo:<22} {'Asignadas':>10} {'Realizadas':>11} {'Cumpl.':>7} {'Visitas':>8} {'Ingresos':>12}")
+        print("-" * 75)
+        for fila in filas:
+            cumplimiento = f"{fila['cumplimiento']}%" if fila['cumplimiento'] is not None else '-'
+            print(f"{(fila[clave] or 'Sin asignar'):<22} {fila['asignadas']:>10} "
+                  f"{fila['realizadas']:>11} {cumplimiento:>7} {fila['visitas']:>8} "
+                  f"${fila['ingresos']:>11,.0f}")
+    
+    def ver_estadisticas_consultas(self):
+        """Muestra las estadísticas de la instrumentación de consultas."""
+        if self.db.instrumentacion is None:
+            print("\nLa instrumentación está desactivada.")
+            activar = input("¿Activarla ahora? (s/n): ").strip().lower()
+            if activar == 's':
+                self.db.activar_instrumentacion(volcar_al_salir=True)
+                print("✓ Instrumentación activada (umbral de consultas lentas: 100 ms)")
+            return
+        self.db.instrumentacion.imprimir()
+    
+    def balancear_carga(self):
+        """Propone redistribuir clientes entre responsables y días, y lo aplica si se confirma."""
+        from planificador import Planificador, aplicar, imprimir_plan
+        
+        capacidad_input = input("\nMáximo de clientes por técnico y día [automático]: ").strip()
+        capacidad = int(capacidad_input) if capacidad_input.isdigit() else None
+        plan = Planificador(self.db, capacidad=capacidad).planificar()
+        tecnicos = {r['id']: r['nombre'] for r in self.db.obtener_responsables()}
+        imprimir_plan(plan, tecnicos, limite=20)
+        if not plan['cambios']:
+            print("\nLa distribución actual ya cumple el plan.")
+            return
+        
+        confirmar = input(f"\n¿Aplicar los {len(plan['cambios'])} cambios? (s/n): ").strip().lower()
+        if confirmar != 's':
+            return
+        semana = self.db.obtener_semana_actual()
+        resultado = aplicar(self.db, plan['cambios'], semana)
+        print(f"✓ {resultado['actualizados']} clientes actualizados "
+              f"({resultado['conflictos']} conflictos)")
+        print(f"✓ {resultado['asignaciones']} asignaciones pendientes de la semana del {semana} rehechas")
+    
     def ver_historial_cliente(self):
         """Muestra el historial de visitas de un cliente."""
-        self.ver_clientes()
-        cliente_id_input = input("\nID del cliente: ").strip()
-        if not cliente_id_input.isdigit():
-            print("ID inválido.")
+        cliente = self.seleccionar_cliente()
+        if not cliente:
             return
         
-        cliente_id = int(cliente_id_input)
+        cliente_id = cliente['id']
         visitas = self.db.obtener_visitas_cliente(cliente_id, limit=20)
         
         if not visitas:
             print("\nNo hay visitas registradas para este cliente.")
             return
         
-        print(f"\nHistorial de visitas (últimas 20):")
+        print("\nHistorial de visitas (últimas 20):")
         print(f"{'Fecha':<12} {'Responsable':<20} {'Precio':<10} {'Realizada':<10}")
         print("-" * 60)
         for visita in visitas:
@@ -305,7 +485,7 @@ class App:
             
             try:
                 if opcion == "1":
-                    self.ver_clientes()
+                    self.ver_clientes_filtrados()
                 elif opcion == "2":
                     self.ver_responsables()
                 elif opcion == "3":
@@ -324,6 +504,16 @@ class App:
                     self.registrar_visita()
                 elif opcion == "10":
                     self.ver_historial_cliente()
+                elif opcion == "11":
+                    self.asignar_rango_semanas()
+                elif opcion == "12":
+                    self.cerrar_ruta_dia()
+                elif opcion == "13":
+                    self.ver_reportes()
+                elif opcion == "14":
+                    self.ver_estadisticas_consultas()
+                elif opcion == "15":
+                    self.balancear_carga()
                 elif opcion == "0":
                     print("\n¡Hasta luego!")
                     break
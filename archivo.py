@@ -0,0 +1,353 @@
+"""
+Archivo histórico: mueve los periodos cerrados a una base SQLite por año.
+
+``visitas`` y ``asignaciones_semanales`` solo crecen (cada semana agrega una
+copia completa de la cartera), y con ellas la base, sus índices y los
+respaldos. El archivado mueve las filas anteriores a un corte a archivos
+``archivo/<base>_<año>.db`` con el mismo esquema y las registra en la tabla
+``archivos_historicos`` junto con su rango de claves de día y de semana.
+
+Las consultas históricas de ``Database`` (``obtener_visitas_cliente``,
+``visitas_rango`` y ``asignaciones_rango``) adjuntan con ``ATTACH`` solo los
+archivos que pueden tener filas del rango pedido y unen sus resultados con
+los de la base, así que el archivado no cambia lo que retornan.
+
+Qué se archiva:
+- asignaciones de semanas que empiezan antes del corte;
+- visitas anteriores al corte que ya no esperan nada de Odoo: con documento
+  (``odoo_move_id``, p. ej. emitido por el servidor Node), no realizadas o
+  ya enviadas por la bandeja. Las realizadas sin documento se quedan en la
+  base hasta facturarse. Las entradas de la bandeja de las visitas
+  archivadas se borran.
+
+La copia y el borrado van en transacciones separadas: si el proceso se
+interrumpe entre ambas, las filas quedan repetidas (nunca perdidas), las
+consultas las muestran una vez y el siguiente archivado termina de
+borrarlas. ``resumen_semanal`` no cambia: mientras se borra se suspenden
+sus triggers de borrado, así que los reportes siguen incluyendo los años
+archivados (``Reportes.reconstruir`` en cambio solo ve la base).
+
+``compactar`` devuelve al sistema las páginas libres con ``VACUUM``. Como
+reescribe todo el archivo, el siguiente respaldo incremental de
+``respaldos.py`` copia casi todas las páginas; conviene compactar justo
+antes del respaldo completo. Los archivos históricos no cambian después de
+archivar y se respaldan copiándolos tal cual.
+
+Uso:
+    python archivo.py archivar [--db piscinas.db] [--meses 12 | --antes-de 2025-01-01] [--dry-run] [--compactar]
+    python archivo.py compactar [--db piscinas.db]
+    python archivo.py listar [--db piscinas.db]
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import date
+from typing import Dict, List
+
+import calendario
+from database import Database
+
+DIRECTORIO = 'archivo'
+
+# Columnas generadas que se recrean en los archivos (ver migraciones._calendario)
+_GENERADAS = {
+    'visitas': {'dia_clave': calendario.sql_clave_dia('fecha_visita')},
+    'asignaciones_semanales': {'semana_clave': calendario.sql_clave_semana('semana_inicio')},
+}
+
+_INDICES = {
+    'visitas': ["cliente_id, fecha_visita", "dia_clave"],
+    'asignaciones_semanales': ["semana_clave, responsable_id", "cliente_id"],
+}
+
+# Selecciona las filas a archivar en la base (alias "t") según el corte
+_CONDICION = {
+    'visitas': """t.dia_clave < :dia AND (t.odoo_move_id IS NOT NULL OR t.realizada IS NOT 1
+                     OR EXISTS (SELECT 1 FROM odoo_outbox o
+                                WHERE o.visita_id = t.id AND o.estado = 'enviado'))""",
+    'asignaciones_semanales': "t.semana_clave < :semana",
+}
+
+# Año de cada fila, a partir de su clave entera
+_ANIO = {
+    'visitas': "t.dia_clave / 10000",
+    'asignaciones_semanales': "t.semana_clave / 100",
+}
+
+
+def _megas(n: int) -> str:
+    return f"{n / (1 << 20):.1f} MB"
+
+
+def _tamano(path: str) -> int:
+    """Tamaño de la base más su WAL."""
+    return sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p))
+
+
+class Archivador:
+    """Archiva y compacta una base de ``Database`` en archivos por año."""
+    
+    def __init__(self, db: Database, directorio: str = DIRECTORIO):
+        self.db = db
+        self.directorio = directorio
+    
+    @staticmethod
+    def corte(meses: int = 12) -> str:
+        """Lunes de la semana del primer día del mes de hace ``meses`` meses.
+        
+        Usar siempre un lunes deja completa en la base la semana del corte.
+        """
+        hoy = date.today()
+        total = hoy.year * 12 + hoy.month - 1 - meses
+        return calendario.semana_inicio(date(total // 12, total % 12 + 1, 1))
+    
+    def _parametros(self, antes_de: str) -> Dict:
+        lunes = calendario.lunes(antes_de)
+        return {'dia': calendario.clave_dia(lunes), 'semana': calendario.clave_semana(lunes)}
+    
+    def pendientes(self, antes_de: str) -> Dict[int, Dict[str, int]]:
+        """Filas que archivaría ``archivar(antes_de)``, por año y tabla."""
+        conn = self.db.get_connection()
+        resultado: Dict[int, Dict[str, int]] = {}
+        for tabla in _CONDICION:
+            cursor = conn.execute(f"""
+                SELECT {_ANIO[tabla]} AS anio, COUNT(*) FROM {tabla} t
+                WHERE {_CONDICION[tabla]} GROUP BY anio
+            """, self._parametros(antes_de))
+            for anio, cantidad in cursor:
+                resultado.setdefault(anio, {t: 0 for t in _CONDICION})[tabla] = cantidad
+        return dict(sorted(resultado.items()))
+    
+    def _nombre_archivo(self, anio: int) -> str:
+        """Ruta del archivo de ``anio``, relativa al directorio de la base."""
+        base = os.path.splitext(os.path.basename(self.db.db_path))[0]
+        return os.path.join(self.directorio, f"{base}_{anio}.db")
+    
+    def _crear_esquema(self, conn: sqlite3.Connection):
+        """Crea en ``destino`` las tablas (con el esquema actual de la base) e índices."""
+        for tabla, generadas in _GENERADAS.items():
+            columnas = [
+                f"{nombre} {tipo}".strip()
+                for _, nombre, tipo, _, _, _, oculta in conn.execute(f"PRAGMA main.table_xinfo({tabla})")
+                if oculta == 0 and nombre != 'id'
+            ]
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS destino.{tabla} (
+                    id INTEGER PRIMARY KEY, {', '.join(columnas)}
+                )
+            """)
+            # Si la base ganó columnas desde el último archivado, se agregan
+            existentes = {row[1] for row in conn.execute(f"PRAGMA destino.table_xinfo({tabla})")}
+            for _, nombre, tipo, _, _, _, oculta in conn.execute(f"PRAGMA main.table_xinfo({tabla})"):
+                if nombre in existentes:
+                    continue
+                if nombre in generadas:
+                    conn.execute(f"""
+                        ALTER TABLE destino.{tabla}
+                        ADD COLUMN {nombre} INTEGER GENERATED ALWAYS AS ({generadas[nombre]}) VIRTUAL
+                    """)
+                elif oculta == 0:
+                    conn.execute(f"ALTER TABLE destino.{tabla} ADD COLUMN {nombre} {tipo}")
+            for i, indice in enumerate(_INDICES[tabla]):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS destino.idx_{tabla}_archivo_{i} "
+                             f"ON {tabla}({indice})")
+    
+    def archivar(self, antes_de: str) -> List[Dict]:
+        """Mueve a los archivos por año las filas anteriores a ``antes_de``.
+        
+        Retorna, por año, las filas movidas y los segundos que tomó. Las
+        páginas que quedan libres en la base (``paginas_libres``) se devuelven
+        al sistema con ``compactar``.
+        """
+        if self.db.pool.in_transaction():
+            raise RuntimeError("No se puede archivar dentro de una transacción abierta")
+        conn = self.db.get_connection()
+        params = self._parametros(antes_de)
+        resultados = []
+        
+        for anio in self.pendientes(antes_de):
+            inicio = time.perf_counter()
+            archivo = self._nombre_archivo(anio)
+            ruta = self.db.ruta_archivo(archivo)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            filtro = dict(params, anio=anio)
+            # ATTACH no se puede dentro de una transacción
+            conn.execute("ATTACH DATABASE ? AS destino", (ruta,))
+            try:
+                with self.db.transaction():
+                    self._crear_esquema(conn)
+                    for tabla in _CONDICION:
+                        columnas = ", ".join(
+                            row[1] for row in conn.execute(f"PRAGMA destino.table_info({tabla})"))
+                        conn.execute(f"""
+                            INSERT OR IGNORE INTO destino.{tabla} ({columnas})
+                            SELECT {columnas} FROM main.{tabla} t
+                            WHERE {_CONDICION[tabla]} AND {_ANIO[tabla]} = :anio
+                        """, filtro)
+                
+                movidas = {}
+                with self.db.transaction():
+                    triggers = self._suspender_triggers(conn)
+                    for tabla in _CONDICION:
+                        movidas[tabla] = conn.execute(f"""
+                            DELETE FROM main.{tabla} WHERE id IN (
+                                SELECT t.id FROM main.{tabla} t JOIN destino.{tabla} d ON d.id = t.id
+                                WHERE {_CONDICION[tabla]} AND {_ANIO[tabla]} = :anio)
+                        """, filtro).rowcount
+                    # Después de las visitas: su condición mira la bandeja
+                    conn.execute("""
+                        DELETE FROM odoo_outbox
+                        WHERE visita_id IN (SELECT id FROM destino.visitas)
+                          AND visita_id NOT IN (SELECT id FROM main.visitas)
+                    """)
+                    for sql in triggers:
+                        conn.execute(sql)
+                    conn.execute("""
+                        INSERT INTO archivos_historicos
+                        (anio, archivo, visitas, asignaciones, dia_desde, dia_hasta,
+                         semana_desde, semana_hasta, actualizado_at)
+                        SELECT ?, ?, v.n, a.n, v.desde, v.hasta, a.desde, a.hasta, datetime('now')
+                        FROM (SELECT COUNT(*) AS n, MIN(dia_clave) AS desde, MAX(dia_clave) AS hasta
+                              FROM destino.visitas) v,
+                             (SELECT COUNT(*) AS n, MIN(semana_clave) AS desde, MAX(semana_clave) AS hasta
+                              FROM destino.asignaciones_semanales) a
+                        WHERE true
+                        ON CONFLICT (anio) DO UPDATE SET
+                            archivo = excluded.archivo,
+                            visitas = excluded.visitas,
+                            asignaciones = excluded.asignaciones,
+                            dia_desde = excluded.dia_desde,
+                            dia_hasta = excluded.dia_hasta,
+                            semana_desde = excluded.semana_desde,
+                            semana_hasta = excluded.semana_hasta,
+                            actualizado_at = excluded.actualizado_at
+                    """, (anio, archivo))
+                    self.db._invalidar_cache()
+            finally:
+                conn.execute("DETACH DATABASE destino")
+            resultados.append({
+                'anio': anio,
+                'archivo': archivo,
+                'visitas': movidas['visitas'],
+                'asignaciones': movidas['asignaciones_semanales'],
+                'segundos': time.perf_counter() - inicio,
+            })
+        return resultados
+    
+    @staticmethod
+    def _suspender_triggers(conn: sqlite3.Connection) -> List[str]:
+        """Borra los triggers de borrado de ``resumen_semanal`` y retorna su SQL.
+        
+        Lo archivado sigue contando en el resumen, por eso el borrado no
+        debe descontarlo.
+        """
+        triggers = conn.execute("""
+            SELECT name, sql FROM main.sqlite_master
+            WHERE type = 'trigger' AND name IN ('resumen_visitas_ad', 'resumen_asignaciones_semanales_ad')
+        """).fetchall()
+        for nombre, _ in triggers:
+            conn.execute(f"DROP TRIGGER {nombre}")
+        return [sql for _, sql in triggers]
+    
+    def paginas_libres(self) -> int:
+        """Bytes de páginas libres en la base (los que recupera ``compactar``)."""
+        conn = self.db.get_connection()
+        libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return libres * conn.execute("PRAGMA page_size").fetchone()[0]
+    
+    def compactar(self) -> List[Dict]:
+        """Ejecuta ``VACUUM`` sobre la base y sus archivos; retorna tamaños y tiempos.
+        
+        Bloquea las escrituras mientras dura: conviene hacerlo fuera del
+        horario de trabajo.
+        """
+        if self.db.pool.in_transaction():
+            raise RuntimeError("No se puede compactar dentro de una transacción abierta")
+        conn = self.db.get_connection()
+        rutas = [self.db.db_path] + [self.db.ruta_archivo(a['archivo'])
+                                     for a in self.db.archivos_historicos()]
+        resultados = []
+        for ruta in rutas:
+            if not os.path.exists(ruta):
+                continue
+            inicio = time.perf_counter()
+            antes = _tamano(ruta)
+            if ruta == self.db.db_path:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            else:
+                archivo = sqlite3.connect(ruta)
+                try:
+                    archivo.execute("VACUUM")
+                finally:
+                    archivo.close()
+            resultados.append({
+                'archivo': ruta,
+                'bytes_antes': antes,
+                'bytes_despues': _tamano(ruta),
+                'segundos': time.perf_counter() - inicio,
+            })
+        return resultados
+
+
+def _imprimir_compactacion(resultados: List[Dict]):
+    for r in resultados:
+        print(f"✓ {r['archivo']}: {_megas(r['bytes_antes'])} → {_megas(r['bytes_despues'])} "
+              f"en {r['segundos']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo histórico por año de visitas y asignaciones")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_arch = sub.add_parser('archivar', help="Mueve los periodos cerrados a los archivos por año")
+    corte = p_arch.add_mutually_exclusive_group()
+    corte.add_argument('--meses', type=int, default=12, help="Meses que quedan en la base")
+    corte.add_argument('--antes-de', help="Archivar lo anterior a esta fecha (YYYY-MM-DD)")
+    p_arch.add_argument('--dir', default=DIRECTORIO,
+                        help="Directorio de los archivos, relativo a la base")
+    p_arch.add_argument('--dry-run', action='store_true', help="Solo muestra qué se archivaría")
+    p_arch.add_argument('--compactar', action='store_true', help="Ejecuta VACUUM al terminar")
+    
+    sub.add_parser('compactar', help="Ejecuta VACUUM sobre la base y los archivos")
+    sub.add_parser('listar', help="Lista los archivos históricos registrados")
+    
+    for p in sub.choices.values():
+        p.add_argument('--db', default='piscinas.db')
+    
+    args = parser.parse_args()
+    db = Database(args.db)
+    archivador = Archivador(db, getattr(args, 'dir', DIRECTORIO))
+    
+    if args.comando == 'archivar':
+        antes_de = calendario.semana_inicio(args.antes_de) if args.antes_de else Archivador.corte(args.meses)
+        if args.dry_run:
+            print(f"Se archivaría lo anterior a {antes_de}:")
+            for anio, tablas in archivador.pendientes(antes_de).items():
+                print(f"  {anio}: {tablas['visitas']} visitas, "
+                      f"{tablas['asignaciones_semanales']} asignaciones")
+            return
+        antes = _tamano(db.db_path)
+        resultados = archivador.archivar(antes_de)
+        if not resultados:
+            print(f"No hay nada anterior a {antes_de} para archivar")
+        for r in resultados:
+            print(f"✓ {r['anio']}: {r['visitas']} visitas y {r['asignaciones']} asignaciones "
+                  f"→ {r['archivo']} en {r['segundos']:.2f}s")
+        print(f"Base: {_megas(antes)}, {_megas(archivador.paginas_libres())} en páginas libres")
+        if args.compactar:
+            _imprimir_compactacion(archivador.compactar())
+    elif args.comando == 'compactar':
+        _imprimir_compactacion(archivador.compactar())
+    elif args.comando == 'listar':
+        print(f"\n{'Año':<6} {'Archivo':<32} {'Visitas':>9} {'Asignaciones':>13} {'Actualizado':<20}")
+        print("-" * 84)
+        for a in db.archivos_historicos():
+            print(f"{a['anio']:<6} {a['archivo']:<32} {a['visitas']:>9} "
+                  f"{a['asignaciones']:>13} {a['actualizado_at']:<20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,819 @@
+"""
+Benchmarks de la capa de base de datos.
+
+Uso:
+    python benchmark.py conexiones [--llamadas N] [--clientes N]
+    python benchmark.py suite [--clientes N] [--semanas N] [--json salida.json]
+    python benchmark.py arranque [--repeticiones N]
+    python benchmark.py contencion [--hilos 32] [--operaciones 100]
+    python benchmark.py agenda [--clientes N] [--semanas N]
+    python benchmark.py rango [--clientes N] [--semanas N]
+    python benchmark.py filas [--filas 100000]
+    python benchmark.py analitica [--visitas 1000000]
+    python benchmark.py outbox [--clientes 1000] [--latencia-ms 20]
+    python benchmark.py carga [--url http://127.0.0.1:8000/api/clientes] [--conexiones N] [--duracion S]
+    python benchmark.py comparar base.json nuevo.json [--umbral 1.2]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import migraciones
+from database import Database, DIAS_SEMANA
+from modelos import Visita
+
+COMUNAS = ['Las Condes', 'Vitacura', 'Lo Barnechea', 'La Reina', 'Ñuñoa',
+           'Providencia', 'Peñalolén', 'Chicureo', 'Colina', 'La Dehesa']
+NOMBRES = ['José', 'María', 'Juan', 'Francisca', 'Pedro', 'Catalina', 'Diego',
+           'Javiera', 'Tomás', 'Constanza', 'Ignacio', 'Valentina']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras',
+             'Silva', 'Martínez', 'Sepúlveda', 'Morales', 'Rodríguez']
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> Dict[str, float]:
+    """Ejecuta una función varias veces y devuelve la latencia por llamada en microsegundos."""
+    tiempos: List[float] = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    tiempos.sort()
+    return {
+        'llamadas': repeticiones,
+        'media_us': statistics.fmean(tiempos),
+        'p50_us': tiempos[len(tiempos) // 2],
+        'p99_us': tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))],
+    }
+
+
+def benchmark_conexiones(llamadas: int = 2000, clientes: int = 500) -> Dict[str, Dict[str, float]]:
+    """Compara conectar en cada llamada contra reutilizar la conexión del pool."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db = Database(db_path)
+        resp_id = db.agregar_responsable("Benchmark")
+        with db.transaction():
+            for i in range(clientes):
+                db.agregar_cliente(f"Cliente {i}", responsable_id=resp_id,
+                                   dia_atencion="Lunes", precio_por_visita=15000)
+        
+        consulta = """
+            SELECT c.*, r.nombre as responsable_nombre 
+            FROM clientes c
+            LEFT JOIN responsables r ON c.responsable_id = r.id
+            WHERE c.id = ?
+        """
+        
+        def conexion_por_llamada():
+            # Comportamiento anterior: abrir y cerrar una conexión por consulta
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(consulta, (clientes // 2,)).fetchone()
+            conn.close()
+            return dict(row)
+        
+        def conexion_del_pool():
+            # Misma consulta sin pasar por la caché de Database, para medir
+            # solo el costo de la conexión
+            row = db.get_connection().execute(consulta, (clientes // 2,)).fetchone()
+            return dict(row)
+        
+        resultados = {
+            'conexion_por_llamada': medir(conexion_por_llamada, llamadas),
+            'pool': medir(conexion_del_pool, llamadas),
+        }
+        db.close()
+    return resultados
+
+
+def benchmark_arranque(repeticiones: int = 50, procesos: int = 5) -> Dict[str, Dict[str, float]]:
+    """Mide el costo de abrir la base en el arranque de la CLI.
+    
+    Compara la ruta rápida de las migraciones (base ya al día) con volver a
+    ejecutar todo el DDL en cada arranque, como ocurría antes, y mide además
+    el arranque en frío de un proceso que importa ``app`` y crea ``App``.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        Database(db_path).close()
+        
+        def abrir(forzar: bool):
+            db = Database(db_path)
+            if forzar:
+                migraciones.migrar(db.get_connection(), forzar=True)
+            db.close()
+        
+        resultados = {
+            'database_al_dia': medir(lambda: abrir(False), repeticiones),
+            'database_ddl_completo': medir(lambda: abrir(True), repeticiones),
+        }
+        
+        directorio = os.path.dirname(os.path.abspath(__file__))
+        comando = [sys.executable, "-c", f"from app import App; App({db_path!r})"]
+        resultados['proceso_cli_en_frio'] = medir(
+            lambda: subprocess.run(comando, cwd=directorio, check=True), procesos)
+    return resultados
+
+
+async def _cliente_carga(host: str, port: int, ruta: str, hasta: float,
+                        latencias: List[float], encabezados: str) -> int:
+    """Envía peticiones por una conexión keep-alive hasta el instante ``hasta``."""
+    reader, writer = await asyncio.open_connection(host, port)
+    peticion = (f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\n{encabezados}\r\n").encode('latin-1')
+    errores = 0
+    try:
+        while time.perf_counter() < hasta:
+            inicio = time.perf_counter()
+            writer.write(peticion)
+            await writer.drain()
+            estado = await reader.readline()
+            largo = 0
+            while True:
+                linea = await reader.readline()
+                if linea in (b'\r\n', b''):
+                    break
+                nombre, _, valor = linea.decode('latin-1').partition(':')
+                if nombre.lower() == 'content-length':
+                    largo = int(valor)
+            await reader.readexactly(largo)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if not estado.split()[1].startswith((b'2', b'3')):
+                errores += 1
+    finally:
+        writer.close()
+    return errores
+
+
+def benchmark_carga(url: str, conexiones: int = 20, duracion: float = 10.0,
+                    gzip_ok: bool = True, etag: Optional[str] = None) -> Dict[str, float]:
+    """Prueba de carga local contra la API: peticiones por segundo y p99."""
+    partes = urlsplit(url)
+    ruta = partes.path + (f"?{partes.query}" if partes.query else "")
+    encabezados = "Accept-Encoding: gzip\r\n" if gzip_ok else ""
+    if etag:
+        encabezados += f"If-None-Match: {etag}\r\n"
+    token = os.environ.get('PISCINAS_API_TOKEN')
+    if token:
+        encabezados += f"Authorization: Bearer {token}\r\n"
+    latencias: List[float] = []
+    
+    async def correr():
+        hasta = time.perf_counter() + duracion
+        return await asyncio.gather(*[
+            _cliente_carga(partes.hostname, partes.port or 80, ruta, hasta, latencias, encabezados)
+            for _ in range(conexiones)
+        ])
+    
+    inicio = time.perf_counter()
+    errores = sum(asyncio.run(correr()))
+    total_s = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'req_por_s': len(latencias) / total_s,
+        'p50_ms': latencias[len(latencias) // 2] if latencias else 0,
+        'p99_ms': latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] if latencias else 0,
+    }
+
+
+def benchmark_contencion(hilos: int = 32, operaciones: int = 100,
+                         clientes: int = 500) -> Dict[str, Dict[str, float]]:
+    """Muchos hilos escribiendo a la vez: transacción por llamada vs ``EscritorAgrupado``.
+    
+    Cada hilo alterna ``registrar_visita`` y ``actualizar_cliente`` y espera
+    la respuesta antes de la siguiente, como haría un técnico desde la API.
+    """
+    from cola_escritura import EscritorAgrupado
+    
+    def correr(escribir) -> Dict[str, float]:
+        latencias: List[float] = []
+        errores = [0]
+        lock = threading.Lock()
+        
+        def trabajador(n: int):
+            propias = []
+            for i in range(operaciones):
+                cliente_id = (n * operaciones + i) % clientes + 1
+                inicio = time.perf_counter()
+                try:
+                    escribir(i, cliente_id)
+                except sqlite3.OperationalError:
+                    with lock:
+                        errores[0] += 1
+                propias.append((time.perf_counter() - inicio) * 1e6)
+            with lock:
+                latencias.extend(propias)
+        
+        inicio = time.perf_counter()
+        hebras = [threading.Thread(target=trabajador, args=(n,)) for n in range(hilos)]
+        for h in hebras:
+            h.start()
+        for h in hebras:
+            h.join()
+        total_s = time.perf_counter() - inicio
+        latencias.sort()
+        return {
+            'llamadas': len(latencias),
+            'errores': errores[0],
+            'ops_por_s': len(latencias) / total_s,
+            'media_us': statistics.fmean(latencias),
+            'p50_us': latencias[len(latencias) // 2],
+            'p99_us': latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))],
+        }
+    
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for caso in ('transaccion_por_llamada', 'escritor_agrupado'):
+            db_path = os.path.join(tmp, f"{caso}.db")
+            db = Database(db_path)
+            generar_datos(db, responsables=5, clientes=clientes, semanas=1)
+            
+            if caso == 'transaccion_por_llamada':
+                def escribir(i, cliente_id, db=db):
+                    if i % 2:
+                        db.actualizar_cliente(cliente_id, notas=f"op {i}")
+                    else:
+                        db.registrar_visita(cliente_id, "2026-01-05", precio=20000)
+                resultados[caso] = correr(escribir)
+            else:
+                with EscritorAgrupado(db) as escritor:
+                    def escribir(i, cliente_id, escritor=escritor):
+                        if i % 2:
+                            escritor.actualizar_cliente(cliente_id, notas=f"op {i}").result()
+                        else:
+                            escritor.registrar_visita(cliente_id, "2026-01-05", precio=20000).result()
+                    resultados[caso] = correr(escribir)
+                    resultados[caso].update(
+                        {k: escritor.estadisticas()[k] for k in ('lotes', 'promedio_lote')})
+            db.close()
+    return resultados
+
+
+def benchmark_outbox(clientes: int = 1000, latencia_ms: float = 20.0,
+                     concurrencias=(1, 4, 16), lote: int = 50) -> Dict[str, Dict[str, float]]:
+    """Despacho de la bandeja de Odoo contra el simulador XML-RPC local.
+    
+    Cada caso parte de una base nueva con las visitas de dos semanas
+    encoladas y mide documentos emitidos por segundo según la concurrencia.
+    """
+    from odoo_outbox import ClienteOdoo, DespachadorOutbox, SimuladorOdoo, iniciar_simulador
+    
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for concurrencia in concurrencias:
+            servidor = iniciar_simulador(port=0, simulador=SimuladorOdoo(latencia_ms))
+            url = f"http://127.0.0.1:{servidor.server_address[1]}"
+            db = Database(os.path.join(tmp, f"outbox_{concurrencia}.db"))
+            generar_datos(db, responsables=5, clientes=clientes, semanas=2)
+            # Backlog ya vencido: las visitas se encolan con GRACIA_OUTBOX de espera
+            db.get_connection().execute("UPDATE odoo_outbox SET proximo_intento = datetime('now')")
+            despachador = DespachadorOutbox(db, ClienteOdoo(url=url), lote, concurrencia)
+            backlog = despachador.estado()['pendientes']
+            r = despachador.procesar()
+            resultados[f'concurrencia_{concurrencia}'] = {
+                'backlog_inicial': backlog,
+                'enviadas': r['enviadas'],
+                'segundos': r['segundos'],
+                'por_segundo': r['por_segundo'],
+                'pendientes': r['pendientes'],
+            }
+            db.close()
+            servidor.shutdown()
+            servidor.server_close()
+    return resultados
+
+
+def problemas_plan(planes: Dict[str, List[str]]) -> List[str]:
+    """Pasos de un plan que recorren una tabla completa o la ordenan aparte."""
+    return [f"{nombre}: {paso}" for nombre, pasos in planes.items() for paso in pasos
+            if paso.startswith('SCAN') or 'TEMP B-TREE' in paso]
+
+
+def benchmark_agenda(clientes: int = 10000, responsables: int = 10, semanas: int = 52,
+                     repeticiones: int = 20) -> Dict:
+    """Agenda de técnicos: asignaciones de la semana agrupadas en Python vs ``agenda``.
+    
+    Retorna las latencias de cada caso y los planes de ejecución de las
+    consultas de agenda, que deben resolverse solo con índices.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "agenda.db"))
+        generar_datos(db, responsables, clientes, semanas)
+        semana = db.get_connection().execute(
+            "SELECT MAX(semana_inicio) FROM asignaciones_semanales"
+        ).fetchone()[0]
+        responsable_id = db.obtener_responsables()[0]['id']
+        fecha = (datetime.strptime(semana, "%Y-%m-%d") + timedelta(days=2)).strftime("%Y-%m-%d")
+        
+        def semana_agrupada():
+            # Lo que hacía App.ver_asignaciones_semana
+            por_dia = {}
+            for asignacion in db.obtener_asignaciones_semana(semana):
+                por_dia.setdefault(asignacion['dia_atencion'], []).append(asignacion)
+            return por_dia
+        
+        def semana_filtrada():
+            return [a for a in db.obtener_asignaciones_semana(semana)
+                    if a['responsable_id'] == responsable_id and a['dia_atencion'] == 'Miércoles']
+        
+        resultados = {
+            'semana_agrupada_en_python': medir(semana_agrupada, repeticiones),
+            'agenda_semana': medir(lambda: db.agenda_semana(semana), repeticiones),
+            'dia_filtrado_en_python': medir(semana_filtrada, repeticiones),
+            'agenda': medir(lambda: db.agenda(responsable_id, fecha), repeticiones),
+        }
+        planes = db.planes_agenda()
+        db.close()
+    return {'resultados': resultados, 'planes': planes}
+
+
+def benchmark_rango(clientes: int = 2000, semanas: int = 208,
+                    repeticiones: int = 10) -> Dict:
+    """Rangos de 12 semanas y de un año sobre un historial de ``semanas`` semanas.
+    
+    Compara el filtro por texto (``fecha_visita BETWEEN``) con las claves
+    enteras del calendario y retorna también los planes de las consultas.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "rango.db"))
+        generar_datos(db, responsables=10, clientes=clientes, semanas=semanas)
+        conn = db.get_connection()
+        ultima = datetime.strptime(conn.execute(
+            "SELECT MAX(semana_inicio) FROM asignaciones_semanales").fetchone()[0], "%Y-%m-%d")
+        
+        resultados = {}
+        for nombre, semanas_rango in (('12_semanas', 12), ('un_anio', 52)):
+            desde = (ultima - timedelta(weeks=semanas_rango - 1)).strftime("%Y-%m-%d")
+            hasta = (ultima + timedelta(days=6)).strftime("%Y-%m-%d")
+            resultados[f'visitas_texto_{nombre}'] = medir(lambda: conn.execute("""
+                SELECT v.*, c.nombre as cliente_nombre, r.nombre as responsable_nombre
+                FROM visitas v
+                LEFT JOIN clientes c ON v.cliente_id = c.id
+                LEFT JOIN responsables r ON v.responsable_id = r.id
+                WHERE v.fecha_visita BETWEEN ? AND ?
+                ORDER BY v.fecha_visita, v.id
+            """, (desde, hasta)).fetchall(), repeticiones)
+            resultados[f'visitas_rango_{nombre}'] = medir(
+                lambda: db.visitas_rango(desde, hasta, compactas=True), repeticiones)
+            resultados[f'asignaciones_rango_{nombre}'] = medir(
+                lambda: db.asignaciones_rango(desde, hasta, compactas=True), repeticiones)
+        planes = db.planes_rango()
+        db.close()
+    return {'resultados': resultados, 'planes': planes}
+
+
+def benchmark_filas(filas: int = 100000, repeticiones: int = 5) -> Dict[str, Dict[str, float]]:
+    """Lectura de ``filas`` visitas: ``dict(row)`` vs filas compactas vs recorrido perezoso.
+    
+    Además de la latencia mide, con tracemalloc, la memoria máxima asignada
+    durante la lectura (``pico_mb``).
+    """
+    import tracemalloc
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "filas.db"))
+        # 85% de asignaciones realizadas: clientes y semanas justos para ~filas visitas
+        clientes = 2000
+        generar_datos(db, responsables=10, clientes=clientes,
+                      semanas=max(1, round(filas / (clientes * 0.85))))
+        sql = """
+            SELECT v.*, c.nombre as cliente_nombre, r.nombre as responsable_nombre
+            FROM visitas v
+            LEFT JOIN clientes c ON v.cliente_id = c.id
+            LEFT JOIN responsables r ON v.responsable_id = r.id
+            ORDER BY v.fecha_visita, v.id
+            LIMIT ?
+        """
+        
+        def diccionarios():
+            cursor = db.get_connection().execute(sql, (filas,))
+            return [dict(row) for row in cursor.fetchall()]
+        
+        def compactas():
+            return list(db._filas(Visita, sql, (filas,)))
+        
+        def perezoso():
+            # Recorre y suma sin guardar las filas
+            return sum(v.precio or 0 for v in db._filas(Visita, sql, (filas,)))
+        
+        resultados = {}
+        for nombre, funcion in (('dict_row', diccionarios), ('compactas', compactas),
+                                ('recorrido_perezoso', perezoso)):
+            r = medir(funcion, repeticiones)
+            tracemalloc.start()
+            resultado = funcion()
+            r['pico_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            r['filas'] = len(resultado) if isinstance(resultado, list) else filas
+            del resultado
+            resultados[nombre] = r
+        db.close()
+    return resultados
+
+
+def generar_datos(db: Database, responsables: int = 10, clientes: int = 10000,
+                  semanas: int = 104, pct_realizadas: int = 85,
+                  semana_final: str = "2026-01-05", semilla: int = 42) -> Dict[str, int]:
+    """Llena la base con datos sintéticos realistas.
+    
+    Crea ``responsables`` responsables, ``clientes`` clientes repartidos entre
+    comunas, responsables y días, las asignaciones de las ``semanas`` semanas
+    que terminan en ``semana_final`` y una visita por cada asignación
+    realizada (``pct_realizadas`` por ciento, elegidas de forma determinista).
+    """
+    rnd = random.Random(semilla)
+    ids = list(db.obtener_o_crear_responsables(
+        [f"Técnico {i + 1}" for i in range(responsables)]
+    ).values())
+    
+    lote = []
+    for i in range(clientes):
+        lote.append({
+            'nombre': f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+            'direccion': f"Calle {rnd.randint(1, 500)} #{rnd.randint(100, 9999)}",
+            'comuna': rnd.choice(COMUNAS),
+            'celular': f"+569{rnd.randint(10000000, 99999999)}",
+            'responsable_id': rnd.choice(ids),
+            'dia_atencion': rnd.choice(DIAS_SEMANA[:6]),
+            'precio_por_visita': rnd.choice([15000, 18000, 20000, 25000, 30000]),
+        })
+        if len(lote) == 10000:
+            db.agregar_clientes_lote(lote)
+            lote = []
+    if lote:
+        db.agregar_clientes_lote(lote)
+    
+    fin = datetime.strptime(semana_final, "%Y-%m-%d")
+    inicio = fin - timedelta(weeks=semanas - 1)
+    asignaciones = db.asignar_clientes_semanas(inicio.strftime("%Y-%m-%d"), semana_final)
+    
+    with db.transaction() as conn:
+        # Selección determinista de asignaciones realizadas a partir del ID
+        conn.execute("""
+            UPDATE asignaciones_semanales SET realizada = 1
+            WHERE (id * 2654435761) % 100 < ?
+        """, (pct_realizadas,))
+        dias = " ".join(f"WHEN '{dia}' THEN {i}" for i, dia in enumerate(DIAS_SEMANA))
+        cursor = conn.execute(f"""
+            INSERT INTO visitas (cliente_id, fecha_visita, responsable_id, precio, realizada)
+            SELECT cliente_id,
+                   date(semana_inicio, '+' || (CASE dia_atencion {dias} ELSE 0 END) || ' days'),
+                   responsable_id, precio, 1
+            FROM asignaciones_semanales
+            WHERE realizada = 1
+            ORDER BY semana_inicio, cliente_id
+        """)
+        visitas = cursor.rowcount
+    
+    return {'responsables': responsables, 'clientes': clientes, 'semanas': semanas,
+            'asignaciones': asignaciones['insertadas'], 'visitas': visitas}
+
+
+def generar_excel(excel_path: str, filas: int, semilla: int = 42):
+    """Genera un Excel con el formato de la planilla maestra."""
+    import openpyxl
+    
+    rnd = random.Random(semilla)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Nombre cliente', 'Dirección', 'Comuna', 'Celular',
+               'Responsable', 'día de atención', 'precio'])
+    for i in range(filas):
+        ws.append([
+            f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {i}",
+            f"Calle {rnd.randint(1, 500)} #{rnd.randint(100, 9999)}",
+            rnd.choice(COMUNAS),
+            f"+569{rnd.randint(10000000, 99999999)}",
+            f"Técnico {rnd.randint(1, 10)}",
+            rnd.choice(DIAS_SEMANA[:6]),
+            f"${rnd.choice([15000, 18000, 20000, 25000]):,}",
+        ])
+    wb.save(excel_path)
+
+
+def benchmark_suite(clientes: int = 10000, responsables: int = 10, semanas: int = 104,
+                    repeticiones: int = 20, filas_excel: int = 5000,
+                    db_path: str = None) -> Dict:
+    """Mide los métodos públicos de ``Database`` sobre datos sintéticos.
+    
+    Retorna un diccionario serializable a JSON con los parámetros, el
+    entorno y las latencias de cada operación.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = db_path or os.path.join(tmp, "bench.db")
+        db = Database(db_path)
+        
+        inicio = time.perf_counter()
+        datos = generar_datos(db, responsables, clientes, semanas)
+        generacion_s = time.perf_counter() - inicio
+        
+        semana = db.get_connection().execute(
+            "SELECT MAX(semana_inicio) FROM asignaciones_semanales"
+        ).fetchone()[0]
+        rnd = random.Random(7)
+        ids_clientes = [rnd.randint(1, clientes) for _ in range(repeticiones)]
+        semanas_nuevas = iter([
+            (datetime.strptime(semana, "%Y-%m-%d") + timedelta(weeks=i + 1)).strftime("%Y-%m-%d")
+            for i in range(repeticiones)
+        ])
+        
+        resultados = {}
+        # Las lecturas de listas completas se miden sin caché
+        resultados['obtener_clientes'] = medir(
+            lambda: (db.cache.invalidar(), db.obtener_clientes()), repeticiones)
+        resultados['obtener_asignaciones_semana'] = medir(
+            lambda: db.obtener_asignaciones_semana(semana), repeticiones)
+        ids = iter(ids_clientes)
+        resultados['obtener_visitas_cliente'] = medir(
+            lambda: db.obtener_visitas_cliente(next(ids), limit=20), repeticiones)
+        ids = iter(ids_clientes)
+        resultados['registrar_visita'] = medir(
+            lambda: db.registrar_visita(next(ids), semana), repeticiones)
+        resultados['asignar_clientes_semana'] = medir(
+            lambda: db.asignar_clientes_semana(next(semanas_nuevas)), repeticiones)
+        db.close()
+        
+        if filas_excel:
+            from importar_excel import importar_desde_excel
+            excel_path = os.path.join(tmp, "bench.xlsx")
+            generar_excel(excel_path, filas_excel)
+            destino = os.path.join(tmp, "import.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                importacion = medir(lambda: importar_desde_excel(excel_path, destino), 1)
+            importacion['filas'] = filas_excel
+            importacion['filas_por_s'] = filas_excel / (importacion['media_us'] / 1e6)
+            resultados['importar_desde_excel'] = importacion
+    
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                    'plataforma': platform.platform()},
+        'datos': dict(datos, generacion_s=round(generacion_s, 3)),
+        'resultados': resultados,
+    }
+
+
+def imprimir_resultados(resultados: Dict[str, Dict[str, float]]):
+    """Imprime los resultados en forma de tabla."""
+    print(f"\n{'Caso':<30} {'Llamadas':>9} {'Media (µs)':>12} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    print("-" * 75)
+    for nombre, r in resultados.items():
+        print(f"{nombre:<30} {r['llamadas']:>9} {r['media_us']:>12.1f} "
+              f"{r['p50_us']:>10.1f} {r['p99_us']:>10.1f}")
+
+
+def comparar(base_path: str, nuevo_path: str, umbral: float = 1.2) -> bool:
+    """Compara dos informes JSON de la suite; retorna False si hay regresiones.
+    
+    Se considera regresión cuando la mediana de un caso empeora más que
+    ``umbral`` veces respecto del informe base.
+    """
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)['resultados']
+    with open(nuevo_path, encoding='utf-8') as f:
+        nuevo = json.load(f)['resultados']
+    
+    sin_regresiones = True
+    print(f"\n{'Caso':<30} {'Base p50 (µs)':>14} {'Nuevo p50 (µs)':>15} {'Cambio':>8}")
+    print("-" * 72)
+    for nombre in [n for n in base if n in nuevo]:
+        antes, despues = base[nombre]['p50_us'], nuevo[nombre]['p50_us']
+        razon = despues / antes if antes else 1.0
+        marca = " ✗" if razon > umbral else ""
+        sin_regresiones &= razon <= umbral
+        print(f"{nombre:<30} {antes:>14.1f} {despues:>15.1f} {razon:>7.2f}x{marca}")
+    return sin_regresiones
+
+
+def benchmark_analitica(visitas: int = 1000000, repeticiones: int = 3) -> Dict:
+    """Métricas de ``analitica`` sobre ~``visitas`` visitas realizadas.
+    
+    Mide la carga completa, la lectura desde la caché ``.npz``, el refresco
+    sin cambios y con un 1% de visitas nuevas, cada métrica y, como
+    referencia, la detección de abandono recorriendo las filas en Python.
+    """
+    from analitica import Analitica
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "analitica.db"))
+        clientes = 10000
+        datos = generar_datos(db, responsables=20, clientes=clientes,
+                              semanas=max(1, round(visitas / (clientes * 0.85))))
+        db.get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        cache = os.path.join(tmp, "analitica.npz")
+        
+        def carga_completa():
+            Analitica(db, historico=False).refrescar(completo=True)
+        
+        def desde_cache():
+            Analitica(db, cache).refrescar()
+        
+        analitica = Analitica(db, cache)
+        analitica.refrescar()
+        resultados = {
+            'carga_completa': medir(carga_completa, repeticiones),
+            'carga_desde_cache': medir(desde_cache, repeticiones),
+            'refresco_sin_cambios': medir(analitica.refrescar, repeticiones),
+        }
+        
+        conn = db.get_connection()
+        nuevas = max(1, datos['visitas'] // 100)
+        tiempos = []
+        for _ in range(repeticiones):
+            with db.transaction():
+                conn.execute("""
+                    INSERT INTO visitas (cliente_id, fecha_visita, responsable_id, precio, realizada)
+                    SELECT cliente_id, date(fecha_visita, '+7 days'), responsable_id, precio, 1
+                    FROM visitas ORDER BY id DESC LIMIT ?
+                """, (nuevas,))
+            inicio = time.perf_counter()
+            r = analitica.refrescar()
+            tiempos.append((time.perf_counter() - inicio) * 1e6)
+            assert not r['recarga_completa'] and r['visitas_nuevas'] == nuevas
+        resultados['refresco_1pct_nuevas'] = {
+            'llamadas': repeticiones, 'media_us': statistics.fmean(tiempos),
+            'p50_us': sorted(tiempos)[len(tiempos) // 2], 'p99_us': max(tiempos),
+        }
+        
+        analitica.ttl = float('inf')
+        resultados['abandono'] = medir(analitica.abandono, repeticiones)
+        resultados['precios'] = medir(analitica.precios, repeticiones)
+        resultados['cumplimiento'] = medir(lambda: analitica.cumplimiento(104), repeticiones)
+        resultados['rendimiento'] = medir(lambda: analitica.rendimiento(52), repeticiones)
+        
+        def abandono_python():
+            # Primera y última visita por cliente recorriendo las filas
+            resumen = {}
+            for cliente_id, fecha in conn.execute(
+                    "SELECT cliente_id, date(fecha_visita) FROM visitas WHERE realizada = 1"):
+                dia = datetime.strptime(fecha, "%Y-%m-%d").toordinal()
+                actual = resumen.get(cliente_id)
+                if actual is None:
+                    resumen[cliente_id] = [dia, dia, 1]
+                else:
+                    actual[0] = min(actual[0], dia)
+                    actual[1] = max(actual[1], dia)
+                    actual[2] += 1
+            hoy = max(r[1] for r in resumen.values())
+            return [c for c, (primera, ultima, n) in resumen.items()
+                    if n >= 3 and hoy - ultima > max(45, 3 * (ultima - primera) / (n - 1))]
+        
+        resultados['abandono_en_python'] = medir(abandono_python, repeticiones)
+        datos['visitas'] = len(analitica.visitas['id'])
+        datos['cache_mb'] = os.path.getsize(cache) / 2**20
+        db.close()
+    return {'datos': datos, 'resultados': resultados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa de base de datos")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_con = sub.add_parser('conexiones', help="Latencia por llamada: conexión nueva vs pool")
+    p_con.add_argument('--llamadas', type=int, default=2000)
+    p_con.add_argument('--clientes', type=int, default=500)
+    
+    p_suite = sub.add_parser('suite', help="Mide los métodos de Database sobre datos sintéticos")
+    p_suite.add_argument('--clientes', type=int, default=10000)
+    p_suite.add_argument('--responsables', type=int, default=10)
+    p_suite.add_argument('--semanas', type=int, default=104)
+    p_suite.add_argument('--repeticiones', type=int, default=20)
+    p_suite.add_argument('--filas-excel', type=int, default=5000,
+                         help="Filas del Excel sintético a importar (0 para omitir)")
+    p_suite.add_argument('--db', help="Conservar la base generada en esta ruta")
+    p_suite.add_argument('--json', help="Guardar los resultados en este archivo JSON")
+    
+    p_arr = sub.add_parser('arranque', help="Costo de abrir la base al iniciar la CLI")
+    p_arr.add_argument('--repeticiones', type=int, default=50)
+    p_arr.add_argument('--procesos', type=int, default=5)
+    
+    p_carga = sub.add_parser('carga', help="Prueba de carga contra servidor.py")
+    p_carga.add_argument('--url', default='http://127.0.0.1:8000/api/clientes')
+    p_carga.add_argument('--conexiones', type=int, default=20)
+    p_carga.add_argument('--duracion', type=float, default=10.0)
+    p_carga.add_argument('--sin-gzip', action='store_true')
+    p_carga.add_argument('--etag', help="Enviar If-None-Match con este ETag (mide respuestas 304)")
+    
+    p_cont = sub.add_parser('contencion', help="Escrituras concurrentes: directas vs commit agrupado")
+    p_cont.add_argument('--hilos', type=int, default=32)
+    p_cont.add_argument('--operaciones', type=int, default=100, help="Escrituras por hilo")
+    p_cont.add_argument('--clientes', type=int, default=500)
+    
+    p_age = sub.add_parser('agenda', help="Agenda por responsable y día, y sus planes de ejecución")
+    p_age.add_argument('--clientes', type=int, default=10000)
+    p_age.add_argument('--semanas', type=int, default=52)
+    p_age.add_argument('--repeticiones', type=int, default=20)
+    
+    p_ran = sub.add_parser('rango', help="Rangos de fechas con claves enteras del calendario")
+    p_ran.add_argument('--clientes', type=int, default=2000)
+    p_ran.add_argument('--semanas', type=int, default=208)
+    p_ran.add_argument('--repeticiones', type=int, default=10)
+    
+    p_fil = sub.add_parser('filas', help="Memoria y tiempo: dict(row) vs filas compactas")
+    p_fil.add_argument('--filas', type=int, default=100000)
+    p_fil.add_argument('--repeticiones', type=int, default=5)
+    
+    p_ana = sub.add_parser('analitica', help="Métricas vectorizadas de analitica.py")
+    p_ana.add_argument('--visitas', type=int, default=1000000)
+    p_ana.add_argument('--repeticiones', type=int, default=3)
+    
+    p_out = sub.add_parser('outbox', help="Despacho a Odoo contra el simulador XML-RPC")
+    p_out.add_argument('--clientes', type=int, default=1000)
+    p_out.add_argument('--latencia-ms', type=float, default=20.0)
+    p_out.add_argument('--concurrencias', type=int, nargs='+', default=[1, 4, 16])
+    
+    p_cmp = sub.add_parser('comparar', help="Compara dos informes JSON de la suite")
+    p_cmp.add_argument('base')
+    p_cmp.add_argument('nuevo')
+    p_cmp.add_argument('--umbral', type=float, default=1.2)
+    
+    args = parser.parse_args()
+    if args.comando == 'comparar':
+        if not comparar(args.base, args.nuevo, args.umbral):
+            raise SystemExit(1)
+    elif args.comando == 'suite':
+        informe = benchmark_suite(args.clientes, args.responsables, args.semanas,
+                                  args.repeticiones, args.filas_excel, args.db)
+        print(f"Datos: {informe['datos']}")
+        imprimir_resultados(informe['resultados'])
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            print(f"\n✓ Resultados guardados en {args.json}")
+    elif args.comando == 'carga':
+        r = benchmark_carga(args.url, args.conexiones, args.duracion,
+                            not args.sin_gzip, args.etag)
+        print(f"\n{args.url} ({args.conexiones} conexiones, {args.duracion:g}s)")
+        print(f"  Peticiones: {r['peticiones']} ({r['errores']} con error)")
+        print(f"  Peticiones/s: {r['req_por_s']:,.0f}")
+        print(f"  Latencia p50: {r['p50_ms']:.2f} ms  p99: {r['p99_ms']:.2f} ms")
+    elif args.comando == 'contencion':
+        resultados = benchmark_contencion(args.hilos, args.operaciones, args.clientes)
+        imprimir_resultados(resultados)
+        for nombre, r in resultados.items():
+            extra = f", {r['lotes']} lotes de {r['promedio_lote']:.1f} ops" if 'lotes' in r else ""
+            print(f"{nombre}: {r['ops_por_s']:,.0f} ops/s, {r['errores']} errores{extra}")
+    elif args.comando in ('agenda', 'rango'):
+        medicion = benchmark_agenda if args.comando == 'agenda' else benchmark_rango
+        informe = medicion(args.clientes, semanas=args.semanas,
+                           repeticiones=args.repeticiones)
+        imprimir_resultados(informe['resultados'])
+        for nombre, pasos in informe['planes'].items():
+            print(f"\nPlan de {nombre}:")
+            for paso in pasos:
+                print(f"  {paso}")
+        problemas = problemas_plan(informe['planes'])
+        if problemas:
+            print(f"\n❌ Las consultas de {args.comando} ya no usan solo índices:")
+            for problema in problemas:
+                print(f"  {problema}")
+            raise SystemExit(1)
+        print(f"\n✓ Las consultas de {args.comando} se resuelven con índices, sin ordenar")
+    elif args.comando == 'filas':
+        resultados = benchmark_filas(args.filas, args.repeticiones)
+        imprimir_resultados(resultados)
+        print()
+        for nombre, r in resultados.items():
+            print(f"{nombre}: {r['filas']:,} filas, pico de memoria {r['pico_mb']:.1f} MB")
+    elif args.comando == 'analitica':
+        informe = benchmark_analitica(args.visitas, args.repeticiones)
+        print(f"Datos: {informe['datos']}")
+        imprimir_resultados(informe['resultados'])
+        python = informe['resultados']['abandono_en_python']['media_us']
+        numpy = informe['resultados']['abandono']['media_us']
+        print(f"\nAbandono: {python / numpy:.1f}x más rápido que recorriendo filas")
+    elif args.comando == 'outbox':
+        resultados = benchmark_outbox(args.clientes, args.latencia_ms, args.concurrencias)
+        print(f"\n{'Caso':<20} {'Backlog':>8} {'Enviadas':>9} {'Segundos':>9} {'Docs/s':>8} {'Quedan':>7}")
+        print("-" * 66)
+        for nombre, r in resultados.items():
+            print(f"{nombre:<20} {r['backlog_inicial']:>8} {r['enviadas']:>9} {r['segundos']:>9.2f} "
+                  f"{r['por_segundo']:>8.1f} {r['pendientes']:>7}")
+    elif args.comando == 'arranque':
+        imprimir_resultados(benchmark_arranque(args.repeticiones, args.procesos))
+    elif args.comando == 'conexiones':
+        resultados = benchmark_conexiones(args.llamadas, args.clientes)
+        imprimir_resultados(resultados)
+        antes = resultados['conexion_por_llamada']['media_us']
+        despues = resultados['pool']['media_us']
+        print(f"\nMejora: {antes / despues:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
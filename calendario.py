@@ -0,0 +1,263 @@
+"""
+Calendario: semanas ISO, claves enteras de día y semana y feriados de Chile.
+
+Las fechas se guardan como texto ('YYYY-MM-DD', y a veces con hora cuando
+vienen del servidor Node), así que los rangos entre semanas terminan en
+comparaciones de cadenas que fallan con cualquier variante de formato. Este
+módulo define dos claves enteras y ordenables:
+
+- ``clave_dia``: YYYYMMDD (20260112)
+- ``clave_semana``: año ISO * 100 + semana ISO (202603)
+
+``migraciones`` las agrega como columnas generadas (``dia_clave`` en
+``visitas`` y ``semana_clave`` en ``asignaciones_semanales``) con las
+expresiones SQL equivalentes de este módulo, y llena la tabla
+``calendario`` con un día por fila: semana ISO, mes, feriados y si el día es
+hábil (lunes a sábado que no sea feriado). La migración solo precalcula
+unos años alrededor del actual; ``asegurar`` agrega los que falten cuando
+una consulta pide fechas fuera de ellos.
+
+Los feriados siguen las leyes vigentes en Chile, incluidos los que se
+trasladan a lunes (Ley 19.668). El Día de los Pueblos Indígenas cae en el
+solsticio de invierno y se calcula con la fórmula de Meeus; los feriados
+extraordinarios (elecciones, decretos) se agregan editando la tabla.
+
+Uso:
+    python calendario.py feriados [--anio 2026]
+    python calendario.py semana [--fecha 2026-01-01]
+"""
+import argparse
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Tuple, Union
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+# Años antes y después del actual que la migración deja en la tabla calendario
+ANIOS_ALREDEDOR = 2
+# Límites de los años que ``asegurar`` agrega a pedido
+ANIO_MINIMO = 2000
+ANIO_MAXIMO = 2100
+
+Fecha = Union[str, date, datetime]
+
+
+def a_fecha(valor: Fecha) -> date:
+    """Convierte 'YYYY-MM-DD' (con o sin hora), ``date`` o ``datetime`` a ``date``."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def lunes(valor: Fecha = None) -> date:
+    """Lunes de la semana de ``valor`` (por defecto, de hoy)."""
+    fecha = a_fecha(valor) if valor is not None else date.today()
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def semana_inicio(valor: Fecha = None) -> str:
+    """Lunes de la semana de ``valor`` como 'YYYY-MM-DD' (formato de ``semana_inicio``)."""
+    return lunes(valor).isoformat()
+
+
+def clave_dia(valor: Fecha) -> int:
+    """Clave entera YYYYMMDD de una fecha."""
+    fecha = a_fecha(valor)
+    return fecha.year * 10000 + fecha.month * 100 + fecha.day
+
+
+def clave_semana(valor: Fecha) -> int:
+    """Clave entera de la semana ISO de una fecha: año ISO * 100 + semana."""
+    anio, semana, _ = a_fecha(valor).isocalendar()
+    return anio * 100 + semana
+
+
+def sql_clave_dia(columna: str) -> str:
+    """Expresión SQL equivalente a ``clave_dia`` (NULL si la fecha no es válida)."""
+    return f"CAST(strftime('%Y%m%d', {columna}) AS INTEGER)"
+
+
+def sql_clave_semana(columna: str) -> str:
+    """Expresión SQL equivalente a ``clave_semana``.
+    
+    La semana ISO es la de su jueves: se retrocede tres días y se avanza al
+    jueves siguiente (o se queda si ya lo es), y de ese jueves salen el año y
+    el número de semana.
+    """
+    jueves = f"date({columna}, '-3 days', 'weekday 4')"
+    return (f"(CAST(strftime('%Y', {jueves}) AS INTEGER) * 100"
+            f" + (CAST(strftime('%j', {jueves}) AS INTEGER) - 1) / 7 + 1)")
+
+
+# Feriados
+def pascua(anio: int) -> date:
+    """Domingo de Pascua (algoritmo anónimo gregoriano)."""
+    a, b, c = anio % 19, anio // 100, anio % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(anio, mes, dia)
+
+
+def _trasladar_a_lunes(fecha: date) -> date:
+    """Ley 19.668: martes, miércoles y jueves pasan al lunes de la misma semana; viernes al siguiente."""
+    dia = fecha.weekday()
+    if dia in (1, 2, 3):
+        return fecha - timedelta(days=dia)
+    if dia == 4:
+        return fecha + timedelta(days=3)
+    return fecha
+
+
+def _solsticio_invierno(anio: int) -> date:
+    """Fecha en Chile (UTC-4) del solsticio de junio, según Meeus."""
+    y = (anio - 2000) / 1000
+    jde = (2451716.56767 + 365241.62603 * y + 0.00325 * y ** 2
+           + 0.00888 * y ** 3 - 0.00030 * y ** 4)
+    momento = datetime(2000, 1, 1, 12) + timedelta(days=jde - 2451545.0)
+    return (momento - timedelta(hours=4)).date()
+
+
+def feriados(anio: int) -> Dict[date, str]:
+    """Feriados nacionales de Chile en ``anio``."""
+    resultado = {
+        date(anio, 1, 1): "Año Nuevo",
+        date(anio, 5, 1): "Día Nacional del Trabajo",
+        date(anio, 5, 21): "Día de las Glorias Navales",
+        date(anio, 7, 16): "Día de la Virgen del Carmen",
+        date(anio, 8, 15): "Asunción de la Virgen",
+        date(anio, 9, 18): "Independencia Nacional",
+        date(anio, 9, 19): "Día de las Glorias del Ejército",
+        date(anio, 11, 1): "Día de Todos los Santos",
+        date(anio, 12, 8): "Inmaculada Concepción",
+        date(anio, 12, 25): "Navidad",
+    }
+    domingo = pascua(anio)
+    resultado[domingo - timedelta(days=2)] = "Viernes Santo"
+    resultado[domingo - timedelta(days=1)] = "Sábado Santo"
+    resultado[_trasladar_a_lunes(date(anio, 6, 29))] = "San Pedro y San Pablo"
+    resultado[_trasladar_a_lunes(date(anio, 10, 12))] = "Encuentro de Dos Mundos"
+    
+    if anio >= 2021:
+        # El primer año la ley fijó el 21 de junio; desde 2022, el solsticio
+        solsticio = date(2021, 6, 21) if anio == 2021 else _solsticio_invierno(anio)
+        resultado[solsticio] = "Día Nacional de los Pueblos Indígenas"
+    if anio >= 2008:
+        # Si el 31 de octubre es martes pasa al viernes 27; si es miércoles, al viernes 2
+        evangelicas = date(anio, 10, 31)
+        if evangelicas.weekday() == 1:
+            evangelicas = date(anio, 10, 27)
+        elif evangelicas.weekday() == 2:
+            evangelicas = date(anio, 11, 2)
+        resultado[evangelicas] = "Día de las Iglesias Evangélicas y Protestantes"
+    if anio >= 2017:
+        # Fiestas Patrias: se unen al fin de semana cuando caen martes o jueves
+        if date(anio, 9, 18).weekday() == 1:
+            resultado[date(anio, 9, 17)] = "Fiestas Patrias"
+        if date(anio, 9, 19).weekday() == 3:
+            resultado[date(anio, 9, 20)] = "Fiestas Patrias"
+    return resultado
+
+
+def dias(desde: Fecha, hasta: Fecha) -> Iterator[Tuple]:
+    """Filas de la tabla calendario entre ``desde`` y ``hasta`` (inclusive)."""
+    fecha, fin = a_fecha(desde), a_fecha(hasta)
+    por_anio: Dict[int, Dict[date, str]] = {}
+    while fecha <= fin:
+        if fecha.year not in por_anio:
+            por_anio[fecha.year] = feriados(fecha.year)
+        feriado = por_anio[fecha.year].get(fecha)
+        dia_semana = fecha.weekday()
+        yield (
+            clave_dia(fecha), fecha.isoformat(), fecha.year, fecha.month,
+            fecha.year * 100 + fecha.month, dia_semana, DIAS_SEMANA[dia_semana],
+            clave_semana(fecha), semana_inicio(fecha),
+            1 if feriado else 0, feriado,
+            1 if dia_semana < 6 and not feriado else 0,
+        )
+        fecha += timedelta(days=1)
+
+
+def poblar(conn: Union[sqlite3.Connection, sqlite3.Cursor], desde_anio: int = None,
+           hasta_anio: int = None) -> int:
+    """Llena (o recalcula) la tabla calendario para los años indicados.
+    
+    Por defecto, el año actual y ``ANIOS_ALREDEDOR`` años antes y después.
+    Respeta los feriados agregados a mano en días que este módulo no
+    considera feriados. Retorna la cantidad de días escritos.
+    """
+    actual = date.today().year
+    desde_anio = actual - ANIOS_ALREDEDOR if desde_anio is None else desde_anio
+    hasta_anio = actual + ANIOS_ALREDEDOR if hasta_anio is None else hasta_anio
+    filas = list(dias(date(desde_anio, 1, 1), date(hasta_anio, 12, 31)))
+    conn.executemany("""
+        INSERT INTO calendario
+        (dia, fecha, anio, mes, mes_clave, dia_semana, nombre_dia, semana_clave,
+         semana_inicio, feriado, nombre_feriado, habil)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (dia) DO UPDATE SET
+            feriado = MAX(feriado, excluded.feriado),
+            nombre_feriado = COALESCE(excluded.nombre_feriado, nombre_feriado),
+            habil = MIN(habil, excluded.habil)
+    """, filas)
+    return len(filas)
+
+
+def limitar_anios(desde: Fecha, hasta: Fecha) -> Tuple[int, int]:
+    """Años de ``desde`` y ``hasta`` llevados a ``ANIO_MINIMO``-``ANIO_MAXIMO``."""
+    def limitar(anio: int) -> int:
+        return min(max(anio, ANIO_MINIMO), ANIO_MAXIMO)
+    return limitar(a_fecha(desde).year), limitar(a_fecha(hasta).year)
+
+
+def asegurar(conn: Union[sqlite3.Connection, sqlite3.Cursor], desde: Fecha,
+             hasta: Fecha) -> Tuple[int, int]:
+    """Agrega a la tabla calendario los años que le falten para cubrir ``desde``-``hasta``.
+    
+    La tabla se extiende desde sus extremos, así que nunca queda con años
+    salteados. Los años se limitan con ``limitar_anios``. Retorna el primer
+    y el último año que tiene la tabla después de extenderla.
+    """
+    inicio, fin = limitar_anios(desde, hasta)
+    # dia es la clave primaria (YYYYMMDD): los extremos salen del índice
+    primero, ultimo = conn.execute("SELECT MIN(dia), MAX(dia) FROM calendario").fetchone()
+    if primero is None:
+        poblar(conn, inicio, fin)
+        return inicio, fin
+    primero, ultimo = primero // 10000, ultimo // 10000
+    if inicio < primero:
+        poblar(conn, inicio, primero - 1)
+    if fin > ultimo:
+        poblar(conn, ultimo + 1, fin)
+    return min(inicio, primero), max(fin, ultimo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calendario de semanas ISO y feriados de Chile")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_fer = sub.add_parser('feriados', help="Lista los feriados de un año")
+    p_fer.add_argument('--anio', type=int, default=date.today().year)
+    p_sem = sub.add_parser('semana', help="Semana ISO y claves de una fecha")
+    p_sem.add_argument('--fecha', default=date.today().isoformat())
+    args = parser.parse_args()
+    
+    if args.comando == 'feriados':
+        for fecha, nombre in sorted(feriados(args.anio).items()):
+            print(f"{fecha.isoformat()}  {DIAS_SEMANA[fecha.weekday()]:<10} {nombre}")
+    else:
+        print(f"Fecha:        {args.fecha}")
+        print(f"Lunes:        {semana_inicio(args.fecha)}")
+        print(f"Clave día:    {clave_dia(args.fecha)}")
+        print(f"Clave semana: {clave_semana(args.fecha)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Cola de escrituras con commit agrupado.
+
+Cuando muchos técnicos marcan visitas a la vez, cada escritura con su propia
+transacción compite por el bloqueo de SQLite y paga un COMMIT (y su fsync)
+por operación. ``EscritorAgrupado`` recibe las escrituras en una cola y un
+único hilo escritor las aplica en lotes: toma todo lo pendiente, hasta
+``max_lote`` operaciones, y lo confirma en una sola transacción. Mientras se
+confirma un lote se acumula el siguiente, así que el tamaño de lote crece
+solo con la carga. Con ``espera_ms`` > 0 el escritor además retiene cada lote
+ese tiempo para juntar más operaciones, lo que conviene cuando el COMMIT es
+caro (``synchronous = FULL``) a cambio de más latencia.
+
+Cada operación corre dentro de su propio SAVEPOINT: si falla, se deshace solo
+ella y su futuro recibe la excepción, sin afectar al resto del lote. Los
+futuros se resuelven después del COMMIT, de modo que un resultado recibido
+(por ejemplo el id de una visita) ya es durable.
+
+Uso:
+    escritor = EscritorAgrupado(db)
+    futuro = escritor.registrar_visita(cliente_id=1, fecha_visita="2025-01-06")
+    visita_id = futuro.result()
+    escritor.cerrar()
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+from database import Database
+
+_FIN = object()
+
+
+class EscritorAgrupado:
+    """Serializa escrituras sobre ``Database`` en un hilo y las confirma por lotes."""
+    
+    def __init__(self, db: Database, max_lote: int = 256, espera_ms: float = 0.0):
+        self.db = db
+        self.max_lote = max_lote
+        self.espera = espera_ms / 1000.0
+        self._cola: "queue.Queue" = queue.Queue()
+        self._cerrado = False
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.operaciones = 0
+        self._hilo = threading.Thread(target=self._bucle, name='sqlite-escritor', daemon=True)
+        self._hilo.start()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cerrar()
+    
+    def ejecutar(self, funcion: Callable[[Database], object]) -> Future:
+        """Encola ``funcion(db)`` y retorna un futuro con su resultado."""
+        futuro: Future = Future()
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError("El escritor ya está cerrado")
+            self._cola.put((funcion, futuro))
+        return futuro
+    
+    def enviar(self, metodo: str, *args, **kwargs) -> Future:
+        """Encola la llamada ``db.<metodo>(*args, **kwargs)``."""
+        return self.ejecutar(lambda db: getattr(db, metodo)(*args, **kwargs))
+    
+    def registrar_visita(self, *args, **kwargs) -> Future:
+        """Versión encolada de ``Database.registrar_visita``; el futuro trae el id."""
+        return self.enviar('registrar_visita', *args, **kwargs)
+    
+    def actualizar_cliente(self, cliente_id: int, **kwargs) -> Future:
+        """Versión encolada de ``Database.actualizar_cliente``."""
+        return self.enviar('actualizar_cliente', cliente_id, **kwargs)
+    
+    def estadisticas(self) -> Dict[str, float]:
+        """Lotes confirmados, operaciones aplicadas y tamaño medio de lote."""
+        return {
+            'lotes': self.lotes,
+            'operaciones': self.operaciones,
+            'promedio_lote': self.operaciones / self.lotes if self.lotes else 0.0,
+            'pendientes': self._cola.qsize(),
+        }
+    
+    def cerrar(self):
+        """Aplica lo pendiente, detiene el hilo escritor y espera a que termine."""
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._cola.put(_FIN)
+        self._hilo.join()
+    
+    # Hilo escritor
+    def _bucle(self):
+        seguir = True
+        while seguir:
+            lote, seguir = self._juntar_lote()
+            if lote:
+                self._aplicar(lote)
+    
+    def _juntar_lote(self) -> Tuple[List, bool]:
+        """Espera la primera operación y junta las que lleguen dentro del plazo."""
+        primero = self._cola.get()
+        if primero is _FIN:
+            return [], False
+        lote = [primero]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.max_lote:
+            try:
+                # Primero vacía lo que ya está en cola; luego espera lo que quede del plazo
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+            if item is _FIN:
+                return lote, False
+            lote.append(item)
+        return lote, True
+    
+    def _aplicar(self, lote: List):
+        """Ejecuta el lote en una transacción, con un SAVEPOINT por operación."""
+        resultados = []
+        try:
+            with self.db.transaction() as conn:
+                for funcion, futuro in lote:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT operacion")
+                    try:
+                        resultado = funcion(self.db)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO operacion")
+                        conn.execute("RELEASE operacion")
+                        futuro.set_exception(e)
+                        continue
+                    conn.execute("RELEASE operacion")
+                    resultados.append((futuro, resultado))
+        except Exception as e:
+            # Falló la transacción (p. ej. el COMMIT): nada del lote quedó aplicado
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.operaciones += len(resultados)
+        for futuro, resultado in resultados:
+            futuro.set_result(resultado)
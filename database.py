@@ -3,306 +3,1331 @@ Módulo para la gestión de la base de datos SQLite del sistema de mantenimiento
 """
 import sqlite3
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterator, Optional, Tuple
+from urllib.request import pathname2url
 
+import calendario
+import migraciones
+from calendario import DIAS_SEMANA
+from modelos import Asignacion, Cliente, Fila, Responsable, Visita, filas
 
-class Database:
-    """Clase para gestionar la base de datos SQLite."""
+
+def normalizar_texto(valor) -> str:
+    """Normaliza texto para comparar: sin tildes, minúsculas y espacios simples."""
+    if not valor:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+# Día de atención comparable con normalizar_texto (sin tildes ni mayúsculas)
+_SQL_DIA = ("lower(trim(replace(replace(replace(replace({columna}, "
+            "'é', 'e'), 'É', 'E'), 'á', 'a'), 'Á', 'A')))")
+
+# Las comunas y nombres se repiten mucho al ordenar agendas
+_clave_orden = lru_cache(maxsize=8192)(normalizar_texto)
+
+
+class ConnectionPool:
+    """Mantiene una conexión SQLite persistente por hilo.
+    
+    sqlite3 no permite compartir una conexión entre hilos, así que cada hilo
+    obtiene la suya la primera vez que la pide y la reutiliza en adelante.
+    Las conexiones se abren en modo autocommit (``isolation_level=None``) y
+    las transacciones se delimitan explícitamente con ``transaction()``.
+    Con ``solo_lectura`` se abren con ``mode=ro``: SQLite rechaza cualquier
+    escritura y, en modo WAL, no bloquean ni son bloqueadas por el escritor.
+    """
+    
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA mmap_size = 134217728",
+    )
     
-    def __init__(self, db_path: str = "piscinas.db"):
-        """Inicializa la conexión a la base de datos."""
+    def __init__(self, db_path: str, timeout: float = 30.0, solo_lectura: bool = False):
         self.db_path = db_path
-        self.init_database()
+        self.timeout = timeout
+        self.solo_lectura = solo_lectura
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
     
-    def get_connection(self):
-        """Obtiene una conexión a la base de datos."""
-        conn = sqlite3.connect(self.db_path)
+    def _connect(self) -> sqlite3.Connection:
+        """Abre una conexión nueva y aplica los PRAGMA de rendimiento."""
+        if self.solo_lectura:
+            uri = 'file:' + pathname2url(os.path.abspath(self.db_path)) + '?mode=ro'
+            conn = sqlite3.connect(uri, timeout=self.timeout, isolation_level=None,
+                                   uri=True)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   isolation_level=None)
         conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            # El modo de journal lo fija el escritor; una conexión de solo
+            # lectura no puede cambiarlo
+            if self.solo_lectura and 'journal_mode' in pragma:
+                continue
+            conn.execute(pragma)
+        with self._lock:
+            self._connections.append(conn)
         return conn
     
-    def init_database(self):
-        """Inicializa las tablas de la base de datos."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabla de responsables
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS responsables (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL UNIQUE,
-                activo INTEGER DEFAULT 1,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Tabla de clientes
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                direccion TEXT,
-                comuna TEXT,
-                celular TEXT,
-                responsable_id INTEGER,
-                dia_atencion TEXT,
-                precio_por_visita REAL DEFAULT 0,
-                activo INTEGER DEFAULT 1,
-                notas TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (responsable_id) REFERENCES responsables(id)
-            )
-        """)
-        
-        # Tabla de visitas (historial de mantenimientos)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS visitas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER NOT NULL,
-                fecha_visita TEXT NOT NULL,
-                responsable_id INTEGER,
-                precio REAL,
-                realizada INTEGER DEFAULT 0,
-                notas TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-                FOREIGN KEY (responsable_id) REFERENCES responsables(id)
-            )
-        """)
-        
-        # Tabla de asignaciones semanales
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS asignaciones_semanales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                semana_inicio TEXT NOT NULL,
-                cliente_id INTEGER NOT NULL,
-                responsable_id INTEGER,
-                dia_atencion TEXT,
-                precio REAL,
-                asignada INTEGER DEFAULT 1,
-                realizada INTEGER DEFAULT 0,
-                notas TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-                FOREIGN KEY (responsable_id) REFERENCES responsables(id),
-                UNIQUE(semana_inicio, cliente_id)
-            )
-        """)
+    def al_confirmar(self, callback):
+        """Ejecuta ``callback`` tras el COMMIT de la transacción en curso.
+        
+        Fuera de una transacción se ejecuta de inmediato.
+        """
+        if self.in_transaction():
+            self._local.pendientes.append(callback)
+        else:
+            callback()
+    
+    def datos_cambiaron(self) -> bool:
+        """Indica si otra conexión confirmó cambios desde la consulta anterior de este hilo.
+        
+        Usa ``PRAGMA data_version``, que solo es comparable dentro de una
+        misma conexión: la primera vez que se consulta en un hilo retorna True.
+        """
+        version = self.get().execute("PRAGMA data_version").fetchone()[0]
+        anterior = getattr(self._local, 'data_version', None)
+        self._local.data_version = version
+        return version != anterior
+    
+    def in_transaction(self) -> bool:
+        """Indica si el hilo actual está dentro de ``transaction()``."""
+        return getattr(self._local, 'depth', 0) > 0
+    
+    def get(self) -> sqlite3.Connection:
+        """Obtiene la conexión del hilo actual, creándola si no existe."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """Abre una transacción en la conexión del hilo actual.
+        
+        Las transacciones anidadas se integran en la más externa: solo esta
+        hace COMMIT (o ROLLBACK si ocurre una excepción).
+        """
+        conn = self.get()
+        if self._local.depth > 0:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn.execute("BEGIN")
+        self._local.depth = 1
+        self._local.pendientes = []
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+            pendientes, self._local.pendientes = self._local.pendientes, []
+        for callback in pendientes:
+            callback()
+    
+    def close_all(self):
+        """Cierra todas las conexiones abiertas por el pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Conexión creada en otro hilo; se libera al terminar ese hilo
+                pass
+        self._local = threading.local()
+
+
+class QueryCache:
+    """Caché LRU en memoria para resultados de consultas de lectura.
+    
+    Las claves son tuplas (consulta, argumentos). Se invalida completa en
+    cada escritura sobre las tablas cacheadas; los cambios de otros procesos
+    sobre el mismo archivo los detecta ``Database.validar_cache``.
+    """
+    
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._generacion = 0
+        self._datos: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def obtener(self, clave: Tuple, cargar):
+        """Retorna el valor cacheado para ``clave`` o lo calcula con ``cargar()``."""
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return self._datos[clave]
+            self.misses += 1
+            generacion = self._generacion
+        valor = cargar()
+        with self._lock:
+            if generacion != self._generacion:
+                # Hubo una escritura mientras se cargaba; no guardar el valor
+                return valor
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+        return valor
+    
+    @property
+    def generacion(self) -> int:
+        """Número que cambia con cada invalidación (sirve para validar derivados)."""
+        return self._generacion
+    
+    def invalidar(self):
+        """Descarta todas las entradas."""
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Retorna los contadores de aciertos y fallos."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._datos), 'maxsize': self.maxsize}
+
+
+class Database:
+    """Clase para gestionar la base de datos SQLite."""
+    
+    def __init__(self, db_path: str = "piscinas.db", cache_size: int = 256,
+                 solo_lectura: bool = False, cache: "QueryCache" = None):
+        """Inicializa la conexión a la base de datos.
+        
+        Una instancia ``solo_lectura`` no aplica migraciones (el esquema debe
+        estar al día) y puede compartir ``cache`` con la instancia que escribe,
+        de modo que sus invalidaciones también la alcancen.
+        """
+        self.db_path = db_path
+        self.solo_lectura = solo_lectura
+        self.pool = ConnectionPool(db_path, solo_lectura=solo_lectura)
+        self.cache = cache if cache is not None else QueryCache(cache_size)
+        self._fts_disponible = None
+        # Años (primero, último) que ya se sabe que tiene la tabla calendario
+        self._anios_calendario = None
+        self.instrumentacion = None
+        if not solo_lectura:
+            self.init_database()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtiene la conexión persistente del hilo actual."""
+        return self.pool.get()
+    
+    def transaction(self):
+        """Context manager que agrupa varias operaciones en una transacción."""
+        return self.pool.transaction()
+    
+    def _cacheado(self, clave: Tuple, cargar):
+        """Lee a través de la caché (salvo dentro de una transacción abierta).
         
-        # Índices para mejorar el rendimiento
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_responsable ON clientes(responsable_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_dia ON clientes(dia_atencion)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_cliente ON visitas(cliente_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_fecha ON visitas(fecha_visita)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_asignaciones_semana ON asignaciones_semanales(semana_inicio)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_asignaciones_cliente ON asignaciones_semanales(cliente_id)")
+        Retorna copias de los diccionarios para que el llamador pueda
+        modificarlos sin alterar la caché.
+        """
+        if self.pool.in_transaction():
+            return cargar()
+        self.validar_cache()
+        valor = self.cache.obtener(clave, cargar)
+        if isinstance(valor, list):
+            return [dict(row) for row in valor]
+        return dict(valor) if valor is not None else None
+    
+    def _cacheado_filas(self, clave: Tuple, cargar):
+        """Como ``_cacheado`` pero para listas de filas compactas.
         
-        conn.commit()
-        conn.close()
+        Las filas son inmutables, así que la lista cacheada se comparte sin
+        copiar: el llamador no debe modificarla.
+        """
+        if self.pool.in_transaction():
+            return cargar()
+        self.validar_cache()
+        return self.cache.obtener(clave, cargar)
+    
+    def _filas(self, modelo, sql: str, params=()) -> Iterator[Fila]:
+        """Ejecuta ``sql`` y retorna sus filas como ``modelo``, a medida que se leen.
+        
+        El cursor queda abierto mientras se itera; si se escribe en la base
+        desde el mismo hilo antes de terminar, conviene materializar antes
+        con ``list()``.
+        """
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        return filas(cursor, modelo)
+    
+    def validar_cache(self) -> int:
+        """Descarta la caché si otra conexión escribió en la base; retorna su generación.
+        
+        Detecta las escrituras de otros hilos y de otros procesos sobre el
+        mismo archivo (el servidor Node, la CLI, los importadores), que no
+        pasan por ``_invalidar_cache``.
+        """
+        if self.pool.datos_cambiaron():
+            self.cache.invalidar()
+        return self.cache.generacion
+    
+    def _invalidar_cache(self):
+        """Vacía la caché ahora y de nuevo cuando se confirme la transacción."""
+        self.cache.invalidar()
+        self.pool.al_confirmar(self.cache.invalidar)
+    
+    def activar_instrumentacion(self, umbral_ms: float = 100.0, archivo_log: str = None,
+                                volcar_al_salir: bool = False):
+        """Empieza a medir los métodos públicos y a registrar consultas lentas.
+        
+        Retorna el objeto ``Instrumentacion`` con las estadísticas.
+        """
+        from instrumentacion import Instrumentacion
+        
+        if self.instrumentacion is None:
+            self.instrumentacion = Instrumentacion(self, umbral_ms, archivo_log, volcar_al_salir)
+            self.instrumentacion.instalar()
+        return self.instrumentacion
+    
+    def desactivar_instrumentacion(self):
+        """Restaura los métodos sin medir."""
+        if self.instrumentacion is not None:
+            self.instrumentacion.desinstalar()
+            self.instrumentacion = None
+    
+    def close(self):
+        """Cierra las conexiones abiertas."""
+        self.pool.close_all()
+    
+    def init_database(self):
+        """Aplica las migraciones de esquema pendientes (ninguna si está al día)."""
+        migraciones.migrar(self.get_connection())
+    
+    @property
+    def fts_disponible(self) -> bool:
+        """Indica si existe el índice FTS5 de clientes."""
+        if self._fts_disponible is None:
+            self._fts_disponible = self.get_connection().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clientes_fts'"
+            ).fetchone() is not None
+        return self._fts_disponible
     
     # Métodos para responsables
     def agregar_responsable(self, nombre: str) -> int:
         """Agrega un nuevo responsable."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        self._invalidar_cache()
+        cursor = self.get_connection().cursor()
         try:
-            cursor.execute(
-                "INSERT INTO responsables (nombre) VALUES (?)",
-                (nombre,)
-            )
-            conn.commit()
+            with self.transaction():
+                cursor.execute(
+                    "INSERT INTO responsables (nombre) VALUES (?)",
+                    (nombre,)
+                )
             return cursor.lastrowid
         except sqlite3.IntegrityError:
             # Si ya existe, retornar el ID existente
             cursor.execute("SELECT id FROM responsables WHERE nombre = ?", (nombre,))
             result = cursor.fetchone()
             return result['id'] if result else None
-        finally:
-            conn.close()
     
-    def obtener_responsables(self, activos_only: bool = True) -> List[Dict]:
-        """Obtiene todos los responsables."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def obtener_o_crear_responsables(self, nombres) -> Dict[str, int]:
+        """Crea los responsables que no existan y retorna un mapa nombre -> id."""
+        nombres = list(nombres)
+        if not nombres:
+            return {}
+        self._invalidar_cache()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO responsables (nombre) VALUES (?)",
+                [(nombre,) for nombre in nombres]
+            )
+            placeholders = ", ".join("?" * len(nombres))
+            cursor = conn.execute(
+                f"SELECT id, nombre FROM responsables WHERE nombre IN ({placeholders})",
+                nombres
+            )
+            return {row['nombre']: row['id'] for row in cursor.fetchall()}
+    
+    def obtener_responsables(self, activos_only: bool = True,
+                             compactas: bool = False) -> List[Dict]:
+        """Obtiene todos los responsables.
+        
+        Con ``compactas=True`` retorna filas ``Responsable`` en vez de diccionarios.
+        """
         query = "SELECT * FROM responsables"
         if activos_only:
             query += " WHERE activo = 1"
         query += " ORDER BY nombre"
-        cursor.execute(query)
-        responsables = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return responsables
+        if compactas:
+            return self._cacheado_filas(('obtener_responsables', activos_only, 'filas'),
+                                        lambda: list(self._filas(Responsable, query)))
+        def cargar():
+            cursor = self.get_connection().cursor()
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+        return self._cacheado(('obtener_responsables', activos_only), cargar)
     
     # Métodos para clientes
     def agregar_cliente(self, nombre: str, direccion: str = None, comuna: str = None,
                        celular: str = None, responsable_id: int = None,
                        dia_atencion: str = None, precio_por_visita: float = 0) -> int:
         """Agrega un nuevo cliente."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO clientes 
-            (nombre, direccion, comuna, celular, responsable_id, dia_atencion, precio_por_visita)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (nombre, direccion, comuna, celular, responsable_id, dia_atencion, precio_por_visita))
-        conn.commit()
-        cliente_id = cursor.lastrowid
-        conn.close()
-        return cliente_id
+        self._invalidar_cache()
+        with self.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO clientes 
+                (nombre, direccion, comuna, celular, responsable_id, dia_atencion, precio_por_visita)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (nombre, direccion, comuna, celular, responsable_id, dia_atencion, precio_por_visita))
+        return cursor.lastrowid
+    
+    def agregar_clientes_lote(self, clientes: List[Dict]) -> int:
+        """Agrega varios clientes con un único ``executemany``.
+        
+        Cada elemento debe tener las claves de ``agregar_cliente``; las que
+        falten se insertan como NULL (o 0 en el caso del precio).
+        """
+        self._invalidar_cache()
+        with self.transaction() as conn:
+            cursor = conn.executemany("""
+                INSERT INTO clientes 
+                (nombre, direccion, comuna, celular, responsable_id, dia_atencion,
+                 precio_por_visita, origen_clave, origen_huella)
+                VALUES (:nombre, :direccion, :comuna, :celular, :responsable_id,
+                        :dia_atencion, :precio_por_visita, :origen_clave, :origen_huella)
+            """, (self._valores_cliente(c) for c in clientes))
+        return cursor.rowcount
+    
+    @staticmethod
+    def _valores_cliente(cliente: Dict) -> Dict:
+        """Normaliza un diccionario de cliente a los parámetros de INSERT/UPDATE."""
+        return {
+            'nombre': cliente['nombre'],
+            'direccion': cliente.get('direccion'),
+            'comuna': cliente.get('comuna'),
+            'celular': cliente.get('celular'),
+            'responsable_id': cliente.get('responsable_id'),
+            'dia_atencion': cliente.get('dia_atencion'),
+            'precio_por_visita': cliente.get('precio_por_visita') or 0,
+            'origen_clave': cliente.get('origen_clave'),
+            'origen_huella': cliente.get('origen_huella'),
+        }
+    
+    def sincronizar_clientes(self, clientes: List[Dict], clave_legado=None) -> Dict[str, int]:
+        """Sincroniza los clientes con una fuente externa aplicando solo el delta.
+        
+        Cada cliente debe traer ``origen_clave`` (identidad estable en la
+        fuente) y ``origen_huella`` (hash de todos sus campos). Los clientes
+        nuevos se insertan, los que cambiaron de huella (o estaban inactivos)
+        se actualizan y los que ya no aparecen en la fuente se desactivan.
+        
+        ``clave_legado`` es una función opcional que calcula la clave a partir
+        de un cliente de la base sin ``origen_clave`` (importado antes de
+        existir la sincronización), para adoptarlo en vez de duplicarlo. Los
+        legados con la misma clave se recorren por id y reciben el sufijo
+        ``-n`` de su aparición, igual que las filas repetidas de la fuente.
+        
+        Retorna un diccionario con las claves ``nuevos``, ``actualizados``,
+        ``sin_cambios`` y ``desactivados``.
+        """
+        resultado = {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0, 'desactivados': 0}
+        self._invalidar_cache()
+        with self.transaction() as conn:
+            existentes = {}
+            for row in conn.execute("""
+                SELECT id, origen_clave, origen_huella, activo
+                FROM clientes WHERE origen_clave IS NOT NULL
+            """):
+                existentes[row['origen_clave']] = row
+            
+            adoptados, apariciones = {}, {}
+            if clave_legado is not None:
+                for row in conn.execute("""
+                    SELECT id, nombre, direccion, comuna, activo
+                    FROM clientes WHERE origen_clave IS NULL
+                    ORDER BY id
+                """):
+                    base = clave_legado(dict(row))
+                    n = apariciones.get(base, 0)
+                    apariciones[base] = n + 1
+                    clave = base if n == 0 else f"{base}-{n}"
+                    if clave not in existentes:
+                        adoptados[clave] = row
+            
+            nuevos, actualizados, vistos = [], [], set()
+            for cliente in clientes:
+                clave = cliente['origen_clave']
+                vistos.add(clave)
+                actual = existentes.get(clave) or adoptados.get(clave)
+                if actual is None:
+                    nuevos.append(self._valores_cliente(cliente))
+                elif actual['activo'] and clave in existentes and \
+                        actual['origen_huella'] == cliente['origen_huella']:
+                    resultado['sin_cambios'] += 1
+                else:
+                    valores = self._valores_cliente(cliente)
+                    valores['id'] = actual['id']
+                    valores['updated_at'] = datetime.now().isoformat()
+                    actualizados.append(valores)
+            
+            if nuevos:
+                self.agregar_clientes_lote(nuevos)
+            if actualizados:
+                conn.executemany("""
+                    UPDATE clientes SET
+                        nombre = :nombre, direccion = :direccion, comuna = :comuna,
+                        celular = :celular, responsable_id = :responsable_id,
+                        dia_atencion = :dia_atencion, precio_por_visita = :precio_por_visita,
+                        origen_clave = :origen_clave, origen_huella = :origen_huella,
+                        activo = 1, updated_at = :updated_at
+                    WHERE id = :id
+                """, actualizados)
+            desactivar = [(datetime.now().isoformat(), row['id'])
+                          for clave, row in existentes.items()
+                          if row['activo'] and clave not in vistos]
+            if desactivar:
+                conn.executemany(
+                    "UPDATE clientes SET activo = 0, updated_at = ? WHERE id = ?",
+                    desactivar
+                )
+            
+            resultado['nuevos'] = len(nuevos)
+            resultado['actualizados'] = len(actualizados)
+            resultado['desactivados'] = len(desactivar)
+        return resultado
     
     def actualizar_cliente(self, cliente_id: int, **kwargs):
         """Actualiza los datos de un cliente."""
         if not kwargs:
             return
-        conn = self.get_connection()
-        cursor = conn.cursor()
         kwargs['updated_at'] = datetime.now().isoformat()
         set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
         values = list(kwargs.values()) + [cliente_id]
-        cursor.execute(f"UPDATE clientes SET {set_clause} WHERE id = ?", values)
-        conn.commit()
-        conn.close()
+        self._invalidar_cache()
+        with self.transaction() as conn:
+            conn.execute(f"UPDATE clientes SET {set_clause} WHERE id = ?", values)
     
-    def obtener_clientes(self, activos_only: bool = True) -> List[Dict]:
-        """Obtiene todos los clientes."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        query = """
+    def obtener_clientes(self, activos_only: bool = True,
+                         compactas: bool = False) -> List[Dict]:
+        """Obtiene todos los clientes.
+        
+        Con ``compactas=True`` retorna filas ``Cliente`` en vez de diccionarios.
+        """
+        if compactas:
+            return self._cacheado_filas(
+                ('obtener_clientes', activos_only, 'filas'),
+                lambda: list(self.recorrer_clientes(activos_only=activos_only)))
+        def cargar():
+            cursor = self.get_connection().cursor()
+            query = """
+                SELECT c.*, r.nombre as responsable_nombre 
+                FROM clientes c
+                LEFT JOIN responsables r ON c.responsable_id = r.id
+            """
+            if activos_only:
+                query += " WHERE c.activo = 1"
+            query += " ORDER BY c.nombre"
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+        return self._cacheado(('obtener_clientes', activos_only), cargar)
+    
+    def recorrer_clientes(self, orden: str = 'nombre', **filtros) -> Iterator[Cliente]:
+        """Recorre los clientes como filas ``Cliente`` sin cargarlos todos.
+        
+        Acepta los mismos filtros que ``pagina_clientes``; ``orden`` puede ser
+        ``'nombre'`` o ``'id'``. A diferencia de ``iter_clientes`` usa una sola
+        consulta, así que no ve los cambios hechos mientras se recorre.
+        """
+        if orden not in ('nombre', 'id'):
+            raise ValueError(f"Orden no soportado: {orden}")
+        condiciones, params = self._filtros_clientes(**filtros)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return self._filas(Cliente, f"""
             SELECT c.*, r.nombre as responsable_nombre 
             FROM clientes c
             LEFT JOIN responsables r ON c.responsable_id = r.id
-        """
+            {where}
+            ORDER BY c.{orden}
+        """, params)
+    
+    def _filtros_clientes(self, activos_only: bool = True, comuna: str = None,
+                          responsable_id: int = None,
+                          dia_atencion: str = None) -> Tuple[List[str], List]:
+        """Construye las condiciones WHERE (y sus parámetros) para listar clientes."""
+        condiciones, params = [], []
         if activos_only:
-            query += " WHERE c.activo = 1"
-        query += " ORDER BY c.nombre"
-        cursor.execute(query)
-        clientes = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return clientes
+            condiciones.append("c.activo = 1")
+        if comuna:
+            condiciones.append("c.comuna = ? COLLATE NOCASE")
+            params.append(comuna)
+        if responsable_id is not None:
+            condiciones.append("c.responsable_id = ?")
+            params.append(responsable_id)
+        if dia_atencion:
+            condiciones.append("c.dia_atencion = ? COLLATE NOCASE")
+            params.append(dia_atencion)
+        return condiciones, params
     
-    def obtener_cliente_por_id(self, cliente_id: int) -> Optional[Dict]:
-        """Obtiene un cliente por su ID."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+    def pagina_clientes(self, after_id: int = 0, limit: int = 50,
+                        **filtros) -> List[Dict]:
+        """Obtiene una página de clientes ordenada por ID (paginación por clave).
+        
+        Retorna hasta ``limit`` clientes con ID mayor que ``after_id``; para
+        la página siguiente se pasa el ID del último cliente recibido. Acepta
+        los filtros ``activos_only``, ``comuna``, ``responsable_id`` y
+        ``dia_atencion``.
+        """
+        condiciones, params = self._filtros_clientes(**filtros)
+        condiciones.append("c.id > ?")
+        params.append(after_id or 0)
+        cursor = self.get_connection().execute(f"""
             SELECT c.*, r.nombre as responsable_nombre 
             FROM clientes c
             LEFT JOIN responsables r ON c.responsable_id = r.id
-            WHERE c.id = ?
-        """, (cliente_id,))
-        result = cursor.fetchone()
-        conn.close()
-        return dict(result) if result else None
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY c.id
+            LIMIT ?
+        """, params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def iter_clientes(self, batch_size: int = 500, **filtros) -> Iterator[Dict]:
+        """Recorre los clientes de a ``batch_size`` sin cargarlos todos en memoria."""
+        after_id = 0
+        while True:
+            pagina = self.pagina_clientes(after_id, batch_size, **filtros)
+            yield from pagina
+            if len(pagina) < batch_size:
+                return
+            after_id = pagina[-1]['id']
+    
+    def buscar_clientes(self, texto: str, limit: int = 20,
+                        activos_only: bool = True) -> List[Dict]:
+        """Busca clientes por nombre, dirección, comuna o celular.
+        
+        Ignora tildes y mayúsculas y acepta palabras incompletas ("rodrig
+        las cond"). Si ninguna fila contiene todas las palabras, busca las
+        que contengan alguna. Los candidatos se ordenan por palabras completas
+        coincidentes y luego por similitud del nombre con el texto buscado.
+        """
+        palabras = [p for p in normalizar_texto(texto).replace('"', ' ').split() if p]
+        if not palabras:
+            return []
+        
+        candidatos = self._candidatos_busqueda(palabras, " AND ", limit * 5, activos_only)
+        if not candidatos and len(palabras) > 1:
+            candidatos = self._candidatos_busqueda(palabras, " OR ", limit * 5, activos_only)
+        
+        consulta = ' '.join(palabras)
+        
+        def puntaje(cliente):
+            nombre = normalizar_texto(cliente['nombre'])
+            campos = set(normalizar_texto(' '.join(
+                str(cliente[k] or '') for k in ('nombre', 'direccion', 'comuna', 'celular')
+            )).split())
+            exactas = sum(1 for p in palabras if p in campos)
+            empieza = 1 if nombre.startswith(palabras[0]) else 0
+            similitud = SequenceMatcher(None, consulta, nombre).ratio()
+            return (exactas, empieza, similitud)
+        
+        candidatos.sort(key=puntaje, reverse=True)
+        return candidatos[:limit]
+    
+    def _candidatos_busqueda(self, palabras: List[str], operador: str,
+                             limit: int, activos_only: bool) -> List[Dict]:
+        """Obtiene los clientes que coinciden con las palabras (FTS5 o LIKE)."""
+        filtro_activo = " AND c.activo = 1" if activos_only else ""
+        conn = self.get_connection()
+        if self.fts_disponible:
+            match = operador.join(f'"{p}"*' for p in palabras)
+            cursor = conn.execute(f"""
+                SELECT c.*, r.nombre as responsable_nombre
+                FROM clientes_fts f
+                JOIN clientes c ON c.id = f.rowid
+                LEFT JOIN responsables r ON c.responsable_id = r.id
+                WHERE clientes_fts MATCH ?{filtro_activo}
+                ORDER BY f.rank
+                LIMIT ?
+            """, (match, limit))
+        else:
+            condicion = ("(c.nombre LIKE ? OR c.direccion LIKE ? "
+                         "OR c.comuna LIKE ? OR c.celular LIKE ?)")
+            params = []
+            for p in palabras:
+                params.extend([f"%{p}%"] * 4)
+            cursor = conn.execute(f"""
+                SELECT c.*, r.nombre as responsable_nombre
+                FROM clientes c
+                LEFT JOIN responsables r ON c.responsable_id = r.id
+                WHERE ({operador.join([condicion] * len(palabras))}){filtro_activo}
+                LIMIT ?
+            """, params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def obtener_cliente_por_id(self, cliente_id: int) -> Optional[Dict]:
+        """Obtiene un cliente por su ID."""
+        def cargar():
+            cursor = self.get_connection().execute("""
+                SELECT c.*, r.nombre as responsable_nombre 
+                FROM clientes c
+                LEFT JOIN responsables r ON c.responsable_id = r.id
+                WHERE c.id = ?
+            """, (cliente_id,))
+            result = cursor.fetchone()
+            return dict(result) if result else None
+        return self._cacheado(('obtener_cliente_por_id', cliente_id), cargar)
     
     # Métodos para asignaciones semanales
     def obtener_semana_actual(self) -> str:
         """Obtiene el inicio de la semana actual (lunes) en formato YYYY-MM-DD."""
-        today = datetime.now()
-        days_since_monday = today.weekday()
-        monday = today.replace(day=today.day - days_since_monday)
-        return monday.strftime("%Y-%m-%d")
+        return calendario.semana_inicio()
     
     def crear_asignacion_semanal(self, semana_inicio: str, cliente_id: int,
                                  responsable_id: int = None, dia_atencion: str = None,
                                  precio: float = None) -> int:
-        """Crea una asignación semanal."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Crea una asignación semanal.
         
+        Si ya existe para ese cliente, semana y día se actualizan su
+        responsable y precio (se conserva si estaba realizada). Es un UPSERT
+        y no ``INSERT OR REPLACE`` porque el borrado implícito del REPLACE no
+        dispara los triggers de ``resumen_semanal``.
+        """
         # Si no se proporciona precio, obtenerlo del cliente
         if precio is None:
             cliente = self.obtener_cliente_por_id(cliente_id)
             precio = cliente['precio_por_visita'] if cliente else 0
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO asignaciones_semanales
-            (semana_inicio, cliente_id, responsable_id, dia_atencion, precio)
-            VALUES (?, ?, ?, ?, ?)
-        """, (semana_inicio, cliente_id, responsable_id, dia_atencion, precio))
-        conn.commit()
-        asignacion_id = cursor.lastrowid
-        conn.close()
-        return asignacion_id
+        with self.transaction() as conn:
+            row = conn.execute("""
+                INSERT INTO asignaciones_semanales
+                (semana_inicio, cliente_id, responsable_id, dia_atencion, precio)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (semana_inicio, cliente_id, COALESCE(dia_atencion, '')) DO UPDATE SET
+                    responsable_id = excluded.responsable_id,
+                    precio = excluded.precio
+                RETURNING id
+            """, (semana_inicio, cliente_id, responsable_id, dia_atencion, precio)).fetchone()
+        return row[0]
     
     def asignar_clientes_semana(self, semana_inicio: str = None, 
                                 solo_activos: bool = True) -> int:
-        """Asigna todos los clientes activos a la semana especificada."""
+        """Asigna todos los clientes activos a la semana especificada.
+        
+        Retorna la cantidad de clientes asignados a la semana (nuevos más
+        los que ya estaban asignados).
+        """
         if semana_inicio is None:
             semana_inicio = self.obtener_semana_actual()
         
-        clientes = self.obtener_clientes(activos_only=solo_activos)
-        asignados = 0
+        resultado = self.asignar_clientes_semanas(semana_inicio, semana_inicio,
+                                                  solo_activos=solo_activos)
+        return resultado['insertadas'] + resultado['existentes']
+    
+    def asignar_clientes_semanas(self, desde: str, hasta: str,
+                                 solo_activos: bool = True) -> Dict[str, int]:
+        """Asigna los clientes a todas las semanas entre ``desde`` y ``hasta``.
         
-        for cliente in clientes:
-            self.crear_asignacion_semanal(
-                semana_inicio=semana_inicio,
-                cliente_id=cliente['id'],
-                responsable_id=cliente['responsable_id'],
-                dia_atencion=cliente['dia_atencion'],
-                precio=cliente['precio_por_visita']
-            )
-            asignados += 1
+        Cada semana se materializa con un único ``INSERT ... SELECT`` y todas
+        las semanas se escriben en la misma transacción. Las asignaciones que
+        ya existían no se modifican (se conserva su estado ``realizada``).
+        Retorna un diccionario con las claves ``semanas``, ``insertadas`` y
+        ``existentes``. Las fechas se llevan al lunes de su semana, que es
+        el ``semana_inicio`` con que consultan la agenda y los reportes.
+        """
+        inicio = calendario.lunes(desde)
+        fin = calendario.lunes(hasta)
+        if fin < inicio:
+            raise ValueError("La fecha 'hasta' debe ser posterior a 'desde'")
+        
+        filtro = " AND activo = 1" if solo_activos else ""
+        resultado = {'semanas': 0, 'insertadas': 0, 'existentes': 0}
+        with self.transaction() as conn:
+            total_clientes = conn.execute(
+                f"SELECT COUNT(*) FROM clientes WHERE 1{filtro}"
+            ).fetchone()[0]
+            semana = inicio
+            while semana <= fin:
+                # Un cliente con alguna asignación en la semana ya está asignado,
+                # aunque después haya cambiado su día de atención
+                cursor = conn.execute(f"""
+                    INSERT INTO asignaciones_semanales
+                    (semana_inicio, cliente_id, responsable_id, dia_atencion, precio)
+                    SELECT :semana, id, responsable_id, dia_atencion, precio_por_visita
+                    FROM clientes
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM asignaciones_semanales a
+                        WHERE a.semana_inicio = :semana AND a.cliente_id = clientes.id
+                    ){filtro}
+                """, {'semana': semana.strftime("%Y-%m-%d")})
+                resultado['semanas'] += 1
+                resultado['insertadas'] += cursor.rowcount
+                resultado['existentes'] += total_clientes - cursor.rowcount
+                semana += timedelta(weeks=1)
+        return resultado
+    
+    SQL_ASIGNACIONES_SEMANA = """
+        SELECT a.*, c.nombre as cliente_nombre, c.direccion, c.comuna, c.celular,
+               r.nombre as responsable_nombre
+        FROM asignaciones_semanales a
+        LEFT JOIN clientes c ON a.cliente_id = c.id
+        LEFT JOIN responsables r ON a.responsable_id = r.id
+        WHERE a.semana_inicio = ?
+        ORDER BY a.dia_atencion, c.nombre
+    """
+    
+    def obtener_asignaciones_semana(self, semana_inicio: str = None,
+                                    compactas: bool = False) -> List[Dict]:
+        """Obtiene las asignaciones de una semana.
+        
+        Con ``compactas=True`` retorna filas ``Asignacion`` en vez de diccionarios.
+        """
+        if compactas:
+            return list(self.recorrer_asignaciones(semana_inicio))
+        if semana_inicio is None:
+            semana_inicio = self.obtener_semana_actual()
+        
+        cursor = self.get_connection().execute(self.SQL_ASIGNACIONES_SEMANA, (semana_inicio,))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def recorrer_asignaciones(self, semana_inicio: str = None) -> Iterator[Asignacion]:
+        """Recorre las asignaciones de una semana como filas ``Asignacion``."""
+        if semana_inicio is None:
+            semana_inicio = self.obtener_semana_actual()
+        return self._filas(Asignacion, self.SQL_ASIGNACIONES_SEMANA, (semana_inicio,))
+    
+    # Agenda de los técnicos
+    # Ambas consultas se resuelven en idx_asignaciones_agenda sin ordenar en
+    # SQLite; ver ``planes_agenda`` y ``python benchmark.py agenda``.
+    SQL_AGENDA = f"""
+        SELECT a.id, a.cliente_id, a.realizada, a.precio, a.visita_id,
+               c.nombre AS cliente_nombre, c.direccion, c.comuna, c.celular
+        FROM asignaciones_semanales a
+        LEFT JOIN clientes c ON a.cliente_id = c.id
+        WHERE a.semana_inicio = ? AND a.responsable_id = ?
+          AND {_SQL_DIA.format(columna='a.dia_atencion')} = ?
+    """
+    SQL_AGENDA_SEMANA = """
+        SELECT a.id, a.responsable_id, a.dia_atencion, a.cliente_id, a.realizada,
+               a.precio, a.visita_id, c.nombre AS cliente_nombre, c.direccion,
+               c.comuna, c.celular, r.nombre AS responsable_nombre
+        FROM asignaciones_semanales a
+        LEFT JOIN clientes c ON a.cliente_id = c.id
+        LEFT JOIN responsables r ON a.responsable_id = r.id
+        WHERE a.semana_inicio = ?
+        ORDER BY a.responsable_id, a.dia_atencion
+    """
+    
+    @staticmethod
+    def _orden_ruta(cliente: Dict) -> Tuple[str, str]:
+        """Orden de visita dentro de un día: por comuna y luego por nombre."""
+        return _clave_orden(cliente['comuna']), _clave_orden(cliente['cliente_nombre'])
+    
+    def agenda(self, responsable_id: int, fecha: str = None) -> Dict:
+        """Clientes que un responsable debe atender en una fecha (por defecto hoy).
         
-        return asignados
+        Retorna la semana y el día que corresponden a la fecha junto con los
+        clientes ordenados por comuna y nombre, y el avance del día.
+        """
+        dia = datetime.strptime(fecha, "%Y-%m-%d") if fecha else datetime.now()
+        semana = calendario.semana_inicio(dia)
+        nombre_dia = DIAS_SEMANA[dia.weekday()]
+        cursor = self.get_connection().execute(
+            self.SQL_AGENDA, (semana, responsable_id, normalizar_texto(nombre_dia)))
+        clientes = sorted((dict(row) for row in cursor.fetchall()), key=self._orden_ruta)
+        return {
+            'fecha': dia.strftime("%Y-%m-%d"),
+            'semana_inicio': semana,
+            'dia': nombre_dia,
+            'responsable_id': responsable_id,
+            'total': len(clientes),
+            'realizadas': sum(1 for c in clientes if c['realizada']),
+            'clientes': clientes,
+        }
     
-    def obtener_asignaciones_semana(self, semana_inicio: str = None) -> List[Dict]:
-        """Obtiene las asignaciones de una semana."""
+    def agenda_semana(self, semana_inicio: str = None) -> List[Dict]:
+        """Asignaciones de una semana agrupadas por responsable y día.
+        
+        Cada responsable trae sus días en orden de la semana (los que no
+        tienen día van al final como ``'Sin día'``), y cada día su fecha y sus
+        clientes en orden de ruta. Los responsables se ordenan por nombre.
+        """
         if semana_inicio is None:
             semana_inicio = self.obtener_semana_actual()
+        lunes = datetime.strptime(semana_inicio, "%Y-%m-%d")
+        cursor = self.get_connection().execute(self.SQL_AGENDA_SEMANA, (semana_inicio,))
+        dias_canonicos = {normalizar_texto(dia): dia for dia in DIAS_SEMANA}
+        
+        responsables: Dict[int, Dict] = {}
+        for row in cursor.fetchall():
+            cliente = dict(row)
+            responsable_id = cliente.pop('responsable_id')
+            responsable = responsables.get(responsable_id)
+            if responsable is None:
+                responsable = responsables[responsable_id] = {
+                    'responsable_id': responsable_id,
+                    'responsable_nombre': cliente['responsable_nombre'] or 'Sin asignar',
+                    'total': 0, 'realizadas': 0, 'dias': {},
+                }
+            del cliente['responsable_nombre']
+            responsable['total'] += 1
+            responsable['realizadas'] += 1 if cliente['realizada'] else 0
+            dia = cliente.pop('dia_atencion')
+            # El día se agrupa por su nombre canónico aunque venga sin tilde
+            dia = dias_canonicos.get(normalizar_texto(dia), dia)
+            responsable['dias'].setdefault(dia, []).append(cliente)
+        
+        orden_dias = {dia: i for i, dia in enumerate(DIAS_SEMANA)}
+        agenda = []
+        for responsable in responsables.values():
+            dias = []
+            for dia in sorted(responsable['dias'], key=lambda d: orden_dias.get(d, len(DIAS_SEMANA))):
+                fecha = (lunes + timedelta(days=orden_dias[dia])).strftime("%Y-%m-%d") \
+                    if dia in orden_dias else None
+                dias.append({
+                    'dia': dia or 'Sin día',
+                    'fecha': fecha,
+                    'clientes': sorted(responsable['dias'][dia], key=self._orden_ruta),
+                })
+            responsable['dias'] = dias
+            agenda.append(responsable)
+        agenda.sort(key=lambda r: _clave_orden(r['responsable_nombre']))
+        return agenda
+    
+    def planes_agenda(self) -> Dict[str, List[str]]:
+        """Plan de ejecución (``EXPLAIN QUERY PLAN``) de las consultas de agenda."""
+        conn = self.get_connection()
+        return {
+            nombre: [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            for nombre, sql, params in (
+                ('agenda', self.SQL_AGENDA, ('2000-01-03', 1, 'lunes')),
+                ('agenda_semana', self.SQL_AGENDA_SEMANA, ('2000-01-03',)),
+            )
+        }
+    
+    # Rangos de fechas sobre las claves enteras del calendario. Las plantillas
+    # sirven tanto para la base como para los archivos históricos adjuntos.
+    SQL_ASIGNACIONES = """
+        SELECT {columnas}, c.nombre as cliente_nombre, c.direccion, c.comuna, c.celular,
+               r.nombre as responsable_nombre
+        FROM {origen} a
+        LEFT JOIN main.clientes c ON a.cliente_id = c.id
+        LEFT JOIN main.responsables r ON a.responsable_id = r.id
+        WHERE {condicion}
+    """
+    SQL_VISITAS = """
+        SELECT {columnas}, c.nombre as cliente_nombre, r.nombre as responsable_nombre
+        FROM {origen} v
+        LEFT JOIN main.clientes c ON v.cliente_id = c.id
+        LEFT JOIN main.responsables r ON v.responsable_id = r.id
+        WHERE {condicion}
+    """
+    
+    def asignaciones_rango(self, desde: str, hasta: str, responsable_id: int = None,
+                           compactas: bool = False, historico: bool = True) -> List[Dict]:
+        """Asignaciones de todas las semanas que tocan el rango ``desde``-``hasta``.
+        
+        Las fechas pueden ser cualquier día: se toman las semanas ISO que los
+        contienen. El resultado viene ordenado por semana y responsable. Con
+        ``historico`` incluye las semanas ya movidas a archivos históricos.
+        """
+        self._asegurar_calendario(desde, hasta)
+        inicio, fin = calendario.clave_semana(desde), calendario.clave_semana(hasta)
+        condicion, params = self._condicion_rango('a.semana_clave', inicio, fin,
+                                                  responsable_id=responsable_id)
+        archivos = self._archivos_en_rango('semana', inicio, fin) if historico else []
+        return self._consultar_historico(
+            self.SQL_ASIGNACIONES, 'asignaciones_semanales', 'a', condicion, params,
+            " ORDER BY semana_clave, responsable_id", archivos, Asignacion, compactas)
+    
+    def visitas_rango(self, desde: str, hasta: str, responsable_id: int = None,
+                      cliente_id: int = None, compactas: bool = False,
+                      historico: bool = True) -> List[Dict]:
+        """Visitas con fecha entre ``desde`` y ``hasta`` (inclusive), por fecha.
         
+        Compara la clave entera del día, así que también incluye las visitas
+        guardadas con hora ('2026-01-12T03:00:00.000Z'). Con ``historico``
+        incluye las visitas ya movidas a archivos históricos.
+        """
+        self._asegurar_calendario(desde, hasta)
+        inicio, fin = calendario.clave_dia(desde), calendario.clave_dia(hasta)
+        condicion, params = self._condicion_rango('v.dia_clave', inicio, fin,
+                                                  responsable_id=responsable_id,
+                                                  cliente_id=cliente_id)
+        archivos = self._archivos_en_rango('dia', inicio, fin) if historico else []
+        return self._consultar_historico(
+            self.SQL_VISITAS, 'visitas', 'v', condicion, params,
+            " ORDER BY dia_clave, id", archivos, Visita, compactas)
+    
+    @staticmethod
+    def _condicion_rango(columna: str, desde: int, hasta: int, **filtros) -> Tuple[str, List]:
+        """Condición BETWEEN sobre una clave más los filtros por igualdad que no sean None."""
+        if hasta < desde:
+            raise ValueError("La fecha 'hasta' debe ser posterior a 'desde'")
+        alias = columna.split('.')[0]
+        condicion, params = f"{columna} BETWEEN ? AND ?", [desde, hasta]
+        for nombre, valor in filtros.items():
+            if valor is not None:
+                condicion += f" AND {alias}.{nombre} = ?"
+                params.append(valor)
+        return condicion, params
+    
+    def _asegurar_calendario(self, desde: str, hasta: str):
+        """Extiende la tabla calendario si el rango sale de los años que tiene.
+        
+        Las instancias de solo lectura no escriben: dependen de que la
+        instancia principal ya haya extendido la tabla.
+        """
+        inicio, fin = calendario.limitar_anios(desde, hasta)
+        anios = self._anios_calendario
+        if self.solo_lectura or (anios and anios[0] <= inicio and fin <= anios[1]):
+            return
+        with self.transaction() as conn:
+            anios = calendario.asegurar(conn, desde, hasta)
+        self._anios_calendario = anios
+    
+    def dias_calendario(self, desde: str, hasta: str, solo_habiles: bool = False) -> List[Dict]:
+        """Días de la tabla calendario entre dos fechas, con su semana ISO y feriados.
+        
+        Si el rango sale de los años precalculados, los agrega primero.
+        """
+        self._asegurar_calendario(desde, hasta)
+        filtro = " AND habil = 1" if solo_habiles else ""
+        cursor = self.get_connection().execute(
+            f"SELECT * FROM calendario WHERE dia BETWEEN ? AND ?{filtro} ORDER BY dia",
+            (calendario.clave_dia(desde), calendario.clave_dia(hasta)))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def planes_rango(self) -> Dict[str, List[str]]:
+        """Plan de ejecución de las consultas de rango, con y sin filtro por responsable."""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT a.*, c.nombre as cliente_nombre, c.direccion, c.comuna, c.celular,
-                   r.nombre as responsable_nombre
+        planes = {}
+        for nombre, plantilla, columna, orden in (
+                ('asignaciones_rango', self.SQL_ASIGNACIONES, 'a.semana_clave',
+                 " ORDER BY semana_clave, responsable_id"),
+                ('visitas_rango', self.SQL_VISITAS, 'v.dia_clave', " ORDER BY dia_clave, id")):
+            alias = columna[0]
+            for sufijo, filtros in (('', {}), ('_responsable', {'responsable_id': 1})):
+                condicion, params = self._condicion_rango(columna, 20000101, 20991231, **filtros)
+                sql = plantilla.format(columnas=f"{alias}.*", origen=self._tabla_de(alias),
+                                       condicion=condicion) + orden
+                planes[nombre + sufijo] = [
+                    row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        return planes
+    
+    @staticmethod
+    def _tabla_de(alias: str) -> str:
+        return {'a': 'asignaciones_semanales', 'v': 'visitas'}[alias]
+    
+    # Archivos históricos (ver archivo.py)
+    def ruta_archivo(self, archivo: str) -> str:
+        """Ruta absoluta de un archivo histórico registrado (relativo a la base)."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), archivo)
+    
+    def archivos_historicos(self) -> List[Dict]:
+        """Archivos históricos registrados, del año más reciente al más antiguo."""
+        def cargar():
+            cursor = self.get_connection().execute(
+                "SELECT * FROM archivos_historicos ORDER BY anio DESC")
+            return [dict(row) for row in cursor.fetchall()]
+        return self._cacheado(('archivos_historicos',), cargar)
+    
+    def _archivos_en_rango(self, clave: str, desde: int, hasta: int) -> List[Dict]:
+        """Archivos con filas cuya clave (``'dia'`` o ``'semana'``) cae en el rango."""
+        return [a for a in self.archivos_historicos()
+                if a[f'{clave}_desde'] is not None
+                and a[f'{clave}_desde'] <= hasta and a[f'{clave}_hasta'] >= desde]
+    
+    def _adjuntar_archivos(self, conn: sqlite3.Connection, archivos: List[Dict]) -> List[str]:
+        """Adjunta a la conexión del hilo los archivos que falten y retorna sus esquemas.
+        
+        Quedan adjuntos para las consultas siguientes. SQLite admite pocas
+        bases adjuntas (10 por defecto): si se llega al límite, se sueltan
+        las adjuntadas antes y se vuelve a intentar.
+        """
+        adjuntos = {row[1] for row in conn.execute("PRAGMA database_list")}
+        esquemas = []
+        for archivo in archivos:
+            esquema = f"historico_{archivo['anio']}"
+            if esquema not in adjuntos:
+                ruta = self.ruta_archivo(archivo['archivo'])
+                if not os.path.exists(ruta):
+                    raise FileNotFoundError(f"Falta el archivo histórico {ruta}")
+                if self.solo_lectura:
+                    ruta = 'file:' + pathname2url(os.path.abspath(ruta)) + '?mode=ro'
+                try:
+                    conn.execute(f"ATTACH DATABASE ? AS {esquema}", (ruta,))
+                except sqlite3.OperationalError as e:
+                    if 'too many attached' not in str(e):
+                        raise
+                    for otro in adjuntos - {esquema}:
+                        if otro.startswith('historico_') and otro not in esquemas:
+                            conn.execute(f"DETACH DATABASE {otro}")
+                    conn.execute(f"ATTACH DATABASE ? AS {esquema}", (ruta,))
+                adjuntos = {row[1] for row in conn.execute("PRAGMA database_list")}
+            esquemas.append(esquema)
+        return esquemas
+    
+    def _consultar_historico(self, plantilla: str, tabla: str, alias: str, condicion: str,
+                             params: List, cola: str, archivos: List[Dict], modelo,
+                             compactas: bool, params_cola: Tuple = ()) -> List:
+        """Ejecuta la plantilla sobre la base y, si hay ``archivos``, une sus filas.
+        
+        Dentro de una transacción no se puede adjuntar, así que entonces solo
+        se consulta la base. Si un archivado quedó a medias, una fila puede
+        estar en la base y en su archivo; se retorna una sola vez.
+        """
+        conn = self.get_connection()
+        if archivos and self.pool.in_transaction():
+            archivos = []
+        if not archivos:
+            sql = plantilla.format(columnas=f"{alias}.*", origen=tabla, condicion=condicion) + cola
+            params = list(params) + list(params_cola)
+            if compactas:
+                return list(self._filas(modelo, sql, params))
+            return [dict(row) for row in conn.execute(sql, params)]
+        
+        columnas = [row[1] for row in conn.execute(f"PRAGMA main.table_xinfo({tabla})")]
+        partes = [plantilla.format(columnas=", ".join(f"{alias}.{c} AS {c}" for c in columnas),
+                                   origen=f"main.{tabla}", condicion=condicion)]
+        for esquema in self._adjuntar_archivos(conn, archivos):
+            propias = {row[1] for row in conn.execute(f"PRAGMA {esquema}.table_xinfo({tabla})")}
+            lista = ", ".join(f"{alias}.{c} AS {c}" if c in propias else f"NULL AS {c}" for c in columnas)
+            partes.append(plantilla.format(columnas=lista, origen=f"{esquema}.{tabla}",
+                                           condicion=condicion))
+        sql = " UNION ALL ".join(partes) + cola
+        params = list(params) * len(partes) + list(params_cola)
+        filas_unidas = (self._filas(modelo, sql, params) if compactas
+                        else (dict(row) for row in conn.execute(sql, params)))
+        vistos, resultado = set(), []
+        for fila in filas_unidas:
+            if fila['id'] not in vistos:
+                vistos.add(fila['id'])
+                resultado.append(fila)
+        return resultado
+    
+    def obtener_progreso_por_responsable(self, semana_inicio: str) -> List[Dict]:
+        """Avance de la semana por responsable: totales, realizadas y desglose por día."""
+        cursor = self.get_connection().execute("""
+            SELECT COALESCE(a.responsable_id, 0) AS responsable_id,
+                   COALESCE(r.nombre, 'Sin asignar') AS responsable_nombre,
+                   COALESCE(a.dia_atencion, 'Sin día') AS dia,
+                   COUNT(*) AS total,
+                   SUM(a.realizada = 1) AS realizadas
             FROM asignaciones_semanales a
-            LEFT JOIN clientes c ON a.cliente_id = c.id
             LEFT JOIN responsables r ON a.responsable_id = r.id
             WHERE a.semana_inicio = ?
-            ORDER BY a.dia_atencion, c.nombre
+            GROUP BY 1, 2, 3
         """, (semana_inicio,))
-        asignaciones = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return asignaciones
+        progreso = {}
+        for row in cursor.fetchall():
+            resp = progreso.setdefault(row['responsable_id'], {
+                'responsable_id': row['responsable_id'],
+                'responsable_nombre': row['responsable_nombre'],
+                'total': 0, 'realizadas': 0, 'pendientes': 0, 'por_dia': {},
+            })
+            resp['total'] += row['total']
+            resp['realizadas'] += row['realizadas']
+            resp['pendientes'] += row['total'] - row['realizadas']
+            resp['por_dia'][row['dia']] = {'total': row['total'], 'realizadas': row['realizadas']}
+        return sorted(progreso.values(), key=lambda r: r['responsable_nombre'])
+    
+    def obtener_estadisticas(self, responsable_id: int = None) -> Dict:
+        """Totales del panel principal (clientes, responsables y asignaciones de la semana)."""
+        conn = self.get_connection()
+        semana_actual = self.obtener_semana_actual()
+        filtro, params = "", []
+        if responsable_id:
+            filtro, params = " AND responsable_id = ?", [responsable_id]
+        total_clientes = conn.execute(
+            f"SELECT COUNT(*) FROM clientes WHERE activo = 1{filtro}", params
+        ).fetchone()[0]
+        total_responsables = conn.execute(
+            "SELECT COUNT(*) FROM responsables WHERE activo = 1"
+        ).fetchone()[0]
+        asignaciones = conn.execute(
+            f"SELECT COUNT(*) FROM asignaciones_semanales WHERE semana_inicio = ?{filtro}",
+            [semana_actual] + params
+        ).fetchone()[0]
+        return {
+            'totalClientes': total_clientes,
+            'totalResponsables': total_responsables,
+            'asignacionesSemanaActual': asignaciones,
+            'semanaActual': semana_actual,
+        }
     
     # Métodos para visitas
     def registrar_visita(self, cliente_id: int, fecha_visita: str,
                         responsable_id: int = None, precio: float = None,
                         realizada: bool = True) -> int:
         """Registra una visita realizada."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         if precio is None:
             cliente = self.obtener_cliente_por_id(cliente_id)
             precio = cliente['precio_por_visita'] if cliente else 0
         
-        cursor.execute("""
-            INSERT INTO visitas
-            (cliente_id, fecha_visita, responsable_id, precio, realizada)
-            VALUES (?, ?, ?, ?, ?)
-        """, (cliente_id, fecha_visita, responsable_id, precio, 1 if realizada else 0))
-        conn.commit()
-        visita_id = cursor.lastrowid
-        conn.close()
-        return visita_id
+        with self.transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO visitas
+                (cliente_id, fecha_visita, responsable_id, precio, realizada)
+                VALUES (?, ?, ?, ?, ?)
+            """, (cliente_id, fecha_visita, responsable_id, precio, 1 if realizada else 0))
+        return cursor.lastrowid
+    
+    def registrar_visitas_lote(self, visitas: List[Dict]) -> Dict:
+        """Registra muchas visitas en una sola transacción.
+        
+        Cada visita es un diccionario con ``cliente_id`` y ``fecha_visita`` y,
+        opcionalmente, ``responsable_id``, ``precio`` y ``realizada`` (por
+        defecto True). Los precios que falten se toman del cliente con un solo
+        JOIN. Cada visita realizada marca como realizada una asignación
+        pendiente del cliente en su semana (la del día de la visita, si no una
+        sin día o la única de la semana) y la enlaza por ``visita_id``.
+        
+        Retorna un diccionario con ``visita_ids`` (en el mismo orden de
+        entrada) y ``asignaciones_marcadas``.
+        """
+        filas = []
+        for v in visitas:
+            fecha = datetime.strptime(v['fecha_visita'], "%Y-%m-%d")
+            lunes = fecha - timedelta(days=fecha.weekday())
+            filas.append((
+                int(v['cliente_id']), v['fecha_visita'], lunes.strftime("%Y-%m-%d"),
+                v.get('responsable_id'), v.get('precio'),
+                0 if v.get('realizada') is False else 1,
+                normalizar_texto(DIAS_SEMANA[fecha.weekday()])
+            ))
+        if not filas:
+            return {'visita_ids': [], 'asignaciones_marcadas': 0}
+        
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS _visitas_lote (
+                    orden INTEGER PRIMARY KEY,
+                    cliente_id INTEGER, fecha_visita TEXT, semana_inicio TEXT,
+                    responsable_id INTEGER, precio REAL, realizada INTEGER
+                )
+            """)
+            conn.execute("DELETE FROM _visitas_lote")
+            conn.executemany("""
+                INSERT INTO _visitas_lote
+                (cliente_id, fecha_visita, semana_inicio, responsable_id, precio, realizada)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [fila[:6] for fila in filas])
+            
+            cursor = conn.execute("""
+                INSERT INTO visitas
+                (cliente_id, fecha_visita, responsable_id, precio, realizada)
+                SELECT t.cliente_id, t.fecha_visita, t.responsable_id,
+                       COALESCE(t.precio, c.precio_por_visita, 0), t.realizada
+                FROM _visitas_lote t
+                LEFT JOIN clientes c ON c.id = t.cliente_id
+                ORDER BY t.orden
+            """)
+            # Un INSERT ... SELECT dentro de la transacción asigna IDs consecutivos
+            ultimo_id = cursor.lastrowid
+            primer_id = ultimo_id - len(filas) + 1
+            
+            # Cada visita realizada cierra a lo más una asignación pendiente:
+            # la de su día, una sin día, o la única del cliente en la semana
+            cursor = conn.executemany(f"""
+                UPDATE asignaciones_semanales SET realizada = 1, visita_id = ?
+                WHERE id = (
+                    SELECT a.id FROM asignaciones_semanales a
+                    WHERE a.semana_inicio = ? AND a.cliente_id = ?
+                      AND a.visita_id IS NULL AND a.realizada IS NOT 1
+                      AND ({_SQL_DIA.format(columna='a.dia_atencion')} = ?
+                           OR a.dia_atencion IS NULL
+                           OR (SELECT COUNT(*) FROM asignaciones_semanales b
+                               WHERE b.semana_inicio = a.semana_inicio
+                                 AND b.cliente_id = a.cliente_id) = 1)
+                    ORDER BY {_SQL_DIA.format(columna='a.dia_atencion')} = ? DESC,
+                             a.dia_atencion IS NULL DESC, a.id
+                    LIMIT 1
+                )
+            """, [
+                (primer_id + i, semana, cliente_id, dia, dia)
+                for i, (cliente_id, _, semana, _, _, realizada, dia) in enumerate(filas)
+                if realizada
+            ])
+            marcadas = cursor.rowcount
+            conn.execute("DELETE FROM _visitas_lote")
+        
+        return {'visita_ids': list(range(primer_id, ultimo_id + 1)),
+                'asignaciones_marcadas': marcadas}
     
     def obtener_visitas_cliente(self, cliente_id: int, 
-                               limit: int = 10) -> List[Dict]:
-        """Obtiene el historial de visitas de un cliente."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+                               limit: int = 10, compactas: bool = False,
+                               historico: bool = True) -> List[Dict]:
+        """Obtiene el historial de visitas de un cliente.
+        
+        Con ``compactas=True`` retorna filas ``Visita`` en vez de diccionarios.
+        Si la base no alcanza a llenar ``limit`` y hay archivos históricos
+        (y ``historico`` no es False), completa con las visitas archivadas.
+        """
+        visitas = self._consultar_historico(
+            self.SQL_VISITAS, 'visitas', 'v', "v.cliente_id = ?", [cliente_id],
+            " ORDER BY fecha_visita DESC LIMIT ?", [], Visita, compactas, (limit,))
+        if historico and len(visitas) < limit:
+            archivos = self.archivos_historicos()
+            if archivos:
+                visitas = self._consultar_historico(
+                    self.SQL_VISITAS, 'visitas', 'v', "v.cliente_id = ?", [cliente_id],
+                    " ORDER BY fecha_visita DESC LIMIT ?", archivos, Visita, compactas,
+                    (limit,))
+        return visitas
+    
+    def recorrer_visitas(self, cliente_id: int = None, desde: str = None,
+                         hasta: str = None) -> Iterator[Visita]:
+        """Recorre visitas como filas ``Visita``, ordenadas por fecha e ID.
+        
+        Filtra opcionalmente por cliente y por rango de fechas (inclusive),
+        sin cargar el resultado completo en memoria.
+        """
+        condiciones, params = [], []
+        if cliente_id is not None:
+            condiciones.append("v.cliente_id = ?")
+            params.append(cliente_id)
+        if desde:
+            condiciones.append("v.fecha_visita >= ?")
+            params.append(desde)
+        if hasta:
+            condiciones.append("v.fecha_visita <= ?")
+            params.append(hasta)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        return self._filas(Visita, f"""
             SELECT v.*, c.nombre as cliente_nombre, r.nombre as responsable_nombre
             FROM visitas v
             LEFT JOIN clientes c ON v.cliente_id = c.id
             LEFT JOIN responsables r ON v.responsable_id = r.id
-            WHERE v.cliente_id = ?
-            ORDER BY v.fecha_visita DESC
-            LIMIT ?
-        """, (cliente_id, limit))
-        visitas = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return visitas
+            {where}
+            ORDER BY v.fecha_visita, v.id
+        """, params)
 
@@ -0,0 +1,202 @@
+"""
+Fachada asíncrona sobre ``Database``.
+
+``AsyncDatabase`` expone como corrutinas los métodos públicos de
+``Database``, y como iteradores asíncronos los que recorren filas sin
+cargarlas todas. Las lecturas se reparten entre un pool de hilos, cada uno
+con su propia conexión de solo lectura, y pueden ejecutarse en paralelo. Las
+escrituras pasan por el único hilo de ``EscritorAgrupado``, de modo que
+quedan serializadas y las que llegan juntas se confirman en un solo COMMIT.
+Con la base en modo WAL, una importación larga en el escritor no bloquea a
+los lectores, que siguen viendo el último estado confirmado.
+
+Uso:
+    adb = AsyncDatabase("piscinas.db")
+    clientes, panel = await asyncio.gather(adb.obtener_clientes(), adb.panel())
+    visita_id = await adb.registrar_visita(cliente_id=1, fecha_visita="2025-01-06")
+    async for cliente in adb.iter_clientes():
+        ...
+    adb.close()
+"""
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from cola_escritura import EscritorAgrupado
+from database import Database
+
+# Métodos de ``Database`` que solo consultan
+LECTURAS = frozenset({
+    'obtener_responsables',
+    'obtener_clientes',
+    'pagina_clientes',
+    'buscar_clientes',
+    'obtener_cliente_por_id',
+    'obtener_asignaciones_semana',
+    'agenda',
+    'agenda_semana',
+    'asignaciones_rango',
+    'visitas_rango',
+    'dias_calendario',
+    'obtener_progreso_por_responsable',
+    'obtener_estadisticas',
+    'obtener_visitas_cliente',
+    'archivos_historicos',
+    'planes_agenda',
+    'planes_rango',
+    'validar_cache',
+})
+
+# Métodos de ``Database`` que retornan un iterador: se exponen como
+# iteradores asíncronos que leen de a ``LOTE_ITERADOR`` filas
+ITERADORES = frozenset({
+    'iter_clientes',
+    'recorrer_clientes',
+    'recorrer_asignaciones',
+    'recorrer_visitas',
+})
+LOTE_ITERADOR = 256
+
+# Métodos de ``Database`` que modifican datos
+ESCRITURAS = frozenset({
+    'agregar_responsable',
+    'obtener_o_crear_responsables',
+    'agregar_cliente',
+    'agregar_clientes_lote',
+    'sincronizar_clientes',
+    'actualizar_cliente',
+    'crear_asignacion_semanal',
+    'asignar_clientes_semana',
+    'asignar_clientes_semanas',
+    'registrar_visita',
+    'registrar_visitas_lote',
+})
+
+# Métodos públicos de ``Database`` que no se exponen: manejan la conexión,
+# la transacción o la configuración de la instancia, o no tocan la base
+NO_EXPUESTOS = frozenset({
+    'close',
+    'get_connection',
+    'init_database',
+    'transaction',
+    'activar_instrumentacion',
+    'desactivar_instrumentacion',
+    'obtener_semana_actual',
+    'ruta_archivo',
+})
+
+
+class AsyncDatabase:
+    """Versión awaitable de ``Database`` con lecturas concurrentes.
+    
+    Cada método de ``LECTURAS`` y ``ESCRITURAS`` está disponible con el mismo
+    nombre y argumentos, pero retorna una corrutina; los de ``ITERADORES``
+    retornan un iterador asíncrono (``async for``). Ambas instancias internas
+    comparten la caché de consultas: lo que invalida el escritor deja de
+    servirse también a los lectores.
+    """
+    
+    def __init__(self, db_path: str = "piscinas.db", lectores: int = 4,
+                 cache_size: int = 256):
+        # El escritor se crea primero: es quien aplica las migraciones
+        self.escritor = Database(db_path, cache_size=cache_size)
+        self.lector = Database(db_path, solo_lectura=True, cache=self.escritor.cache)
+        self.cache = self.escritor.cache
+        self._lecturas = ThreadPoolExecutor(max_workers=lectores,
+                                            thread_name_prefix='sqlite-lectura')
+        # Un cursor abierto solo puede avanzar en el hilo de su conexión, así
+        # que todos los iteradores avanzan en un mismo hilo
+        self._iteraciones = ThreadPoolExecutor(max_workers=1,
+                                               thread_name_prefix='sqlite-iteracion')
+        self.escritura = EscritorAgrupado(self.escritor)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def __getattr__(self, nombre: str):
+        if nombre in LECTURAS:
+            return self._awaitable(self._lecturas, getattr(self.lector, nombre))
+        if nombre in ESCRITURAS:
+            return self._encolada(nombre)
+        if nombre in ITERADORES:
+            return self._iterador(getattr(self.lector, nombre))
+        raise AttributeError(f"'{type(self).__name__}' no tiene el atributo '{nombre}'")
+    
+    @staticmethod
+    def _awaitable(executor: ThreadPoolExecutor, metodo):
+        @functools.wraps(metodo)
+        async def llamar(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor, functools.partial(metodo, *args, **kwargs))
+        return llamar
+    
+    def _iterador(self, metodo):
+        @functools.wraps(metodo)
+        async def recorrer(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            iterador = await loop.run_in_executor(
+                self._iteraciones, lambda: iter(metodo(*args, **kwargs)))
+            try:
+                while True:
+                    filas = await loop.run_in_executor(
+                        self._iteraciones, lambda: list(itertools.islice(iterador, LOTE_ITERADOR)))
+                    for fila in filas:
+                        yield fila
+                    if len(filas) < LOTE_ITERADOR:
+                        return
+            finally:
+                # Si se deja de recorrer antes del final, se libera el cursor
+                cerrar = getattr(iterador, 'close', None)
+                if cerrar is not None:
+                    await loop.run_in_executor(self._iteraciones, cerrar)
+        return recorrer
+    
+    def _encolada(self, nombre: str):
+        @functools.wraps(getattr(self.escritor, nombre))
+        async def escribir(*args, **kwargs):
+            return await asyncio.wrap_future(self.escritura.enviar(nombre, *args, **kwargs))
+        return escribir
+    
+    def obtener_semana_actual(self) -> str:
+        """Lunes de la semana actual (no toca la base, no requiere await)."""
+        return self.escritor.obtener_semana_actual()
+    
+    async def transaccion(self, funcion, *args, **kwargs):
+        """Ejecuta ``funcion(db, ...)`` en el hilo escritor dentro de una transacción.
+        
+        Permite agrupar varias escrituras de forma atómica sin que otra
+        escritura se intercale: si ``funcion`` falla, se deshace completa.
+        """
+        futuro = self.escritura.ejecutar(lambda db: funcion(db, *args, **kwargs))
+        return await asyncio.wrap_future(futuro)
+    
+    async def panel(self, semana_inicio: str = None) -> Dict:
+        """Reúne en paralelo los datos de la vista principal de una semana."""
+        semana = semana_inicio or self.obtener_semana_actual()
+        clientes, responsables, asignaciones, progreso = await asyncio.gather(
+            self.obtener_clientes(),
+            self.obtener_responsables(),
+            self.obtener_asignaciones_semana(semana),
+            self.obtener_progreso_por_responsable(semana),
+        )
+        return {
+            'semana': semana,
+            'clientes': clientes,
+            'responsables': responsables,
+            'asignaciones': asignaciones,
+            'progreso': progreso,
+        }
+    
+    def close(self):
+        """Espera las escrituras pendientes y cierra todas las conexiones."""
+        self.escritura.cerrar()
+        self._lecturas.shutdown(wait=True)
+        self._iteraciones.shutdown(wait=True)
+        self.escritor.close()
+        self.lector.close()
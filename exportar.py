@@ -0,0 +1,266 @@
+"""
+Exportación de clientes y hojas de ruta semanales a Excel y CSV.
+
+Las filas pasan directo del cursor al archivo: los libros se escriben con el
+modo write-only de openpyxl (cada fila se vuelca al disco al agregarla) y
+los CSV con ``csv.writer``, así que la memoria no crece con la cantidad de
+clientes. Solo la tabla de textos compartidos del ``.xlsx`` crece, con los
+textos distintos.
+
+Las columnas siguen el Excel maestro de ``importar_excel.COLUMNAS`` y la
+primera hoja empieza con esos encabezados, de modo que el libro de clientes
+se puede volver a importar con ``importar_excel.py``. Después van columnas
+adicionales (id, activo, datos de facturación) que el importador ignora.
+
+Las hojas de ruta se generan por responsable: un libro con una hoja por día
+(o un CSV con la columna del día), con los clientes en orden de ruta. Cada
+responsable se escribe en un proceso aparte que abre la base en solo
+lectura, así que los libros de todos los técnicos se generan en paralelo.
+
+Uso:
+    python exportar.py clientes [--db piscinas.db] [--salida clientes.xlsx] [--solo-activos]
+    python exportar.py rutas [--db piscinas.db] [--semana 2026-01-05] [--dir rutas] [--formato xlsx|csv] [--procesos N]
+"""
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from openpyxl import Workbook
+
+from database import Database, DIAS_SEMANA, normalizar_texto
+from importar_excel import COLUMNAS
+
+ENCABEZADOS = list(COLUMNAS)
+
+# Campo de la fila exportada para cada encabezado del Excel maestro
+_CAMPOS = [('responsable_nombre' if campo == 'responsable' else campo) for campo in COLUMNAS.values()]
+
+# Columnas de clientes que se agregan después del formato maestro, si existen
+COLUMNAS_ADICIONALES = [
+    'id', 'activo', 'rut', 'email', 'documento_tipo', 'notas',
+    'factura_razon_social', 'factura_rut', 'factura_giro', 'factura_direccion',
+    'factura_comuna', 'factura_email', 'odoo_partner_id',
+]
+
+ENCABEZADOS_RUTA = ['Orden'] + ENCABEZADOS + ['Fecha', 'Realizada', 'Observaciones']
+ANCHOS_RUTA = [7, 32, 36, 16, 14, 18, 16, 10, 11, 10, 30]
+
+SQL_RUTA = """
+    SELECT c.nombre AS cliente_nombre, c.direccion, c.comuna, c.celular,
+           r.nombre AS responsable_nombre, a.dia_atencion, a.precio, a.realizada
+    FROM asignaciones_semanales a
+    LEFT JOIN clientes c ON a.cliente_id = c.id
+    LEFT JOIN responsables r ON a.responsable_id = r.id
+    WHERE a.semana_inicio = ? AND a.responsable_id IS ?
+"""
+
+Hoja = Tuple[str, Sequence[str], Iterable[Sequence]]
+
+
+def _escribir_xlsx(ruta: str, hojas: Iterable[Hoja], anchos: Sequence[float] = ()) -> int:
+    """Escribe un libro write-only con las hojas dadas; retorna las filas escritas."""
+    wb = Workbook(write_only=True)
+    filas = 0
+    for titulo, encabezados, datos in hojas:
+        ws = wb.create_sheet(titulo[:31])
+        for i, ancho in enumerate(anchos):
+            ws.column_dimensions[chr(ord('A') + i)].width = ancho
+        ws.freeze_panes = 'A2'
+        ws.print_title_rows = '1:1'
+        ws.append(list(encabezados))
+        for fila in datos:
+            ws.append(list(fila))
+            filas += 1
+    if not wb.worksheets:
+        wb.create_sheet('Vacío')
+    temporal = ruta + '.tmp'
+    wb.save(temporal)
+    os.replace(temporal, ruta)
+    return filas
+
+
+def _escribir_csv(ruta: str, encabezados: Sequence[str], datos: Iterable[Sequence],
+                  delimitador: str = ',') -> int:
+    """Escribe un CSV en UTF-8 con BOM (Excel lo abre con tildes); retorna las filas."""
+    filas = 0
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', newline='', encoding='utf-8-sig') as f:
+        escritor = csv.writer(f, delimiter=delimitador)
+        escritor.writerow(encabezados)
+        for fila in datos:
+            escritor.writerow(fila)
+            filas += 1
+    os.replace(temporal, ruta)
+    return filas
+
+
+def _formato(ruta: str, formato: Optional[str]) -> str:
+    formato = (formato or os.path.splitext(ruta)[1].lstrip('.') or 'xlsx').lower()
+    if formato not in ('xlsx', 'csv'):
+        raise ValueError(f"Formato no soportado: {formato}")
+    return formato
+
+
+def exportar_clientes(db: Database, salida: str, activos_only: bool = False,
+                      formato: str = None, delimitador: str = ',') -> Dict:
+    """Exporta los clientes (por nombre) a ``salida`` en formato ``xlsx`` o ``csv``.
+    
+    Por defecto incluye activos e inactivos, como el export del servidor
+    Node. El formato se deduce de la extensión si no se indica.
+    """
+    formato = _formato(salida, formato)
+    inicio = time.perf_counter()
+    clientes = db.recorrer_clientes(activos_only=activos_only)
+    primero = next(clientes, None)
+    adicionales = [c for c in COLUMNAS_ADICIONALES if primero is not None and c in primero]
+    campos = _CAMPOS + adicionales
+    
+    def filas() -> Iterator[Tuple]:
+        if primero is None:
+            return
+        yield tuple(primero.get(c) for c in campos)
+        for cliente in clientes:
+            yield tuple(cliente.get(c) for c in campos)
+    
+    encabezados = ENCABEZADOS + adicionales
+    if formato == 'csv':
+        total = _escribir_csv(salida, encabezados, filas(), delimitador)
+    else:
+        total = _escribir_xlsx(salida, [('Clientes', encabezados, filas())])
+    return {'archivo': salida, 'filas': total, 'segundos': time.perf_counter() - inicio}
+
+
+# Hojas de ruta
+_DIAS = {normalizar_texto(dia): i for i, dia in enumerate(DIAS_SEMANA)}
+
+
+def _dias_ruta(db: Database, semana: str, responsable_id: Optional[int]) -> Iterator[Tuple[str, List[Tuple]]]:
+    """Días con clientes de un responsable, cada uno con sus filas en orden de ruta.
+    
+    La semana del responsable se lee en una sola consulta (lo que cabe en
+    sus hojas impresas). Los días se reconocen sin tildes ni mayúsculas
+    ('miercoles' es 'Miércoles'); los que no se reconocen van a 'Sin día'.
+    """
+    lunes = datetime.strptime(semana, "%Y-%m-%d")
+    dias: Dict[Optional[int], List[Dict]] = {}
+    for row in db.get_connection().execute(SQL_RUTA, (semana, responsable_id)):
+        cliente = dict(row)
+        dias.setdefault(_DIAS.get(normalizar_texto(cliente['dia_atencion'])), []).append(cliente)
+    for i in sorted(dias, key=lambda i: len(DIAS_SEMANA) if i is None else i):
+        clientes = sorted(dias.pop(i), key=db._orden_ruta)
+        fecha = (lunes + timedelta(days=i)).strftime("%Y-%m-%d") if i is not None else None
+        yield DIAS_SEMANA[i] if i is not None else 'Sin día', [
+            (orden, c['cliente_nombre'], c['direccion'], c['comuna'], c['celular'],
+             c['responsable_nombre'], c['dia_atencion'], c['precio'], fecha,
+             'Sí' if c['realizada'] else '', None)
+            for orden, c in enumerate(clientes, 1)
+        ]
+
+
+def _nombre_archivo(nombre: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', normalizar_texto(nombre)).strip('_') or 'sin_nombre'
+
+
+def exportar_ruta(db_path: str, semana: str, responsable_id: Optional[int], nombre: str,
+                  directorio: str, formato: str = 'xlsx', delimitador: str = ',') -> Dict:
+    """Hoja de ruta de un responsable para una semana.
+    
+    Abre su propia conexión de solo lectura, así que se puede llamar desde
+    otro proceso.
+    """
+    inicio = time.perf_counter()
+    ruta = os.path.join(directorio, f"ruta_{semana}_{_nombre_archivo(nombre)}.{formato}")
+    db = Database(db_path, solo_lectura=True)
+    try:
+        dias = _dias_ruta(db, semana, responsable_id)
+        if formato == 'csv':
+            filas = _escribir_csv(ruta, ENCABEZADOS_RUTA,
+                                  (fila for _, filas_dia in dias for fila in filas_dia), delimitador)
+        else:
+            filas = _escribir_xlsx(ruta, ((titulo, ENCABEZADOS_RUTA, filas_dia)
+                                          for titulo, filas_dia in dias), ANCHOS_RUTA)
+    finally:
+        db.close()
+    return {'responsable_id': responsable_id, 'responsable': nombre, 'archivo': ruta,
+            'filas': filas, 'segundos': time.perf_counter() - inicio}
+
+
+def exportar_rutas(db_path: str, semana: str = None, directorio: str = 'rutas',
+                   formato: str = 'xlsx', procesos: int = None, delimitador: str = ',') -> List[Dict]:
+    """Hojas de ruta de todos los responsables con asignaciones en la semana.
+    
+    Con ``procesos`` mayor que 1 (por defecto, uno por CPU) cada responsable
+    se exporta en un proceso aparte. Retorna un resumen por archivo, en el
+    orden de los nombres.
+    """
+    formato = _formato('', formato)
+    db = Database(db_path)
+    semana = semana or db.obtener_semana_actual()
+    responsables = [
+        (row[0], row[1] or 'Sin responsable') for row in db.get_connection().execute("""
+            SELECT a.responsable_id, r.nombre
+            FROM (SELECT DISTINCT responsable_id FROM asignaciones_semanales
+                  WHERE semana_inicio = ?) a
+            LEFT JOIN responsables r ON a.responsable_id = r.id
+            ORDER BY r.nombre
+        """, (semana,))
+    ]
+    db.close()
+    os.makedirs(directorio, exist_ok=True)
+    
+    argumentos = [(db_path, semana, responsable_id, nombre, directorio, formato, delimitador)
+                  for responsable_id, nombre in responsables]
+    procesos = min(procesos or os.cpu_count() or 1, len(argumentos))
+    if procesos <= 1:
+        return [exportar_ruta(*a) for a in argumentos]
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        return list(ejecutor.map(exportar_ruta, *zip(*argumentos)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta clientes y hojas de ruta a Excel o CSV")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_cli = sub.add_parser('clientes', help="Lista de clientes (reimportable con importar_excel.py)")
+    p_cli.add_argument('--salida', help="Archivo .xlsx o .csv (por defecto clientes-<fecha>.xlsx)")
+    p_cli.add_argument('--solo-activos', action='store_true')
+    
+    p_rut = sub.add_parser('rutas', help="Hojas de ruta de la semana, una por responsable")
+    p_rut.add_argument('--semana', help="Lunes de la semana (por defecto la actual)")
+    p_rut.add_argument('--dir', default='rutas')
+    p_rut.add_argument('--formato', choices=['xlsx', 'csv'], default='xlsx')
+    p_rut.add_argument('--procesos', type=int, help="Procesos en paralelo (por defecto uno por CPU)")
+    
+    for p in sub.choices.values():
+        p.add_argument('--db', default='piscinas.db')
+        p.add_argument('--delimitador', default=',', help="Separador de los CSV")
+    
+    args = parser.parse_args()
+    if args.comando == 'clientes':
+        salida = args.salida or f"clientes-{datetime.now().strftime('%Y-%m-%d')}.xlsx"
+        db = Database(args.db)
+        try:
+            r = exportar_clientes(db, salida, args.solo_activos, delimitador=args.delimitador)
+        finally:
+            db.close()
+        print(f"✓ {r['filas']:,} clientes exportados a {r['archivo']} en {r['segundos']:.2f}s")
+    elif args.comando == 'rutas':
+        inicio = time.perf_counter()
+        resultados = exportar_rutas(args.db, args.semana, args.dir, args.formato,
+                                    args.procesos, args.delimitador)
+        for r in resultados:
+            print(f"✓ {r['responsable']:<24} {r['filas']:>6,} clientes → {r['archivo']} "
+                  f"({r['segundos']:.2f}s)")
+        if not resultados:
+            print("❌ No hay asignaciones en esa semana")
+        else:
+            print(f"\n{len(resultados)} hojas de ruta en {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,121 +2,225 @@
 Script para importar datos del Excel a la base de datos SQLite.
 """
 import openpyxl
-from database import Database
+from database import Database, normalizar_texto
+import hashlib
+import re
 import sys
+import time
+from typing import Dict, Iterable, Iterator, Optional
 
 
-def importar_desde_excel(excel_path: str, db_path: str = "piscinas.db"):
-    """Importa los datos del Excel a la base de datos."""
-    db = Database(db_path)
-    
-    print(f"Leyendo archivo Excel: {excel_path}")
-    wb = openpyxl.load_workbook(excel_path)
-    ws = wb.active
-    
-    # Leer encabezados
-    headers = {}
-    for col in range(1, ws.max_column + 1):
-        val = ws.cell(1, col).value
-        if val:
-            headers[val] = col
-    
-    print(f"Columnas encontradas: {list(headers.keys())}")
-    
-    # Procesar filas
-    clientes_importados = 0
-    responsables_creados = {}
+# Encabezados del Excel maestro y el campo de la tabla clientes al que corresponden
+COLUMNAS = {
+    'Nombre cliente': 'nombre',
+    'Dirección': 'direccion',
+    'Comuna': 'comuna',
+    'Celular': 'celular',
+    'Responsable': 'responsable',
+    'día de atención': 'dia_atencion',
+    'precio': 'precio_por_visita',
+}
+
+
+def _limpiar(valor) -> Optional[str]:
+    """Convierte una celda a texto sin espacios, o None si está vacía."""
+    return str(valor).strip() if valor else None
+
+
+def _parsear_precio(precio_val) -> float:
+    """Convierte el precio de la celda a número (acepta '$15.000', '15,000', etc.).
     
-    # Primero, crear responsables únicos
-    print("\nIdentificando responsables...")
-    responsables_set = set()
-    for row in range(2, ws.max_row + 1):
-        responsable_val = ws.cell(row, headers.get('Responsable', 0)).value
-        if responsable_val and responsable_val not in ['Responsable', None]:
-            responsables_set.add(str(responsable_val).strip())
+    Un punto seguido de exactamente tres dígitos es separador de miles
+    ('$15.000' son 15000); '15.5' sigue siendo decimal.
+    """
+    if not precio_val:
+        return 0
+    try:
+        # Intentar convertir a número
+        if isinstance(precio_val, (int, float)):
+            return float(precio_val)
+        precio_str = str(precio_val).replace('$', '').replace(',', '').replace(' ', '').strip()
+        precio_str = re.sub(r'\.(?=\d{3}(?!\d))', '', precio_str)
+        return float(precio_str)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _hash(*partes) -> str:
+    return hashlib.sha1('\x1f'.join(str(p) for p in partes).encode('utf-8')).hexdigest()
+
+
+def clave_cliente(cliente: Dict) -> str:
+    """Identidad de un cliente en el Excel: nombre, dirección y comuna normalizados."""
+    return _hash(normalizar_texto(cliente.get('nombre')),
+                 normalizar_texto(cliente.get('direccion')),
+                 normalizar_texto(cliente.get('comuna')))
+
+
+def agregar_huellas(filas: Iterable[Dict]) -> Iterator[Dict]:
+    """Agrega ``origen_clave`` y ``origen_huella`` a cada fila.
     
-    print(f"Responsables encontrados: {list(responsables_set)}")
+    Si la misma clave se repite en el Excel, las repeticiones reciben un
+    sufijo con su número de aparición para que cada fila tenga clave propia.
+    """
+    apariciones: Dict[str, int] = {}
+    for fila in filas:
+        clave = clave_cliente(fila)
+        n = apariciones.get(clave, 0)
+        apariciones[clave] = n + 1
+        fila['origen_clave'] = clave if n == 0 else f"{clave}-{n}"
+        fila['origen_huella'] = _hash(
+            fila['nombre'], fila['direccion'], fila['comuna'], fila['celular'],
+            fila['responsable'], fila['dia_atencion'], fila['precio_por_visita']
+        )
+        yield fila
+
+
+def leer_filas_excel(excel_path: str) -> Iterator[Dict]:
+    """Lee el Excel en modo streaming y entrega un diccionario por cliente.
     
-    # Crear responsables en la base de datos
-    for resp_name in responsables_set:
-        resp_id = db.agregar_responsable(resp_name)
-        responsables_creados[resp_name] = resp_id
+    Usa el modo read-only de openpyxl, que recorre la hoja una sola vez sin
+    cargarla completa en memoria.
+    """
+    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        filas = ws.iter_rows(values_only=True)
+        
+        # Leer encabezados
+        encabezados = next(filas, None) or ()
+        indices = {}
+        for i, val in enumerate(encabezados):
+            if val in COLUMNAS:
+                indices[COLUMNAS[val]] = i
+        print(f"Columnas encontradas: {[v for v in encabezados if v]}")
+        
+        for fila in filas:
+            datos = {campo: (fila[i] if i < len(fila) else None)
+                     for campo, i in indices.items()}
+            nombre = datos.get('nombre')
+            if not nombre or nombre == 'Nombre cliente':
+                continue
+            
+            responsable = datos.get('responsable')
+            if responsable == 'Responsable':
+                responsable = None
+            
+            yield {
+                'nombre': str(nombre).strip(),
+                'direccion': _limpiar(datos.get('direccion')),
+                'comuna': _limpiar(datos.get('comuna')),
+                'celular': _limpiar(datos.get('celular')),
+                'responsable': _limpiar(responsable),
+                'dia_atencion': _limpiar(datos.get('dia_atencion')),
+                'precio_por_visita': _parsear_precio(datos.get('precio_por_visita')),
+            }
+    finally:
+        wb.close()
+
+
+def importar_desde_excel(excel_path: str, db_path: str = "piscinas.db",
+                         tamano_lote: int = 1000):
+    """Importa los datos del Excel a la base de datos.
     
-    # Importar clientes
-    print("\nImportando clientes...")
-    for row in range(2, ws.max_row + 1):
-        # Obtener datos del cliente
-        nombre = ws.cell(row, headers.get('Nombre cliente', 0)).value
-        if not nombre or nombre == 'Nombre cliente':
-            continue
+    Las filas se leen en streaming y se insertan en lotes de ``tamano_lote``
+    con ``executemany``, todo dentro de una única transacción.
+    """
+    db = Database(db_path)
+    try:
+        print(f"Leyendo archivo Excel: {excel_path}")
+        inicio = time.perf_counter()
         
-        direccion = ws.cell(row, headers.get('Dirección', 0)).value
-        comuna = ws.cell(row, headers.get('Comuna', 0)).value
-        celular = ws.cell(row, headers.get('Celular', 0)).value
-        responsable_val = ws.cell(row, headers.get('Responsable', 0)).value
-        dia_atencion = ws.cell(row, headers.get('día de atención', 0)).value
-        precio_val = ws.cell(row, headers.get('precio', 0)).value
+        clientes_importados = 0
+        responsables_creados: Dict[str, int] = {}
+        lote = []
         
-        # Limpiar y procesar datos
-        nombre = str(nombre).strip()
-        direccion = str(direccion).strip() if direccion else None
-        comuna = str(comuna).strip() if comuna else None
-        celular = str(celular).strip() if celular else None
-        dia_atencion = str(dia_atencion).strip() if dia_atencion else None
+        def insertar_lote():
+            # Crear de una vez los responsables nuevos que aparecen en el lote
+            nuevos = {f['responsable'] for f in lote
+                      if f['responsable'] and f['responsable'] not in responsables_creados}
+            if nuevos:
+                responsables_creados.update(db.obtener_o_crear_responsables(nuevos))
+            for fila in lote:
+                fila['responsable_id'] = responsables_creados.get(fila['responsable'])
+            db.agregar_clientes_lote(lote)
         
-        # Obtener responsable_id
-        responsable_id = None
-        if responsable_val and responsable_val not in ['Responsable', None]:
-            responsable_name = str(responsable_val).strip()
-            if responsable_name in responsables_creados:
-                responsable_id = responsables_creados[responsable_name]
+        print("\nImportando clientes...")
+        with db.transaction():
+            for fila in agregar_huellas(leer_filas_excel(excel_path)):
+                lote.append(fila)
+                if len(lote) >= tamano_lote:
+                    insertar_lote()
+                    clientes_importados += len(lote)
+                    lote = []
+                    print(f"  Importados {clientes_importados} clientes...")
+            if lote:
+                insertar_lote()
+                clientes_importados += len(lote)
         
-        # Procesar precio
-        precio_por_visita = 0
-        if precio_val:
-            try:
-                # Intentar convertir a número
-                if isinstance(precio_val, (int, float)):
-                    precio_por_visita = float(precio_val)
-                else:
-                    precio_str = str(precio_val).replace('$', '').replace(',', '').strip()
-                    precio_por_visita = float(precio_str)
-            except (ValueError, TypeError):
-                precio_por_visita = 0
+        duracion = time.perf_counter() - inicio
+        velocidad = clientes_importados / duracion if duracion > 0 else 0
         
-        # Insertar cliente
-        try:
-            cliente_id = db.agregar_cliente(
-                nombre=nombre,
-                direccion=direccion,
-                comuna=comuna,
-                celular=celular,
-                responsable_id=responsable_id,
-                dia_atencion=dia_atencion,
-                precio_por_visita=precio_por_visita
-            )
-            clientes_importados += 1
-            if clientes_importados % 50 == 0:
-                print(f"  Importados {clientes_importados} clientes...")
-        except Exception as e:
-            print(f"  Error al importar cliente {nombre}: {e}")
-            continue
+        print("\n✓ Importación completada!")
+        print(f"  - Responsables creados: {len(responsables_creados)}")
+        print(f"  - Clientes importados: {clientes_importados}")
+        print(f"  - Tiempo: {duracion:.2f}s ({velocidad:,.0f} filas/s)")
+        
+        return clientes_importados
+    finally:
+        db.close()
+
+
+def sincronizar_desde_excel(excel_path: str, db_path: str = "piscinas.db"):
+    """Sincroniza incrementalmente la base con el Excel.
+    
+    Solo se escriben las diferencias: filas nuevas, filas cuyo contenido
+    cambió y clientes que desaparecieron del Excel (se desactivan). Volver a
+    ejecutarlo con el mismo archivo no modifica nada.
+    """
+    db = Database(db_path)
+    
+    print(f"Sincronizando desde: {excel_path}")
+    inicio = time.perf_counter()
     
-    print(f"\n✓ Importación completada!")
-    print(f"  - Responsables creados: {len(responsables_creados)}")
-    print(f"  - Clientees importados: {clientes_importados}")
+    try:
+        filas = list(agregar_huellas(leer_filas_excel(excel_path)))
+        with db.transaction():
+            nombres = {f['responsable'] for f in filas if f['responsable']}
+            responsables = db.obtener_o_crear_responsables(nombres)
+            for fila in filas:
+                fila['responsable_id'] = responsables.get(fila['responsable'])
+            resultado = db.sincronizar_clientes(filas, clave_legado=clave_cliente)
+    finally:
+        db.close()
+    
+    duracion = time.perf_counter() - inicio
+    velocidad = len(filas) / duracion if duracion > 0 else 0
     
-    return clientes_importados
+    print("\n✓ Sincronización completada!")
+    print(f"  - Filas leídas: {len(filas)}")
+    print(f"  - Clientes nuevos: {resultado['nuevos']}")
+    print(f"  - Clientes actualizados: {resultado['actualizados']}")
+    print(f"  - Sin cambios: {resultado['sin_cambios']}")
+    print(f"  - Desactivados: {resultado['desactivados']}")
+    print(f"  - Tiempo: {duracion:.2f}s ({velocidad:,.0f} filas/s)")
+    
+    return resultado
 
 
 if __name__ == "__main__":
     excel_path = "Base de Datos United al 28 oct 2025.xlsx"
     
-    if len(sys.argv) > 1:
-        excel_path = sys.argv[1]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    incremental = '--incremental' in sys.argv[1:]
+    if args:
+        excel_path = args[0]
     
     try:
-        importar_desde_excel(excel_path)
+        if incremental:
+            sincronizar_desde_excel(excel_path)
+        else:
+            importar_desde_excel(excel_path)
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo {excel_path}")
         sys.exit(1)
@@ -125,4 +229,3 @@ if __name__ == "__main__":
         import traceback
         traceback.print_exc()
         sys.exit(1)
-
@@ -0,0 +1,415 @@
+"""
+Importa a SQLite los respaldos de PostgreSQL (``backups/*.sql``).
+
+Lee el dump línea a línea, sin cargarlo entero en memoria, y traduce sus
+sentencias al esquema de ``Database``:
+
+- ``INSERT INTO ... VALUES (...), (...);`` (una o varias filas, incluso con
+  textos de varias líneas)
+- bloques ``COPY ... FROM stdin;`` de pg_dump
+- ``setval(...)`` de las secuencias, que pasan a ``sqlite_sequence``
+
+Los tipos se toman de los ``CREATE TABLE`` del propio dump: las fechas
+(``DATE``) quedan como ``YYYY-MM-DD``, los ``TIMESTAMP`` en UTC como
+``YYYY-MM-DD HH:MM:SS``, los ``NUMERIC`` como número y los booleanos como
+0/1. Las columnas o tablas que no existen en SQLite se omiten y se informan.
+
+Las filas se insertan con ``executemany`` en lotes, todo en una transacción.
+
+Uso:
+    python importar_pg_dump.py backups/backup_unitenpools_2026-01-18_13-07-29.sql [--db piscinas.db] [--reemplazar]
+"""
+import argparse
+import gzip
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from database import Database
+from reportes import Reportes
+
+_IDENTIFICADOR = r'(?:"[^"]+"|[\w.]+)'
+_INSERT = re.compile(rf'^INSERT\s+INTO\s+({_IDENTIFICADOR})\s*(?:\(([^)]*)\))?\s*VALUES\s*', re.I | re.S)
+_COPY = re.compile(rf'^COPY\s+({_IDENTIFICADOR})\s*(?:\(([^)]*)\))?\s+FROM\s+stdin', re.I)
+_CREATE = re.compile(rf'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?({_IDENTIFICADOR})\s*\((.*)\)\s*;?\s*$', re.I | re.S)
+_SETVAL = re.compile(r"setval\(\s*'([^']+)'(?:::regclass)?\s*,\s*(\d+)\s*(?:,\s*(true|false))?\s*\)", re.I)
+_TOKENS = re.compile(r"""
+    \s*(?:
+        (?P<texto>[Ee]?'(?:[^']|'')*')
+      | (?P<numero>[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<palabra>NULL|TRUE|FALSE|DEFAULT)
+      | (?P<cast>::\s*[\w ]+(?:\(\d+(?:\s*,\s*\d+)?\))?(?:\[\])?)
+      | (?P<signo>[(),;])
+    )
+""", re.I | re.X)
+_TEXTO_ESCAPADO = re.compile(r"[(,]\s*[Ee]'")
+_ESCAPES_COPY = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '\\': '\\'}
+_ESCAPE_COPY = re.compile(r'\\(.)')
+
+# Triggers que se suspenden durante la carga: lo que mantienen se recalcula
+# (índice de búsqueda y resumen) o no debe ocurrir (encolar visitas ya
+# emitidas). Cualquier otro trigger de la base sigue activo.
+_TRIGGERS_SUSPENDIDOS = ('clientes_fts_', 'resumen_', 'outbox_')
+
+
+def _nombre(identificador: str) -> str:
+    """``public."clientes"`` -> ``clientes``."""
+    return identificador.split('.')[-1].strip('"').lower()
+
+
+def _columnas(lista: Optional[str]) -> Optional[List[str]]:
+    if not lista:
+        return None
+    return [_nombre(c.strip()) for c in lista.split(',')]
+
+
+def _tipos_create(cuerpo: str) -> Dict[str, Optional[str]]:
+    """Columnas de un CREATE TABLE, en orden, con su tipo simplificado.
+    
+    El tipo es ``date``, ``timestamp``, ``numeric``, ``boolean`` o None si
+    el valor se copia tal cual.
+    """
+    tipos = {}
+    nivel, actual, partes = 0, '', []
+    for c in cuerpo:
+        nivel += (c == '(') - (c == ')')
+        if c == ',' and nivel == 0:
+            partes.append(actual)
+            actual = ''
+        else:
+            actual += c
+    partes.append(actual)
+    for parte in partes:
+        palabras = parte.split()
+        if len(palabras) < 2 or palabras[0].upper() in ('CONSTRAINT', 'PRIMARY', 'UNIQUE',
+                                                        'FOREIGN', 'CHECK'):
+            continue
+        tipo = ' '.join(palabras[1:]).lower()
+        if tipo.startswith('date'):
+            simple = 'date'
+        elif tipo.startswith('timestamp'):
+            simple = 'timestamp'
+        elif tipo.startswith(('numeric', 'decimal', 'real', 'double', 'money')):
+            simple = 'numeric'
+        elif tipo.startswith(('boolean', 'bool')):
+            simple = 'boolean'
+        else:
+            simple = None
+        tipos[_nombre(palabras[0])] = simple
+    return tipos
+
+
+def _booleano(valor):
+    if isinstance(valor, str):
+        return 1 if valor.lower() in ('t', 'true', '1', 'y', 'yes', 'on') else 0
+    return 1 if valor else 0
+
+
+def _numerico(valor):
+    return float(valor) if isinstance(valor, str) and valor else valor
+
+
+def _fecha(valor):
+    # Los DATE de Node llegan como la medianoche de Chile en UTC
+    # ('2026-01-12T03:00:00.000Z'); con zonas negativas la fecha UTC es la
+    # misma que la local.
+    return str(valor)[:10]
+
+
+def _timestamp(valor):
+    texto = str(valor)
+    if len(texto) == 19 and texto[10] == ' ':
+        return texto
+    if texto.endswith('Z'):
+        return texto[:10] + ' ' + texto[11:19]
+    try:
+        momento = datetime.fromisoformat(texto)
+    except ValueError:
+        return texto
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento.strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Conversión de cada tipo simplificado al formato que usa la base SQLite
+CONVERSIONES = {'boolean': _booleano, 'numeric': _numerico, 'date': _fecha, 'timestamp': _timestamp}
+
+
+def _filas_values(texto: str, memoria: sqlite3.Connection):
+    """Filas de ``VALUES (...), (...)``.
+    
+    Los literales estándar (textos con '', números, NULL, TRUE/FALSE) los
+    evalúa SQLite directamente, que es mucho más rápido; si aparecen casts
+    (``::``), textos ``E'...'`` o DEFAULT se recurre al tokenizador.
+    """
+    cuerpo = texto.rstrip().rstrip(';')
+    if '::' not in cuerpo and not _TEXTO_ESCAPADO.search(cuerpo):
+        try:
+            return memoria.execute(f"VALUES {cuerpo}").fetchall()
+        except sqlite3.Error:
+            pass
+    return _tokenizar_values(cuerpo)
+
+
+def _tokenizar_values(texto: str) -> Iterator[List]:
+    """Recorre las tuplas de ``VALUES (...), (...)`` y las retorna como listas."""
+    fila = None
+    for m in _TOKENS.finditer(texto):
+        tipo = m.lastgroup
+        valor = m.group(tipo)
+        if tipo == 'signo':
+            if valor == '(':
+                fila = []
+            elif valor == ')' and fila is not None:
+                yield fila
+                fila = None
+        elif fila is None or tipo == 'cast':
+            continue
+        elif tipo == 'texto':
+            escape = valor[0] in 'Ee'
+            contenido = valor[2:-1] if escape else valor[1:-1]
+            contenido = contenido.replace("''", "'")
+            if escape:
+                contenido = contenido.encode('latin-1', 'backslashreplace').decode('unicode_escape')
+            fila.append(contenido)
+        elif tipo == 'numero':
+            fila.append(float(valor) if any(c in valor for c in '.eE') else int(valor))
+        else:
+            palabra = valor.upper()
+            fila.append(None if palabra in ('NULL', 'DEFAULT') else int(palabra == 'TRUE'))
+
+
+def _campo_copy(campo: str) -> Optional[str]:
+    if campo == r'\N':
+        return None
+    if '\\' not in campo:
+        return campo
+    return _ESCAPE_COPY.sub(lambda m: _ESCAPES_COPY.get(m.group(1), m.group(1)), campo)
+
+
+def leer_dump(path: str) -> Iterator[Tuple]:
+    """Recorre el dump y produce eventos sin acumular más de una sentencia.
+    
+    Eventos: ``('tabla', nombre, tipos)``, ``('filas', nombre, columnas, filas)``
+    y ``('secuencia', nombre, valor)``.
+    """
+    abrir = gzip.open if path.endswith('.gz') else open
+    memoria = sqlite3.connect(':memory:')
+    with abrir(path, 'rt', encoding='utf-8') as f:
+        sentencia: List[str] = []
+        en_texto = False
+        copy = None
+        for linea in f:
+            if copy is not None:
+                if linea.rstrip('\r\n') == '\\.':
+                    copy = None
+                    continue
+                campos = linea.rstrip('\r\n').split('\t')
+                yield ('filas', copy[0], copy[1], [[_campo_copy(c) for c in campos]])
+                continue
+            if not sentencia and (not linea.strip() or linea.lstrip().startswith('--')):
+                continue
+            
+            sentencia.append(linea)
+            # Con standard_conforming_strings las comillas se escapan
+            # duplicándolas, así que la paridad indica si hay un texto abierto
+            en_texto ^= linea.count("'") % 2 == 1
+            if en_texto or not linea.rstrip().endswith(';'):
+                continue
+            texto = ''.join(sentencia).strip()
+            sentencia = []
+            
+            m = _INSERT.match(texto)
+            if m:
+                yield ('filas', _nombre(m.group(1)), _columnas(m.group(2)),
+                       _filas_values(texto[m.end():], memoria))
+                continue
+            m = _COPY.match(texto)
+            if m:
+                copy = (_nombre(m.group(1)), _columnas(m.group(2)))
+                continue
+            m = _CREATE.match(texto)
+            if m:
+                yield ('tabla', _nombre(m.group(1)), _tipos_create(m.group(2)))
+                continue
+            for m in _SETVAL.finditer(texto):
+                valor = int(m.group(2))
+                if (m.group(3) or 'true').lower() == 'false':
+                    valor -= 1
+                yield ('secuencia', _nombre(m.group(1)), valor)
+
+
+def _suspender_triggers(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    """Borra los triggers de ``_TRIGGERS_SUSPENDIDOS`` y retorna su nombre y SQL."""
+    triggers = [
+        (nombre, sql) for nombre, sql in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name")
+        if nombre.startswith(_TRIGGERS_SUSPENDIDOS)
+    ]
+    for nombre, sql in triggers:
+        if not sql:
+            raise RuntimeError(f"No se puede suspender el trigger {nombre}: no tiene SQL para recrearlo")
+    for nombre, _ in triggers:
+        conn.execute(f"DROP TRIGGER {nombre}")
+    return triggers
+
+
+def _restaurar_triggers(conn: sqlite3.Connection, triggers: List[Tuple[str, str]]):
+    """Recrea los triggers suspendidos y verifica que estén todos."""
+    for _, sql in triggers:
+        conn.execute(sql)
+    presentes = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    faltan = sorted(nombre for nombre, _ in triggers if nombre not in presentes)
+    if faltan:
+        raise RuntimeError(f"No se pudieron restaurar los triggers: {', '.join(faltan)}")
+
+
+def importar_dump(sql_path: str, db_path: str = "piscinas.db", reemplazar: bool = False,
+                  tamano_lote: int = 5000) -> Dict[str, int]:
+    """Carga un dump de PostgreSQL en la base SQLite y retorna las filas por tabla.
+    
+    Con ``reemplazar`` se vacían antes las tablas que trae el dump (como hace
+    su propio ``DROP TABLE``); si no, las filas cuyo id ya existe se omiten.
+    
+    Los triggers del índice de búsqueda, del resumen y de la bandeja de Odoo
+    se suspenden durante la carga: el índice y ``resumen_semanal`` se
+    recalculan una vez al final, y las visitas importadas no se encolan para
+    Odoo porque ya pasaron por producción. Los demás triggers siguen activos.
+    """
+    db = Database(db_path)
+    conn = db.get_connection()
+    existentes = {
+        fila[0]: [c[1] for c in conn.execute(f"PRAGMA table_info({fila[0]})")]
+        for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    
+    print(f"Importando dump: {sql_path}")
+    inicio = time.perf_counter()
+    tipos: Dict[str, Dict[str, Optional[str]]] = {}
+    insertadas: Counter = Counter()
+    leidas: Counter = Counter()
+    vaciadas = set()
+    omitidas_tablas = Counter()
+    omitidas_columnas: Dict[str, set] = {}
+    secuencias = {}
+    pendiente: Dict = {'clave': None, 'filas': []}
+    siguiente_aviso = 100000
+    
+    def volcar():
+        clave, filas = pendiente['clave'], pendiente['filas']
+        if not filas:
+            return
+        tabla, columnas = clave
+        cursor = conn.executemany(
+            f"INSERT OR IGNORE INTO {tabla} ({', '.join(columnas)}) "
+            f"VALUES ({', '.join('?' * len(columnas))})", filas)
+        insertadas[tabla] += cursor.rowcount
+        pendiente['filas'] = []
+    
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        with db.transaction():
+            triggers = _suspender_triggers(conn)
+            
+            for evento in leer_dump(sql_path):
+                if evento[0] == 'tabla':
+                    _, tabla, tipos_tabla = evento
+                    tipos[tabla] = tipos_tabla
+                    continue
+                if evento[0] == 'secuencia':
+                    secuencias[evento[1]] = evento[2]
+                    continue
+                
+                _, tabla, columnas, filas = evento
+                if tabla not in existentes:
+                    omitidas_tablas[tabla] += sum(1 for _ in filas)
+                    continue
+                if columnas is None:
+                    columnas = list(tipos.get(tabla) or existentes[tabla])
+                if reemplazar and tabla not in vaciadas:
+                    conn.execute(f"DELETE FROM {tabla}")
+                    vaciadas.add(tabla)
+                
+                indices = [i for i, c in enumerate(columnas) if c in existentes[tabla]]
+                destino = [columnas[i] for i in indices]
+                if len(destino) < len(columnas):
+                    omitidas_columnas.setdefault(tabla, set()).update(set(columnas) - set(destino))
+                tipos_tabla = tipos.get(tabla, {})
+                convertir = [(posicion, CONVERSIONES[tipos_tabla[c]])
+                             for posicion, c in enumerate(destino) if tipos_tabla.get(c)]
+                todas = len(indices) == len(columnas)
+                clave = (tabla, tuple(destino))
+                if pendiente['clave'] != clave:
+                    volcar()
+                    pendiente['clave'] = clave
+                for fila in filas:
+                    leidas[tabla] += 1
+                    if not todas:
+                        fila = [fila[i] for i in indices]
+                    if convertir:
+                        fila = list(fila)
+                        for posicion, funcion in convertir:
+                            if fila[posicion] is not None:
+                                fila[posicion] = funcion(fila[posicion])
+                    pendiente['filas'].append(fila)
+                    if len(pendiente['filas']) >= tamano_lote:
+                        volcar()
+                if sum(leidas.values()) >= siguiente_aviso:
+                    print(f"  {siguiente_aviso:,} filas leídas...")
+                    siguiente_aviso += 100000
+            volcar()
+            
+            for secuencia, valor in secuencias.items():
+                tabla = secuencia[:-len('_id_seq')] if secuencia.endswith('_id_seq') else secuencia
+                if tabla in existentes:
+                    conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (tabla,))
+                    conn.execute(f"""
+                        INSERT INTO sqlite_sequence (name, seq)
+                        SELECT ?, MAX(?, COALESCE((SELECT MAX(id) FROM {tabla}), 0))
+                    """, (tabla, valor))
+            
+            _restaurar_triggers(conn, triggers)
+            if db.fts_disponible:
+                conn.execute("INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')")
+            Reportes(db).reconstruir()
+        db._invalidar_cache()
+    finally:
+        conn.execute("PRAGMA synchronous = NORMAL")
+        db.close()
+    
+    duracion = time.perf_counter() - inicio
+    total = sum(leidas.values())
+    velocidad = total / duracion if duracion > 0 else 0
+    
+    print("\n✓ Importación completada!")
+    for tabla in leidas:
+        ignoradas = leidas[tabla] - insertadas[tabla]
+        extra = f" ({ignoradas} ya existían)" if ignoradas else ""
+        print(f"  - {tabla}: {insertadas[tabla]} filas{extra}")
+    for tabla, n in omitidas_tablas.items():
+        print(f"  - {tabla}: {n} filas omitidas (la tabla no existe en SQLite)")
+    for tabla, columnas in omitidas_columnas.items():
+        print(f"  - {tabla}: columnas omitidas {', '.join(sorted(columnas))}")
+    if secuencias:
+        print(f"  - Secuencias ajustadas: {len(secuencias)}")
+    print(f"  - Tiempo: {duracion:.2f}s ({velocidad:,.0f} filas/s)")
+    return dict(insertadas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa un dump de PostgreSQL a SQLite")
+    parser.add_argument('dump', help="Archivo .sql (o .sql.gz)")
+    parser.add_argument('--db', default='piscinas.db')
+    parser.add_argument('--reemplazar', action='store_true',
+                        help="Vaciar antes las tablas que trae el dump")
+    parser.add_argument('--lote', type=int, default=5000)
+    args = parser.parse_args()
+    try:
+        importar_dump(args.dump, args.db, args.reemplazar, args.lote)
+    except FileNotFoundError:
+        print(f"Error: No se encontró el archivo {args.dump}")
+        sys.exit(1)
@@ -0,0 +1,226 @@
+"""
+Instrumentación opcional de la capa de base de datos.
+
+Cuando se activa, envuelve los métodos públicos de una instancia de
+``Database`` para registrar llamadas, latencias (con histograma) y filas
+retornadas; en los que retornan un iterador se mide también el tiempo de
+recorrerlo. Deja en el log de consultas lentas cada sentencia SQL que
+supere el umbral junto con su ``EXPLAIN QUERY PLAN``. Desactivada no
+agrega ningún costo: los métodos originales quedan intactos.
+"""
+import atexit
+import inspect
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger('piscinas.consultas')
+
+# Límites superiores (ms) de los intervalos del histograma de latencias
+LIMITES_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float('inf'))
+
+# Métodos de Database que no se instrumentan
+EXCLUIDOS = {'get_connection', 'transaction', 'close', 'init_database',
+             'activar_instrumentacion', 'desactivar_instrumentacion', 'validar_cache'}
+
+# Sentencias que emiten el pool y la caché por su cuenta: marcan el término
+# de la sentencia anterior, pero no se registran como consultas lentas
+INTERNAS = ('PRAGMA DATA_VERSION', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+class EstadisticaMetodo:
+    """Acumula las mediciones de un método."""
+    
+    __slots__ = ('llamadas', 'total_ms', 'max_ms', 'filas', 'histograma')
+    
+    def __init__(self):
+        self.llamadas = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.filas = 0
+        self.histograma = [0] * len(LIMITES_MS)
+    
+    def registrar(self, ms: float, filas: int):
+        self.llamadas += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.filas += filas
+        for i, limite in enumerate(LIMITES_MS):
+            if ms <= limite:
+                self.histograma[i] += 1
+                break
+    
+    def como_dict(self) -> Dict:
+        return {
+            'llamadas': self.llamadas,
+            'total_ms': round(self.total_ms, 3),
+            'media_ms': round(self.total_ms / self.llamadas, 3) if self.llamadas else 0,
+            'max_ms': round(self.max_ms, 3),
+            'filas': self.filas,
+            'histograma': {f"<={limite}ms": n for limite, n
+                           in zip(LIMITES_MS, self.histograma) if n},
+        }
+
+
+def _contar_filas(resultado) -> int:
+    if isinstance(resultado, list):
+        return len(resultado)
+    if isinstance(resultado, dict):
+        return len(resultado.get('visita_ids', ())) if 'visita_ids' in resultado else 1
+    return 0
+
+
+class Instrumentacion:
+    """Estadísticas por método y log de consultas lentas de un ``Database``."""
+    
+    def __init__(self, db, umbral_ms: float = 100.0, archivo_log: Optional[str] = None,
+                 volcar_al_salir: bool = False):
+        self.db = db
+        self.umbral_ms = umbral_ms
+        self.estadisticas: Dict[str, EstadisticaMetodo] = {}
+        self.lentas = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._originales = {}
+        self._handler = None
+        if archivo_log:
+            self._handler = logging.FileHandler(archivo_log, encoding='utf-8')
+            self._handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(self._handler)
+            logger.setLevel(logging.INFO)
+        if volcar_al_salir:
+            atexit.register(self.imprimir)
+    
+    def instalar(self):
+        """Reemplaza los métodos públicos de la instancia por versiones medidas."""
+        for nombre, metodo in inspect.getmembers(type(self.db), inspect.isfunction):
+            if nombre.startswith('_') or nombre in EXCLUIDOS:
+                continue
+            original = getattr(self.db, nombre)
+            self._originales[nombre] = original
+            setattr(self.db, nombre, self._envolver(nombre, original))
+    
+    def desinstalar(self):
+        """Restaura los métodos originales."""
+        for nombre in self._originales:
+            delattr(self.db, nombre)
+        self._originales.clear()
+        if self._handler is not None:
+            logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+    
+    def _envolver(self, nombre: str, original):
+        def medido(*args, **kwargs):
+            local = self._local
+            externo = not getattr(local, 'activo', False)
+            if externo:
+                # El método más externo captura las sentencias que se ejecuten
+                local.activo = True
+                local.sentencias = []
+                conn = self.db.get_connection()
+                
+                def capturar(sql):
+                    # Las subsentencias de triggers y tablas virtuales llegan
+                    # como comentarios mientras corre la sentencia que las origina
+                    if not sql.startswith('--'):
+                        local.sentencias.append((time.perf_counter(), sql))
+                conn.set_trace_callback(capturar)
+            inicio = time.perf_counter()
+            try:
+                resultado = original(*args, **kwargs)
+            finally:
+                fin = time.perf_counter()
+                if externo:
+                    conn.set_trace_callback(None)
+                    local.activo = False
+            
+            if externo:
+                self._registrar_lentas(nombre, local.sentencias, fin)
+            if isinstance(resultado, Iterator):
+                # Generadores y cursores hacen su trabajo al recorrerse
+                return self._medir_iteracion(nombre, resultado, fin - inicio)
+            self._registrar(nombre, (fin - inicio) * 1000, _contar_filas(resultado))
+            return resultado
+        medido.__name__ = nombre
+        medido.__doc__ = original.__doc__
+        return medido
+    
+    def _medir_iteracion(self, nombre: str, iterador: Iterator, segundos: float):
+        """Recorre ``iterador`` sumando el tiempo de cada paso, sin el del consumidor.
+        
+        La llamada se registra al agotarse o cerrarse el recorrido.
+        """
+        filas = 0
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    fila = next(iterador)
+                except StopIteration:
+                    return
+                finally:
+                    segundos += time.perf_counter() - inicio
+                filas += 1
+                yield fila
+        finally:
+            cerrar = getattr(iterador, 'close', None)
+            if cerrar is not None:
+                cerrar()
+            self._registrar(nombre, segundos * 1000, filas)
+    
+    def _registrar(self, nombre: str, ms: float, filas: int):
+        with self._lock:
+            estadistica = self.estadisticas.setdefault(nombre, EstadisticaMetodo())
+            estadistica.registrar(ms, filas)
+    
+    def _registrar_lentas(self, metodo: str, sentencias: List, fin: float):
+        """Estima la duración de cada sentencia y registra las que superan el umbral.
+        
+        La duración de una sentencia se toma como el tiempo hasta que comienza
+        la siguiente (o hasta que retorna el método), lo que incluye la lectura
+        de sus filas.
+        """
+        for i, (inicio, sql) in enumerate(sentencias):
+            termino = sentencias[i + 1][0] if i + 1 < len(sentencias) else fin
+            ms = (termino - inicio) * 1000
+            if ms < self.umbral_ms or sql.lstrip().upper().startswith(INTERNAS):
+                continue
+            with self._lock:
+                self.lentas += 1
+            plan = self._plan(sql)
+            logger.warning("Consulta lenta (%.1f ms) en %s:\n%s\nPlan:\n%s",
+                           ms, metodo, sql.strip(), plan)
+    
+    def _plan(self, sql: str) -> str:
+        """Retorna el EXPLAIN QUERY PLAN de una sentencia, si corresponde."""
+        if sql.lstrip().split(None, 1)[0].upper() not in ('SELECT', 'INSERT', 'UPDATE',
+                                                          'DELETE', 'WITH', 'REPLACE'):
+            return '  (sin plan)'
+        try:
+            filas = self.db.get_connection().execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        except sqlite3.Error as e:
+            return f"  (no disponible: {e})"
+        return "\n".join(f"  {fila[3]}" for fila in filas)
+    
+    def resumen(self) -> Dict[str, Dict]:
+        """Estadísticas por método, ordenadas por tiempo total."""
+        with self._lock:
+            orden = sorted(self.estadisticas.items(), key=lambda kv: kv[1].total_ms, reverse=True)
+            return {nombre: e.como_dict() for nombre, e in orden}
+    
+    def imprimir(self):
+        """Imprime las estadísticas acumuladas."""
+        resumen = self.resumen()
+        if not resumen:
+            print("\nNo hay consultas registradas.")
+            return
+        print(f"\n{'Método':<32} {'Llamadas':>9} {'Media (ms)':>11} {'Máx (ms)':>10} "
+              f"{'Total (ms)':>11} {'Filas':>9}")
+        print("-" * 87)
+        for nombre, e in resumen.items():
+            print(f"{nombre:<32} {e['llamadas']:>9} {e['media_ms']:>11.2f} {e['max_ms']:>10.2f} "
+                  f"{e['total_ms']:>11.1f} {e['filas']:>9}")
+        print(f"\nConsultas sobre {self.umbral_ms:g} ms: {self.lentas}")
@@ -0,0 +1,571 @@
+"""
+Migraciones versionadas del esquema SQLite.
+
+La versión del esquema se guarda en ``PRAGMA user_version``. Al abrir la
+base solo se lee ese número; las migraciones pendientes se aplican en orden
+dentro de una transacción y, si la base ya está al día, no se ejecuta
+ningún DDL.
+
+Todas las migraciones son idempotentes, de modo que también pueden
+aplicarse sobre bases creadas antes de existir este módulo (versión 0) que
+ya tengan parte del esquema.
+"""
+import sqlite3
+from typing import Callable, Dict, List, Tuple
+
+import calendario
+
+
+def asegurar_columna(cursor: sqlite3.Cursor, tabla: str, columna: str, definicion: str):
+    """Agrega una columna a una tabla existente si todavía no está."""
+    # table_xinfo también lista las columnas generadas
+    columnas = [row[1] for row in cursor.execute(f"PRAGMA table_xinfo({tabla})")]
+    if columna not in columnas:
+        cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {definicion}")
+
+
+def _esquema_inicial(cursor: sqlite3.Cursor):
+    """Tablas base e índices originales."""
+    # Tabla de responsables
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS responsables (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL UNIQUE,
+            activo INTEGER DEFAULT 1,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Tabla de clientes
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            direccion TEXT,
+            comuna TEXT,
+            celular TEXT,
+            responsable_id INTEGER,
+            dia_atencion TEXT,
+            precio_por_visita REAL DEFAULT 0,
+            activo INTEGER DEFAULT 1,
+            notas TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (responsable_id) REFERENCES responsables(id)
+        )
+    """)
+    
+    # Tabla de visitas (historial de mantenimientos)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS visitas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            fecha_visita TEXT NOT NULL,
+            responsable_id INTEGER,
+            precio REAL,
+            realizada INTEGER DEFAULT 0,
+            notas TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+            FOREIGN KEY (responsable_id) REFERENCES responsables(id)
+        )
+    """)
+    
+    # Tabla de asignaciones semanales
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS asignaciones_semanales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            semana_inicio TEXT NOT NULL,
+            cliente_id INTEGER NOT NULL,
+            responsable_id INTEGER,
+            dia_atencion TEXT,
+            precio REAL,
+            asignada INTEGER DEFAULT 1,
+            realizada INTEGER DEFAULT 0,
+            notas TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+            FOREIGN KEY (responsable_id) REFERENCES responsables(id),
+            UNIQUE(semana_inicio, cliente_id)
+        )
+    """)
+    
+    # Índices para mejorar el rendimiento
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_responsable ON clientes(responsable_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_dia ON clientes(dia_atencion)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_cliente ON visitas(cliente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_fecha ON visitas(fecha_visita)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asignaciones_semana ON asignaciones_semanales(semana_inicio)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asignaciones_cliente ON asignaciones_semanales(cliente_id)")
+
+
+def _origen_excel(cursor: sqlite3.Cursor):
+    """Columnas para la sincronización incremental desde Excel."""
+    asegurar_columna(cursor, 'clientes', 'origen_clave', 'origen_clave TEXT')
+    asegurar_columna(cursor, 'clientes', 'origen_huella', 'origen_huella TEXT')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_origen_clave ON clientes(origen_clave)")
+
+
+def _indice_comuna(cursor: sqlite3.Cursor):
+    """Índice para filtrar clientes por comuna."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clientes_comuna ON clientes(comuna COLLATE NOCASE)")
+
+
+def _indice_busqueda(cursor: sqlite3.Cursor):
+    """Índice FTS5 de clientes y los triggers que lo mantienen.
+    
+    Si la versión de SQLite no incluye FTS5 la migración no crea nada y
+    ``Database.buscar_clientes`` recurre a una búsqueda con LIKE.
+    """
+    existe = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clientes_fts'"
+    ).fetchone()
+    if existe:
+        return
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE clientes_fts USING fts5(
+                nombre, direccion, comuna, celular,
+                content='clientes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        return
+    
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN
+            INSERT INTO clientes_fts(rowid, nombre, direccion, comuna, celular)
+            VALUES (new.id, new.nombre, new.direccion, new.comuna, new.celular);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN
+            INSERT INTO clientes_fts(clientes_fts, rowid, nombre, direccion, comuna, celular)
+            VALUES ('delete', old.id, old.nombre, old.direccion, old.comuna, old.celular);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS clientes_fts_au
+        AFTER UPDATE OF nombre, direccion, comuna, celular ON clientes BEGIN
+            INSERT INTO clientes_fts(clientes_fts, rowid, nombre, direccion, comuna, celular)
+            VALUES ('delete', old.id, old.nombre, old.direccion, old.comuna, old.celular);
+            INSERT INTO clientes_fts(rowid, nombre, direccion, comuna, celular)
+            VALUES (new.id, new.nombre, new.direccion, new.comuna, new.celular);
+        END
+    """)
+    # Indexar los clientes que ya existían
+    cursor.execute("INSERT INTO clientes_fts(clientes_fts) VALUES ('rebuild')")
+
+
+def _columnas_node(cursor: sqlite3.Cursor):
+    """Tabla de usuarios y columnas de facturación/Odoo que usa el servidor Node."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password TEXT NOT NULL,
+            responsable_id INTEGER,
+            rol TEXT DEFAULT 'responsable',
+            activo INTEGER DEFAULT 1,
+            created_at TEXT DEFAULT (datetime('now')),
+            FOREIGN KEY (responsable_id) REFERENCES responsables(id)
+        )
+    """)
+    for definicion in (
+        "rut TEXT", "email TEXT", "documento_tipo TEXT DEFAULT 'invoice'",
+        "odoo_partner_id INTEGER", "odoo_last_sync TEXT",
+        "factura_razon_social TEXT", "factura_rut TEXT", "factura_giro TEXT",
+        "factura_direccion TEXT", "factura_comuna TEXT", "factura_email TEXT",
+        "invoice_nombre TEXT", "invoice_tax_id TEXT", "invoice_direccion TEXT",
+        "invoice_comuna TEXT", "invoice_email TEXT", "invoice_pais TEXT",
+    ):
+        asegurar_columna(cursor, 'clientes', definicion.split()[0], definicion)
+    for definicion in (
+        "odoo_move_id INTEGER", "odoo_move_name TEXT", "odoo_payment_state TEXT",
+        "odoo_last_sync TEXT", "odoo_error TEXT", "odoo_notified_at TEXT",
+        "odoo_notify_count INTEGER DEFAULT 0",
+    ):
+        asegurar_columna(cursor, 'visitas', definicion.split()[0], definicion)
+    # Visita que cerró cada asignación
+    asegurar_columna(cursor, 'asignaciones_semanales', 'visita_id', 'visita_id INTEGER')
+
+
+def _multi_visita(cursor: sqlite3.Cursor):
+    """Permite varias asignaciones por cliente y semana, una por día.
+    
+    Equivale a ``scripts/migrate-multivisit.js``: la unicidad pasa de
+    (semana_inicio, cliente_id) a (semana_inicio, cliente_id, dia_atencion).
+    SQLite no permite quitar una restricción UNIQUE, así que la tabla se
+    reconstruye conservando todas sus columnas y datos.
+    """
+    sql = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'asignaciones_semanales'"
+    ).fetchone()[0]
+    if 'UNIQUE(semana_inicio, cliente_id)' not in sql.replace(' ,', ','):
+        return
+    
+    columnas = [(row[1], row[2]) for row in cursor.execute("PRAGMA table_info(asignaciones_semanales)")]
+    cursor.execute("""
+        CREATE TABLE asignaciones_semanales_nueva (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            semana_inicio TEXT NOT NULL,
+            cliente_id INTEGER NOT NULL,
+            responsable_id INTEGER,
+            dia_atencion TEXT,
+            precio REAL,
+            asignada INTEGER DEFAULT 1,
+            realizada INTEGER DEFAULT 0,
+            notas TEXT,
+            visita_id INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+            FOREIGN KEY (responsable_id) REFERENCES responsables(id)
+        )
+    """)
+    nuevas = {row[1] for row in cursor.execute("PRAGMA table_info(asignaciones_semanales_nueva)")}
+    for nombre, tipo in columnas:
+        if nombre not in nuevas:
+            cursor.execute(f"ALTER TABLE asignaciones_semanales_nueva ADD COLUMN {nombre} {tipo}")
+    lista = ", ".join(nombre for nombre, _ in columnas)
+    cursor.execute(f"""
+        INSERT INTO asignaciones_semanales_nueva ({lista})
+        SELECT {lista} FROM asignaciones_semanales
+    """)
+    
+    cursor.execute("DROP TABLE asignaciones_semanales")
+    cursor.execute("ALTER TABLE asignaciones_semanales_nueva RENAME TO asignaciones_semanales")
+    
+    # dia_atencion puede ser NULL, por eso el índice usa COALESCE
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_asignaciones_unica_dia
+        ON asignaciones_semanales(semana_inicio, cliente_id, COALESCE(dia_atencion, ''))
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asignaciones_semana ON asignaciones_semanales(semana_inicio)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_asignaciones_cliente ON asignaciones_semanales(cliente_id)")
+
+
+def _outbox_odoo(cursor: sqlite3.Cursor):
+    """Bandeja de salida de visitas a emitir en Odoo.
+    
+    Los triggers encolan cada visita realizada sin documento en la misma
+    transacción que la inserta (o que la marca como realizada), venga de
+    Python o del servidor Node, con una espera de ``GRACIA_OUTBOX``.
+    ``odoo_outbox.py`` despacha la cola. La ``clave`` (``visita-<id>``) solo
+    evita encolar dos veces la misma visita; en Odoo la idempotencia la da
+    la referencia ``Visita <id> - Cliente <id>`` del documento.
+    Las visitas anteriores no se encolan solas: ver ``encolar_pendientes``.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS odoo_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            visita_id INTEGER NOT NULL,
+            clave TEXT NOT NULL UNIQUE,
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            intentos INTEGER NOT NULL DEFAULT 0,
+            proximo_intento TEXT NOT NULL DEFAULT (datetime('now')),
+            ultimo_error TEXT,
+            created_at TEXT DEFAULT (datetime('now')),
+            enviado_at TEXT,
+            FOREIGN KEY (visita_id) REFERENCES visitas(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_pendientes
+        ON odoo_outbox(proximo_intento) WHERE estado = 'pendiente'
+    """)
+    _triggers_outbox(cursor)
+
+
+# Espera antes de despachar una visita recién registrada. El servidor Node
+# emite el documento en línea justo después de insertar la visita; mientras
+# esa llamada esté en curso el despachador no debe tomar la entrada, porque
+# aún no encontraría la factura por su referencia y la duplicaría.
+GRACIA_OUTBOX = 300
+
+
+def _triggers_outbox(cursor: sqlite3.Cursor):
+    """Triggers que encolan las visitas realizadas, vencidas tras ``GRACIA_OUTBOX``."""
+    for nombre, evento, condicion in (
+        ('outbox_visitas_ai', 'AFTER INSERT ON visitas', ''),
+        ('outbox_visitas_au', 'AFTER UPDATE OF realizada ON visitas', ' AND OLD.realizada IS NOT 1'),
+    ):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nombre} {evento}
+            WHEN NEW.realizada = 1{condicion} AND NEW.odoo_move_id IS NULL
+            BEGIN
+                INSERT OR IGNORE INTO odoo_outbox (visita_id, clave, proximo_intento)
+                VALUES (NEW.id, 'visita-' || NEW.id, datetime('now', '+{GRACIA_OUTBOX} seconds'));
+            END
+        """)
+
+
+def _indice_agenda(cursor: sqlite3.Cursor):
+    """Índice de cobertura para la agenda de los técnicos.
+    
+    Con (semana, responsable, día) como prefijo, ``Database.agenda`` y
+    ``Database.agenda_semana`` se resuelven con una búsqueda en el índice y
+    sin ordenar: las columnas restantes cubren lo que leen de la asignación,
+    así que la tabla solo se toca para unir con ``clientes`` por su clave.
+    """
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_asignaciones_agenda
+        ON asignaciones_semanales(semana_inicio, responsable_id, dia_atencion,
+                                  cliente_id, realizada, precio, visita_id)
+    """)
+
+
+def _calendario(cursor: sqlite3.Cursor):
+    """Tabla calendario y claves enteras de día y semana.
+    
+    ``dia_clave`` (YYYYMMDD) en ``visitas`` y ``semana_clave`` (año y semana
+    ISO) en ``asignaciones_semanales`` son columnas generadas virtuales: no
+    ocupan espacio en la fila, se calculan igual escriba Python o el
+    servidor Node, y sus índices permiten rangos entre semanas y años sin
+    comparar texto (``fecha_visita`` a veces trae hora). La tabla parte con
+    unos años alrededor del actual; ``Database`` agrega el resto a pedido.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS calendario (
+            dia INTEGER PRIMARY KEY,
+            fecha TEXT NOT NULL UNIQUE,
+            anio INTEGER NOT NULL,
+            mes INTEGER NOT NULL,
+            mes_clave INTEGER NOT NULL,
+            dia_semana INTEGER NOT NULL,
+            nombre_dia TEXT NOT NULL,
+            semana_clave INTEGER NOT NULL,
+            semana_inicio TEXT NOT NULL,
+            feriado INTEGER NOT NULL DEFAULT 0,
+            nombre_feriado TEXT,
+            habil INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_calendario_semana ON calendario(semana_clave)")
+    calendario.poblar(cursor)
+    
+    asegurar_columna(cursor, 'visitas', 'dia_clave', (
+        "dia_clave INTEGER GENERATED ALWAYS AS "
+        f"({calendario.sql_clave_dia('fecha_visita')}) VIRTUAL"))
+    asegurar_columna(cursor, 'asignaciones_semanales', 'semana_clave', (
+        "semana_clave INTEGER GENERATED ALWAYS AS "
+        f"({calendario.sql_clave_semana('semana_inicio')}) VIRTUAL"))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_visitas_dia_clave ON visitas(dia_clave)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_asignaciones_semana_clave
+        ON asignaciones_semanales(semana_clave, responsable_id)
+    """)
+
+
+def _archivos_historicos(cursor: sqlite3.Cursor):
+    """Registro de las bases de archivo por año (ver ``archivo.py``).
+    
+    Guarda, además de los conteos, el rango de claves de día y de semana que
+    contiene cada archivo, para que las consultas históricas solo adjunten
+    los años que pueden tener filas del rango pedido. El índice de la bandeja
+    por visita permite elegir las visitas que ya no esperan envío a Odoo.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archivos_historicos (
+            anio INTEGER PRIMARY KEY,
+            archivo TEXT NOT NULL,
+            visitas INTEGER NOT NULL DEFAULT 0,
+            asignaciones INTEGER NOT NULL DEFAULT 0,
+            dia_desde INTEGER,
+            dia_hasta INTEGER,
+            semana_desde INTEGER,
+            semana_hasta INTEGER,
+            actualizado_at TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_visita ON odoo_outbox(visita_id, estado)")
+
+
+# Resumen semanal: los aportes de cada asignación y visita a su semana,
+# responsable y comuna. Lunes de una fecha 'YYYY-MM-DD' con la convención de
+# semana_inicio; la comuna es la del cliente al escribir la fila.
+_LUNES = "date({fecha}, 'weekday 0', '-6 days')"
+_COMUNA = "COALESCE((SELECT comuna FROM clientes WHERE id = {fila}.cliente_id), '')"
+COLUMNAS_RESUMEN = ("semana_inicio, responsable_id, comuna, asignadas, realizadas, "
+                    "monto_asignado, visitas, ingresos")
+_SUMAR = ", ".join(f"{c} = {c} + excluded.{c}" for c in COLUMNAS_RESUMEN.split(", ")[3:])
+
+
+def _upsert_resumen(fila: str, signo: str, semana: str, columnas: Dict[str, str]) -> str:
+    """Genera el UPSERT que suma (o resta) los aportes de una fila al resumen."""
+    nombres = ", ".join(columnas)
+    valores = ", ".join(f"{signo}({v})" for v in columnas.values())
+    sets = ", ".join(f"{c} = {c} + excluded.{c}" for c in columnas)
+    return f"""
+        INSERT INTO resumen_semanal (semana_inicio, responsable_id, comuna, {nombres})
+        VALUES ({semana}, COALESCE({fila}.responsable_id, 0), {_COMUNA.format(fila=fila)}, {valores})
+        ON CONFLICT (semana_inicio, responsable_id, comuna) DO UPDATE SET {sets};
+    """
+
+
+def aportes_resumen(comuna: str, signo: str = '', cliente: str = None) -> str:
+    """SELECT con los aportes al resumen por semana, responsable y comuna.
+    
+    ``comuna`` es la expresión de la comuna (``c`` es el cliente de cada
+    fila); con ``cliente`` solo se suman las filas de ese cliente.
+    """
+    filtro = f" WHERE cliente_id = {cliente}" if cliente else ""
+    return f"""
+        SELECT x.semana_inicio, x.responsable_id, {comuna},
+               {signo}SUM(x.asignadas), {signo}SUM(x.realizadas), {signo}SUM(x.monto_asignado),
+               {signo}SUM(x.visitas), {signo}SUM(x.ingresos)
+        FROM (
+            SELECT semana_inicio, COALESCE(responsable_id, 0) AS responsable_id, cliente_id,
+                   1 AS asignadas, realizada = 1 AS realizadas,
+                   COALESCE(precio, 0) AS monto_asignado, 0 AS visitas, 0 AS ingresos
+            FROM asignaciones_semanales{filtro}
+            UNION ALL
+            SELECT {_LUNES.format(fecha='fecha_visita')}, COALESCE(responsable_id, 0), cliente_id,
+                   0, 0, 0, realizada = 1,
+                   CASE WHEN realizada = 1 THEN COALESCE(precio, 0) ELSE 0 END
+            FROM visitas{filtro}
+        ) x
+        LEFT JOIN clientes c ON c.id = x.cliente_id
+        GROUP BY 1, 2, 3
+    """
+
+
+def _triggers_resumen(cursor: sqlite3.Cursor):
+    """Triggers que mantienen ``resumen_semanal`` en cada escritura.
+    
+    Los de actualización solo se disparan con las columnas que aportan al
+    resumen, así que marcar una visita en Odoo o editar notas no lo toca.
+    """
+    asignacion = lambda f: {
+        'asignadas': '1',
+        'realizadas': f'{f}.realizada = 1',
+        'monto_asignado': f'COALESCE({f}.precio, 0)',
+    }
+    visita = lambda f: {
+        'visitas': f'{f}.realizada = 1',
+        'ingresos': f'CASE WHEN {f}.realizada = 1 THEN COALESCE({f}.precio, 0) ELSE 0 END',
+    }
+    for tabla, columnas, semana, actualizadas in (
+        ('asignaciones_semanales', asignacion, "{f}.semana_inicio",
+         "realizada, precio, responsable_id, cliente_id, semana_inicio, dia_atencion"),
+        ('visitas', visita, _LUNES.format(fecha="{f}.fecha_visita"),
+         "realizada, precio, fecha_visita, responsable_id, cliente_id"),
+    ):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS resumen_{tabla}_ai AFTER INSERT ON {tabla} BEGIN
+                {_upsert_resumen('new', '+', semana.format(f='new'), columnas('new'))}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS resumen_{tabla}_ad AFTER DELETE ON {tabla} BEGIN
+                {_upsert_resumen('old', '-', semana.format(f='old'), columnas('old'))}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS resumen_{tabla}_au
+            AFTER UPDATE OF {actualizadas} ON {tabla} BEGIN
+                {_upsert_resumen('old', '-', semana.format(f='old'), columnas('old'))}
+                {_upsert_resumen('new', '+', semana.format(f='new'), columnas('new'))}
+            END
+        """)
+    # Si el cliente se cambia de comuna, sus aportes se mueven a la nueva
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS resumen_clientes_au AFTER UPDATE OF comuna ON clientes
+        WHEN COALESCE(old.comuna, '') <> COALESCE(new.comuna, '') BEGIN
+            INSERT INTO resumen_semanal ({COLUMNAS_RESUMEN})
+            {aportes_resumen("COALESCE(old.comuna, '')", '-', 'old.id')}
+            ON CONFLICT (semana_inicio, responsable_id, comuna) DO UPDATE SET {_SUMAR};
+            INSERT INTO resumen_semanal ({COLUMNAS_RESUMEN})
+            {aportes_resumen("COALESCE(new.comuna, '')", '', 'new.id')}
+            ON CONFLICT (semana_inicio, responsable_id, comuna) DO UPDATE SET {_SUMAR};
+        END
+    """)
+
+
+def _resumen_semanal(cursor: sqlite3.Cursor):
+    """Resumen semanal de facturación y productividad (ver ``reportes.py``).
+    
+    Una fila por semana, responsable y comuna, mantenida por triggers. Se
+    llena con el historial solo al crearla: después lo archivado deja de
+    estar en la base pero sigue contando en el resumen.
+    """
+    nueva = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumen_semanal'"
+    ).fetchone() is None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_semanal (
+            semana_inicio TEXT NOT NULL,
+            responsable_id INTEGER NOT NULL DEFAULT 0,
+            comuna TEXT NOT NULL DEFAULT '',
+            asignadas INTEGER NOT NULL DEFAULT 0,
+            realizadas INTEGER NOT NULL DEFAULT 0,
+            monto_asignado REAL NOT NULL DEFAULT 0,
+            visitas INTEGER NOT NULL DEFAULT 0,
+            ingresos REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (semana_inicio, responsable_id, comuna)
+        ) WITHOUT ROWID
+    """)
+    _triggers_resumen(cursor)
+    if nueva:
+        cursor.execute(f"""
+            INSERT INTO resumen_semanal ({COLUMNAS_RESUMEN})
+            {aportes_resumen("COALESCE(c.comuna, '')")}
+        """)
+
+
+# (versión, descripción, función). Agregar siempre al final con el número siguiente.
+MIGRACIONES: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "esquema inicial", _esquema_inicial),
+    (2, "origen de clientes importados desde Excel", _origen_excel),
+    (3, "índice por comuna", _indice_comuna),
+    (4, "búsqueda de texto completo de clientes", _indice_busqueda),
+    (5, "usuarios y columnas de Odoo del servidor Node", _columnas_node),
+    (6, "asignaciones múltiples por semana (una por día)", _multi_visita),
+    (7, "bandeja de salida para Odoo", _outbox_odoo),
+    (8, "índice de agenda por semana, responsable y día", _indice_agenda),
+    (9, "calendario y claves enteras de día y semana", _calendario),
+    (10, "archivos históricos por año e índice de la bandeja por visita", _archivos_historicos),
+    (11, "resumen semanal de facturación y productividad", _resumen_semanal),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def version_esquema(conn: sqlite3.Connection) -> int:
+    """Retorna la versión de esquema registrada en la base."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrar(conn: sqlite3.Connection, forzar: bool = False) -> List[int]:
+    """Aplica las migraciones pendientes y retorna las versiones aplicadas.
+    
+    La conexión debe estar en modo autocommit (``isolation_level=None``).
+    Con ``forzar=True`` se vuelven a ejecutar todas (son idempotentes).
+    """
+    version = 0 if forzar else version_esquema(conn)
+    if version == VERSION_ACTUAL:
+        return []
+    if version > VERSION_ACTUAL:
+        raise RuntimeError(
+            f"La base de datos tiene el esquema v{version}, más nuevo que el "
+            f"soportado por esta versión (v{VERSION_ACTUAL})"
+        )
+    
+    aplicadas = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Otro proceso pudo migrar mientras se esperaba el bloqueo
+        if not forzar:
+            version = version_esquema(conn)
+        cursor = conn.cursor()
+        for numero, _descripcion, funcion in MIGRACIONES:
+            if numero > version:
+                funcion(cursor)
+                aplicadas.append(numero)
+        cursor.execute(f"PRAGMA user_version = {VERSION_ACTUAL}")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return aplicadas
@@ -0,0 +1,108 @@
+"""
+Filas compactas para los resultados de consultas.
+
+``dict(row)`` crea un diccionario por fila (con su tabla hash) y obliga a
+materializar todo el resultado antes de usarlo. Los modelos de este módulo
+son tuplas con nombre: guardan solo los valores, comparten entre todas las
+filas de una consulta el mapa de columnas a posiciones y se construyen
+directamente desde el cursor, fila a fila.
+
+Como las columnas dependen de la consulta (``c.*`` cambia con las
+migraciones, y algunas consultas agregan ``responsable_nombre``), la clase
+concreta se genera según la descripción del cursor y se guarda para
+reutilizarla. Todas heredan de ``Cliente``, ``Responsable``, ``Visita`` o
+``Asignacion``, así que ``isinstance`` funciona igual.
+
+Son compatibles con el uso de diccionarios que ya hace el código:
+``fila['nombre']``, ``fila.get('comuna')``, ``'id' in fila``, ``keys()``,
+``items()`` y ``dict(fila)``. Además se leen como atributos
+(``fila.nombre``) y, al ser inmutables, se pueden compartir sin copiarlas.
+"""
+import sqlite3
+from collections import namedtuple
+from functools import lru_cache, partial
+from typing import Dict, Iterator, Tuple, Type
+
+
+class Fila(tuple):
+    """Base de los modelos: una tupla que también se consulta como diccionario."""
+    
+    __slots__ = ()
+    _columnas: Tuple[str, ...] = ()
+    _posiciones: Dict[str, int] = {}
+    
+    def __getitem__(self, clave):
+        if isinstance(clave, str):
+            try:
+                return tuple.__getitem__(self, self._posiciones[clave])
+            except KeyError:
+                raise KeyError(clave) from None
+        return tuple.__getitem__(self, clave)
+    
+    def __contains__(self, clave) -> bool:
+        # Como en un diccionario: 'in' pregunta por el nombre de la columna
+        return clave in self._posiciones
+    
+    def get(self, clave: str, defecto=None):
+        posicion = self._posiciones.get(clave)
+        return defecto if posicion is None else tuple.__getitem__(self, posicion)
+    
+    def keys(self):
+        return self._posiciones.keys()
+    
+    def values(self):
+        return [tuple.__getitem__(self, i) for i in self._posiciones.values()]
+    
+    def items(self):
+        return [(c, tuple.__getitem__(self, i)) for c, i in self._posiciones.items()]
+    
+    def a_dict(self) -> Dict:
+        """Copia la fila a un diccionario (por ejemplo para serializarla a JSON)."""
+        return {c: tuple.__getitem__(self, i) for c, i in self._posiciones.items()}
+
+
+class Cliente(Fila):
+    """Fila de ``clientes`` (más ``responsable_nombre`` cuando se une)."""
+    __slots__ = ()
+
+
+class Responsable(Fila):
+    """Fila de ``responsables``."""
+    __slots__ = ()
+
+
+class Visita(Fila):
+    """Fila de ``visitas`` (más los nombres de cliente y responsable)."""
+    __slots__ = ()
+
+
+class Asignacion(Fila):
+    """Fila de ``asignaciones_semanales`` (más los datos del cliente)."""
+    __slots__ = ()
+
+
+@lru_cache(maxsize=128)
+def modelo(base: Type[Fila], columnas: Tuple[str, ...]) -> Type[Fila]:
+    """Clase de filas de ``base`` para una lista concreta de columnas.
+    
+    Si una columna se repite, como en un diccionario, gana la última.
+    """
+    # rename=True tolera columnas repetidas o que no son identificadores
+    tupla = namedtuple(base.__name__, columnas, rename=True)
+    posiciones = {columna: i for i, columna in enumerate(columnas)}
+    return type(base.__name__, (base, tupla), {
+        '__slots__': (),
+        '_columnas': columnas,
+        '_posiciones': posiciones,
+    })
+
+
+def filas(cursor: sqlite3.Cursor, base: Type[Fila]) -> Iterator[Fila]:
+    """Itera el resultado de ``cursor`` como filas de ``base``, sin materializarlo.
+    
+    El cursor debe tener ``row_factory = None`` (filas como tuplas).
+    """
+    if cursor.description is None:
+        return iter(())
+    clase = modelo(base, tuple(d[0] for d in cursor.description))
+    return map(partial(tuple.__new__, clase), cursor)
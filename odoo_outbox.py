@@ -0,0 +1,567 @@
+"""
+Despacho a Odoo de la bandeja de salida de visitas (``odoo_outbox``).
+
+Cada visita realizada sin documento queda encolada por un trigger en la misma
+transacción que la registra (migración 7). La entrada vence recién tras
+``migraciones.GRACIA_OUTBOX`` segundos, para no adelantarse a la emisión en
+línea del servidor Node. ``DespachadorOutbox`` toma lotes de entradas
+vencidas, emite los documentos en paralelo con un límite de concurrencia y
+guarda el resultado: ``odoo_move_id`` en la visita si salió bien, o un
+reintento con espera exponencial si falló.
+
+El envío es idempotente: antes de crear un documento se busca en Odoo uno
+con la misma referencia (``Visita <id> - Cliente <id>``, la que usa también
+el servidor Node), de modo que un reintento tras un corte nunca duplica la
+factura.
+
+Uso:
+    python odoo_outbox.py despachar [--db piscinas.db] [--lote 50] [--concurrencia 4] [--continuo]
+    python odoo_outbox.py estado [--db piscinas.db]
+    python odoo_outbox.py encolar-pendientes [--db piscinas.db]
+    python odoo_outbox.py simulador [--port 8069] [--latencia-ms 50] [--fallos 0.1]
+
+La conexión a Odoo se configura con las mismas variables que ``odoo.js``
+(ODOO_URL, ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD, ODOO_PRODUCT_ID, ...).
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from socketserver import ThreadingMixIn
+from typing import Dict, List, Optional, Tuple
+from xmlrpc.server import MultiPathXMLRPCServer, SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+from database import Database
+
+
+class _Transporte(xmlrpc.client.Transport):
+    """Transporte XML-RPC con timeout de socket."""
+    
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+    
+    def make_connection(self, host):
+        conexion = super().make_connection(host)
+        conexion.timeout = self.timeout
+        return conexion
+
+
+class _TransporteSeguro(xmlrpc.client.SafeTransport):
+    """Transporte XML-RPC sobre HTTPS con timeout de socket."""
+    
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.timeout = timeout
+    
+    def make_connection(self, host):
+        conexion = super().make_connection(host)
+        conexion.timeout = self.timeout
+        return conexion
+
+
+class ClienteOdoo:
+    """Cliente XML-RPC de Odoo con las operaciones que necesita la emisión.
+    
+    Es seguro usarlo desde varios hilos: cada hilo tiene su propio proxy. El
+    uid y los ids de diario, producto y tipo de documento se resuelven una
+    sola vez.
+    """
+    
+    def __init__(self, url: str = None, base: str = None, usuario: str = None,
+                 clave: str = None, timeout: float = 30.0):
+        self.url = (url or os.environ.get('ODOO_URL', 'http://10.10.10.166:8086')).rstrip('/')
+        self.base = base or os.environ.get('ODOO_DB', 'pools')
+        self.usuario = usuario or os.environ.get('ODOO_USERNAME', 'admin')
+        self.clave = clave or os.environ.get('ODOO_PASSWORD', 'admin')
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._uid = None
+        self._ids: Dict[str, Optional[int]] = {}
+    
+    def _proxy(self, servicio: str) -> xmlrpc.client.ServerProxy:
+        proxies = getattr(self._local, 'proxies', None)
+        if proxies is None:
+            proxies = self._local.proxies = {}
+        if servicio not in proxies:
+            transporte = (_TransporteSeguro if self.url.startswith('https') else _Transporte)(self.timeout)
+            proxies[servicio] = xmlrpc.client.ServerProxy(
+                f"{self.url}/xmlrpc/2/{servicio}", transport=transporte, allow_none=True)
+        return proxies[servicio]
+    
+    def uid(self) -> int:
+        """Autentica una vez y retorna el uid."""
+        if self._uid is None:
+            uid = self._proxy('common').authenticate(self.base, self.usuario, self.clave, {})
+            if not uid:
+                raise RuntimeError("Falló la autenticación en Odoo (uid vacío). "
+                                   "Revisa ODOO_DB/ODOO_USERNAME/ODOO_PASSWORD")
+            self._uid = uid
+        return self._uid
+    
+    def execute_kw(self, modelo: str, metodo: str, args: list, kwargs: Dict = None):
+        return self._proxy('object').execute_kw(
+            self.base, self.uid(), self.clave, modelo, metodo, args, kwargs or {})
+    
+    def _buscar_uno(self, modelo: str, dominio: list) -> Optional[int]:
+        ids = self.execute_kw(modelo, 'search', [dominio], {'limit': 1})
+        return ids[0] if ids else None
+    
+    def _id_cacheado(self, clave: str, resolver) -> Optional[int]:
+        with self._lock:
+            if clave in self._ids:
+                return self._ids[clave]
+        valor = resolver()
+        with self._lock:
+            self._ids[clave] = valor
+        return valor
+    
+    @staticmethod
+    def tipo_documento(cliente: Dict) -> str:
+        tipo = (cliente.get('documento_tipo') or 'invoice').lower()
+        return tipo if tipo in ('factura', 'boleta') else 'invoice'
+    
+    def asegurar_partner(self, cliente: Dict) -> int:
+        """Busca el partner del cliente (RUT, email o nombre+dirección) o lo crea."""
+        if cliente.get('odoo_partner_id'):
+            return cliente['odoo_partner_id']
+        factura = self.tipo_documento(cliente) == 'factura' and any(
+            cliente.get(c) for c in ('factura_razon_social', 'factura_rut',
+                                     'factura_direccion', 'factura_email'))
+        
+        def dato(campo_factura: str, campo: str):
+            if factura and cliente.get(campo_factura):
+                return cliente[campo_factura]
+            return cliente.get(campo) or False
+        
+        empresa = bool(factura and cliente.get('factura_razon_social'))
+        valores = {
+            'name': dato('factura_razon_social', 'nombre') or 'Sin nombre',
+            'vat': dato('factura_rut', 'rut'),
+            'email': dato('factura_email', 'email'),
+            'phone': cliente.get('celular') or False,
+            'street': dato('factura_direccion', 'direccion'),
+            'city': dato('factura_comuna', 'comuna'),
+            'is_company': empresa,
+            'company_type': 'company' if empresa else 'person',
+        }
+        if valores['vat']:
+            dominio = [['vat', '=', valores['vat']]]
+        elif valores['email']:
+            dominio = [['email', '=', valores['email']]]
+        else:
+            dominio = [['name', '=', cliente.get('nombre') or ''], ['street', '=', valores['street'] or '']]
+        partner_id = self._buscar_uno('res.partner', dominio)
+        if partner_id:
+            return partner_id
+        return self.execute_kw('res.partner', 'create', [valores])
+    
+    def _diario(self, tipo: str) -> int:
+        def resolver():
+            if tipo == 'invoice':
+                nombre = os.environ.get('ODOO_JOURNAL_INVOICE_NAME', 'Documento Interno')
+                return self._buscar_uno('account.journal', [['name', '=', nombre]])
+            nombre = os.environ.get('ODOO_JOURNAL_SALES_NAME', 'Ventas')
+            return (self._buscar_uno('account.journal', [['name', '=', nombre], ['type', '=', 'sale']])
+                    or self._buscar_uno('account.journal', [['name', 'ilike', nombre], ['type', '=', 'sale']]))
+        
+        variable = 'ODOO_JOURNAL_INVOICE_ID' if tipo == 'invoice' else 'ODOO_JOURNAL_SALES_ID'
+        if os.environ.get(variable):
+            return int(os.environ[variable])
+        diario = self._id_cacheado(f'diario:{tipo}', resolver)
+        if not diario:
+            raise RuntimeError(f"No se encontró el diario de Odoo para {tipo}")
+        return diario
+    
+    def _producto(self) -> int:
+        if os.environ.get('ODOO_PRODUCT_ID'):
+            return int(os.environ['ODOO_PRODUCT_ID'])
+        nombre = os.environ.get('ODOO_PRODUCT_NAME', 'Servicio semanal de mantención de piscina')
+        producto = self._id_cacheado(
+            'producto', lambda: self._buscar_uno('product.product', [['name', '=', nombre]]))
+        if not producto:
+            raise RuntimeError(f"No se encontró el producto '{nombre}' en Odoo. "
+                               f"Configura ODOO_PRODUCT_ID")
+        return producto
+    
+    def _tipo_documento_latam(self, tipo: str) -> Optional[int]:
+        codigo = {'factura': '33', 'boleta': '39'}.get(tipo)
+        if not codigo:
+            return None
+        variable = f'ODOO_DOC_TYPE_{tipo.upper()}_ID'
+        if os.environ.get(variable):
+            return int(os.environ[variable])
+        return self._id_cacheado(f'documento:{codigo}', lambda: self._buscar_uno(
+            'l10n_latam.document.type', [['code', '=', codigo]]))
+    
+    def emitir_factura(self, cliente: Dict, visita: Dict, partner_id: int) -> Dict:
+        """Emite y publica el documento de una visita, o retorna el ya existente."""
+        referencia = f"Visita {visita['id']} - Cliente {cliente['id']}"
+        move_id = self._buscar_uno('account.move', [['ref', '=', referencia],
+                                                     ['move_type', '=', 'out_invoice']])
+        reutilizado = move_id is not None
+        if not reutilizado:
+            tipo = self.tipo_documento(cliente)
+            precio = cliente.get('precio_por_visita')
+            valores = {
+                'move_type': 'out_invoice',
+                'partner_id': partner_id,
+                'journal_id': self._diario(tipo),
+                'invoice_date': date.today().isoformat(),
+                'ref': referencia,
+                'invoice_line_ids': [[0, 0, {
+                    'name': os.environ.get('ODOO_SERVICE_NAME', 'Servicio semanal de mantención de piscina'),
+                    'product_id': self._producto(),
+                    'quantity': 1,
+                    'price_unit': float(precio if precio is not None else visita.get('precio') or 0),
+                }]],
+            }
+            documento = self._tipo_documento_latam(tipo)
+            if documento:
+                valores['l10n_latam_document_type_id'] = documento
+            move_id = self.execute_kw('account.move', 'create', [valores])
+        
+        move = self.execute_kw('account.move', 'read',
+                               [[move_id], ['name', 'state', 'payment_state']])[0]
+        if move.get('state') == 'draft':
+            self.execute_kw('account.move', 'action_post', [[move_id]])
+            move = self.execute_kw('account.move', 'read',
+                                   [[move_id], ['name', 'state', 'payment_state']])[0]
+        return {'move_id': move_id, 'name': move.get('name'),
+                'payment_state': move.get('payment_state'), 'reutilizado': reutilizado}
+
+
+class DespachadorOutbox:
+    """Envía a Odoo las entradas pendientes de ``odoo_outbox``.
+    
+    Al reclamar un lote, cada entrada queda "arrendada" (su próximo intento
+    se corre ``arriendo`` segundos) para que otro despachador no la tome;
+    si el proceso muere, la entrada vuelve a estar disponible al vencer.
+    """
+    
+    def __init__(self, db: Database, odoo: ClienteOdoo, tamano_lote: int = 50,
+                 concurrencia: int = 4, max_intentos: int = 8, espera_base: float = 30.0,
+                 espera_max: float = 3600.0, arriendo: float = 300.0):
+        self.db = db
+        self.odoo = odoo
+        self.tamano_lote = tamano_lote
+        self.concurrencia = concurrencia
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.arriendo = arriendo
+    
+    def espera(self, intentos: int) -> float:
+        """Segundos hasta el próximo intento: exponencial, con tope y algo de azar."""
+        base = min(self.espera_max, self.espera_base * 2 ** max(0, intentos - 1))
+        return base * random.uniform(0.8, 1.2)
+    
+    def reclamar(self) -> List[Dict]:
+        """Toma un lote de entradas vencidas junto con su visita y cliente."""
+        with self.db.transaction() as conn:
+            filas = conn.execute("""
+                SELECT o.id AS outbox_id, o.clave, o.intentos,
+                       v.id AS visita_id, v.precio AS visita_precio,
+                       v.odoo_move_id, c.*
+                FROM odoo_outbox o
+                JOIN visitas v ON v.id = o.visita_id
+                JOIN clientes c ON c.id = v.cliente_id
+                WHERE o.estado = 'pendiente' AND o.proximo_intento <= datetime('now')
+                ORDER BY o.proximo_intento, o.id
+                LIMIT ?
+            """, (self.tamano_lote,)).fetchall()
+            if filas:
+                conn.execute(f"""
+                    UPDATE odoo_outbox
+                    SET intentos = intentos + 1,
+                        proximo_intento = datetime('now', '+{int(self.arriendo)} seconds')
+                    WHERE id IN ({','.join('?' * len(filas))})
+                """, [f['outbox_id'] for f in filas])
+        return [dict(f) for f in filas]
+    
+    def _enviar(self, entrada: Dict) -> Tuple[Dict, Optional[Dict], Optional[str]]:
+        """Emite una entrada; retorna (entrada, resultado, error)."""
+        if entrada['odoo_move_id']:
+            # Ya emitida por otra vía (p. ej. el servidor Node)
+            return entrada, {'move_id': entrada['odoo_move_id'], 'ya_emitida': True}, None
+        # La entrada trae las columnas del cliente (su ``id`` es el del cliente)
+        visita = {'id': entrada['visita_id'], 'precio': entrada['visita_precio']}
+        try:
+            partner_id = self.odoo.asegurar_partner(entrada)
+            resultado = self.odoo.emitir_factura(entrada, visita, partner_id)
+            resultado['partner_id'] = partner_id
+            return entrada, resultado, None
+        except Exception as e:
+            # Cualquier falla de una entrada se reintenta sin cortar el lote
+            return entrada, None, str(e) or type(e).__name__
+    
+    def _guardar(self, resultados: List[Tuple[Dict, Optional[Dict], Optional[str]]]) -> Dict[str, int]:
+        """Guarda el resultado del lote en una transacción."""
+        ahora = datetime.now().isoformat()
+        conteo = {'enviadas': 0, 'reintentos': 0, 'fallidas': 0}
+        with self.db.transaction() as conn:
+            for entrada, resultado, error in resultados:
+                if error is None:
+                    conteo['enviadas'] += 1
+                    conn.execute("""
+                        UPDATE odoo_outbox SET estado = 'enviado', enviado_at = datetime('now'),
+                               ultimo_error = NULL
+                        WHERE id = ?
+                    """, (entrada['outbox_id'],))
+                    if resultado.get('ya_emitida'):
+                        continue
+                    conn.execute("""
+                        UPDATE visitas SET odoo_move_id = ?, odoo_move_name = ?,
+                               odoo_payment_state = ?, odoo_last_sync = ?, odoo_error = NULL
+                        WHERE id = ?
+                    """, (resultado['move_id'], resultado['name'], resultado['payment_state'],
+                          ahora, entrada['visita_id']))
+                    conn.execute("""
+                        UPDATE clientes SET odoo_partner_id = ?, odoo_last_sync = ?
+                        WHERE id = ? AND odoo_partner_id IS NULL
+                    """, (resultado['partner_id'], ahora, entrada['id']))
+                    continue
+                
+                intentos = entrada['intentos'] + 1
+                if intentos >= self.max_intentos:
+                    conteo['fallidas'] += 1
+                    conn.execute("""
+                        UPDATE odoo_outbox SET estado = 'error', ultimo_error = ? WHERE id = ?
+                    """, (error, entrada['outbox_id']))
+                else:
+                    conteo['reintentos'] += 1
+                    conn.execute(f"""
+                        UPDATE odoo_outbox SET ultimo_error = ?,
+                               proximo_intento = datetime('now', '+{int(self.espera(intentos))} seconds')
+                        WHERE id = ?
+                    """, (error, entrada['outbox_id']))
+                conn.execute("""
+                    UPDATE visitas SET odoo_error = ?, odoo_last_sync = ? WHERE id = ?
+                """, (error, ahora, entrada['visita_id']))
+        return conteo
+    
+    def procesar(self, continuo: bool = False, intervalo: float = 5.0) -> Dict[str, float]:
+        """Despacha lotes hasta vaciar las entradas vencidas.
+        
+        Con ``continuo`` sigue esperando entradas nuevas cada ``intervalo``
+        segundos hasta que se interrumpa.
+        """
+        totales = {'lotes': 0, 'enviadas': 0, 'reintentos': 0, 'fallidas': 0}
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix='odoo') as pool:
+            try:
+                while True:
+                    lote = self.reclamar()
+                    if not lote:
+                        if not continuo:
+                            break
+                        time.sleep(intervalo)
+                        continue
+                    conteo = self._guardar(list(pool.map(self._enviar, lote)))
+                    totales['lotes'] += 1
+                    for clave, valor in conteo.items():
+                        totales[clave] += valor
+            except KeyboardInterrupt:
+                pass
+        segundos = time.perf_counter() - inicio
+        totales['segundos'] = segundos
+        totales['por_segundo'] = totales['enviadas'] / segundos if segundos else 0.0
+        totales.update(self.estado())
+        return totales
+    
+    def estado(self) -> Dict[str, float]:
+        """Profundidad de la cola: entradas por estado, vencidas y antigüedad."""
+        conn = self.db.get_connection()
+        estado = {'pendientes': 0, 'enviado': 0, 'error': 0}
+        for fila in conn.execute("SELECT estado, COUNT(*) FROM odoo_outbox GROUP BY estado"):
+            estado['pendientes' if fila[0] == 'pendiente' else fila[0]] = fila[1]
+        fila = conn.execute("""
+            SELECT SUM(proximo_intento <= datetime('now')),
+                   (julianday('now') - julianday(MIN(created_at))) * 86400
+            FROM odoo_outbox WHERE estado = 'pendiente'
+        """).fetchone()
+        estado['vencidas'] = fila[0] or 0
+        estado['antiguedad_s'] = fila[1] or 0.0
+        return estado
+
+
+def encolar_pendientes(db: Database) -> int:
+    """Encola las visitas realizadas anteriores a la bandeja que aún no tienen documento.
+    
+    Reemplaza la búsqueda de ``scripts/enviar-odoo-pendientes.js``; las
+    visitas con error registrado se omiten, igual que allí.
+    """
+    with db.transaction() as conn:
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO odoo_outbox (visita_id, clave)
+            SELECT id, 'visita-' || id FROM visitas
+            WHERE realizada = 1 AND odoo_move_id IS NULL
+              AND (odoo_error IS NULL OR odoo_error = '')
+        """)
+    return cursor.rowcount
+
+
+class SimuladorOdoo:
+    """Imitación mínima en memoria de la API XML-RPC de Odoo, para pruebas locales.
+    
+    Atiende ``authenticate`` y ``execute_kw`` con search/read/create/write y
+    ``action_post``, con dominios simples (``=`` e ``ilike``). Puede agregar
+    latencia y fallar al azar una fracción ``tasa_fallos`` de las llamadas.
+    """
+    
+    def __init__(self, latencia_ms: float = 0.0, tasa_fallos: float = 0.0, semilla: int = None):
+        self.latencia = latencia_ms / 1000.0
+        self.tasa_fallos = tasa_fallos
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.llamadas = 0
+        self.registros: Dict[str, Dict[int, Dict]] = {}
+        self._siguiente = 1
+        self._crear('account.journal', {'name': 'Ventas', 'type': 'sale'})
+        self._crear('account.journal', {'name': 'Documento Interno', 'type': 'general'})
+        self._crear('product.product', {'name': 'Servicio semanal de mantención de piscina'})
+        self._crear('l10n_latam.document.type', {'code': '33'})
+        self._crear('l10n_latam.document.type', {'code': '39'})
+    
+    def _crear(self, modelo: str, valores: Dict) -> int:
+        nuevo = self._siguiente
+        self._siguiente += 1
+        registro = dict(valores, id=nuevo)
+        if modelo == 'account.move':
+            registro.update(name=f"INV/{date.today().year}/{nuevo:05d}",
+                            state='draft', payment_state='not_paid')
+        self.registros.setdefault(modelo, {})[nuevo] = registro
+        return nuevo
+    
+    @staticmethod
+    def _cumple(registro: Dict, dominio: list) -> bool:
+        for campo, operador, valor in dominio:
+            actual = registro.get(campo)
+            if operador == '=' and actual != valor:
+                return False
+            if operador == 'ilike' and str(valor).lower() not in str(actual or '').lower():
+                return False
+        return True
+    
+    def authenticate(self, base, usuario, clave, contexto):
+        return 2
+    
+    def execute_kw(self, base, uid, clave, modelo, metodo, args, kwargs=None):
+        kwargs = kwargs or {}
+        if self.latencia:
+            time.sleep(self.latencia)
+        with self._lock:
+            self.llamadas += 1
+            if self.tasa_fallos and self._azar.random() < self.tasa_fallos:
+                raise RuntimeError("Fallo simulado de Odoo")
+            tabla = self.registros.setdefault(modelo, {})
+            if metodo == 'search':
+                ids = [i for i, r in tabla.items() if self._cumple(r, args[0])]
+                return ids[:kwargs['limit']] if kwargs.get('limit') else ids
+            if metodo == 'read':
+                campos = args[1] if len(args) > 1 else kwargs.get('fields')
+                return [{c: tabla[i].get(c, False) for c in ['id'] + list(campos or tabla[i])}
+                        for i in args[0] if i in tabla]
+            if metodo == 'create':
+                return self._crear(modelo, args[0])
+            if metodo == 'write':
+                for i in args[0]:
+                    tabla[i].update(args[1])
+                return True
+            if metodo == 'action_post':
+                for i in args[0]:
+                    tabla[i]['state'] = 'posted'
+                return True
+        raise ValueError(f"Método no soportado por el simulador: {modelo}.{metodo}")
+
+
+class _RutasOdoo(SimpleXMLRPCRequestHandler):
+    rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+
+
+class _ServidorSimulador(ThreadingMixIn, MultiPathXMLRPCServer):
+    daemon_threads = True
+
+
+def iniciar_simulador(host: str = '127.0.0.1', port: int = 8069,
+                      simulador: SimuladorOdoo = None) -> _ServidorSimulador:
+    """Levanta el simulador en un hilo y retorna el servidor (``shutdown()`` para detenerlo)."""
+    simulador = simulador or SimuladorOdoo()
+    servidor = _ServidorSimulador((host, port), requestHandler=_RutasOdoo,
+                                  logRequests=False, allow_none=True)
+    for servicio, funciones in (('common', ['authenticate']), ('object', ['execute_kw'])):
+        despachador = SimpleXMLRPCDispatcher(allow_none=True)
+        for nombre in funciones:
+            despachador.register_function(getattr(simulador, nombre), nombre)
+        servidor.add_dispatcher(f'/xmlrpc/2/{servicio}', despachador)
+    servidor.simulador = simulador
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def imprimir_estado(estado: Dict[str, float]):
+    print(f"  Pendientes: {estado['pendientes']} ({estado['vencidas']} vencidas, "
+          f"la más antigua de hace {estado['antiguedad_s'] / 60:.1f} min)")
+    print(f"  Enviadas: {estado['enviado']}  Con error definitivo: {estado['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandeja de salida de visitas hacia Odoo")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_desp = sub.add_parser('despachar', help="Envía las entradas pendientes")
+    p_desp.add_argument('--db', default='piscinas.db')
+    p_desp.add_argument('--lote', type=int, default=50)
+    p_desp.add_argument('--concurrencia', type=int, default=4)
+    p_desp.add_argument('--max-intentos', type=int, default=8)
+    p_desp.add_argument('--continuo', action='store_true', help="Seguir esperando entradas nuevas")
+    
+    p_est = sub.add_parser('estado', help="Muestra la profundidad de la cola")
+    p_est.add_argument('--db', default='piscinas.db')
+    
+    p_enc = sub.add_parser('encolar-pendientes', help="Encola visitas anteriores sin documento")
+    p_enc.add_argument('--db', default='piscinas.db')
+    
+    p_sim = sub.add_parser('simulador', help="Levanta un Odoo simulado para pruebas")
+    p_sim.add_argument('--host', default='127.0.0.1')
+    p_sim.add_argument('--port', type=int, default=8069)
+    p_sim.add_argument('--latencia-ms', type=float, default=0.0)
+    p_sim.add_argument('--fallos', type=float, default=0.0, help="Fracción de llamadas que fallan")
+    
+    args = parser.parse_args()
+    if args.comando == 'simulador':
+        servidor = iniciar_simulador(args.host, args.port,
+                                     SimuladorOdoo(args.latencia_ms, args.fallos))
+        print(f"✓ Odoo simulado en http://{args.host}:{args.port} (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            servidor.shutdown()
+        return
+    
+    db = Database(args.db)
+    try:
+        if args.comando == 'encolar-pendientes':
+            print(f"✓ {encolar_pendientes(db)} visitas encoladas")
+        elif args.comando == 'estado':
+            imprimir_estado(DespachadorOutbox(db, None).estado())
+        else:
+            despachador = DespachadorOutbox(db, ClienteOdoo(), args.lote, args.concurrencia,
+                                            args.max_intentos)
+            r = despachador.procesar(continuo=args.continuo)
+            print(f"✓ {r['enviadas']} documentos emitidos en {r['segundos']:.1f}s "
+                  f"({r['por_segundo']:.1f}/s, {r['lotes']} lotes)")
+            print(f"  Reintentos programados: {r['reintentos']}  Fallidas: {r['fallidas']}")
+            imprimir_estado(r)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
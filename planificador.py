@@ -0,0 +1,375 @@
+"""
+Balance de carga de clientes entre responsables y días de atención.
+
+``clientes.responsable_id`` y ``clientes.dia_atencion`` se fijan a mano, y
+con el tiempo algunos técnicos quedan con días sobrecargados. ``Planificador``
+propone una nueva distribución de los clientes activos en casillas
+(responsable, día) que:
+
+1. respeta una capacidad máxima de clientes por técnico y día,
+2. mantiene juntos en un mismo día los clientes de una comuna de cada
+   técnico, para acortar los traslados, y
+3. mueve la menor cantidad posible de clientes respecto del plan actual.
+
+Funciona en dos pasos, ambos codiciosos y deterministas:
+
+- Por técnico: si un técnico supera su capacidad semanal, cede exactamente
+  el exceso empezando por sus comunas más chicas. Los clientes cedidos y
+  los que no tienen responsable van a los técnicos con cupo, prefiriendo a
+  quienes ya atienden esa comuna.
+- Por día: las comunas de cada técnico, de la más grande a la más chica, van
+  al día donde ya está la mayoría de sus clientes si caben enteras; si no,
+  al día donde más clientes quedan en su lugar, y solo si no caben en
+  ningún día se reparten.
+
+El resultado es un diff (lista de cambios) que se puede revisar, guardar en
+JSON y aplicar después, incluso regenerando las asignaciones pendientes de
+una semana.
+
+Uso:
+    python planificador.py planificar [--db piscinas.db] [--capacidad N] [--guardar cambios.json] [--aplicar]
+    python planificador.py aplicar cambios.json [--db piscinas.db] [--semana YYYY-MM-DD]
+"""
+import argparse
+import json
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from database import Database, DIAS_SEMANA, normalizar_texto
+
+# Días en que se atiende por defecto (de lunes a sábado)
+DIAS_ATENCION = DIAS_SEMANA[:6]
+
+
+class Planificador:
+    """Calcula una redistribución de clientes en casillas (responsable, día)."""
+    
+    def __init__(self, db: Database, dias: Sequence[str] = DIAS_ATENCION,
+                 capacidad: Optional[int] = None, holgura: float = 0.1):
+        """``capacidad`` es el máximo de clientes por técnico y día.
+        
+        Si no se indica, se usa el promedio necesario para atender a todos
+        los clientes más una ``holgura`` (10% por defecto).
+        """
+        self.db = db
+        self.dias = list(dias)
+        self.capacidad = capacidad
+        self.holgura = holgura
+        self._dias_normalizados = {normalizar_texto(d): d for d in self.dias}
+    
+    def _dia(self, valor) -> Optional[str]:
+        """Nombre canónico del día ('miercoles' -> 'Miércoles'), o None si no es de atención."""
+        return self._dias_normalizados.get(normalizar_texto(valor))
+    
+    def planificar(self) -> Dict:
+        """Calcula el plan sin modificar la base.
+        
+        Retorna un diccionario con ``cambios`` (uno por cliente que cambia de
+        responsable o de día), la ``capacidad`` usada, la carga por casilla
+        antes y después y un ``resumen`` con los indicadores principales.
+        """
+        inicio = time.perf_counter()
+        tecnicos = {r['id']: r['nombre'] for r in self.db.obtener_responsables(compactas=True)}
+        if not tecnicos:
+            raise ValueError("No hay responsables activos para repartir los clientes")
+        clientes = [{
+            'id': c['id'],
+            'nombre': c['nombre'],
+            'comuna': c['comuna'],
+            'clave_comuna': normalizar_texto(c['comuna']),
+            'responsable_id': c['responsable_id'] if c['responsable_id'] in tecnicos else None,
+            'dia': self._dia(c['dia_atencion']),
+            'responsable_original': c['responsable_id'],
+            'dia_original': c['dia_atencion'],
+        } for c in self.db.recorrer_clientes(orden='id')]
+        actual = {c['id']: (c['responsable_id'], c['dia']) for c in clientes}
+        
+        casillas = len(tecnicos) * len(self.dias)
+        capacidad = self.capacidad or max(1, math.ceil(len(clientes) / casillas * (1 + self.holgura)))
+        if capacidad * casillas < len(clientes):
+            raise ValueError(f"Capacidad insuficiente: {len(clientes)} clientes para "
+                             f"{casillas} casillas de {capacidad}")
+        
+        por_tecnico = self._repartir_tecnicos(clientes, tecnicos, capacidad * len(self.dias))
+        plan: Dict[int, Tuple[int, str]] = {}
+        for tecnico_id, propios in por_tecnico.items():
+            plan.update(self._repartir_dias(tecnico_id, propios, capacidad))
+        
+        cambios = []
+        for c in clientes:
+            responsable_id, dia = plan[c['id']]
+            # Un día escrito distinto ('miercoles') no cuenta como cambio
+            if responsable_id != c['responsable_original'] or dia != actual[c['id']][1]:
+                cambios.append({
+                    'cliente_id': c['id'],
+                    'cliente_nombre': c['nombre'],
+                    'comuna': c['comuna'],
+                    'de_responsable_id': c['responsable_original'],
+                    'de_dia': c['dia_original'],
+                    'a_responsable_id': responsable_id,
+                    'a_dia': dia,
+                    'responsable_nombre': tecnicos[responsable_id],
+                })
+        
+        antes = self._carga(actual.values())
+        despues = self._carga(plan.values())
+        return {
+            'capacidad': capacidad,
+            'dias': self.dias,
+            'cambios': cambios,
+            'carga_antes': antes,
+            'carga_despues': despues,
+            'resumen': {
+                'clientes': len(clientes),
+                'movidos': len(cambios),
+                'cambian_responsable': sum(
+                    1 for c in cambios if c['de_responsable_id'] != c['a_responsable_id']),
+                'maximo_antes': max(antes.values(), default=0),
+                'maximo_despues': max(despues.values(), default=0),
+                'sobre_capacidad_antes': sum(1 for v in antes.values() if v > capacidad),
+                'comunas_divididas_antes': self._comunas_divididas(clientes, actual),
+                'comunas_divididas_despues': self._comunas_divididas(clientes, plan),
+                'segundos': round(time.perf_counter() - inicio, 3),
+            },
+        }
+    
+    @staticmethod
+    def _carga(casillas) -> Dict[str, int]:
+        """Clientes por casilla 'responsable_id|día' (las incompletas cuentan aparte)."""
+        carga = Counter(f"{r or 'sin responsable'}|{d or 'sin día'}" for r, d in casillas)
+        return dict(sorted(carga.items()))
+    
+    @staticmethod
+    def _comunas_divididas(clientes: List[Dict], plan: Dict[int, Tuple]) -> int:
+        """Pares (técnico, comuna) cuyos clientes quedan en más de un día."""
+        dias = defaultdict(set)
+        for c in clientes:
+            responsable_id, dia = plan[c['id']]
+            if responsable_id is not None:
+                dias[(responsable_id, c['clave_comuna'])].add(dia)
+        return sum(1 for d in dias.values() if len(d) > 1)
+    
+    # Paso 1: clientes por técnico
+    def _repartir_tecnicos(self, clientes: List[Dict], tecnicos: Dict[int, str],
+                           maximo: int) -> Dict[int, List[Dict]]:
+        por_tecnico: Dict[int, List[Dict]] = {t: [] for t in tecnicos}
+        sin_tecnico = []
+        for c in clientes:
+            if c['responsable_id'] is None:
+                sin_tecnico.append(c)
+            else:
+                por_tecnico[c['responsable_id']].append(c)
+        
+        # Cada técnico excedido cede justo el exceso, de sus comunas más chicas
+        for propios in por_tecnico.values():
+            exceso = len(propios) - maximo
+            if exceso <= 0:
+                continue
+            comunas = defaultdict(list)
+            for c in propios:
+                comunas[c['clave_comuna']].append(c)
+            cedidos, enteras = [], []
+            for grupo in sorted(comunas.values(), key=len):
+                if len(grupo) <= exceso - len(cedidos):
+                    cedidos.extend(grupo)
+                else:
+                    enteras.append(grupo)
+            if len(cedidos) < exceso:
+                # Falta ceder una parte de una comuna: la más chica que alcance,
+                # empezando por sus clientes que no tienen día
+                grupo = sorted(enteras[0], key=lambda c: c['dia'] is not None)
+                cedidos.extend(grupo[:exceso - len(cedidos)])
+            ids = {c['id'] for c in cedidos}
+            propios[:] = [c for c in propios if c['id'] not in ids]
+            sin_tecnico.extend(cedidos)
+        
+        # Los clientes sin técnico van, por comuna, a quien ya atiende esa comuna
+        atiende = defaultdict(Counter)
+        for tecnico_id, propios in por_tecnico.items():
+            for c in propios:
+                atiende[c['clave_comuna']][tecnico_id] += 1
+        pendientes = defaultdict(list)
+        for c in sin_tecnico:
+            pendientes[c['clave_comuna']].append(c)
+        for comuna, grupo in sorted(pendientes.items(), key=lambda x: (-len(x[1]), x[0])):
+            while grupo:
+                libres = {t: maximo - len(p) for t, p in por_tecnico.items() if len(p) < maximo}
+                tecnico_id = max(libres, key=lambda t: (atiende[comuna][t], libres[t], -t))
+                tomados, grupo = grupo[:libres[tecnico_id]], grupo[libres[tecnico_id]:]
+                for c in tomados:
+                    c['responsable_id'] = tecnico_id
+                    c['dia'] = None
+                por_tecnico[tecnico_id].extend(tomados)
+                atiende[comuna][tecnico_id] += len(tomados)
+        return por_tecnico
+    
+    # Paso 2: días de cada técnico
+    def _repartir_dias(self, tecnico_id: int, propios: List[Dict],
+                       capacidad: int) -> Dict[int, Tuple[int, str]]:
+        comunas = defaultdict(list)
+        for c in propios:
+            comunas[c['clave_comuna']].append(c)
+        libres = {d: capacidad for d in self.dias}
+        plan = {}
+        for _, grupo in sorted(comunas.items(), key=lambda x: (-len(x[1]), x[0])):
+            actuales = Counter(c['dia'] for c in grupo if c['dia'])
+            orden = sorted(self.dias, key=lambda d: (-actuales[d], -libres[d], self.dias.index(d)))
+            # Entera en el día con más clientes ya ubicados donde quepa
+            enteros = [d for d in orden if libres[d] >= len(grupo)]
+            if enteros:
+                destinos = [enteros[0]]
+            else:
+                destinos = [d for d in orden if libres[d] > 0]
+            # Primero quedan en su lugar los que ya están en un día de destino;
+            # después, los demás llenan los cupos en el orden de preferencia
+            restantes = []
+            for c in grupo:
+                if c['dia'] in destinos and libres[c['dia']] > 0:
+                    plan[c['id']] = (tecnico_id, c['dia'])
+                    libres[c['dia']] -= 1
+                else:
+                    restantes.append(c)
+            for dia in destinos:
+                tomados, restantes = restantes[:libres[dia]], restantes[libres[dia]:]
+                for c in tomados:
+                    plan[c['id']] = (tecnico_id, dia)
+                libres[dia] -= len(tomados)
+        return plan
+
+
+def aplicar(db: Database, cambios: List[Dict], semana_inicio: str = None) -> Dict[str, int]:
+    """Aplica un diff de ``Planificador.planificar`` en una sola transacción.
+    
+    Cada cambio se aplica solo si el cliente sigue con el responsable y día
+    de origen; si alguien lo editó entretanto, se cuenta como conflicto y se
+    deja como está. Con ``semana_inicio``, las asignaciones pendientes de esa
+    semana de los clientes movidos se rehacen con el nuevo plan (las ya
+    realizadas no se tocan).
+    """
+    resultado = {'actualizados': 0, 'conflictos': 0, 'asignaciones': 0}
+    ahora = datetime.now().isoformat()
+    movidos = []
+    with db.transaction() as conn:
+        # Se invalida de nuevo al confirmar: un lector que recargue la caché
+        # mientras dura la transacción todavía ve los datos anteriores
+        db._invalidar_cache()
+        for cambio in cambios:
+            cursor = conn.execute("""
+                UPDATE clientes SET responsable_id = ?, dia_atencion = ?, updated_at = ?
+                WHERE id = ? AND responsable_id IS ? AND dia_atencion IS ?
+            """, (cambio['a_responsable_id'], cambio['a_dia'], ahora, cambio['cliente_id'],
+                  cambio['de_responsable_id'], cambio['de_dia']))
+            if cursor.rowcount:
+                movidos.append((cambio['cliente_id'],))
+            else:
+                resultado['conflictos'] += 1
+        resultado['actualizados'] = len(movidos)
+        
+        if semana_inicio and movidos:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS _movidos (cliente_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM _movidos")
+            conn.executemany("INSERT INTO _movidos (cliente_id) VALUES (?)", movidos)
+            conn.execute("""
+                DELETE FROM asignaciones_semanales
+                WHERE semana_inicio = ? AND realizada = 0 AND visita_id IS NULL
+                  AND cliente_id IN (SELECT cliente_id FROM _movidos)
+            """, (semana_inicio,))
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO asignaciones_semanales
+                (semana_inicio, cliente_id, responsable_id, dia_atencion, precio)
+                SELECT ?, c.id, c.responsable_id, c.dia_atencion, c.precio_por_visita
+                FROM clientes c JOIN _movidos m ON m.cliente_id = c.id
+                WHERE c.activo = 1 AND NOT EXISTS (
+                    SELECT 1 FROM asignaciones_semanales a
+                    WHERE a.semana_inicio = ? AND a.cliente_id = c.id
+                )
+            """, (semana_inicio, semana_inicio))
+            resultado['asignaciones'] = cursor.rowcount
+            conn.execute("DELETE FROM _movidos")
+    return resultado
+
+
+def imprimir_plan(plan: Dict, tecnicos: Dict[int, str], limite: int = 50):
+    """Imprime el resumen, la carga por casilla y los primeros cambios del plan."""
+    r = plan['resumen']
+    print(f"\nCapacidad por técnico y día: {plan['capacidad']}")
+    print(f"Clientes: {r['clientes']}  Movidos: {r['movidos']} "
+          f"({r['cambian_responsable']} cambian de responsable)")
+    print(f"Carga máxima por casilla: {r['maximo_antes']} -> {r['maximo_despues']} "
+          f"({r['sobre_capacidad_antes']} casillas sobre la capacidad antes)")
+    print(f"Comunas repartidas en más de un día: "
+          f"{r['comunas_divididas_antes']} -> {r['comunas_divididas_despues']}")
+    print(f"Calculado en {r['segundos']:.2f}s")
+    
+    print(f"\n{'Responsable':<25} " + " ".join(f"{d[:3]:>9}" for d in plan['dias']))
+    print("-" * (26 + 10 * len(plan['dias'])))
+    for tecnico_id, nombre in tecnicos.items():
+        celdas = []
+        for dia in plan['dias']:
+            antes = plan['carga_antes'].get(f"{tecnico_id}|{dia}", 0)
+            despues = plan['carga_despues'].get(f"{tecnico_id}|{dia}", 0)
+            celdas.append(f"{antes:>4}->{despues:<4}")
+        print(f"{nombre[:25]:<25} " + " ".join(celdas))
+    
+    if plan['cambios']:
+        print(f"\n{'ID':<6} {'Cliente':<30} {'Comuna':<15} {'De':<28} {'A':<28}")
+        print("-" * 110)
+        for c in plan['cambios'][:limite]:
+            de = f"{tecnicos.get(c['de_responsable_id'], 'Sin asignar')[:15]} / {c['de_dia'] or '-'}"
+            a = f"{c['responsable_nombre'][:15]} / {c['a_dia']}"
+            print(f"{c['cliente_id']:<6} {(c['cliente_nombre'] or '')[:30]:<30} "
+                  f"{(c['comuna'] or '')[:15]:<15} {de:<28} {a:<28}")
+        if len(plan['cambios']) > limite:
+            print(f"... y {len(plan['cambios']) - limite} cambios más")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balance de clientes entre responsables y días")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_plan = sub.add_parser('planificar', help="Calcula el plan y muestra el diff (no modifica nada)")
+    p_plan.add_argument('--capacidad', type=int, help="Máximo de clientes por técnico y día")
+    p_plan.add_argument('--holgura', type=float, default=0.1,
+                        help="Margen sobre el promedio cuando no se indica capacidad")
+    p_plan.add_argument('--dias', nargs='+', default=DIAS_ATENCION, help="Días de atención")
+    p_plan.add_argument('--guardar', help="Guardar el diff en este archivo JSON")
+    p_plan.add_argument('--aplicar', action='store_true', help="Aplicar el plan después de mostrarlo")
+    p_plan.add_argument('--limite', type=int, default=50, help="Cambios a mostrar")
+    
+    p_apl = sub.add_parser('aplicar', help="Aplica un diff guardado con --guardar")
+    p_apl.add_argument('archivo')
+    
+    for p in (p_plan, p_apl):
+        p.add_argument('--db', default='piscinas.db')
+        p.add_argument('--semana', help="Rehacer las asignaciones pendientes de esta semana")
+    
+    args = parser.parse_args()
+    db = Database(args.db)
+    try:
+        if args.comando == 'planificar':
+            plan = Planificador(db, args.dias, args.capacidad, args.holgura).planificar()
+            tecnicos = {r['id']: r['nombre'] for r in db.obtener_responsables()}
+            imprimir_plan(plan, tecnicos, args.limite)
+            if args.guardar:
+                with open(args.guardar, 'w', encoding='utf-8') as f:
+                    json.dump(plan, f, indent=2, ensure_ascii=False)
+                print(f"\n✓ Diff guardado en {args.guardar}")
+            if not args.aplicar:
+                return
+            cambios = plan['cambios']
+        else:
+            with open(args.archivo, encoding='utf-8') as f:
+                cambios = json.load(f)['cambios']
+        r = aplicar(db, cambios, args.semana)
+        print(f"\n✓ {r['actualizados']} clientes actualizados, {r['conflictos']} conflictos")
+        if args.semana:
+            print(f"✓ {r['asignaciones']} asignaciones rehechas en la semana del {args.semana}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Script para registrar visitas en lote desde un archivo CSV.
+
+Columnas: cliente_id, fecha_visita (YYYY-MM-DD) y, opcionalmente,
+responsable_id, precio y realizada (1/0). Si falta el precio se usa el
+precio por visita del cliente.
+"""
+import csv
+import sys
+import time
+from typing import Dict, List
+
+from database import Database
+
+
+def leer_visitas_csv(csv_path: str) -> List[Dict]:
+    """Lee el CSV y retorna las visitas en el formato de ``registrar_visitas_lote``."""
+    visitas = []
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for n, fila in enumerate(csv.DictReader(f), start=2):
+            cliente_id = (fila.get('cliente_id') or '').strip()
+            fecha = (fila.get('fecha_visita') or fila.get('fecha') or '').strip()
+            if not cliente_id.isdigit() or not fecha:
+                print(f"  Línea {n} ignorada: falta cliente_id o fecha_visita")
+                continue
+            
+            responsable = (fila.get('responsable_id') or '').strip()
+            precio = (fila.get('precio') or '').replace('$', '').replace(',', '').strip()
+            realizada = (fila.get('realizada') or '1').strip().lower()
+            visitas.append({
+                'cliente_id': int(cliente_id),
+                'fecha_visita': fecha,
+                'responsable_id': int(responsable) if responsable.isdigit() else None,
+                'precio': float(precio) if precio else None,
+                'realizada': realizada not in ('0', 'no', 'false'),
+            })
+    return visitas
+
+
+def registrar_desde_csv(csv_path: str, db_path: str = "piscinas.db") -> Dict:
+    """Registra todas las visitas del CSV en una sola transacción."""
+    db = Database(db_path)
+    
+    print(f"Leyendo archivo CSV: {csv_path}")
+    inicio = time.perf_counter()
+    visitas = leer_visitas_csv(csv_path)
+    resultado = db.registrar_visitas_lote(visitas)
+    duracion = time.perf_counter() - inicio
+    
+    print("\n✓ Registro completado!")
+    print(f"  - Visitas registradas: {len(resultado['visita_ids'])}")
+    print(f"  - Asignaciones marcadas como realizadas: {resultado['asignaciones_marcadas']}")
+    print(f"  - Tiempo: {duracion:.2f}s")
+    return resultado
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python registrar_visitas.py visitas.csv")
+        sys.exit(1)
+    
+    try:
+        registrar_desde_csv(sys.argv[1])
+    except FileNotFoundError:
+        print(f"Error: No se encontró el archivo {sys.argv[1]}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error durante el registro: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
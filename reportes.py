@@ -0,0 +1,68 @@
+"""
+Módulo de reportes: resúmenes semanales de facturación y productividad.
+
+Lee la tabla ``resumen_semanal`` (migración 11), con una fila por semana,
+responsable y comuna. Los triggers sobre ``visitas`` y
+``asignaciones_semanales`` la actualizan en cada escritura, de modo que las
+consultas de reportes leen unas pocas filas ya agregadas en vez de recorrer
+todo el historial.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import migraciones
+from database import Database
+
+
+class Reportes:
+    """Consultas de facturación y productividad sobre ``resumen_semanal``."""
+    
+    def __init__(self, db: Database):
+        self.db = db
+    
+    def reconstruir(self):
+        """Recalcula ``resumen_semanal`` completo desde las tablas de origen.
+        
+        Solo hace falta si se modificaron datos con los triggers
+        desactivados; el resto del tiempo los triggers la mantienen.
+        """
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM resumen_semanal")
+            conn.execute(f"""
+                INSERT INTO resumen_semanal ({migraciones.COLUMNAS_RESUMEN})
+                {migraciones.aportes_resumen("COALESCE(c.comuna, '')")}
+            """)
+    
+    def _agrupado(self, campo: str, desde: str, hasta: str,
+                  columnas: str = None) -> List[Dict]:
+        """Suma el resumen entre dos semanas agrupando por ``campo``."""
+        cursor = self.db.get_connection().execute(f"""
+            SELECT {columnas or campo},
+                   SUM(asignadas) AS asignadas, SUM(realizadas) AS realizadas,
+                   SUM(monto_asignado) AS monto_asignado,
+                   SUM(visitas) AS visitas, SUM(ingresos) AS ingresos,
+                   ROUND(100.0 * SUM(realizadas) / NULLIF(SUM(asignadas), 0), 1) AS cumplimiento
+            FROM resumen_semanal s
+            LEFT JOIN responsables r ON r.id = s.responsable_id
+            WHERE s.semana_inicio BETWEEN ? AND ?
+            GROUP BY {campo}
+            ORDER BY ingresos DESC
+        """, (desde, hasta))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def por_responsable(self, desde: str, hasta: str = None) -> List[Dict]:
+        """Ingresos y cumplimiento por responsable entre dos semanas (inclusive)."""
+        return self._agrupado("s.responsable_id", desde, hasta or desde,
+                              columnas="s.responsable_id, r.nombre AS responsable_nombre")
+    
+    def por_comuna(self, desde: str, hasta: str = None) -> List[Dict]:
+        """Ingresos y cumplimiento por comuna entre dos semanas (inclusive)."""
+        return self._agrupado("s.comuna", desde, hasta or desde)
+    
+    def tendencia_semanal(self, semanas: int = 12, hasta: str = None) -> List[Dict]:
+        """Totales y porcentaje de cumplimiento de las últimas ``semanas`` semanas."""
+        hasta = hasta or self.db.obtener_semana_actual()
+        desde = (datetime.strptime(hasta, "%Y-%m-%d")
+                 - timedelta(weeks=semanas - 1)).strftime("%Y-%m-%d")
+        return sorted(self._agrupado("s.semana_inicio", desde, hasta),
+                      key=lambda fila: fila['semana_inicio'])
@@ -0,0 +1,336 @@
+"""
+Respaldos en caliente, incrementales y comprimidos de la base SQLite.
+
+La copia se toma con la API de backup de SQLite por tramos de páginas, sobre
+una instantánea de lectura: con la base en modo WAL la aplicación puede
+seguir escribiendo mientras se respalda. Luego la copia se compara página a
+página con el respaldo anterior y solo se guardan las páginas que cambiaron.
+
+Cada respaldo deja en el directorio:
+    <id>.paginas.gz   páginas guardadas (todas si es completo)
+    <id>.hashes.gz    hash de cada página de la base, para el siguiente incremental
+y una entrada en ``manifest.json`` con tamaños, tiempos y checksums SHA-256
+del archivo y de la base reconstruida.
+
+Restaurar a un punto en el tiempo aplica el último respaldo completo anterior
+y los incrementales que lo siguen, escribiendo cada página en su posición, y
+verifica el resultado contra el checksum del manifiesto.
+
+Uso:
+    python respaldos.py crear [--db piscinas.db] [--dir backups/sqlite] [--completo]
+    python respaldos.py listar [--dir backups/sqlite]
+    python respaldos.py restaurar destino.db [--dir backups/sqlite] [--id ID | --hasta "2026-01-05 18:00"]
+    python respaldos.py verificar [--dir backups/sqlite]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+DIRECTORIO = os.path.join('backups', 'sqlite')
+MANIFIESTO = 'manifest.json'
+TAMANO_HASH = 20  # sha1 por página
+_CABECERA = struct.Struct('>I')
+
+
+def _sha256_archivo(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _abrir(path: str, modo: str, comprimido: bool):
+    return gzip.open(path, modo, compresslevel=6) if comprimido else open(path, modo)
+
+
+class Respaldos:
+    """Administra los respaldos de una base en un directorio con ``manifest.json``."""
+    
+    def __init__(self, directorio: str = DIRECTORIO):
+        self.directorio = directorio
+        self.manifiesto_path = os.path.join(directorio, MANIFIESTO)
+    
+    # Manifiesto
+    def manifiesto(self) -> Dict:
+        """Lee el manifiesto (vacío si todavía no hay respaldos)."""
+        if not os.path.exists(self.manifiesto_path):
+            return {'version': 1, 'respaldos': []}
+        with open(self.manifiesto_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _guardar_manifiesto(self, manifiesto: Dict):
+        temporal = self.manifiesto_path + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.manifiesto_path)
+    
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+    
+    # Crear
+    def _copiar_en_caliente(self, db_path: str, destino: str, paginas_por_paso: int,
+                            pausa_ms: float) -> int:
+        """Copia la base con la API de backup; retorna la cantidad de tramos."""
+        tramos = [0]
+        
+        def progreso(estado, restantes, total):
+            tramos[0] += 1
+            # Deja pasar a los escritores entre tramos
+            if pausa_ms:
+                time.sleep(pausa_ms / 1000.0)
+        
+        origen = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        copia = sqlite3.connect(destino)
+        try:
+            # Una transacción de lectura abierta fija la instantánea: en modo
+            # WAL no bloquea a los escritores y evita que la copia se reinicie
+            # cada vez que otra conexión escribe entre dos tramos.
+            origen.execute("BEGIN")
+            origen.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            origen.backup(copia, pages=paginas_por_paso, progress=progreso)
+            origen.execute("COMMIT")
+        finally:
+            copia.close()
+            origen.close()
+        return tramos[0]
+    
+    def crear(self, db_path: str, completo: bool = False, completo_cada: int = 7,
+              paginas_por_paso: int = 1024, pausa_ms: float = 0.0,
+              comprimir: bool = True) -> Dict:
+        """Respalda ``db_path`` y retorna la entrada agregada al manifiesto.
+        
+        El respaldo es incremental respecto del último salvo que se pida
+        ``completo``, no haya respaldo previo, haya cambiado el tamaño de
+        página o ya haya ``completo_cada`` incrementales seguidos.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        manifiesto = self.manifiesto()
+        anterior = manifiesto['respaldos'][-1] if manifiesto['respaldos'] else None
+        
+        inicio = time.perf_counter()
+        creado = datetime.now()
+        ident = creado.strftime('%Y%m%d-%H%M%S-%f')
+        copia = self._ruta(f'.{ident}.copia.db')
+        try:
+            tramos = self._copiar_en_caliente(db_path, copia, paginas_por_paso, pausa_ms)
+            segundos_copia = time.perf_counter() - inicio
+            with open(copia, 'rb') as f:
+                encabezado = f.read(100)
+            page_size = struct.unpack('>H', encabezado[16:18])[0]
+            page_size = 65536 if page_size == 1 else page_size
+            
+            hashes_previos = b''
+            if anterior and not completo and anterior['page_size'] == page_size:
+                incrementales = 0
+                for r in reversed(manifiesto['respaldos']):
+                    if r['tipo'] == 'completo':
+                        break
+                    incrementales += 1
+                if incrementales < completo_cada:
+                    with gzip.open(self._ruta(anterior['hashes']), 'rb') as f:
+                        hashes_previos = f.read()
+            tipo = 'incremental' if hashes_previos else 'completo'
+            
+            extension = '.gz' if comprimir else ''
+            archivo = f'{ident}.paginas{extension}'
+            archivo_hashes = f'{ident}.hashes.gz'
+            hashes = bytearray()
+            guardadas = 0
+            base = hashlib.sha256()
+            with open(copia, 'rb') as f, _abrir(self._ruta(archivo), 'wb', comprimir) as salida:
+                numero = 0
+                for pagina in iter(lambda: f.read(page_size), b''):
+                    numero += 1
+                    base.update(pagina)
+                    digest = hashlib.sha1(pagina).digest()
+                    hashes += digest
+                    desde = (numero - 1) * TAMANO_HASH
+                    if hashes_previos[desde:desde + TAMANO_HASH] != digest:
+                        salida.write(_CABECERA.pack(numero))
+                        salida.write(pagina)
+                        guardadas += 1
+            with gzip.open(self._ruta(archivo_hashes), 'wb') as f:
+                f.write(bytes(hashes))
+        finally:
+            if os.path.exists(copia):
+                os.remove(copia)
+        
+        entrada = {
+            'id': ident,
+            'tipo': tipo,
+            'base': anterior['id'] if tipo == 'incremental' else None,
+            'creado': creado.isoformat(timespec='seconds'),
+            'origen': os.path.abspath(db_path),
+            'page_size': page_size,
+            'paginas': numero,
+            'paginas_guardadas': guardadas,
+            'comprimido': comprimir,
+            'archivo': archivo,
+            'sha256_archivo': _sha256_archivo(self._ruta(archivo)),
+            'bytes_archivo': os.path.getsize(self._ruta(archivo)),
+            'hashes': archivo_hashes,
+            'sha256_hashes': _sha256_archivo(self._ruta(archivo_hashes)),
+            'sha256_base': base.hexdigest(),
+            'bytes_base': numero * page_size,
+            'tramos_backup': tramos,
+            'segundos_copia': round(segundos_copia, 3),
+            'segundos': round(time.perf_counter() - inicio, 3),
+        }
+        manifiesto['respaldos'].append(entrada)
+        self._guardar_manifiesto(manifiesto)
+        return entrada
+    
+    # Restaurar
+    def cadena(self, ident: str = None, hasta: datetime = None) -> List[Dict]:
+        """Respaldos a aplicar, del completo al elegido, para restaurar un punto.
+        
+        Sin argumentos elige el último; con ``hasta`` el último creado hasta
+        ese instante.
+        """
+        respaldos = self.manifiesto()['respaldos']
+        por_id = {r['id']: r for r in respaldos}
+        if ident:
+            if ident not in por_id:
+                raise ValueError(f"No existe el respaldo {ident}")
+            objetivo = por_id[ident]
+        else:
+            candidatos = [r for r in respaldos
+                          if hasta is None or datetime.fromisoformat(r['creado']) <= hasta]
+            if not candidatos:
+                raise ValueError("No hay respaldos para el punto pedido")
+            objetivo = candidatos[-1]
+        
+        cadena = [objetivo]
+        while cadena[-1]['tipo'] != 'completo':
+            base = por_id.get(cadena[-1]['base'])
+            if base is None:
+                raise ValueError(f"Falta el respaldo base {cadena[-1]['base']}")
+            cadena.append(base)
+        return list(reversed(cadena))
+    
+    def _paginas(self, entrada: Dict) -> Iterator[Tuple[int, bytes]]:
+        largo = entrada['page_size']
+        with _abrir(self._ruta(entrada['archivo']), 'rb', entrada['comprimido']) as f:
+            while True:
+                cabecera = f.read(_CABECERA.size)
+                if not cabecera:
+                    return
+                yield _CABECERA.unpack(cabecera)[0], f.read(largo)
+    
+    def restaurar(self, destino: str, ident: str = None, hasta: datetime = None,
+                  verificar: bool = True) -> Dict:
+        """Reconstruye la base en ``destino`` al estado del respaldo elegido."""
+        if os.path.exists(destino):
+            raise FileExistsError(f"{destino} ya existe; no se sobrescribe")
+        inicio = time.perf_counter()
+        cadena = self.cadena(ident, hasta)
+        objetivo = cadena[-1]
+        if verificar:
+            for entrada in cadena:
+                if _sha256_archivo(self._ruta(entrada['archivo'])) != entrada['sha256_archivo']:
+                    raise ValueError(f"Checksum inválido en {entrada['archivo']}")
+        
+        temporal = destino + '.parcial'
+        escritas = 0
+        with open(temporal, 'wb') as f:
+            for entrada in cadena:
+                largo = entrada['page_size']
+                for numero, pagina in self._paginas(entrada):
+                    if numero <= objetivo['paginas']:
+                        f.seek((numero - 1) * largo)
+                        f.write(pagina)
+                        escritas += 1
+            f.truncate(objetivo['paginas'] * objetivo['page_size'])
+        if verificar and _sha256_archivo(temporal) != objetivo['sha256_base']:
+            os.remove(temporal)
+            raise ValueError("La base reconstruida no coincide con el checksum del manifiesto")
+        os.replace(temporal, destino)
+        return {
+            'id': objetivo['id'],
+            'creado': objetivo['creado'],
+            'respaldos_aplicados': len(cadena),
+            'paginas_escritas': escritas,
+            'bytes': objetivo['bytes_base'],
+            'segundos': time.perf_counter() - inicio,
+        }
+    
+    def verificar(self) -> List[str]:
+        """Comprueba los checksums de todos los archivos; retorna los problemas."""
+        problemas = []
+        for entrada in self.manifiesto()['respaldos']:
+            for campo, checksum in (('archivo', 'sha256_archivo'), ('hashes', 'sha256_hashes')):
+                ruta = self._ruta(entrada[campo])
+                if not os.path.exists(ruta):
+                    problemas.append(f"{entrada['id']}: falta {entrada[campo]}")
+                elif _sha256_archivo(ruta) != entrada[checksum]:
+                    problemas.append(f"{entrada['id']}: checksum inválido en {entrada[campo]}")
+        return problemas
+
+
+def _megas(n: float) -> str:
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldos en caliente de la base SQLite")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    
+    p_crear = sub.add_parser('crear', help="Crea un respaldo (incremental si es posible)")
+    p_crear.add_argument('--db', default='piscinas.db')
+    p_crear.add_argument('--completo', action='store_true', help="Forzar respaldo completo")
+    p_crear.add_argument('--completo-cada', type=int, default=7,
+                         help="Incrementales seguidos antes de forzar uno completo")
+    p_crear.add_argument('--paginas', type=int, default=1024, help="Páginas por tramo de copia")
+    p_crear.add_argument('--pausa-ms', type=float, default=0.0, help="Pausa entre tramos")
+    p_crear.add_argument('--sin-compresion', action='store_true')
+    
+    sub.add_parser('listar', help="Lista los respaldos del manifiesto")
+    
+    p_rest = sub.add_parser('restaurar', help="Restaura la base a un punto en el tiempo")
+    p_rest.add_argument('destino')
+    p_rest.add_argument('--id', help="Respaldo a restaurar (por defecto el último)")
+    p_rest.add_argument('--hasta', help="Último respaldo hasta esta fecha/hora (ISO)")
+    
+    sub.add_parser('verificar', help="Comprueba los checksums de los respaldos")
+    
+    for p in sub.choices.values():
+        p.add_argument('--dir', default=DIRECTORIO, help="Directorio de respaldos")
+    
+    args = parser.parse_args()
+    respaldos = Respaldos(args.dir)
+    if args.comando == 'crear':
+        r = respaldos.crear(args.db, args.completo, args.completo_cada, args.paginas,
+                            args.pausa_ms, not args.sin_compresion)
+        print(f"✓ Respaldo {r['tipo']} {r['id']}: {r['paginas_guardadas']} de {r['paginas']} páginas, "
+              f"{_megas(r['bytes_archivo'])} (base {_megas(r['bytes_base'])}) en {r['segundos']:.2f}s")
+    elif args.comando == 'listar':
+        print(f"\n{'ID':<24} {'Tipo':<12} {'Creado':<20} {'Páginas':>14} {'Archivo':>10}")
+        print("-" * 84)
+        for r in respaldos.manifiesto()['respaldos']:
+            paginas = f"{r['paginas_guardadas']}/{r['paginas']}"
+            print(f"{r['id']:<24} {r['tipo']:<12} {r['creado']:<20} {paginas:>14} "
+                  f"{_megas(r['bytes_archivo']):>10}")
+    elif args.comando == 'restaurar':
+        hasta = datetime.fromisoformat(args.hasta) if args.hasta else None
+        r = respaldos.restaurar(args.destino, args.id, hasta)
+        print(f"✓ Restaurado {r['id']} ({r['creado']}) en {args.destino}: "
+              f"{r['respaldos_aplicados']} respaldos, {_megas(r['bytes'])} en {r['segundos']:.2f}s")
+    elif args.comando == 'verificar':
+        problemas = respaldos.verificar()
+        for problema in problemas:
+            print(f"✗ {problema}")
+        if problemas:
+            raise SystemExit(1)
+        print("✓ Todos los respaldos están íntegros")
+
+
+if __name__ == "__main__":
+    main()
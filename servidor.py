@@ -0,0 +1,313 @@
+"""
+Servidor HTTP asíncrono con la API JSON que consume ``public/app.js``.
+
+Implementa sobre ``AsyncDatabase`` las rutas de consulta del servidor Node:
+
+    GET  /api/clientes
+    GET  /api/asignaciones/semana-actual
+    GET  /api/asignaciones/{semana}
+    POST /api/visitas
+    GET  /api/progreso/{semana}
+    GET  /api/agenda/{responsable_id}[/{fecha}]
+    GET  /api/agenda-semana/{semana}
+    GET  /api/estadisticas
+
+Usa solo la biblioteca estándar: asyncio para las conexiones (con
+keep-alive), ``AsyncDatabase`` para consultar en paralelo con conexiones de
+solo lectura y un pool acotado de hilos para serializar y comprimir. Las respuestas llevan ETag (con 304 si no cambiaron) y se
+comprimen con gzip cuando el cliente lo acepta.
+
+Si se define PISCINAS_API_TOKEN, todas las rutas exigen el encabezado
+``Authorization: Bearer <token>``.
+
+Uso:
+    python servidor.py [--host 127.0.0.1] [--port 8000] [--db piscinas.db] [--hilos 8]
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from database_async import AsyncDatabase
+
+logger = logging.getLogger('piscinas.servidor')
+
+MOTIVOS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 401: 'Unauthorized',
+           404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+# Respuestas más pequeñas que esto no se comprimen
+MIN_GZIP = 1024
+MAX_CUERPO = 1024 * 1024
+TIMEOUT_INACTIVO = 15.0
+
+RUTA_SEMANA = re.compile(r'^/api/(asignaciones|progreso|agenda-semana)/(\d{4}-\d{2}-\d{2})$')
+RUTA_AGENDA = re.compile(r'^/api/agenda/(\d+)(?:/(\d{4}-\d{2}-\d{2}))?$')
+
+# Rutas que solo leen datos cacheados por Database: su JSON se reutiliza
+# mientras no cambie la generación de la caché (que también cambia con las
+# escrituras de otros procesos, ver ``Database.validar_cache``)
+RUTAS_CACHEADAS = {'/api/clientes'}
+
+
+class ErrorHTTP(Exception):
+    """Error que se responde al cliente con su código de estado."""
+    
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ServidorAPI:
+    """Atiende la API JSON sobre una instancia de ``AsyncDatabase``."""
+    
+    def __init__(self, db: AsyncDatabase, hilos: int = 8, token: Optional[str] = None):
+        self.db = db
+        self.token = token
+        self.executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='api')
+        # Limita las tareas en cola para no acumular trabajo sin control
+        self.cupos = asyncio.Semaphore(hilos * 4)
+        self._gzip: "OrderedDict[str, bytes]" = OrderedDict()
+        self._serializadas: Dict[str, Tuple[int, bytes]] = {}
+    
+    async def en_hilo(self, funcion, *args):
+        """Ejecuta una función bloqueante en el pool de hilos."""
+        async with self.cupos:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, funcion, *args)
+    
+    # Rutas
+    async def despachar(self, metodo: str, ruta: str, cuerpo: bytes):
+        """Resuelve la ruta y retorna el objeto a serializar como JSON."""
+        if ruta == '/api/clientes':
+            self._exigir(metodo, 'GET')
+            async with self.cupos:
+                return await self.db.obtener_clientes()
+        if ruta == '/api/estadisticas':
+            self._exigir(metodo, 'GET')
+            async with self.cupos:
+                return await self.db.obtener_estadisticas()
+        if ruta == '/api/asignaciones/semana-actual':
+            self._exigir(metodo, 'GET')
+            semana = self.db.obtener_semana_actual()
+            async with self.cupos:
+                asignaciones = await self.db.obtener_asignaciones_semana(semana)
+            return {'semana': semana, 'asignaciones': asignaciones}
+        if ruta == '/api/visitas':
+            self._exigir(metodo, 'POST')
+            async with self.cupos:
+                return await self._registrar_visita(cuerpo)
+        
+        coincidencia = RUTA_SEMANA.match(ruta)
+        if coincidencia:
+            self._exigir(metodo, 'GET')
+            recurso, semana = coincidencia.groups()
+            async with self.cupos:
+                if recurso == 'asignaciones':
+                    return await self.db.obtener_asignaciones_semana(semana)
+                if recurso == 'agenda-semana':
+                    return await self.db.agenda_semana(semana)
+                return await self.db.obtener_progreso_por_responsable(semana)
+        
+        coincidencia = RUTA_AGENDA.match(ruta)
+        if coincidencia:
+            self._exigir(metodo, 'GET')
+            responsable_id, fecha = coincidencia.groups()
+            async with self.cupos:
+                return await self.db.agenda(int(responsable_id), fecha)
+        raise ErrorHTTP(404, 'Ruta no encontrada')
+    
+    @staticmethod
+    def _exigir(metodo: str, esperado: str):
+        if metodo != esperado:
+            raise ErrorHTTP(405, f'Método {metodo} no permitido')
+    
+    async def _registrar_visita(self, cuerpo: bytes) -> Dict:
+        try:
+            datos = json.loads(cuerpo or b'{}')
+        except ValueError:
+            raise ErrorHTTP(400, 'El cuerpo debe ser JSON')
+        if not isinstance(datos, dict):
+            raise ErrorHTTP(400, 'El cuerpo debe ser un objeto JSON')
+        if not datos.get('cliente_id') or not datos.get('fecha_visita'):
+            raise ErrorHTTP(400, 'cliente_id y fecha_visita son obligatorios')
+        try:
+            cliente_id = int(datos['cliente_id'])
+        except (TypeError, ValueError):
+            raise ErrorHTTP(400, 'cliente_id debe ser un número')
+        try:
+            datetime.strptime(datos['fecha_visita'], "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ErrorHTTP(400, 'fecha_visita debe tener formato YYYY-MM-DD')
+        visita_id = await self.db.registrar_visita(
+            cliente_id=cliente_id,
+            fecha_visita=datos['fecha_visita'],
+            responsable_id=datos.get('responsable_id'),
+            precio=datos.get('precio'),
+            realizada=datos.get('realizada') is not False
+        )
+        return {'id': visita_id, 'success': True}
+    
+    # HTTP
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atiende las peticiones de una conexión mientras siga abierta."""
+        try:
+            while True:
+                try:
+                    peticion = await asyncio.wait_for(self._leer_peticion(reader), TIMEOUT_INACTIVO)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except ErrorHTTP as e:
+                    # No se sabe dónde termina la petición: se responde y se cierra
+                    writer.write(self._respuesta(e.estado, self._json({'error': str(e)}), {}, False))
+                    await writer.drain()
+                    break
+                if peticion is None:
+                    break
+                metodo, ruta, version, encabezados, cuerpo = peticion
+                
+                conexion = encabezados.get('connection', '').lower()
+                mantener = conexion != 'close' if version == 'HTTP/1.1' else conexion == 'keep-alive'
+                
+                estado, datos, extra = await self._procesar(metodo, ruta, encabezados, cuerpo)
+                writer.write(self._respuesta(estado, datos, extra, mantener))
+                await writer.drain()
+                if not mantener:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def _leer_peticion(self, reader: asyncio.StreamReader):
+        linea = await reader.readline()
+        if not linea:
+            return None
+        try:
+            metodo, objetivo, version = linea.decode('latin-1').split()
+        except ValueError:
+            raise ErrorHTTP(400, 'Línea de petición inválida')
+        
+        encabezados = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b'\r\n', b'\n', b''):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            encabezados[nombre.strip().lower()] = valor.strip()
+        
+        try:
+            largo = int(encabezados.get('content-length') or 0)
+            if largo < 0:
+                raise ValueError(largo)
+        except ValueError:
+            raise ErrorHTTP(400, 'Content-Length inválido')
+        if largo > MAX_CUERPO:
+            raise ErrorHTTP(413, 'Cuerpo demasiado grande')
+        cuerpo = await reader.readexactly(largo) if largo else b''
+        return metodo.upper(), urlsplit(objetivo).path, version.upper(), encabezados, cuerpo
+    
+    async def _procesar(self, metodo: str, ruta: str, encabezados: Dict,
+                        cuerpo: bytes) -> Tuple[int, bytes, Dict[str, str]]:
+        """Ejecuta la ruta y prepara cuerpo y encabezados (ETag, gzip)."""
+        try:
+            if self.token and encabezados.get('authorization') != f'Bearer {self.token}':
+                raise ErrorHTTP(401, 'No autenticado')
+            datos = await self._datos_ruta(metodo, ruta, cuerpo)
+            estado = 200
+        except ErrorHTTP as e:
+            datos, estado = self._json({'error': str(e)}), e.estado
+        except Exception:
+            # El detalle queda en el log; al cliente no se le exponen internos
+            logger.exception("Error al atender %s %s", metodo, ruta)
+            datos, estado = self._json({'error': 'Error interno del servidor'}), 500
+        
+        extra = {}
+        if estado == 200 and metodo == 'GET':
+            etag = '"' + hashlib.sha1(datos).hexdigest() + '"'
+            extra['ETag'] = etag
+            extra['Cache-Control'] = 'no-cache'
+            if encabezados.get('if-none-match') == etag:
+                return 304, b'', extra
+        if len(datos) >= MIN_GZIP and 'gzip' in encabezados.get('accept-encoding', ''):
+            datos = await self._comprimir(datos, extra.get('ETag'))
+            extra['Content-Encoding'] = 'gzip'
+        extra['Vary'] = 'Accept-Encoding'
+        return estado, datos, extra
+    
+    @staticmethod
+    def _json(resultado) -> bytes:
+        return json.dumps(resultado, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    async def _datos_ruta(self, metodo: str, ruta: str, cuerpo: bytes) -> bytes:
+        """Retorna el JSON de la ruta, reutilizándolo si la caché no cambió."""
+        cacheable = metodo == 'GET' and ruta in RUTAS_CACHEADAS
+        if cacheable:
+            generacion = await self.db.validar_cache()
+            previo = self._serializadas.get(ruta)
+            if previo and previo[0] == generacion:
+                return previo[1]
+        resultado = await self.despachar(metodo, ruta, cuerpo)
+        # Serializar respuestas grandes bloquea; se hace fuera del event loop
+        datos = await self.en_hilo(self._json, resultado)
+        if cacheable:
+            self._serializadas[ruta] = (generacion, datos)
+        return datos
+    
+    async def _comprimir(self, datos: bytes, etag: Optional[str]) -> bytes:
+        """Comprime con gzip reutilizando el resultado si el ETag ya se comprimió."""
+        if etag and etag in self._gzip:
+            self._gzip.move_to_end(etag)
+            return self._gzip[etag]
+        comprimido = await self.en_hilo(gzip.compress, datos, 5)
+        if etag:
+            self._gzip[etag] = comprimido
+            while len(self._gzip) > 32:
+                self._gzip.popitem(last=False)
+        return comprimido
+    
+    @staticmethod
+    def _respuesta(estado: int, datos: bytes, extra: Dict[str, str], mantener: bool) -> bytes:
+        encabezados = [f"HTTP/1.1 {estado} {MOTIVOS.get(estado, '')}"]
+        if estado != 304:
+            encabezados.append("Content-Type: application/json; charset=utf-8")
+        encabezados.append(f"Content-Length: {len(datos)}")
+        encabezados.append(f"Connection: {'keep-alive' if mantener else 'close'}")
+        encabezados.extend(f"{nombre}: {valor}" for nombre, valor in extra.items())
+        return ("\r\n".join(encabezados) + "\r\n\r\n").encode('latin-1') + datos
+
+
+async def servir(host: str, port: int, db_path: str, hilos: int):
+    """Levanta el servidor y atiende hasta que se interrumpa."""
+    db = AsyncDatabase(db_path, lectores=hilos)
+    api = ServidorAPI(db, hilos, os.environ.get('PISCINAS_API_TOKEN'))
+    servidor = await asyncio.start_server(api.atender, host, port)
+    print(f"✓ API escuchando en http://{host}:{port} (base: {db_path}, hilos: {hilos})")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        api.executor.shutdown(wait=False)
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON del sistema de piscinas")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--db', default='piscinas.db')
+    parser.add_argument('--hilos', type=int, default=8)
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.host, args.port, args.db, args.hilos))
+    except KeyboardInterrupt:
+        print("\n¡Hasta luego!")
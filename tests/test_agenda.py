@@ -0,0 +1,71 @@
+"""
+Plan de las consultas de agenda: deben resolverse con el índice de cobertura.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, DIAS_SEMANA
+
+
+class PlanAgendaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'agenda.db'))
+        with self.db.transaction() as conn:
+            conn.executemany("INSERT INTO responsables (nombre) VALUES (?)",
+                             [(f"Técnico {i}",) for i in range(5)])
+            conn.executemany("""
+                INSERT INTO clientes (nombre, comuna, responsable_id, dia_atencion, precio_por_visita)
+                VALUES (?, ?, ?, ?, 20000)
+            """, [(f"Cliente {i}", f"Comuna {i % 7}", i % 5 + 1, DIAS_SEMANA[i % 6])
+                  for i in range(500)])
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-03-30')
+        # Con estadísticas el planificador elige como lo hará en producción
+        self.db.get_connection().execute("ANALYZE")
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_indice_de_cobertura_sin_ordenar(self):
+        for nombre, pasos in self.db.planes_agenda().items():
+            with self.subTest(consulta=nombre):
+                self.assertTrue(
+                    any('USING COVERING INDEX idx_asignaciones_agenda' in paso for paso in pasos), pasos)
+                self.assertFalse(any('USE TEMP B-TREE' in paso for paso in pasos), pasos)
+
+
+class DiaNormalizadoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'agenda.db'))
+        self.db.get_connection().execute("INSERT INTO responsables (nombre) VALUES ('Ana')")
+        self.db.get_connection().executemany("""
+            INSERT INTO clientes (nombre, comuna, responsable_id, dia_atencion) VALUES (?, 'Maipú', 1, ?)
+        """, [('Cliente 1', 'Miércoles'), ('Cliente 2', 'miercoles'), ('Cliente 3', ' MIÉRCOLES ')])
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_agenda_del_dia(self):
+        agenda = self.db.agenda(1, '2026-01-07')
+        self.assertEqual(agenda['total'], 3)
+    
+    def test_agenda_semana_agrupa_variantes(self):
+        (responsable,) = self.db.agenda_semana('2026-01-05')
+        self.assertEqual([(d['dia'], d['fecha'], len(d['clientes'])) for d in responsable['dias']],
+                         [('Miércoles', '2026-01-07', 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
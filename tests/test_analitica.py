@@ -0,0 +1,146 @@
+"""
+Analítica vectorizada (``analitica.py``) contra los mismos cálculos fila a fila.
+
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analitica import Analitica
+from database import Database
+
+INICIO = date(2025, 1, 6)
+SEMANAS = 30
+REFERENCIA = (INICIO + timedelta(weeks=SEMANAS - 1)).isoformat()
+
+
+class AnaliticaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'analitica.db'))
+        azar = random.Random(3)
+        responsables = [self.db.agregar_responsable(f"Técnico {i}") for i in range(3)]
+        self.db.agregar_clientes_lote([{'nombre': f"Cliente {i}", 'responsable_id': responsables[i % 3]}
+                                       for i in range(40)])
+        visitas, asignaciones = [], []
+        for cliente_id in range(1, 41):
+            responsable_id = responsables[cliente_id % 3]
+            # Los clientes múltiplos de 7 dejan de recibir visitas a mitad de periodo
+            ultima = SEMANAS // 2 if cliente_id % 7 == 0 else SEMANAS
+            precio = 15000 + 1000 * (cliente_id % 4)
+            for semana in range(SEMANAS):
+                lunes = INICIO + timedelta(weeks=semana)
+                realizada = semana < ultima and azar.random() < 0.8
+                asignaciones.append((lunes.isoformat(), cliente_id, responsable_id, precio, int(realizada)))
+                if realizada:
+                    if semana == 20 and cliente_id % 5 == 0:
+                        precio += 2000
+                    dia = lunes + timedelta(days=cliente_id % 6)
+                    visitas.append((cliente_id, f"{dia.isoformat()} 10:30:00", responsable_id, precio))
+        with self.db.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO asignaciones_semanales (semana_inicio, cliente_id, responsable_id, precio, realizada)
+                VALUES (?, ?, ?, ?, ?)
+            """, asignaciones)
+            conn.executemany("""
+                INSERT INTO visitas (cliente_id, fecha_visita, responsable_id, precio, realizada)
+                VALUES (?, ?, ?, ?, 1)
+            """, visitas)
+            # Una visita no realizada no cuenta en ninguna métrica
+            conn.execute("INSERT INTO visitas (cliente_id, fecha_visita, precio, realizada) "
+                         "VALUES (1, ?, 99999, 0)", (REFERENCIA,))
+        self.visitas = visitas
+        self.asignaciones = asignaciones
+        self.analitica = Analitica(self.db, historico=False)
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_abandono(self):
+        dias = defaultdict(list)
+        for cliente_id, fecha, _, _ in self.visitas:
+            dias[cliente_id].append(date.fromisoformat(fecha[:10]))
+        referencia = date.fromisoformat(REFERENCIA)
+        esperados = set()
+        for cliente_id, fechas in dias.items():
+            intervalo = (fechas[-1] - fechas[0]).days / (len(fechas) - 1)
+            if len(fechas) >= 3 and (referencia - fechas[-1]).days > max(45, 3 * intervalo):
+                esperados.add(cliente_id)
+        
+        resultado = self.analitica.abandono(referencia=REFERENCIA)
+        self.assertEqual({r['cliente_id'] for r in resultado}, esperados)
+        self.assertTrue(esperados)
+        self.assertTrue(all(cliente_id % 7 == 0 for cliente_id in esperados))
+        sin_visita = [r['dias_sin_visita'] for r in resultado]
+        self.assertEqual(sin_visita, sorted(sin_visita, reverse=True))
+    
+    def test_cumplimiento(self):
+        por_semana = defaultdict(lambda: [0, 0])
+        for semana, _, _, _, realizada in self.asignaciones:
+            por_semana[semana][0] += 1
+            por_semana[semana][1] += realizada
+        resultado = self.analitica.cumplimiento(semanas=SEMANAS, ventana=4, referencia=REFERENCIA)
+        self.assertEqual([(s['semana_inicio'], s['asignadas'], s['realizadas']) for s in resultado['semanas']],
+                         [(semana, a, r) for semana, (a, r) in sorted(por_semana.items())])
+        # La media móvil suma las asignaciones de la ventana, no promedia porcentajes
+        cuarta = resultado['semanas'][3]
+        tramo = [por_semana[s] for s in sorted(por_semana)[:4]]
+        self.assertAlmostEqual(cuarta['media_movil_pct'],
+                               round(sum(r for _, r in tramo) / sum(a for a, _ in tramo) * 100, 2))
+        self.assertLess(resultado['pendiente_pp_semana'], 0)
+    
+    def test_rendimiento(self):
+        visitas = defaultdict(int)
+        ingresos = defaultdict(float)
+        for _, _, responsable_id, precio in self.visitas:
+            visitas[responsable_id] += 1
+            ingresos[responsable_id] += precio
+        resultado = self.analitica.rendimiento(semanas=SEMANAS, referencia=REFERENCIA)
+        self.assertEqual({r['responsable_id']: (r['visitas'], r['ingresos']) for r in resultado},
+                         {r: (visitas[r], ingresos[r]) for r in visitas})
+        self.assertEqual([r['visitas'] for r in resultado], sorted(visitas.values(), reverse=True))
+    
+    def test_precios(self):
+        resultado = self.analitica.precios(meses=12, referencia=REFERENCIA)
+        subieron = {c['cliente_id'] for c in resultado['clientes']}
+        self.assertEqual(subieron, {c for c in range(5, 41, 5) if any(
+            v[0] == c and v[3] != 15000 + 1000 * (c % 4) for v in self.visitas)})
+        self.assertEqual(resultado['resumen']['bajaron'], 0)
+        self.assertEqual([m['mes'] for m in resultado['por_mes']],
+                         [f"2025-{mes:02d}" for mes in range(1, 8)])
+        self.assertEqual(sum(m['visitas'] for m in resultado['por_mes']),
+                         sum(1 for v in self.visitas if v[1] < '2025-08'))
+    
+    def test_refrescar_incremental(self):
+        self.assertTrue(self.analitica.refrescar()['recarga_completa'])
+        self.db.get_connection().execute(
+            "INSERT INTO visitas (cliente_id, fecha_visita, precio, realizada) VALUES (2, ?, 1, 1)",
+            (REFERENCIA,))
+        incremental = self.analitica.refrescar()
+        self.assertFalse(incremental['recarga_completa'])
+        self.assertEqual(incremental['visitas_nuevas'], 1)
+        
+        # Cambiar una fila ya cargada obliga a recargar todo
+        self.db.get_connection().execute("UPDATE visitas SET precio = precio + 1 WHERE id = 1")
+        self.assertTrue(self.analitica.refrescar()['recarga_completa'])
+    
+    def test_cache_en_disco(self):
+        cache = os.path.join(self.directorio.name, 'analitica.npz')
+        Analitica(self.db, cache=cache, historico=False).refrescar()
+        otra = Analitica(self.db, cache=cache, historico=False)
+        resultado = otra.refrescar()
+        self.assertFalse(resultado['recarga_completa'])
+        self.assertEqual(resultado['visitas'], len(self.visitas) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
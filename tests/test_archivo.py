@@ -0,0 +1,83 @@
+"""
+Archivado histórico por año (``archivo.py``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo import Archivador
+from database import Database
+
+
+class ArchivadorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'archivo.db'))
+        self.conn = self.db.get_connection()
+        self.conn.execute("INSERT INTO clientes (nombre, comuna, precio_por_visita) VALUES ('Cliente', 'Maipú', 100)")
+        self.db.asignar_clientes_semanas('2024-03-04', '2024-03-11')
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        self.visitas = {}
+        for nombre, fecha, realizada in (
+                ('con_documento', '2024-03-04', 1), ('no_realizada', '2024-03-05', 0),
+                ('enviada', '2024-03-06', 1), ('sin_factura', '2024-03-07', 1),
+                ('pendiente', '2024-03-08', 1), ('reciente', '2026-01-05', 1)):
+            self.visitas[nombre] = self.conn.execute(
+                "INSERT INTO visitas (cliente_id, fecha_visita, realizada, precio) VALUES (1, ?, ?, 100)",
+                (fecha, realizada)).lastrowid
+        self.conn.execute("UPDATE visitas SET odoo_move_id = 55 WHERE id = ?", (self.visitas['con_documento'],))
+        self.conn.execute("UPDATE odoo_outbox SET estado = 'enviado' WHERE visita_id = ?",
+                          (self.visitas['enviada'],))
+        # Realizada antes de existir la bandeja: nunca se encoló ni se facturó
+        self.conn.execute("DELETE FROM odoo_outbox WHERE visita_id = ?", (self.visitas['sin_factura'],))
+        self.archivador = Archivador(self.db)
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def ids_en_base(self):
+        return {row[0] for row in self.conn.execute("SELECT id FROM visitas")}
+    
+    def test_solo_archiva_visitas_cerradas_con_odoo(self):
+        self.assertEqual(self.archivador.pendientes('2025-01-01'),
+                         {2024: {'visitas': 3, 'asignaciones_semanales': 2}})
+        (resultado,) = self.archivador.archivar('2025-01-01')
+        self.assertEqual((resultado['anio'], resultado['visitas'], resultado['asignaciones']), (2024, 3, 2))
+        
+        quedan = {self.visitas[n] for n in ('sin_factura', 'pendiente', 'reciente')}
+        self.assertEqual(self.ids_en_base(), quedan)
+        encoladas = {row[0] for row in self.conn.execute("SELECT visita_id FROM odoo_outbox")}
+        self.assertEqual(encoladas, {self.visitas['pendiente'], self.visitas['reciente']})
+        self.assertEqual(self.archivador.pendientes('2025-01-01'), {})
+    
+    def test_consultas_historicas_no_cambian(self):
+        antes = [v['id'] for v in self.db.visitas_rango('2024-01-01', '2026-12-31')]
+        asignaciones = len(self.db.asignaciones_rango('2024-01-01', '2026-12-31'))
+        resumen = self.conn.execute("SELECT SUM(visitas), SUM(asignadas) FROM resumen_semanal").fetchone()
+        self.archivador.archivar('2025-01-01')
+        self.assertEqual([v['id'] for v in self.db.visitas_rango('2024-01-01', '2026-12-31')], antes)
+        self.assertEqual(len(self.db.asignaciones_rango('2024-01-01', '2026-12-31')), asignaciones)
+        self.assertEqual(len(self.db.visitas_rango('2024-01-01', '2026-12-31', historico=False)), 3)
+        self.assertEqual(len(self.db.obtener_visitas_cliente(1, limit=10)), 6)
+        # Lo archivado sigue contando en el resumen
+        self.assertEqual(tuple(self.conn.execute(
+            "SELECT SUM(visitas), SUM(asignadas) FROM resumen_semanal").fetchone()), tuple(resumen))
+    
+    def test_archivar_otra_vez_completa_el_anio(self):
+        self.archivador.archivar('2025-01-01')
+        self.conn.execute("UPDATE visitas SET odoo_move_id = 56 WHERE id = ?", (self.visitas['sin_factura'],))
+        (resultado,) = self.archivador.archivar('2025-01-01')
+        self.assertEqual(resultado['visitas'], 1)
+        (registro,) = self.db.archivos_historicos()
+        self.assertEqual((registro['anio'], registro['visitas']), (2024, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Asignación masiva de clientes a semanas (``Database.asignar_clientes_semanas``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class AsignarSemanasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'asignaciones.db'))
+        self.conn = self.db.get_connection()
+        self.conn.executemany(
+            "INSERT INTO clientes (nombre, dia_atencion, precio_por_visita, activo) VALUES (?, ?, ?, ?)",
+            [('Activo 1', 'Lunes', 100, 1), ('Activo 2', 'Martes', 200, 1), ('Inactivo', 'Lunes', 50, 0)])
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def semanas(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT semana_inicio FROM asignaciones_semanales ORDER BY 1")]
+    
+    def test_rango_de_semanas(self):
+        resultado = self.db.asignar_clientes_semanas('2026-01-05', '2026-01-19')
+        self.assertEqual(resultado, {'semanas': 3, 'insertadas': 6, 'existentes': 0})
+        self.assertEqual(self.semanas(), ['2026-01-05', '2026-01-12', '2026-01-19'])
+    
+    def test_fechas_se_llevan_al_lunes(self):
+        resultado = self.db.asignar_clientes_semanas('2026-01-08', '2026-01-14')
+        self.assertEqual(resultado['semanas'], 2)
+        self.assertEqual(self.semanas(), ['2026-01-05', '2026-01-12'])
+    
+    def test_repetir_no_duplica(self):
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        resultado = self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        self.assertEqual(resultado, {'semanas': 1, 'insertadas': 0, 'existentes': 2})
+    
+    def test_cambio_de_dia_no_duplica(self):
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        self.conn.execute("UPDATE clientes SET dia_atencion = 'Jueves' WHERE nombre = 'Activo 1'")
+        resultado = self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        self.assertEqual(resultado['insertadas'], 0)
+        self.assertEqual(resultado['existentes'], 2)
+        total = self.conn.execute("SELECT COUNT(*) FROM asignaciones_semanales").fetchone()[0]
+        self.assertEqual(total, 2)
+    
+    def test_conserva_realizadas(self):
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        self.conn.execute("UPDATE asignaciones_semanales SET realizada = 1")
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-12')
+        realizadas = self.conn.execute(
+            "SELECT COUNT(*) FROM asignaciones_semanales WHERE realizada = 1").fetchone()[0]
+        self.assertEqual(realizadas, 2)
+    
+    def test_incluir_inactivos(self):
+        resultado = self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05', solo_activos=False)
+        self.assertEqual(resultado['insertadas'], 3)
+    
+    def test_rango_invertido(self):
+        with self.assertRaises(ValueError):
+            self.db.asignar_clientes_semanas('2026-01-19', '2026-01-05')
+
+
+if __name__ == "__main__":
+    unittest.main()
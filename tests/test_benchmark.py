@@ -0,0 +1,89 @@
+"""
+Generador de datos sintéticos y suite de ``benchmark.py`` (con datos pequeños).
+
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+from database import Database
+
+
+class GenerarDatosTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'bench.db'))
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_conteos_consistentes(self):
+        datos = benchmark.generar_datos(self.db, responsables=3, clientes=200, semanas=4,
+                                        pct_realizadas=50)
+        conn = self.db.get_connection()
+        self.assertEqual(datos['asignaciones'], 800)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0], 200)
+        self.assertEqual(conn.execute(
+            "SELECT COUNT(DISTINCT semana_inicio) FROM asignaciones_semanales").fetchone()[0], 4)
+        realizadas = conn.execute(
+            "SELECT COUNT(*) FROM asignaciones_semanales WHERE realizada = 1").fetchone()[0]
+        self.assertEqual(datos['visitas'], realizadas)
+        self.assertTrue(300 < realizadas < 500)
+        # Cada visita cae en el día de atención de su semana
+        fuera = conn.execute("""
+            SELECT COUNT(*) FROM visitas v
+            WHERE NOT EXISTS (SELECT 1 FROM asignaciones_semanales a
+                              WHERE a.cliente_id = v.cliente_id AND a.realizada = 1
+                                AND v.fecha_visita BETWEEN a.semana_inicio AND date(a.semana_inicio, '+6 days'))
+        """).fetchone()[0]
+        self.assertEqual(fuera, 0)
+    
+    def test_determinista(self):
+        benchmark.generar_datos(self.db, clientes=50, semanas=2)
+        otra = Database(os.path.join(self.directorio.name, 'otra.db'))
+        try:
+            benchmark.generar_datos(otra, clientes=50, semanas=2)
+            consulta = "SELECT nombre, comuna, dia_atencion, precio_por_visita FROM clientes ORDER BY id"
+            self.assertEqual([tuple(r) for r in self.db.get_connection().execute(consulta)],
+                             [tuple(r) for r in otra.get_connection().execute(consulta)])
+        finally:
+            otra.close()
+
+
+class SuiteTest(unittest.TestCase):
+
+    def test_suite_y_comparar(self):
+        informe = benchmark.benchmark_suite(clientes=100, responsables=2, semanas=3,
+                                            repeticiones=3, filas_excel=20)
+        self.assertEqual(set(informe['resultados']), {
+            'obtener_clientes', 'obtener_asignaciones_semana', 'obtener_visitas_cliente',
+            'registrar_visita', 'asignar_clientes_semana', 'importar_desde_excel'})
+        self.assertEqual(informe['datos']['clientes'], 100)
+        
+        with tempfile.TemporaryDirectory() as directorio:
+            base = os.path.join(directorio, 'base.json')
+            lento = os.path.join(directorio, 'lento.json')
+            with open(base, 'w', encoding='utf-8') as f:
+                json.dump(informe, f)
+            for resultado in informe['resultados'].values():
+                resultado['p50_us'] *= 2
+            with open(lento, 'w', encoding='utf-8') as f:
+                json.dump(informe, f)
+            with redirect_stdout(StringIO()):
+                self.assertTrue(benchmark.comparar(base, base))
+                self.assertFalse(benchmark.comparar(base, lento, umbral=1.5))
+                self.assertTrue(benchmark.comparar(base, lento, umbral=2.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Búsqueda de clientes sin tildes, con palabras incompletas (``Database.buscar_clientes``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class BusquedaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'busqueda.db'))
+        self.db.agregar_clientes_lote([
+            {'nombre': 'Rodrigo Muñoz', 'direccion': 'Las Condes 1234', 'comuna': 'Las Condes',
+             'celular': '+56911112222'},
+            {'nombre': 'Rodrigo Pérez', 'direccion': 'Av. Grecia 50', 'comuna': 'Ñuñoa'},
+            {'nombre': 'María José Rodríguez', 'direccion': 'Los Leones 10', 'comuna': 'Providencia'},
+            {'nombre': 'Condominio Los Álamos', 'direccion': 'Camino 5', 'comuna': 'Colina'},
+        ])
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def nombres(self, texto, **kwargs):
+        return [c['nombre'] for c in self.db.buscar_clientes(texto, **kwargs)]
+    
+    def test_usa_fts(self):
+        self.assertTrue(self.db.fts_disponible)
+    
+    def test_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.nombres('NUNOA'), ['Rodrigo Pérez'])
+        self.assertEqual(self.nombres('alamos'), ['Condominio Los Álamos'])
+        self.assertEqual(self.nombres('perez'), ['Rodrigo Pérez'])
+    
+    def test_palabras_incompletas(self):
+        self.assertEqual(self.nombres('rodrig las cond'), ['Rodrigo Muñoz'])
+        self.assertEqual(self.nombres('5691111'), ['Rodrigo Muñoz'])
+    
+    def test_orden_por_coincidencia(self):
+        resultado = self.nombres('rodri')
+        self.assertEqual(set(resultado[:2]), {'Rodrigo Muñoz', 'Rodrigo Pérez'})
+        self.assertEqual(resultado[2], 'María José Rodríguez')
+    
+    def test_alguna_palabra_si_ninguno_tiene_todas(self):
+        self.assertEqual(set(self.nombres('grecia leones')),
+                         {'Rodrigo Pérez', 'María José Rodríguez'})
+    
+    def test_inactivos_y_cambios(self):
+        self.db.actualizar_cliente(2, activo=0, nombre='Rodrigo Soto')
+        self.assertEqual(self.nombres('perez', activos_only=False), [])
+        self.assertEqual(self.nombres('soto'), [])
+        self.assertEqual(self.nombres('soto', activos_only=False), ['Rodrigo Soto'])
+        self.assertEqual(self.nombres('   '), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Calendario: feriados trasladados, claves enteras y años agregados a pedido.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendario
+from database import Database
+
+
+class FeriadosTest(unittest.TestCase):
+
+    def test_traslados_a_lunes(self):
+        casos = {
+            # Jueves: al lunes de la misma semana
+            (2023, "San Pedro y San Pablo"): date(2023, 6, 26),
+            (2023, "Encuentro de Dos Mundos"): date(2023, 10, 9),
+            # Martes: al lunes anterior
+            (2024, "Encuentro de Dos Mundos"): date(2024, 10, 12),
+            (2027, "San Pedro y San Pablo"): date(2027, 6, 28),
+            # Viernes: al lunes siguiente
+            (2029, "Encuentro de Dos Mundos"): date(2029, 10, 15),
+            # Lunes: se queda
+            (2026, "San Pedro y San Pablo"): date(2026, 6, 29),
+        }
+        for (anio, nombre), esperado in casos.items():
+            with self.subTest(anio=anio, feriado=nombre):
+                fechas = [f for f, n in calendario.feriados(anio).items() if n == nombre]
+                self.assertEqual(fechas, [esperado])
+    
+    def test_claves_sql_equivalentes(self):
+        import sqlite3
+        conn = sqlite3.connect(':memory:')
+        for fecha in ('2020-12-31', '2021-01-03', '2021-01-04', '2026-01-12', '2026-12-28'):
+            with self.subTest(fecha=fecha):
+                dia, semana = conn.execute(
+                    f"SELECT {calendario.sql_clave_dia('?1')}, {calendario.sql_clave_semana('?1')}",
+                    (fecha,)).fetchone()
+                self.assertEqual(dia, calendario.clave_dia(fecha))
+                self.assertEqual(semana, calendario.clave_semana(fecha))
+        conn.close()
+
+
+class TablaCalendarioTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'calendario.db'))
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def anios(self):
+        return tuple(self.db.get_connection().execute(
+            "SELECT MIN(anio), MAX(anio) FROM calendario").fetchone())
+    
+    def test_ventana_inicial(self):
+        actual = date.today().year
+        self.assertEqual(self.anios(), (actual - calendario.ANIOS_ALREDEDOR,
+                                        actual + calendario.ANIOS_ALREDEDOR))
+    
+    def test_extiende_a_pedido(self):
+        dias = self.db.dias_calendario('2010-06-28', '2010-07-04')
+        self.assertEqual([d['fecha'] for d in dias][:2], ['2010-06-28', '2010-06-29'])
+        self.assertEqual(dias[0]['nombre_feriado'], "San Pedro y San Pablo")
+        self.assertEqual(self.anios()[0], 2010)
+        
+        self.db.visitas_rango('2060-01-01', '2060-01-31')
+        self.assertEqual(self.anios()[1], 2060)
+        # Sin huecos entre los años agregados
+        total = self.db.get_connection().execute("SELECT COUNT(DISTINCT anio) FROM calendario").fetchone()[0]
+        self.assertEqual(total, 2060 - 2010 + 1)
+    
+    def test_no_pasa_de_los_limites(self):
+        self.db.dias_calendario('1900-01-01', '1900-12-31')
+        self.assertEqual(self.anios()[0], calendario.ANIO_MINIMO)
+    
+    def test_respeta_feriados_agregados_a_mano(self):
+        conn = self.db.get_connection()
+        conn.execute("""
+            UPDATE calendario SET feriado = 1, nombre_feriado = 'Elecciones', habil = 0
+            WHERE fecha = ?
+        """, (f"{date.today().year}-03-03",))
+        calendario.poblar(conn)
+        fila = conn.execute("SELECT feriado, nombre_feriado, habil FROM calendario WHERE fecha = ?",
+                            (f"{date.today().year}-03-03",)).fetchone()
+        self.assertEqual(tuple(fila), (1, 'Elecciones', 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
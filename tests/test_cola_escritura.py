@@ -0,0 +1,78 @@
+"""
+Cola de escrituras con commit agrupado (``cola_escritura.EscritorAgrupado``).
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cola_escritura import EscritorAgrupado
+from database import Database
+
+
+class EscritorAgrupadoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'cola.db')
+        self.db = Database(self.db_path)
+        self.db.agregar_clientes_lote([{'nombre': f"Cliente {i}"} for i in range(20)])
+        self.escritor = EscritorAgrupado(self.db, espera_ms=50)
+    
+    def tearDown(self):
+        self.escritor.cerrar()
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def contar(self, sql):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql).fetchone()[0]
+        finally:
+            conn.close()
+    
+    def test_agrupa_en_lotes(self):
+        with ThreadPoolExecutor(max_workers=8) as hilos:
+            futuros = list(hilos.map(
+                lambda i: self.escritor.registrar_visita(cliente_id=i % 20 + 1,
+                                                         fecha_visita='2026-01-05'),
+                range(100)))
+        ids = [f.result(timeout=10) for f in futuros]
+        self.assertEqual(len(set(ids)), 100)
+        estadisticas = self.escritor.estadisticas()
+        self.assertEqual(estadisticas['operaciones'], 100)
+        self.assertLess(estadisticas['lotes'], 100)
+        # Un resultado recibido ya está confirmado: otra conexión lo ve
+        self.assertEqual(self.contar("SELECT COUNT(*) FROM visitas"), 100)
+    
+    def test_falla_solo_la_operacion(self):
+        def falla(db):
+            db.actualizar_cliente(1, nombre='No queda')
+            raise ValueError("falla")
+        futuros = [self.escritor.actualizar_cliente(2, nombre='Queda'),
+                   self.escritor.ejecutar(falla),
+                   self.escritor.actualizar_cliente(3, nombre='También')]
+        futuros[0].result(timeout=10)
+        with self.assertRaises(ValueError):
+            futuros[1].result(timeout=10)
+        futuros[2].result(timeout=10)
+        nombres = {c['id']: c['nombre'] for c in self.db.obtener_clientes()}
+        self.assertEqual((nombres[1], nombres[2], nombres[3]), ('Cliente 0', 'Queda', 'También'))
+    
+    def test_cerrar_aplica_lo_pendiente(self):
+        futuros = [self.escritor.enviar('agregar_cliente', nombre=f"Nuevo {i}") for i in range(10)]
+        self.escritor.cerrar()
+        self.assertTrue(all(f.done() for f in futuros))
+        self.assertEqual(self.contar("SELECT COUNT(*) FROM clientes"), 30)
+        with self.assertRaises(RuntimeError):
+            self.escritor.enviar('agregar_cliente', nombre='Tarde')
+
+
+if __name__ == "__main__":
+    unittest.main()
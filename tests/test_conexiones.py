@@ -0,0 +1,95 @@
+"""
+Conexiones persistentes por hilo, transacciones y caché de ``Database``.
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class ConexionesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'conexiones.db')
+        self.db = Database(self.db_path)
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def contar_clientes(self):
+        return self.db.get_connection().execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
+    
+    def test_una_conexion_por_hilo(self):
+        conn = self.db.get_connection()
+        self.assertIs(self.db.get_connection(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        otras = []
+        hilo = threading.Thread(target=lambda: otras.append(self.db.get_connection()))
+        hilo.start()
+        hilo.join()
+        self.assertIsNot(otras[0], conn)
+    
+    def test_transaccion_anidada_se_deshace_completa(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction() as conn:
+                conn.execute("INSERT INTO clientes (nombre) VALUES ('Externo')")
+                with self.db.transaction() as interna:
+                    interna.execute("INSERT INTO clientes (nombre) VALUES ('Interno')")
+                raise RuntimeError("falla")
+        self.assertEqual(self.contar_clientes(), 0)
+        self.assertFalse(self.db.get_connection().in_transaction)
+        
+        with self.db.transaction():
+            self.db.agregar_cliente(nombre='Cliente A')
+            self.assertTrue(self.db.get_connection().in_transaction)
+        self.assertEqual(self.contar_clientes(), 1)
+    
+    def test_al_confirmar(self):
+        llamadas = []
+        with self.db.transaction():
+            self.db.pool.al_confirmar(lambda: llamadas.append('commit'))
+            self.assertEqual(llamadas, [])
+        self.assertEqual(llamadas, ['commit'])
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.pool.al_confirmar(lambda: llamadas.append('rollback'))
+                raise RuntimeError("falla")
+        self.assertEqual(llamadas, ['commit'])
+    
+    def test_cache_ve_escrituras_de_otras_conexiones(self):
+        self.db.agregar_cliente(nombre='Cliente A')
+        self.assertEqual(len(self.db.obtener_clientes()), 1)
+        self.db.obtener_clientes()
+        self.assertGreaterEqual(self.db.cache.stats()['hits'], 1)
+        
+        # Otro proceso (aquí, otra conexión) escribe sin pasar por la caché
+        otra = sqlite3.connect(self.db_path)
+        otra.execute("INSERT INTO clientes (nombre) VALUES ('Cliente B')")
+        otra.commit()
+        otra.close()
+        self.assertEqual(len(self.db.obtener_clientes()), 2)
+    
+    def test_solo_lectura(self):
+        lector = Database(self.db_path, solo_lectura=True, cache=self.db.cache)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                lector.get_connection().execute("INSERT INTO clientes (nombre) VALUES ('X')")
+            self.assertEqual(lector.obtener_clientes(), [])
+            self.db.agregar_cliente(nombre='Cliente A')
+            self.assertEqual(len(lector.obtener_clientes()), 1)
+        finally:
+            lector.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Fachada asíncrona (``database_async.AsyncDatabase``).
+
+    python -m pytest tests
+"""
+import inspect
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_async
+from database import Database
+from database_async import AsyncDatabase
+
+
+class CoberturaTest(unittest.TestCase):
+
+    def test_cada_metodo_publico_en_un_solo_grupo(self):
+        publicos = {nombre for nombre, valor in inspect.getmembers(Database, inspect.isfunction)
+                    if not nombre.startswith('_')}
+        grupos = (database_async.LECTURAS, database_async.ESCRITURAS,
+                  database_async.ITERADORES, database_async.NO_EXPUESTOS)
+        for nombre in publicos:
+            with self.subTest(metodo=nombre):
+                self.assertEqual(sum(nombre in grupo for grupo in grupos), 1)
+        self.assertEqual(set().union(*grupos) - publicos, set())
+
+
+class AsyncDatabaseTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'async.db')
+        self.adb = AsyncDatabase(self.db_path, lectores=2)
+    
+    def tearDown(self):
+        self.adb.close()
+        self.directorio.cleanup()
+    
+    async def agregar_clientes(self, cantidad):
+        await self.adb.agregar_clientes_lote(
+            [{'nombre': f"Cliente {i:04d}", 'comuna': 'Maipú'} for i in range(cantidad)])
+    
+    async def test_lectura_y_escritura(self):
+        cliente_id = await self.adb.agregar_cliente(nombre='Cliente A', comuna='Ñuñoa')
+        cliente = await self.adb.obtener_cliente_por_id(cliente_id)
+        self.assertEqual(cliente['nombre'], 'Cliente A')
+        self.assertEqual(await self.adb.archivos_historicos(), [])
+    
+    async def test_iteradores_recorren_mas_de_un_lote(self):
+        total = database_async.LOTE_ITERADOR * 2 + 10
+        await self.agregar_clientes(total)
+        nombres = [cliente.nombre async for cliente in self.adb.recorrer_clientes()]
+        self.assertEqual(nombres, sorted(f"Cliente {i:04d}" for i in range(total)))
+        ids = [cliente['id'] async for cliente in self.adb.iter_clientes(batch_size=100)]
+        self.assertEqual(len(ids), total)
+    
+    async def test_cortar_iteracion(self):
+        await self.agregar_clientes(database_async.LOTE_ITERADOR + 1)
+        vistos = 0
+        async for _ in self.adb.recorrer_clientes(orden='id'):
+            vistos += 1
+            if vistos == 3:
+                break
+        self.assertEqual(vistos, 3)
+        # El hilo de iteración queda libre para el siguiente recorrido
+        self.assertEqual(len([c async for c in self.adb.iter_clientes()]),
+                         database_async.LOTE_ITERADOR + 1)
+    
+    async def test_planes(self):
+        self.assertIn('agenda', await self.adb.planes_agenda())
+        self.assertIn('visitas_rango', await self.adb.planes_rango())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Exportación de clientes y hojas de ruta (``exportar.py``).
+
+    python -m pytest tests
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import load_workbook
+
+import exportar
+import importar_excel
+from database import Database
+
+
+def maestro(db_path):
+    """Clientes con los campos del Excel maestro, ordenados por nombre."""
+    with Database(db_path) as db:
+        return sorted((c['nombre'], c['direccion'], c['comuna'], c['celular'],
+                       c['responsable_nombre'], c['dia_atencion'], c['precio_por_visita'])
+                      for c in db.obtener_clientes(activos_only=False))
+
+
+class ExportarClientesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'origen.db')
+        with Database(self.db_path) as db:
+            ana, luis = db.agregar_responsable('Ana'), db.agregar_responsable('Luis')
+            db.agregar_clientes_lote([
+                {'nombre': 'Cliente Ñandú', 'direccion': 'Av. O\'Higgins 1', 'comuna': 'Ñuñoa',
+                 'celular': '+56911111111', 'responsable_id': ana, 'dia_atencion': 'Miércoles',
+                 'precio_por_visita': 15000},
+                {'nombre': 'Cliente, con coma', 'direccion': 'Calle "2"', 'comuna': 'Maipú',
+                 'celular': '+56922222222', 'responsable_id': luis, 'dia_atencion': 'Lunes',
+                 'precio_por_visita': 20000},
+                {'nombre': 'Cliente inactivo', 'direccion': 'Calle 3', 'comuna': 'Maipú',
+                 'responsable_id': luis, 'dia_atencion': 'Viernes', 'precio_por_visita': 18000},
+            ])
+            db.actualizar_cliente(3, activo=0)
+    
+    def tearDown(self):
+        self.directorio.cleanup()
+    
+    def ruta(self, nombre):
+        return os.path.join(self.directorio.name, nombre)
+    
+    def exportar(self, salida, **kwargs):
+        with Database(self.db_path) as db:
+            return exportar.exportar_clientes(db, self.ruta(salida), **kwargs)
+    
+    def test_xlsx_se_vuelve_a_importar(self):
+        resultado = self.exportar('clientes.xlsx')
+        self.assertEqual(resultado['filas'], 3)
+        hoja = load_workbook(self.ruta('clientes.xlsx'), read_only=True).active
+        encabezados = next(hoja.iter_rows(max_row=1, values_only=True))
+        self.assertEqual(list(encabezados[:len(exportar.ENCABEZADOS)]), exportar.ENCABEZADOS)
+        
+        with redirect_stdout(StringIO()):
+            importados = importar_excel.importar_desde_excel(self.ruta('clientes.xlsx'),
+                                                             self.ruta('copia.db'))
+        self.assertEqual(importados, 3)
+        self.assertEqual(maestro(self.ruta('copia.db')), maestro(self.db_path))
+    
+    def test_csv(self):
+        resultado = self.exportar('clientes.csv', activos_only=True, delimitador=';')
+        self.assertEqual(resultado['filas'], 2)
+        with open(self.ruta('clientes.csv'), newline='', encoding='utf-8-sig') as f:
+            filas = list(csv.reader(f, delimiter=';'))
+        self.assertEqual(filas[0][:len(exportar.ENCABEZADOS)], exportar.ENCABEZADOS)
+        self.assertEqual([fila[0] for fila in filas[1:]], ['Cliente Ñandú', 'Cliente, con coma'])
+        self.assertEqual(filas[2][1], 'Calle "2"')
+    
+    def test_formato_no_soportado(self):
+        with self.assertRaises(ValueError):
+            self.exportar('clientes.ods')
+
+
+class ExportarRutasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'rutas.db')
+        self.salida = os.path.join(self.directorio.name, 'rutas')
+        with Database(self.db_path) as db:
+            ana = db.agregar_responsable('Ana María')
+            db.agregar_clientes_lote([
+                {'nombre': 'Zeta', 'comuna': 'Maipú', 'responsable_id': ana, 'dia_atencion': 'Lunes'},
+                {'nombre': 'Alfa', 'comuna': 'Maipú', 'responsable_id': ana, 'dia_atencion': 'lunes'},
+                {'nombre': 'Beta', 'comuna': 'Ñuñoa', 'responsable_id': ana, 'dia_atencion': 'miercoles'},
+                {'nombre': 'Gama', 'comuna': 'Ñuñoa', 'responsable_id': ana, 'dia_atencion': 'Feriado'},
+                {'nombre': 'Sola', 'comuna': 'Maipú', 'dia_atencion': 'Martes'},
+            ])
+            db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+    
+    def tearDown(self):
+        self.directorio.cleanup()
+    
+    def test_una_hoja_por_dia(self):
+        resultados = exportar.exportar_rutas(self.db_path, '2026-01-05', self.salida, procesos=1)
+        self.assertEqual([(r['responsable'], r['filas']) for r in resultados],
+                         [('Sin responsable', 1), ('Ana María', 4)])
+        ana = resultados[1]['archivo']
+        self.assertEqual(os.path.basename(ana), 'ruta_2026-01-05_ana_maria.xlsx')
+        
+        libro = load_workbook(ana, read_only=True)
+        self.assertEqual(libro.sheetnames, ['Lunes', 'Miércoles', 'Sin día'])
+        lunes = list(libro['Lunes'].iter_rows(values_only=True))
+        self.assertEqual(list(lunes[0]), exportar.ENCABEZADOS_RUTA)
+        self.assertEqual([(fila[0], fila[1], fila[8]) for fila in lunes[1:]],
+                         [(1, 'Alfa', '2026-01-05'), (2, 'Zeta', '2026-01-05')])
+        miercoles = list(libro['Miércoles'].iter_rows(values_only=True))
+        self.assertEqual(miercoles[1][8], '2026-01-07')
+    
+    def test_csv_en_procesos(self):
+        resultados = exportar.exportar_rutas(self.db_path, '2026-01-05', self.salida,
+                                             formato='csv', procesos=2)
+        self.assertEqual(sum(r['filas'] for r in resultados), 5)
+        with open(resultados[1]['archivo'], newline='', encoding='utf-8-sig') as f:
+            filas = list(csv.reader(f))
+        self.assertEqual([fila[1] for fila in filas[1:]], ['Alfa', 'Zeta', 'Beta', 'Gama'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Importación del Excel maestro de clientes (``importar_excel.py``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+import importar_excel
+from database import Database
+
+
+def escribir_excel(ruta, filas):
+    """Excel con los encabezados del maestro y las filas dadas."""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(list(importar_excel.COLUMNAS))
+    for fila in filas:
+        ws.append(list(fila))
+    wb.save(ruta)
+
+
+class ParsearPrecioTest(unittest.TestCase):
+
+    def test_formatos(self):
+        casos = {
+            '$15.000': 15000, '15,000': 15000, '$1.234.567': 1234567,
+            ' $ 20.000 ': 20000, '15.5': 15.5, 12000: 12000, 99.9: 99.9,
+            None: 0, '': 0, 'a convenir': 0,
+        }
+        for valor, esperado in casos.items():
+            with self.subTest(valor=valor):
+                self.assertEqual(importar_excel._parsear_precio(valor), esperado)
+
+
+class ImportarExcelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.excel = os.path.join(self.directorio.name, 'maestro.xlsx')
+        self.db_path = os.path.join(self.directorio.name, 'importar.db')
+    
+    def tearDown(self):
+        self.directorio.cleanup()
+    
+    def importar(self, filas, **kwargs):
+        escribir_excel(self.excel, filas)
+        with redirect_stdout(StringIO()):
+            return importar_excel.importar_desde_excel(self.excel, self.db_path, **kwargs)
+    
+    def test_importa_en_lotes(self):
+        filas = [(f"Cliente {i}", f"Calle {i}", 'Ñuñoa', '+569', f"Técnico {i % 3}", 'Lunes', '$15.000')
+                 for i in range(25)]
+        self.assertEqual(self.importar(filas, tamano_lote=10), 25)
+        with Database(self.db_path) as db:
+            conn = db.get_connection()
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0], 25)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM responsables").fetchone()[0], 3)
+            precios = {row[0] for row in conn.execute("SELECT precio_por_visita FROM clientes")}
+            self.assertEqual(precios, {15000})
+            sin_responsable = conn.execute(
+                "SELECT COUNT(*) FROM clientes WHERE responsable_id IS NULL").fetchone()[0]
+            self.assertEqual(sin_responsable, 0)
+    
+    def test_omite_filas_vacias_y_encabezados_repetidos(self):
+        filas = [
+            ('Cliente A', 'Calle 1', 'Maipú', None, None, 'Martes', 20000),
+            (None, None, None, None, None, None, None),
+            tuple(importar_excel.COLUMNAS),
+            ('Cliente B', 'Calle 2', 'Maipú', None, 'Responsable', None, None),
+        ]
+        self.assertEqual(self.importar(filas), 2)
+        with Database(self.db_path) as db:
+            clientes = {c['nombre']: c for c in db.obtener_clientes(activos_only=False)}
+        self.assertEqual(set(clientes), {'Cliente A', 'Cliente B'})
+        self.assertIsNone(clientes['Cliente B']['responsable_id'])
+        self.assertEqual(clientes['Cliente A']['precio_por_visita'], 20000)
+
+
+class SincronizarExcelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.excel = os.path.join(self.directorio.name, 'maestro.xlsx')
+        self.db_path = os.path.join(self.directorio.name, 'sincronizar.db')
+    
+    def tearDown(self):
+        self.directorio.cleanup()
+    
+    def sincronizar(self, filas):
+        escribir_excel(self.excel, filas)
+        with redirect_stdout(StringIO()):
+            return importar_excel.sincronizar_desde_excel(self.excel, self.db_path)
+    
+    def clientes(self):
+        with Database(self.db_path) as db:
+            return db.get_connection().execute(
+                "SELECT id, nombre, celular, activo, origen_clave FROM clientes ORDER BY id").fetchall()
+    
+    def test_solo_aplica_el_delta(self):
+        filas = [('Cliente A', 'Calle 1', 'Maipú', '1', 'Ana', 'Lunes', 100),
+                 ('Cliente B', 'Calle 2', 'Maipú', '2', 'Ana', 'Martes', 200)]
+        self.assertEqual(self.sincronizar(filas)['nuevos'], 2)
+        self.assertEqual(self.sincronizar(filas),
+                         {'nuevos': 0, 'actualizados': 0, 'sin_cambios': 2, 'desactivados': 0})
+        
+        filas = [('Cliente A', 'Calle 1', 'Maipú', '9', 'Ana', 'Lunes', 100),
+                 ('Cliente C', 'Calle 3', 'Maipú', '3', 'Ana', 'Martes', 300)]
+        self.assertEqual(self.sincronizar(filas),
+                         {'nuevos': 1, 'actualizados': 1, 'sin_cambios': 0, 'desactivados': 1})
+        estado = {row['nombre']: (row['celular'], row['activo']) for row in self.clientes()}
+        self.assertEqual(estado, {'Cliente A': ('9', 1), 'Cliente B': ('2', 0), 'Cliente C': ('3', 1)})
+    
+    def test_adopta_legados_repetidos_por_id(self):
+        with Database(self.db_path) as db:
+            db.get_connection().executemany(
+                "INSERT INTO clientes (nombre, direccion, comuna, celular) VALUES (?, ?, ?, ?)",
+                [('Cliente A', 'Calle 1', 'Maipú', 'primero'), ('Cliente A', 'Calle 1', 'Maipú', 'segundo')])
+        filas = [('Cliente A', 'Calle 1', 'Maipú', 'uno', None, None, None),
+                 ('Cliente A', 'Calle 1', 'Maipú', 'dos', None, None, None)]
+        resultado = self.sincronizar(filas)
+        self.assertEqual(resultado['nuevos'], 0)
+        self.assertEqual(resultado['actualizados'], 2)
+        clientes = self.clientes()
+        self.assertEqual([row['celular'] for row in clientes], ['uno', 'dos'])
+        self.assertTrue(clientes[1]['origen_clave'].endswith('-1'))
+        self.assertEqual(self.sincronizar(filas)['sin_cambios'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
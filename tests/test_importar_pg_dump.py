@@ -0,0 +1,142 @@
+"""
+Importación de respaldos de PostgreSQL (``importar_pg_dump.py``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importar_pg_dump
+from database import Database
+
+DUMP = r"""
+--
+-- PostgreSQL database dump
+--
+CREATE TABLE public.responsables (
+    id integer NOT NULL,
+    nombre character varying(255) NOT NULL,
+    activo boolean DEFAULT true,
+    created_at timestamp with time zone DEFAULT now()
+);
+CREATE TABLE public.clientes (
+    id integer NOT NULL,
+    nombre character varying(255) NOT NULL,
+    direccion text,
+    comuna character varying(100),
+    responsable_id integer,
+    precio_por_visita numeric(10,2) DEFAULT 0,
+    activo boolean DEFAULT true,
+    notas text,
+    CONSTRAINT clientes_pkey PRIMARY KEY (id)
+);
+CREATE TABLE public.visitas (
+    id integer NOT NULL,
+    cliente_id integer NOT NULL,
+    fecha_visita date NOT NULL,
+    responsable_id integer,
+    precio numeric(10,2),
+    realizada boolean DEFAULT false,
+    firma_url text
+);
+INSERT INTO public.responsables (id, nombre, activo, created_at) VALUES
+    (1, 'Ana', true, '2026-01-02 12:00:00+00'),
+    (2, 'Beto', false, '2026-01-02T15:30:00-03:00');
+COPY public.clientes (id, nombre, direccion, comuna, responsable_id, precio_por_visita, activo, notas) FROM stdin;
+1	Piscina O'Higgins	Av. Uno 1	Ñuñoa	1	25000.00	t	\N
+2	Condominio	Calle\tDos	Maipú	2	30000.50	f	línea 1\nlínea 2
+\.
+INSERT INTO public.visitas VALUES (1, 1, '2026-01-12T03:00:00.000Z', 1, 25000.00, true, 'https://x');
+INSERT INTO public.visitas (id, cliente_id, fecha_visita, responsable_id, precio, realizada) VALUES (2, 2, '2026-01-13', 2, NULL, false), (3, 1, '2026-01-19', 1, 25000::numeric, TRUE);
+INSERT INTO public.tabla_desconocida VALUES (1, 'x');
+SELECT pg_catalog.setval('public.clientes_id_seq', 40, true);
+SELECT pg_catalog.setval('public.visitas_id_seq', 3, false);
+"""
+
+
+class ImportarDumpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.dump = os.path.join(self.directorio.name, 'respaldo.sql')
+        self.db_path = os.path.join(self.directorio.name, 'dump.db')
+        with open(self.dump, 'w', encoding='utf-8') as f:
+            f.write(DUMP)
+        self.db = Database(self.db_path)
+        self.conn = self.db.get_connection()
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def importar(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            return importar_pg_dump.importar_dump(self.dump, self.db_path, **kwargs)
+    
+    def triggers(self):
+        return dict(self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"))
+    
+    def test_filas_y_tipos(self):
+        self.assertEqual(self.importar(), {'responsables': 2, 'clientes': 2, 'visitas': 3})
+        responsables = [tuple(r) for r in self.conn.execute(
+            "SELECT id, activo, created_at FROM responsables ORDER BY id")]
+        self.assertEqual(responsables, [(1, 1, '2026-01-02 12:00:00'), (2, 0, '2026-01-02 18:30:00')])
+        clientes = {r['id']: dict(r) for r in self.conn.execute("SELECT * FROM clientes")}
+        self.assertEqual(clientes[1]['nombre'], "Piscina O'Higgins")
+        self.assertEqual(clientes[2]['direccion'], "Calle\tDos")
+        self.assertEqual(clientes[2]['notas'], "línea 1\nlínea 2")
+        self.assertEqual(clientes[2]['precio_por_visita'], 30000.5)
+        self.assertEqual((clientes[1]['activo'], clientes[2]['activo']), (1, 0))
+        visitas = [tuple(r) for r in self.conn.execute(
+            "SELECT fecha_visita, precio, realizada FROM visitas ORDER BY id")]
+        self.assertEqual(visitas, [('2026-01-12', 25000, 1), ('2026-01-13', None, 0), ('2026-01-19', 25000, 1)])
+        secuencias = dict(self.conn.execute("SELECT name, seq FROM sqlite_sequence"))
+        self.assertEqual((secuencias['clientes'], secuencias['visitas']), (40, 3))
+    
+    def test_reimportar_omite_existentes(self):
+        self.importar()
+        self.assertEqual(self.importar(), {'responsables': 0, 'clientes': 0, 'visitas': 0})
+        self.assertEqual(self.importar(reemplazar=True), {'responsables': 2, 'clientes': 2, 'visitas': 3})
+    
+    def test_triggers_suspendidos_y_restaurados(self):
+        # Un trigger ajeno a los que reconstruye el importador sigue activo
+        self.conn.execute("CREATE TABLE auditoria (visita_id INTEGER)")
+        self.conn.execute("""
+            CREATE TRIGGER auditoria_visitas AFTER INSERT ON visitas BEGIN
+                INSERT INTO auditoria VALUES (new.id);
+            END
+        """)
+        antes = self.triggers()
+        self.importar()
+        self.assertEqual(self.triggers(), antes)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM auditoria").fetchone()[0], 3)
+        
+        # Las visitas importadas no se encolan, pero sí cuentan en el resumen
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM odoo_outbox").fetchone()[0], 0)
+        ingresos = self.conn.execute("SELECT SUM(ingresos) FROM resumen_semanal").fetchone()[0]
+        self.assertEqual(ingresos, 50000)
+        if self.db.fts_disponible:
+            self.assertEqual([c['id'] for c in self.db.buscar_clientes('higgins')], [1])
+    
+    def test_error_no_deja_triggers_borrados(self):
+        antes = self.triggers()
+        with open(self.dump, 'a', encoding='utf-8') as f:
+            f.write("INSERT INTO public.visitas (id, cliente_id) VALUES (9, 1, 5);\n")
+        with self.assertRaises(Exception):
+            self.importar()
+        self.assertEqual(self.triggers(), antes)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM clientes").fetchone()[0], 0)
+    
+    def test_restaurar_verifica_los_triggers(self):
+        with self.assertRaises(RuntimeError):
+            importar_pg_dump._restaurar_triggers(self.conn, [('resumen_inexistente', 'SELECT 1')])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Instrumentación de la capa de base de datos (``instrumentacion.py``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class InstrumentacionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'instrumentacion.db'))
+        self.db.agregar_clientes_lote([{'nombre': f"Cliente {i}", 'comuna': 'Maipú'} for i in range(30)])
+        self.instrumentacion = self.db.activar_instrumentacion(umbral_ms=0)
+    
+    def tearDown(self):
+        self.db.desactivar_instrumentacion()
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_log_sin_sentencias_internas(self):
+        with self.assertLogs('piscinas.consultas', level='WARNING') as registro:
+            self.db.agregar_cliente(nombre='Cliente A', comuna='Ñuñoa')
+            self.db.obtener_clientes()
+        sentencias = '\n'.join(registro.output).upper()
+        self.assertIn('INSERT INTO CLIENTES', sentencias)
+        self.assertIn('SELECT', sentencias)
+        for interna in ('DATA_VERSION', 'BEGIN', 'COMMIT'):
+            self.assertNotIn(interna, sentencias)
+    
+    def test_no_instrumenta_validar_cache(self):
+        self.db.obtener_clientes()
+        self.db.validar_cache()
+        resumen = self.instrumentacion.resumen()
+        self.assertIn('obtener_clientes', resumen)
+        self.assertNotIn('validar_cache', resumen)
+    
+    def test_mide_iteradores(self):
+        self.assertEqual(len(list(self.db.recorrer_clientes())), 30)
+        self.assertEqual(len(list(self.db.iter_clientes(batch_size=7))), 30)
+        resumen = self.instrumentacion.resumen()
+        self.assertEqual(resumen['recorrer_clientes']['llamadas'], 1)
+        self.assertEqual(resumen['recorrer_clientes']['filas'], 30)
+        self.assertEqual(resumen['iter_clientes']['filas'], 30)
+        # Las páginas que pide ``iter_clientes`` se miden también por separado
+        self.assertEqual(resumen['pagina_clientes']['llamadas'], 5)
+    
+    def test_iteracion_cortada(self):
+        for i, _ in enumerate(self.db.recorrer_clientes()):
+            if i == 4:
+                break
+        self.assertEqual(self.instrumentacion.resumen()['recorrer_clientes']['filas'], 5)
+    
+    def test_desactivar_restaura_metodos(self):
+        self.db.desactivar_instrumentacion()
+        self.assertNotIn('obtener_clientes', vars(self.db))
+        self.assertEqual(len(list(self.db.recorrer_clientes())), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Migraciones versionadas del esquema (``migraciones.py``).
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migraciones
+from database import Database
+
+# Esquema de las bases creadas antes de existir las migraciones (versión 0)
+ESQUEMA_LEGADO = """
+    CREATE TABLE responsables (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL UNIQUE,
+        activo INTEGER DEFAULT 1,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE clientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        direccion TEXT,
+        comuna TEXT,
+        celular TEXT,
+        responsable_id INTEGER,
+        dia_atencion TEXT,
+        precio_por_visita REAL DEFAULT 0,
+        activo INTEGER DEFAULT 1,
+        notas TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (responsable_id) REFERENCES responsables(id)
+    );
+    CREATE TABLE visitas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cliente_id INTEGER NOT NULL,
+        fecha_visita TEXT NOT NULL,
+        responsable_id INTEGER,
+        precio REAL,
+        realizada INTEGER DEFAULT 0,
+        notas TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+        FOREIGN KEY (responsable_id) REFERENCES responsables(id)
+    );
+    CREATE TABLE asignaciones_semanales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        semana_inicio TEXT NOT NULL,
+        cliente_id INTEGER NOT NULL,
+        responsable_id INTEGER,
+        dia_atencion TEXT,
+        precio REAL,
+        asignada INTEGER DEFAULT 1,
+        realizada INTEGER DEFAULT 0,
+        notas TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+        FOREIGN KEY (responsable_id) REFERENCES responsables(id),
+        UNIQUE(semana_inicio, cliente_id)
+    );
+    INSERT INTO responsables (nombre) VALUES ('Ana');
+    INSERT INTO clientes (nombre, comuna, responsable_id, dia_atencion, precio_por_visita)
+    VALUES ('Cliente', 'Maipú', 1, 'Lunes', 20000);
+    INSERT INTO visitas (cliente_id, fecha_visita, responsable_id, precio, realizada)
+    VALUES (1, '2024-03-04', 1, 20000, 0);
+    INSERT INTO asignaciones_semanales (semana_inicio, cliente_id, responsable_id, dia_atencion, precio)
+    VALUES ('2024-03-04', 1, 1, 'Lunes', 20000);
+"""
+
+
+class MigracionesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'migraciones.db')
+    
+    def tearDown(self):
+        self.directorio.cleanup()
+    
+    def conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self.addCleanup(conn.close)
+        return conn
+    
+    def test_numeros_consecutivos(self):
+        numeros = [numero for numero, _, _ in migraciones.MIGRACIONES]
+        self.assertEqual(numeros, list(range(1, len(numeros) + 1)))
+        self.assertEqual(migraciones.VERSION_ACTUAL, numeros[-1])
+    
+    def test_base_nueva_y_reapertura(self):
+        conn = self.conectar()
+        self.assertEqual(migraciones.migrar(conn), list(range(1, migraciones.VERSION_ACTUAL + 1)))
+        self.assertEqual(migraciones.version_esquema(conn), migraciones.VERSION_ACTUAL)
+        self.assertEqual(migraciones.migrar(conn), [])
+    
+    def test_forzar_es_idempotente(self):
+        conn = self.conectar()
+        migraciones.migrar(conn)
+        esquema = sorted(conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall(),
+                         key=lambda fila: (fila[0], fila[1]))
+        migraciones.migrar(conn, forzar=True)
+        despues = sorted(conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall(),
+                         key=lambda fila: (fila[0], fila[1]))
+        self.assertEqual(despues, esquema)
+    
+    def test_base_legada(self):
+        conn = self.conectar()
+        conn.executescript(ESQUEMA_LEGADO)
+        migraciones.migrar(conn)
+        # La unicidad pasó a ser por día: el mismo cliente puede ir dos días
+        conn.execute("""
+            INSERT INTO asignaciones_semanales (semana_inicio, cliente_id, dia_atencion)
+            VALUES ('2024-03-04', 1, 'Jueves')
+        """)
+        with self.assertRaises(sqlite3.IntegrityError):
+            conn.execute("""
+                INSERT INTO asignaciones_semanales (semana_inicio, cliente_id, dia_atencion)
+                VALUES ('2024-03-04', 1, 'Lunes')
+            """)
+        fila = conn.execute("""
+            SELECT precio, semana_clave FROM asignaciones_semanales WHERE dia_atencion = 'Lunes'
+        """).fetchone()
+        self.assertEqual(fila, (20000, 202410))
+        
+        # Los datos siguen usables desde Database, incluidas las visitas nuevas
+        with Database(self.db_path) as db:
+            self.assertEqual(db.obtener_cliente_por_id(1)['responsable_nombre'], 'Ana')
+            db.registrar_visitas_lote([{'cliente_id': 1, 'fecha_visita': '2024-03-04'}])
+            self.assertEqual(len(db.visitas_rango('2024-03-04', '2024-03-04')), 2)
+    
+    def test_base_mas_nueva(self):
+        conn = self.conectar()
+        conn.execute(f"PRAGMA user_version = {migraciones.VERSION_ACTUAL + 1}")
+        with self.assertRaises(RuntimeError):
+            migraciones.migrar(conn)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Filas compactas (``modelos.py``) y su uso desde ``Database``.
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from modelos import Cliente, Fila, Visita, filas
+
+
+class FilaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE t (id INTEGER, nombre TEXT, comuna TEXT)")
+        self.conn.executemany("INSERT INTO t VALUES (?, ?, ?)", [(1, 'Ana', 'Maipú'), (2, 'Luis', None)])
+    
+    def tearDown(self):
+        self.conn.close()
+    
+    def test_como_diccionario(self):
+        ana, luis = filas(self.conn.execute("SELECT * FROM t ORDER BY id"), Cliente)
+        self.assertIsInstance(ana, Cliente)
+        self.assertIsInstance(ana, Fila)
+        self.assertEqual((ana['nombre'], ana.nombre, ana[0]), ('Ana', 'Ana', 1))
+        self.assertEqual(luis.get('comuna', 'sin comuna'), None)
+        self.assertEqual(luis.get('celular', 'sin celular'), 'sin celular')
+        self.assertIn('comuna', ana)
+        self.assertNotIn('Ana', ana)
+        self.assertEqual(dict(ana), {'id': 1, 'nombre': 'Ana', 'comuna': 'Maipú'})
+        self.assertEqual(ana.a_dict(), dict(ana))
+        self.assertEqual(list(ana.keys()), ['id', 'nombre', 'comuna'])
+        with self.assertRaises(KeyError):
+            ana['celular']
+        with self.assertRaises(TypeError):
+            ana[0] = 5
+    
+    def test_clase_compartida_y_columna_repetida(self):
+        primera, segunda = filas(self.conn.execute(
+            "SELECT id, nombre, comuna AS nombre FROM t ORDER BY id"), Visita)
+        self.assertIs(type(primera), type(segunda))
+        # Como en dict(row), gana la última columna con el mismo nombre
+        self.assertEqual(primera['nombre'], 'Maipú')
+    
+    def test_sin_resultado(self):
+        self.assertEqual(list(filas(self.conn.execute("UPDATE t SET id = id"), Cliente)), [])
+
+
+class CompactasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'modelos.db'))
+        ana = self.db.agregar_responsable('Ana')
+        self.db.agregar_clientes_lote([{'nombre': f"Cliente {i}", 'responsable_id': ana,
+                                        'dia_atencion': 'Lunes'} for i in range(5)])
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_mismos_datos_que_diccionarios(self):
+        for metodo, args in (('obtener_clientes', ()), ('obtener_responsables', ()),
+                             ('obtener_asignaciones_semana', ('2026-01-05',))):
+            with self.subTest(metodo=metodo):
+                diccionarios = getattr(self.db, metodo)(*args)
+                compactas = getattr(self.db, metodo)(*args, compactas=True)
+                self.assertEqual([dict(f) for f in compactas], diccionarios)
+    
+    def test_cache_comparte_filas(self):
+        primera = self.db.obtener_clientes(compactas=True)
+        self.assertIs(self.db.obtener_clientes(compactas=True), primera)
+        self.db.agregar_cliente(nombre='Otro')
+        self.assertEqual(len(self.db.obtener_clientes(compactas=True)), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
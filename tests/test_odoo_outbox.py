@@ -0,0 +1,135 @@
+"""
+Bandeja de salida hacia Odoo (``odoo_outbox.py``) contra el Odoo simulado.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from odoo_outbox import ClienteOdoo, DespachadorOutbox, encolar_pendientes, iniciar_simulador
+
+
+class OdooQueFalla:
+    """Cliente de Odoo cuyo envío falla con una excepción cualquiera."""
+    
+    def asegurar_partner(self, cliente):
+        raise ValueError("respuesta inesperada")
+
+
+class OutboxTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = iniciar_simulador(port=0)
+        host, port = cls.servidor.server_address
+        cls.url = f"http://{host}:{port}"
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+    
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'outbox.db'))
+        self.conn = self.db.get_connection()
+        self.conn.execute("""
+            INSERT INTO clientes (nombre, direccion, precio_por_visita, documento_tipo)
+            VALUES ('Cliente', 'Calle 1', 25000, 'boleta')
+        """)
+        self.cliente_id = self.conn.execute("SELECT id FROM clientes").fetchone()[0]
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def visita(self, realizada=1) -> int:
+        return self.conn.execute(
+            "INSERT INTO visitas (cliente_id, fecha_visita, realizada) VALUES (?, '2026-01-05', ?)",
+            (self.cliente_id, realizada)).lastrowid
+    
+    def vencer(self):
+        self.conn.execute("UPDATE odoo_outbox SET proximo_intento = datetime('now', '-1 second')")
+    
+    def entrada(self, visita_id):
+        return self.conn.execute(
+            "SELECT estado, intentos, ultimo_error FROM odoo_outbox WHERE visita_id = ?",
+            (visita_id,)).fetchone()
+    
+    def despachador(self, odoo=None, **kwargs):
+        return DespachadorOutbox(self.db, odoo or ClienteOdoo(url=self.url), **kwargs)
+    
+    def test_encola_con_espera(self):
+        visita_id = self.visita()
+        pendiente = self.visita(realizada=0)
+        self.assertEqual(tuple(self.entrada(visita_id)), ('pendiente', 0, None))
+        self.assertIsNone(self.entrada(pendiente))
+        # Dentro de la espera el despachador no la toma
+        self.assertEqual(self.despachador().reclamar(), [])
+        
+        self.conn.execute("UPDATE visitas SET realizada = 1 WHERE id = ?", (pendiente,))
+        self.assertIsNotNone(self.entrada(pendiente))
+    
+    def test_despacha_una_vez(self):
+        visitas = [self.visita() for _ in range(3)]
+        self.vencer()
+        resultado = self.despachador(tamano_lote=2).procesar()
+        self.assertEqual((resultado['enviadas'], resultado['lotes']), (3, 2))
+        for visita_id in visitas:
+            self.assertEqual(self.entrada(visita_id)['estado'], 'enviado')
+            move_id = self.conn.execute("SELECT odoo_move_id FROM visitas WHERE id = ?",
+                                        (visita_id,)).fetchone()[0]
+            self.assertIsNotNone(move_id)
+        facturas = self.servidor.simulador.registros['account.move']
+        referencias = [f['ref'] for f in facturas.values()]
+        for visita_id in visitas:
+            self.assertEqual(referencias.count(f"Visita {visita_id} - Cliente {self.cliente_id}"), 1)
+    
+    def test_reutiliza_el_documento_existente(self):
+        visita_id = self.visita()
+        self.vencer()
+        odoo = ClienteOdoo(url=self.url)
+        previo = odoo.emitir_factura({'id': self.cliente_id, 'documento_tipo': 'boleta'},
+                                     {'id': visita_id, 'precio': 0}, 1)
+        self.despachador(odoo).procesar()
+        move_id = self.conn.execute("SELECT odoo_move_id FROM visitas WHERE id = ?",
+                                    (visita_id,)).fetchone()[0]
+        self.assertEqual(move_id, previo['move_id'])
+    
+    def test_arriendo(self):
+        self.visita()
+        self.vencer()
+        despachador = self.despachador()
+        self.assertEqual(len(despachador.reclamar()), 1)
+        self.assertEqual(despachador.reclamar(), [])
+    
+    def test_cualquier_error_se_reintenta(self):
+        visitas = [self.visita() for _ in range(2)]
+        self.vencer()
+        despachador = self.despachador(OdooQueFalla(), max_intentos=2)
+        self.assertEqual(despachador._guardar([despachador._enviar(e) for e in despachador.reclamar()]),
+                         {'enviadas': 0, 'reintentos': 2, 'fallidas': 0})
+        self.assertEqual(tuple(self.entrada(visitas[0])), ('pendiente', 1, 'respuesta inesperada'))
+        
+        self.vencer()
+        self.assertEqual(despachador.procesar()['fallidas'], 2)
+        self.assertEqual(self.entrada(visitas[1])['estado'], 'error')
+    
+    def test_encolar_pendientes(self):
+        visita_id = self.visita()
+        self.conn.execute("DELETE FROM odoo_outbox")
+        con_error = self.visita()
+        self.conn.execute("DELETE FROM odoo_outbox WHERE visita_id = ?", (con_error,))
+        self.conn.execute("UPDATE visitas SET odoo_error = 'rechazada' WHERE id = ?", (con_error,))
+        self.assertEqual(encolar_pendientes(self.db), 1)
+        self.assertIsNotNone(self.entrada(visita_id))
+        self.assertIsNone(self.entrada(con_error))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Listados de clientes paginados por clave y recorridos sin cargar todo.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class PaginacionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'paginacion.db'))
+        ana = self.db.agregar_responsable('Ana')
+        self.db.agregar_clientes_lote([{
+            'nombre': f"Cliente {i:03d}",
+            'comuna': 'Maipú' if i % 2 else 'Ñuñoa',
+            'responsable_id': ana if i % 3 == 0 else None,
+            'dia_atencion': 'Lunes',
+        } for i in range(120)])
+        self.db.get_connection().execute("UPDATE clientes SET activo = 0 WHERE id % 10 = 0")
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def test_paginas_por_clave(self):
+        vistos, after_id = [], 0
+        while True:
+            pagina = self.db.pagina_clientes(after_id, 25)
+            if not pagina:
+                break
+            vistos.extend(c['id'] for c in pagina)
+            after_id = pagina[-1]['id']
+        self.assertEqual(vistos, [i for i in range(1, 121) if i % 10])
+    
+    def test_filtros(self):
+        pagina = self.db.pagina_clientes(0, 500, activos_only=False, comuna='maipú')
+        self.assertEqual(len(pagina), 60)
+        self.assertTrue(all(c['comuna'] == 'Maipú' for c in pagina))
+        con_responsable = self.db.pagina_clientes(0, 500, responsable_id=1)
+        self.assertTrue(all(c['responsable_nombre'] == 'Ana' for c in con_responsable))
+        self.assertEqual(len(con_responsable), sum(1 for i in range(120) if i % 3 == 0 and (i + 1) % 10))
+    
+    def test_iter_clientes_cubre_todo(self):
+        ids = [c['id'] for c in self.db.iter_clientes(batch_size=7, activos_only=False)]
+        self.assertEqual(ids, list(range(1, 121)))
+    
+    def test_recorrer_clientes(self):
+        por_nombre = [c.nombre for c in self.db.recorrer_clientes()]
+        self.assertEqual(por_nombre, sorted(por_nombre))
+        self.assertEqual(len(por_nombre), 108)
+        por_id = [c.id for c in self.db.recorrer_clientes(orden='id', activos_only=False)]
+        self.assertEqual(por_id, list(range(1, 121)))
+        with self.assertRaises(ValueError):
+            self.db.recorrer_clientes(orden='comuna')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Balance de carga entre responsables y días (``planificador.py``).
+
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from planificador import DIAS_ATENCION, Planificador, aplicar
+
+COMUNAS = ['Maipú', 'Ñuñoa', 'La Florida', 'Providencia', 'Puente Alto', 'Peñalolén', 'Vitacura']
+VARIANTES_DIA = ['Lunes', 'martes', 'MIÉRCOLES', 'Miercoles', 'Jueves', 'Viernes', 'Sábado',
+                 'Domingo', None]
+
+
+class PlanificadorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'planificador.db'))
+        self.tecnicos = [self.db.agregar_responsable(f"Técnico {i}") for i in range(4)]
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def poblar_desbalanceado(self, cantidad=300, semilla=7):
+        azar = random.Random(semilla)
+        # La mitad de los clientes carga al primer técnico; algunos no tienen técnico
+        pesos = [10, 3, 3, 2, 2]
+        self.db.agregar_clientes_lote([{
+            'nombre': f"Cliente {i}",
+            'comuna': azar.choice(COMUNAS),
+            'responsable_id': azar.choices(self.tecnicos + [None], pesos)[0],
+            'dia_atencion': azar.choice(VARIANTES_DIA),
+        } for i in range(cantidad)])
+    
+    def verificar_plan(self, plan):
+        capacidad = plan['capacidad']
+        for casilla, carga in plan['carga_despues'].items():
+            with self.subTest(casilla=casilla):
+                responsable, dia = casilla.split('|')
+                self.assertIn(int(responsable), self.tecnicos)
+                self.assertIn(dia, DIAS_ATENCION)
+                self.assertLessEqual(carga, capacidad)
+        self.assertEqual(sum(plan['carga_despues'].values()), plan['resumen']['clientes'])
+    
+    def test_respeta_la_capacidad(self):
+        self.poblar_desbalanceado()
+        plan = Planificador(self.db).planificar()
+        self.verificar_plan(plan)
+        self.assertGreater(plan['resumen']['sobre_capacidad_antes'], 0)
+        self.assertLessEqual(plan['resumen']['maximo_despues'], plan['capacidad'])
+        
+        ajustado = Planificador(self.db, capacidad=13).planificar()
+        self.verificar_plan(ajustado)
+        self.assertEqual(ajustado['capacidad'], 13)
+    
+    def test_capacidad_insuficiente(self):
+        self.poblar_desbalanceado(cantidad=100)
+        with self.assertRaises(ValueError):
+            Planificador(self.db, capacidad=4).planificar()
+    
+    def test_aplicado_queda_estable(self):
+        self.poblar_desbalanceado()
+        plan = Planificador(self.db).planificar()
+        resultado = aplicar(self.db, plan['cambios'])
+        self.assertEqual(resultado['actualizados'], len(plan['cambios']))
+        self.assertEqual(resultado['conflictos'], 0)
+        
+        de_nuevo = Planificador(self.db, capacidad=plan['capacidad']).planificar()
+        self.assertEqual(de_nuevo['cambios'], [])
+        self.assertEqual(de_nuevo['carga_antes'], plan['carga_despues'])
+    
+    def test_balanceado_no_mueve_nada(self):
+        # Cada comuna en un solo día de cada técnico, y cada casilla llena
+        self.db.agregar_clientes_lote([{
+            'nombre': f"Cliente {tecnico_id}-{d}-{n}", 'comuna': COMUNAS[d],
+            'responsable_id': tecnico_id, 'dia_atencion': dia,
+        } for tecnico_id in self.tecnicos for d, dia in enumerate(DIAS_ATENCION) for n in range(2)])
+        plan = Planificador(self.db, capacidad=2).planificar()
+        self.assertEqual(plan['cambios'], [])
+    
+    def test_conflictos_y_semana(self):
+        self.poblar_desbalanceado(cantidad=120)
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        plan = Planificador(self.db).planificar()
+        editado, *resto = plan['cambios']
+        self.db.actualizar_cliente(editado['cliente_id'], dia_atencion='Domingo')
+        
+        resultado = aplicar(self.db, plan['cambios'], semana_inicio='2026-01-05')
+        self.assertEqual(resultado['conflictos'], 1)
+        self.assertEqual(resultado['actualizados'], len(resto))
+        self.assertEqual(resultado['asignaciones'], len(resto))
+        asignaciones = {a['cliente_id']: a for a in self.db.obtener_asignaciones_semana('2026-01-05')}
+        for cambio in resto:
+            asignacion = asignaciones[cambio['cliente_id']]
+            self.assertEqual((asignacion['responsable_id'], asignacion['dia_atencion']),
+                             (cambio['a_responsable_id'], cambio['a_dia']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Registro de visitas en lote (``Database.registrar_visitas_lote``).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+class RegistrarVisitasLoteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'visitas.db'))
+        self.conn = self.db.get_connection()
+        self.conn.executemany(
+            "INSERT INTO clientes (nombre, dia_atencion, precio_por_visita) VALUES (?, ?, ?)",
+            [('Lunes', 'lunes', 100), ('Miércoles', 'MIERCOLES', 200), ('Sin día', None, 300)])
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def asignaciones(self):
+        return {row['cliente_id']: (row['realizada'], row['visita_id']) for row in self.conn.execute(
+            "SELECT cliente_id, realizada, visita_id FROM asignaciones_semanales")}
+    
+    def test_ids_en_orden_y_precio_del_cliente(self):
+        resultado = self.db.registrar_visitas_lote([
+            {'cliente_id': 2, 'fecha_visita': '2026-01-07'},
+            {'cliente_id': 1, 'fecha_visita': '2026-01-05', 'precio': 150},
+        ])
+        ids = resultado['visita_ids']
+        self.assertEqual(len(ids), 2)
+        precios = [self.conn.execute("SELECT cliente_id, precio FROM visitas WHERE id = ?",
+                                     (i,)).fetchone() for i in ids]
+        self.assertEqual([tuple(p) for p in precios], [(2, 200), (1, 150)])
+    
+    def test_marca_la_asignacion_del_dia_sin_importar_tildes(self):
+        resultado = self.db.registrar_visitas_lote([
+            {'cliente_id': 1, 'fecha_visita': '2026-01-05'},
+            {'cliente_id': 2, 'fecha_visita': '2026-01-07'},
+            {'cliente_id': 3, 'fecha_visita': '2026-01-09'},
+        ])
+        self.assertEqual(resultado['asignaciones_marcadas'], 3)
+        asignaciones = self.asignaciones()
+        for cliente_id, visita_id in zip((1, 2, 3), resultado['visita_ids']):
+            self.assertEqual(asignaciones[cliente_id], (1, visita_id))
+    
+    def test_no_realizadas_no_marcan(self):
+        resultado = self.db.registrar_visitas_lote([
+            {'cliente_id': 1, 'fecha_visita': '2026-01-05', 'realizada': False}])
+        self.assertEqual(resultado['asignaciones_marcadas'], 0)
+        self.assertEqual(self.asignaciones()[1], (0, None))
+    
+    def test_cada_asignacion_se_marca_una_vez(self):
+        resultado = self.db.registrar_visitas_lote([
+            {'cliente_id': 1, 'fecha_visita': '2026-01-05'},
+            {'cliente_id': 1, 'fecha_visita': '2026-01-06'},
+        ])
+        self.assertEqual(resultado['asignaciones_marcadas'], 1)
+        self.assertEqual(self.asignaciones()[1], (1, resultado['visita_ids'][0]))
+    
+    def test_lote_vacio(self):
+        self.assertEqual(self.db.registrar_visitas_lote([]),
+                         {'visita_ids': [], 'asignaciones_marcadas': 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
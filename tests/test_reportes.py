@@ -0,0 +1,99 @@
+"""
+Resumen semanal mantenido por triggers (``reportes.py``, migración 11).
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from reportes import Reportes
+
+
+class ResumenSemanalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directorio.name, 'reportes.db'))
+        self.conn = self.db.get_connection()
+        self.conn.executemany("INSERT INTO responsables (nombre) VALUES (?)", [('Ana',), ('Beto',)])
+        self.conn.executemany("""
+            INSERT INTO clientes (nombre, comuna, responsable_id, dia_atencion, precio_por_visita)
+            VALUES (?, ?, ?, 'Lunes', ?)
+        """, [('Cliente 1', 'Maipú', 1, 100), ('Cliente 2', 'Ñuñoa', 2, 200), ('Cliente 3', None, 1, 300)])
+        self.reportes = Reportes(self.db)
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def resumen(self):
+        return sorted(tuple(row) for row in self.conn.execute(
+            "SELECT * FROM resumen_semanal WHERE asignadas OR realizadas OR monto_asignado "
+            "OR visitas OR ingresos"))
+    
+    def assertResumenExacto(self):
+        mantenido = self.resumen()
+        self.reportes.reconstruir()
+        self.assertEqual(mantenido, self.resumen())
+    
+    def test_triggers_igual_a_reconstruir(self):
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-12')
+        self.db.registrar_visitas_lote([
+            {'cliente_id': 1, 'fecha_visita': '2026-01-05'},
+            {'cliente_id': 3, 'fecha_visita': '2026-01-13', 'realizada': False},
+        ])
+        # El servidor Node guarda la fecha con hora
+        self.conn.execute("""
+            INSERT INTO visitas (cliente_id, fecha_visita, responsable_id, precio, realizada)
+            VALUES (2, '2026-01-07T15:00:00.000Z', 2, 250, 1)
+        """)
+        self.assertResumenExacto()
+        
+        # Cambios de cada columna que aporta al resumen
+        self.conn.execute("UPDATE visitas SET realizada = 1 WHERE cliente_id = 3")
+        self.conn.execute("UPDATE visitas SET fecha_visita = '2026-01-14' WHERE cliente_id = 1")
+        self.conn.execute("UPDATE visitas SET responsable_id = 2, precio = 999 WHERE cliente_id = 2")
+        self.conn.execute("UPDATE asignaciones_semanales SET responsable_id = 2 WHERE cliente_id = 1")
+        self.conn.execute("UPDATE asignaciones_semanales SET semana_inicio = '2026-01-19' "
+                          "WHERE cliente_id = 3 AND semana_inicio = '2026-01-12'")
+        self.conn.execute("UPDATE asignaciones_semanales SET cliente_id = 3 WHERE cliente_id = 2 "
+                          "AND semana_inicio = '2026-01-12'")
+        self.assertResumenExacto()
+        
+        # El cliente se cambia de comuna y luego se borran filas
+        self.conn.execute("UPDATE clientes SET comuna = 'Providencia' WHERE id = 1")
+        self.conn.execute("UPDATE clientes SET comuna = 'Maipú' WHERE id = 3")
+        self.assertResumenExacto()
+        self.conn.execute("DELETE FROM visitas WHERE cliente_id = 2")
+        self.conn.execute("DELETE FROM asignaciones_semanales WHERE cliente_id = 1")
+        self.assertResumenExacto()
+    
+    def test_actualizar_otras_columnas_no_toca_el_resumen(self):
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        visita_id = self.db.registrar_visitas_lote(
+            [{'cliente_id': 1, 'fecha_visita': '2026-01-05'}])['visita_ids'][0]
+        antes = self.conn.total_changes
+        self.conn.execute("UPDATE visitas SET notas = 'ok', odoo_move_id = 7 WHERE id = ?", (visita_id,))
+        self.conn.execute("UPDATE asignaciones_semanales SET notas = 'ok'")
+        # Solo las filas actualizadas, sin escrituras de triggers
+        self.assertEqual(self.conn.total_changes - antes, 1 + 3)
+    
+    def test_reportes(self):
+        self.db.asignar_clientes_semanas('2026-01-05', '2026-01-05')
+        self.db.registrar_visitas_lote([{'cliente_id': 1, 'fecha_visita': '2026-01-05', 'responsable_id': 1},
+                                        {'cliente_id': 3, 'fecha_visita': '2026-01-05', 'responsable_id': 1}])
+        por_responsable = {f['responsable_nombre']: f for f in self.reportes.por_responsable('2026-01-05')}
+        self.assertEqual(por_responsable['Ana']['ingresos'], 400)
+        self.assertEqual(por_responsable['Ana']['cumplimiento'], 100.0)
+        self.assertEqual(por_responsable['Beto']['cumplimiento'], 0.0)
+        comunas = {f['comuna']: f['asignadas'] for f in self.reportes.por_comuna('2026-01-05')}
+        self.assertEqual(comunas, {'Maipú': 1, 'Ñuñoa': 1, '': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
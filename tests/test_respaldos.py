@@ -0,0 +1,92 @@
+"""
+Respaldos incrementales y restauración (``respaldos.py``).
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from respaldos import Respaldos
+
+
+def clientes(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, nombre, comuna FROM clientes ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+class RespaldosTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directorio.name, 'origen.db')
+        self.respaldos = Respaldos(os.path.join(self.directorio.name, 'respaldos'))
+        self.db = Database(self.db_path)
+        self.db.agregar_clientes_lote(
+            [{'nombre': f"Cliente {i}", 'comuna': 'Maipú', 'direccion': 'x' * 200} for i in range(500)])
+    
+    def tearDown(self):
+        self.db.close()
+        self.directorio.cleanup()
+    
+    def destino(self, nombre):
+        return os.path.join(self.directorio.name, nombre)
+    
+    def test_completo_e_incremental(self):
+        completo = self.respaldos.crear(self.db_path)
+        estado_completo = clientes(self.db_path)
+        self.db.actualizar_cliente(1, comuna='Ñuñoa')
+        self.db.agregar_cliente(nombre='Cliente nuevo', comuna='La Florida')
+        incremental = self.respaldos.crear(self.db_path)
+        
+        self.assertEqual(completo['tipo'], 'completo')
+        self.assertEqual(completo['paginas_guardadas'], completo['paginas'])
+        self.assertEqual(incremental['tipo'], 'incremental')
+        self.assertEqual(incremental['base'], completo['id'])
+        self.assertLess(incremental['paginas_guardadas'], incremental['paginas'])
+        
+        ultimo = self.respaldos.restaurar(self.destino('ultimo.db'))
+        self.assertEqual(ultimo['respaldos_aplicados'], 2)
+        self.assertEqual(clientes(self.destino('ultimo.db')), clientes(self.db_path))
+        self.respaldos.restaurar(self.destino('primero.db'), ident=completo['id'])
+        self.assertEqual(clientes(self.destino('primero.db')), estado_completo)
+        
+        conn = sqlite3.connect(self.destino('ultimo.db'))
+        self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone()[0], 'ok')
+        conn.close()
+        self.assertEqual(self.respaldos.verificar(), [])
+    
+    def test_completo_cada(self):
+        tipos = []
+        for i in range(4):
+            self.db.agregar_cliente(nombre=f"Extra {i}")
+            tipos.append(self.respaldos.crear(self.db_path, completo_cada=2)['tipo'])
+        self.assertEqual(tipos, ['completo', 'incremental', 'incremental', 'completo'])
+        self.assertEqual(len(self.respaldos.cadena()), 1)
+    
+    def test_detecta_archivo_corrupto(self):
+        entrada = self.respaldos.crear(self.db_path, comprimir=False)
+        with open(self.respaldos._ruta(entrada['archivo']), 'r+b') as f:
+            f.seek(100)
+            f.write(b'\x00' * 8)
+        self.assertEqual(len(self.respaldos.verificar()), 1)
+        with self.assertRaises(ValueError):
+            self.respaldos.restaurar(self.destino('corrupto.db'))
+        self.assertFalse(os.path.exists(self.destino('corrupto.db')))
+    
+    def test_no_sobrescribe(self):
+        self.respaldos.crear(self.db_path)
+        with self.assertRaises(FileExistsError):
+            self.respaldos.restaurar(self.db_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
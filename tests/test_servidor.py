@@ -0,0 +1,118 @@
+"""
+API JSON asíncrona (``servidor.py``) con peticiones HTTP reales.
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import servidor
+from database_async import AsyncDatabase
+
+
+class ServidorTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.db = AsyncDatabase(os.path.join(self.directorio.name, 'api.db'), lectores=2)
+        await self.db.agregar_cliente("Cliente 1", comuna="Maipú", dia_atencion="Lunes",
+                                      precio_por_visita=15000)
+        self.api = servidor.ServidorAPI(self.db, hilos=2)
+        self.servidor = await asyncio.start_server(self.api.atender, '127.0.0.1', 0)
+        self.port = self.servidor.sockets[0].getsockname()[1]
+    
+    async def asyncTearDown(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        self.api.executor.shutdown()
+        self.db.close()
+        self.directorio.cleanup()
+    
+    async def enviar(self, crudo: bytes):
+        """Envía bytes tal cual; retorna estado, encabezados, cuerpo y si se cerró la conexión."""
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(crudo)
+        await writer.drain()
+        encabezados = {}
+        linea = await reader.readline()
+        estado = int(linea.split()[1])
+        while True:
+            linea = await reader.readline()
+            if linea in (b'\r\n', b''):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            encabezados[nombre.strip().lower()] = valor.strip()
+        cuerpo = await reader.readexactly(int(encabezados.get('content-length', 0)))
+        cerrada = await reader.read(1) == b''
+        writer.close()
+        return estado, encabezados, cuerpo, cerrada
+    
+    async def pedir(self, metodo: str, ruta: str, cuerpo: bytes = b'', **encabezados):
+        extra = ''.join(f"{k.replace('_', '-')}: {v}\r\n" for k, v in encabezados.items())
+        crudo = (f"{metodo} {ruta} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n{extra}"
+                 f"Content-Length: {len(cuerpo)}\r\n\r\n").encode('latin-1') + cuerpo
+        estado, encabezados, cuerpo, _ = await self.enviar(crudo)
+        return estado, encabezados, cuerpo
+    
+    async def test_clientes_con_etag(self):
+        estado, encabezados, cuerpo = await self.pedir('GET', '/api/clientes')
+        self.assertEqual(estado, 200)
+        self.assertEqual([c['nombre'] for c in json.loads(cuerpo)], ["Cliente 1"])
+        estado, _, cuerpo = await self.pedir('GET', '/api/clientes', If_None_Match=encabezados['etag'])
+        self.assertEqual((estado, cuerpo), (304, b''))
+        
+        await self.db.agregar_cliente("Cliente 2")
+        estado, _, cuerpo = await self.pedir('GET', '/api/clientes', If_None_Match=encabezados['etag'])
+        self.assertEqual((estado, len(json.loads(cuerpo))), (200, 2))
+    
+    async def test_registrar_visita(self):
+        estado, _, cuerpo = await self.pedir(
+            'POST', '/api/visitas', json.dumps({'cliente_id': 1, 'fecha_visita': '2026-01-05'}).encode())
+        self.assertEqual(estado, 200)
+        self.assertTrue(json.loads(cuerpo)['success'])
+        for datos in (b'no es json', b'[]', b'{"cliente_id": "x", "fecha_visita": "2026-01-05"}',
+                      b'{"cliente_id": 1, "fecha_visita": "05-01-2026"}', b'{}'):
+            with self.subTest(cuerpo=datos):
+                estado, _, _ = await self.pedir('POST', '/api/visitas', datos)
+                self.assertEqual(estado, 400)
+    
+    async def test_ruta_y_metodo(self):
+        self.assertEqual((await self.pedir('GET', '/api/nada'))[0], 404)
+        self.assertEqual((await self.pedir('POST', '/api/clientes'))[0], 405)
+    
+    async def test_peticiones_invalidas_se_responden(self):
+        estado, _, cuerpo, cerrada = await self.enviar(b"BASURA\r\n\r\n")
+        self.assertEqual(estado, 400)
+        self.assertTrue(cerrada)
+        grande = servidor.MAX_CUERPO + 1
+        estado, _, _, cerrada = await self.enviar(
+            f"POST /api/visitas HTTP/1.1\r\nContent-Length: {grande}\r\n\r\n".encode())
+        self.assertEqual(estado, 413)
+        self.assertTrue(cerrada)
+        estado, _, _, _ = await self.enviar(b"GET /api/clientes HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        self.assertEqual(estado, 400)
+    
+    async def test_error_interno_no_expone_detalles(self):
+        async def fallar(metodo, ruta, cuerpo):
+            raise RuntimeError("ruta secreta /var/db")
+        self.api.despachar = fallar
+        with self.assertLogs('piscinas.servidor', level='ERROR') as registro:
+            estado, _, cuerpo = await self.pedir('GET', '/api/estadisticas')
+        self.assertEqual(estado, 500)
+        self.assertNotIn(b'secreta', cuerpo)
+        self.assertIn('ruta secreta', '\n'.join(registro.output))
+    
+    async def test_token(self):
+        self.api.token = 'abc'
+        self.assertEqual((await self.pedir('GET', '/api/estadisticas'))[0], 401)
+        self.assertEqual((await self.pedir('GET', '/api/estadisticas', Authorization='Bearer abc'))[0], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()